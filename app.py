@@ -1,3 +1,8 @@
+# builtins
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 # modules
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
@@ -6,15 +11,64 @@ import uvicorn
 # local
 import src.template_handlers as template_handlers
 import src.api_handlers as api_handlers
+from src.common.config import WARM_POOL_ENABLED
+from src.common.config import CERT_POOL_ENABLED
+from src.common.config import TERMINAL_RELAY_GATEWAY_ENABLED
+from src.common.config import CONTAINER_INFORMER_ENABLED
+from src.common.config import TERMINAL_REAPER_ENABLED
+from src.containers.certificate_pool import CertificatePoolManager, get_certificate_pool_manager
+from src.containers.warm_pool import WarmPoolManager, get_warm_pool_manager
+from src.containers.creation_jobs import get_creation_job_manager
+from src.containers.container_informer import get_container_informer
+from src.containers.terminal_reaper import get_terminal_reaper
+from src.containers.terminal_relay import get_terminal_sessions
+from src.common.kubernetes_utils import KubernetesUtils
+from src.common.resilience import BackendUnavailableError
+from src.containers.admission import AdmissionRejectedError
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.list_container_response_dto import ListContainerResponseModel
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    '''
+    Start and stop background services.
+    '''
+    background_tasks: list[asyncio.Task] = []
+    if CONTAINER_INFORMER_ENABLED:
+        background_tasks.append(asyncio.create_task(get_container_informer().run()))
+    if WARM_POOL_ENABLED:
+        warm_pool_manager: WarmPoolManager = get_warm_pool_manager()
+        background_tasks.append(asyncio.create_task(warm_pool_manager.run()))
+    # gateway mode terminals have no certificates.
+    if CERT_POOL_ENABLED and not TERMINAL_RELAY_GATEWAY_ENABLED:
+        certificate_pool_manager: CertificatePoolManager = get_certificate_pool_manager()
+        background_tasks.append(asyncio.create_task(certificate_pool_manager.run()))
+    if TERMINAL_REAPER_ENABLED:
+        background_tasks.append(asyncio.create_task(get_terminal_reaper().run()))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    if WARM_POOL_ENABLED:
+        await get_warm_pool_manager().stop()
+    if CERT_POOL_ENABLED and not TERMINAL_RELAY_GATEWAY_ENABLED:
+        await get_certificate_pool_manager().stop()
+    await get_creation_job_manager().stop()
+    await get_terminal_sessions().close()
+    await KubernetesUtils.close()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_exception_handler(BackendUnavailableError, api_handlers.backend_unavailable)
+app.add_exception_handler(AdmissionRejectedError, api_handlers.admission_rejected)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="templates/static"), name="static")
 
 # health checkup
 app.add_api_route(path="/echo", endpoint=api_handlers.echo, methods=["POST"])
+app.add_api_route(path="/metrics", endpoint=api_handlers.metrics, methods=["GET"])
 
 # application templates
 app.add_api_route(path="/", endpoint=template_handlers.home, methods=["GET"])
@@ -38,9 +92,19 @@ app.add_api_route(path="/logout", endpoint=api_handlers.logout, methods=["POST"]
 
 # container apis
 app.add_api_route(path="/create_container", endpoint=api_handlers.create_container, methods=["POST"])
-# app.add_api_route(path="/list_container", endpoint=handlers.list_container, methods=["GET"])
-# app.add_api_route(path="/get_container", endpoint=handlers.get_container, methods=["GET"])
-# app.add_api_route(path="/delete_container", endpoint=handlers.delete_container, methods=["DELETE"])
+app.add_api_route(path="/list_container", endpoint=api_handlers.list_container, methods=["GET"], response_model=ListContainerResponseModel)
+app.add_api_route(path="/get_container", endpoint=api_handlers.get_container, methods=["GET"], response_model=ContainerResponseModel)
+app.add_api_route(path="/delete_container", endpoint=api_handlers.delete_container, methods=["DELETE"])
+
+# terminal apis
+app.add_api_route(path="/create_terminal", endpoint=api_handlers.create_terminal, methods=["POST"])
+app.add_api_route(path="/terminals/{terminal_id}/heartbeat", endpoint=api_handlers.terminal_heartbeat, methods=["POST"])
+app.add_api_websocket_route(path="/ws/terminal/{terminal_id}", endpoint=api_handlers.terminal_relay)
+app.add_api_websocket_route(path="/ws/terminals", endpoint=api_handlers.terminals_relay)
+
+# creation job apis
+app.add_api_route(path="/creation_jobs/{job_id}", endpoint=api_handlers.get_creation_job, methods=["GET"])
+app.add_api_route(path="/creation_jobs/{job_id}/events", endpoint=api_handlers.creation_job_events, methods=["GET"])
 
 
 if __name__ == "__main__":
@@ -4,18 +4,42 @@ Their job is to parse request data, call some class and return response data.
 '''
 
 import asyncio
-from fastapi import Request, HTTPException
+from fastapi import Request, HTTPException, WebSocket
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, Response
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 import json
+import math
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pydantic import BaseModel
+from typing import AsyncIterator, Awaitable, Callable
 
 
-from src.containers.containers_service import ContainerService
+from src.containers.containers_service import ContainerMakerClient, ContainerNotFoundError, get_container_maker_client
 from src.containers.dto.create_container_dto import CreateContainerModel
 from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.list_container_dto import ListContainerDataModel
+from src.containers.dto.list_container_response_dto import ListContainerResponseModel
+from src.containers.dto.get_container_dto import GetContainerDataModel
+from src.containers.dto.delete_container_dto import DeleteContainerDataModel
+from src.containers.dto.delete_container_response_dto import DeleteContainerResponseModel
+from src.containers.dto.create_terminal_dto import CreateTerminalModel
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+from src.containers.warm_pool import get_warm_pool_manager
+from src.containers.creation_jobs import CreationJobManager, ProgressCallback, get_creation_job_manager
+from src.containers.dto.creation_job_dto import CreationJobModel
+from src.containers.enum.creation_job_kind_enum import CreationJobKind
+from src.containers.terminal_reaper import TerminalReaper, get_terminal_reaper
+from src.containers.terminal_owners import TerminalOwners, get_terminal_owners
+from src.containers.terminal_protocol import TerminalCodec, negotiate_browser_codec
+from src.containers.terminal_relay import CLOSE_INTERNAL_ERROR, CLOSE_POLICY_VIOLATION, TerminalRelay, TerminalSession
+from src.containers.terminal_relay import get_terminal_sessions
+from src.containers.admission import AdmissionController, AdmissionRejectedError, AdmissionTicket, get_admission_controller
+from src.common.config import TERMINAL_NETWORK_NAME
+from src.common.config import TERMINAL_REAPER_ENABLED
+from src.common.resilience import BackendUnavailableError
 
 from src.data_models.echo import EchoRequestData, EchoResponseData
-from src.authentication.authentication_helpers import authenticate_session
+from src.authentication.authentication_helpers import authenticate_session, authenticate_websocket
 from src.authentication.authentication_service import GoogleAuthenticationService, GithubAuthenticationService
 
 
@@ -57,18 +81,329 @@ async def echo(request: EchoRequestData) -> EchoResponseData:
     return EchoResponseData(message=request.message)
 
 
+async def metrics() -> Response:
+    '''
+    Prometheus metrics.
+    '''
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+async def backend_unavailable(request: Request, error: BackendUnavailableError) -> JSONResponse:
+    '''
+    Exception handler: calls to a protected backend fail fast with 503 and a Retry-After.
+    '''
+    return JSONResponse(
+        status_code=503,
+        content={'detail': str(error)},
+        headers={'Retry-After': str(math.ceil(error.retry_after))}
+    )
+
+
+async def admission_rejected(request: Request, error: AdmissionRejectedError) -> JSONResponse:
+    '''
+    Exception handler: creations that are not admitted are rejected with 429 and a Retry-After.
+    '''
+    return JSONResponse(
+        status_code=429,
+        content={'detail': str(error)},
+        headers={'Retry-After': str(math.ceil(error.retry_after))}
+    )
+
+
+def subscription_type(request: Request | WebSocket) -> str:
+    '''
+    Get the subscription type of the authenticated user, e.g. free.
+    '''
+    return (request.state.current_subscription_plan or {}).get('type', 'free')
+
+
+async def submit_admitted(
+    request: Request,
+    user_id: str,
+    kind: CreationJobKind,
+    run: Callable[[ProgressCallback], Awaitable[BaseModel]],
+    idempotency_key: str | None = None
+) -> CreationJobModel:
+    '''
+    Reserve a creation with the admission controller and submit its job.
+    The job stays queued until the creation is admitted.
+    With an idempotency key, a job already submitted with the key is returned instead.
+    :raises: AdmissionRejectedError if the creation cannot even wait for admission.
+    '''
+    admission_controller: AdmissionController = get_admission_controller()
+    ticket: AdmissionTicket = admission_controller.reserve(user_id, subscription_type(request))
+
+    async def run_admitted(progress: ProgressCallback) -> BaseModel:
+        async with admission_controller.admitted(ticket):
+            return await run(progress)
+
+    try:
+        if idempotency_key is None:
+            return await get_creation_job_manager().submit(user_id, kind, run_admitted)
+        job, submitted = await get_creation_job_manager().submit_once(user_id, kind, run_admitted, idempotency_key)
+        if not submitted:
+            admission_controller.release(ticket)
+        return job
+    except Exception as e:
+        admission_controller.release(ticket)
+        raise e
+
+
+@authenticate_session
+async def create_container(request: Request, create_container_data: CreateContainerModel) -> Response:
+    '''
+    Authentication: This handler needs to be authenticated.
+    Submits a job creating the container and returns 202 with the job.
+    Progress is streamed from /creation_jobs/{job_id}/events.
+    '''
+    try:
+        user_id: str = str(request.state.user_info['id'])
+        idempotency_key: str | None = create_container_data.idempotency_key
+        if idempotency_key is not None:
+            # a retry: answer with the running or finished job, container-maker is not called again.
+            job: CreationJobModel | None = await get_creation_job_manager().find(user_id, CreationJobKind.CONTAINER, idempotency_key)
+            if job is not None:
+                return Response(content=job.model_dump_json(), media_type="application/json", status_code=202)
+        # get the shared container maker client
+        container_maker_client: ContainerMakerClient = get_container_maker_client()
+        # fail fast instead of queueing a job that cannot succeed.
+        container_maker_client.guard.breaker.check()
+
+        async def run(progress: ProgressCallback) -> ContainerResponseModel:
+            return await container_maker_client.create_container_until_ready(
+                create_container_data, user_id=user_id, progress=progress
+            )
+
+        # submit the creation job, it runs once admitted
+        job = await submit_admitted(request, user_id, CreationJobKind.CONTAINER, run, idempotency_key=idempotency_key)
+        return Response(content=job.model_dump_json(), media_type="application/json", status_code=202)
+    except Exception as e:
+        raise e
+
+
+@authenticate_session
+async def list_container(request: Request, network_name: str = TERMINAL_NETWORK_NAME) -> Response:
+    '''
+    Authentication: This handler needs to be authenticated.
+    Lists the user's containers in a network. Served from the container metadata cache when possible.
+    '''
+    try:
+        container_maker_client: ContainerMakerClient = get_container_maker_client()
+        container_list: ListContainerResponseModel = await container_maker_client.list_container(
+            ListContainerDataModel(network_name=network_name), user_id=str(request.state.user_info['id'])
+        )
+        # serialized here: returning the model would make FastAPI validate it again.
+        return Response(content=container_list.model_dump_json(), media_type="application/json")
+    except Exception as e:
+        raise e
+
+
+@authenticate_session
+async def get_container(request: Request, container_id: str, network_name: str = TERMINAL_NETWORK_NAME) -> Response:
+    '''
+    Authentication: This handler needs to be authenticated.
+    Gets one of the user's containers. Served from the container metadata cache when possible.
+    Containers of other users are reported as not found.
+    '''
+    try:
+        container_maker_client: ContainerMakerClient = get_container_maker_client()
+        container: ContainerResponseModel = await container_maker_client.get_container(
+            GetContainerDataModel(container_id=container_id, network_name=network_name),
+            user_id=str(request.state.user_info['id'])
+        )
+        return Response(content=container.model_dump_json(), media_type="application/json")
+    except ContainerNotFoundError:
+        raise HTTPException(status_code=404, detail="Container not found")
+    except Exception as e:
+        raise e
+
+
 @authenticate_session
-async def create_container(request: CreateContainerModel) -> ContainerResponseModel:
+async def delete_container(request: Request, delete_container_data: DeleteContainerDataModel) -> DeleteContainerResponseModel:
     '''
     Authentication: This handler needs to be authenticated.
-    Creates an SSH container and a Socket-SSH container.
+    Deletes one of the user's containers and invalidates its cache entries.
+    A terminal whose container is deleted can no longer be opened, its owner record is deleted too.
+    Containers of other users are reported as not found.
     '''
     try:
-        # create a container maker client
-        container_maker_client: ContainerService = ContainerService()
-        # create a container
-        container_response_model: ContainerResponseModel = await container_maker_client.create_container(request)
-        # return the response
-        return container_response_model
+        container_maker_client: ContainerMakerClient = get_container_maker_client()
+        response: DeleteContainerResponseModel = await container_maker_client.delete_container(
+            delete_container_data, user_id=str(request.state.user_info['id'])
+        )
+        await get_terminal_owners().remove_container(delete_container_data.container_id)
+        return response
+    except ContainerNotFoundError:
+        raise HTTPException(status_code=404, detail="Container not found")
     except Exception as e:
         raise e
+
+
+async def hand_out_terminal(terminal: TerminalResponseModel, user_id: str, tier: str) -> None:
+    '''
+    Record the owner of a new terminal and start tracking it.
+    If either fails the terminal is deleted and the error raised: nobody could open it, nothing would ever reap it.
+    '''
+    try:
+        # only the owner can open the terminal, with or without the reaper.
+        await get_terminal_owners().add(user_id, terminal)
+        if TERMINAL_REAPER_ENABLED:
+            # from now on the terminal is deleted once idle.
+            await get_terminal_reaper().track(terminal, user_id, tier)
+    except Exception as e:
+        print(f"Error tracking terminal {terminal.terminal_id}, deleting it: {e}")
+        try:
+            await get_warm_pool_manager().terminal_service.delete_terminal(terminal, user_id=user_id)
+            await get_terminal_owners().remove(terminal.terminal_id)
+        except Exception as delete_error:
+            print(f"Error deleting terminal {terminal.terminal_id}: {delete_error}")
+        raise e
+
+
+@authenticate_session
+async def create_terminal(request: Request, create_terminal_data: CreateTerminalModel) -> Response:
+    '''
+    Authentication: This handler needs to be authenticated.
+    Submits a job creating a terminal: an SSH container and a Socket-SSH container.
+    Hands out a warm terminal when the pool has one. Returns 202 with the job.
+    '''
+    try:
+        user_id: str = str(request.state.user_info['id'])
+
+        async def run(progress: ProgressCallback) -> TerminalResponseModel:
+            terminal: TerminalResponseModel = await get_warm_pool_manager().acquire_or_create(
+                create_terminal_data, user_id=user_id, progress=progress
+            )
+            await hand_out_terminal(terminal, user_id, subscription_type(request))
+            # the browser opens the terminal next, have its connection ready.
+            get_terminal_sessions().connector.warm(terminal)
+            return terminal
+
+        job: CreationJobModel = await submit_admitted(request, user_id, CreationJobKind.TERMINAL, run)
+        return Response(content=job.model_dump_json(), media_type="application/json", status_code=202)
+    except Exception as e:
+        raise e
+
+
+@authenticate_session
+async def terminal_heartbeat(request: Request, terminal_id: str) -> Response:
+    '''
+    Authentication: This handler needs to be authenticated.
+    Records activity on a terminal, so that it is not deleted as idle.
+    '''
+    user_id: str = str(request.state.user_info['id'])
+    if not await get_terminal_reaper().heartbeat(terminal_id, user_id, subscription_type(request)):
+        raise HTTPException(status_code=404, detail="Terminal not found")
+    return Response(status_code=204)
+
+
+@authenticate_websocket
+async def terminal_relay(websocket: WebSocket, terminal_id: str, resume: int | None = None) -> None:
+    '''
+    Authentication: This websocket needs to be authenticated.
+    Relays frames between the browser and the socket-ssh container of one of the user's terminals.
+    The encoding is negotiated as a subprotocol: binary frames, or JSON when the browser offers nothing else.
+    Reconnects pass the sequence number of the output they saw as resume, and are sent only what they missed.
+    Traffic from the browser counts as activity, so that the terminal is not deleted as idle.
+    '''
+    user_id: str = str(websocket.state.user_info['id'])
+    terminal_reaper: TerminalReaper = get_terminal_reaper()
+    terminal: TerminalResponseModel | None = await get_terminal_owners().terminal(terminal_id, user_id)
+    if terminal is None:
+        # terminals of other users are reported as not found, like missing ones.
+        await websocket.close(code=CLOSE_POLICY_VIOLATION)
+        return
+    offered: list[str] = websocket.scope.get('subprotocols', [])
+    browser_codec: TerminalCodec = negotiate_browser_codec(offered)
+    # a subprotocol the browser did not offer would fail the handshake.
+    await websocket.accept(subprotocol=browser_codec.subprotocol if offered else None)
+    try:
+        session: TerminalSession = await get_terminal_sessions().open(terminal)
+    except Exception as e:
+        print(f"Error connecting to socket-ssh of terminal {terminal_id}: {e}")
+        # the certificates may have been reissued.
+        get_terminal_sessions().connector.forget(terminal)
+        await websocket.close(code=CLOSE_INTERNAL_ERROR)
+        return
+    tier: str = subscription_type(websocket)
+
+    async def on_input(terminal_id: str) -> None:
+        await terminal_reaper.record_activity(terminal_id, tier)
+
+    await TerminalRelay(websocket, session, browser_codec=browser_codec, on_input=on_input, resume=resume).run()
+
+
+@authenticate_websocket
+async def terminals_relay(websocket: WebSocket) -> None:
+    '''
+    Authentication: This websocket needs to be authenticated.
+    Relays any number of the user's terminals over one websocket, one channel each, see terminal_relay.
+    The browser opens a channel per terminal, with the sequence number to resume from if it reconnects.
+    Terminals of other users are refused like missing ones.
+    '''
+    user_id: str = str(websocket.state.user_info['id'])
+    terminal_reaper: TerminalReaper = get_terminal_reaper()
+    terminal_owners: TerminalOwners = get_terminal_owners()
+    offered: list[str] = websocket.scope.get('subprotocols', [])
+    browser_codec: TerminalCodec = negotiate_browser_codec(offered)
+    await websocket.accept(subprotocol=browser_codec.subprotocol if offered else None)
+    tier: str = subscription_type(websocket)
+
+    async def open_session(terminal_id: str) -> TerminalSession | None:
+        terminal: TerminalResponseModel | None = await terminal_owners.terminal(terminal_id, user_id)
+        if terminal is None:
+            return None
+        try:
+            return await get_terminal_sessions().open(terminal)
+        except Exception:
+            # the certificates may have been reissued.
+            get_terminal_sessions().connector.forget(terminal)
+            raise
+
+    async def on_input(terminal_id: str) -> None:
+        await terminal_reaper.record_activity(terminal_id, tier)
+
+    await TerminalRelay(websocket, browser_codec=browser_codec, on_input=on_input, open_session=open_session).run()
+
+
+async def get_user_creation_job(request: Request, job_id: str) -> CreationJobModel:
+    '''
+    Get a creation job of the authenticated user.
+    Jobs of other users are reported as not found.
+    '''
+    job: CreationJobModel | None = await get_creation_job_manager().get(job_id)
+    if job is None or job.user_id != str(request.state.user_info['id']):
+        raise HTTPException(status_code=404, detail="Creation job not found")
+    return job
+
+
+@authenticate_session
+async def get_creation_job(request: Request, job_id: str) -> CreationJobModel:
+    '''
+    Authentication: This handler needs to be authenticated.
+    Get the current state of a creation job.
+    '''
+    return await get_user_creation_job(request, job_id)
+
+
+@authenticate_session
+async def creation_job_events(request: Request, job_id: str) -> StreamingResponse:
+    '''
+    Authentication: This handler needs to be authenticated.
+    Stream the progress of a creation job as server-sent events, until it is ready or failed.
+    '''
+    await get_user_creation_job(request, job_id)
+    creation_job_manager: CreationJobManager = get_creation_job_manager()
+
+    async def event_stream() -> AsyncIterator[str]:
+        async for job in creation_job_manager.stream(job_id):
+            if job is None:
+                yield ": heartbeat\n\n"
+                continue
+            yield f"event: {job.status.value}\ndata: {job.model_dump_json()}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -4,7 +4,8 @@ import asyncio
 from functools import wraps
 
 # modules
-from fastapi import Request
+from fastapi import Request, WebSocket
+from fastapi.requests import HTTPConnection
 from fastapi.responses import RedirectResponse
 
 # local
@@ -91,6 +92,36 @@ async def process_user_info(user_info: UserInfoModel) -> SessionResponseModel:
         raise Exception(f"Error processing user info: {str(e)}")
 
 
+def load_session(connection: HTTPConnection) -> bool:
+    '''
+    Validate the session cookie of a request or websocket, extend the session
+    and add the session data to connection.state.
+    Returns:
+        bool: Whether the session is valid
+    '''
+    session_id: str = connection.cookies.get('session')
+    if not session_id:
+        return False
+
+    session_manager: RedisSessionManager = RedisSessionManager()
+
+    # Validate session using the new validate_session method
+    validation: SessionValidationModel = session_manager.validate_session(session_id)
+
+    if not validation.is_valid or not validation.session_data:
+        return False
+
+    # Session is valid, extend it
+    extend_session(session_id, expiry=1800)  # 30 minutes
+
+    # Add session data to connection.state
+    connection.state.user_info = validation.session_data.user_info
+    connection.state.subscription_info = validation.session_data.subscription_info
+    connection.state.current_subscription_plan = validation.session_data.current_subscription_plan
+    connection.state.session_id = session_id
+    return True
+
+
 # this decorator can be used to authenticate the session
 def authenticate_session(func: callable) -> callable:
     @wraps(func)
@@ -100,25 +131,23 @@ def authenticate_session(func: callable) -> callable:
         If not authenticated, redirect to login page.
         '''
         request: Request = kwargs.get('request')
-        session_id: str = request.cookies.get('session')
-        if not session_id:
-            return RedirectResponse(url="/login", status_code=302)
-
-        session_manager: RedisSessionManager = RedisSessionManager()
-
-        # Validate session using the new validate_session method
-        validation: SessionValidationModel = session_manager.validate_session(session_id)
-
-        if not validation.is_valid or not validation.session_data:
+        if not load_session(request):
             return RedirectResponse(url="/login", status_code=302)
+        return await func(*args, **kwargs)
+    return wrapper
 
-        # Session is valid, extend it
-        extend_session(session_id, expiry=1800)  # 30 minutes
 
-        # Add session data to request.state
-        request.state.user_info = validation.session_data.user_info
-        request.state.subscription_info = validation.session_data.subscription_info
-        request.state.current_subscription_plan = validation.session_data.current_subscription_plan
-        request.state.session_id = session_id
+# this decorator can be used to authenticate the session of a websocket
+def authenticate_websocket(func: callable) -> callable:
+    @wraps(func)
+    async def wrapper(*args: tuple, **kwargs: dict) -> any:
+        '''
+        Authenticate the websocket using Redis session.
+        If not authenticated, close it before accepting it: the handshake fails with 403.
+        '''
+        websocket: WebSocket = kwargs.get('websocket')
+        if not load_session(websocket):
+            await websocket.close(code=1008)
+            return None
         return await func(*args, **kwargs)
     return wrapper
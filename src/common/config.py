@@ -3,8 +3,8 @@ from browseterm_db.common.config import DBConfig
 
 
 # Container Maker Config
-CONTAINER_MAKER_HOST: str = "container-maker-development-service"
-CONTAINER_MAKER_PORT: int = 50052
+CONTAINER_MAKER_HOST: str = os.getenv("CONTAINER_MAKER_HOST", "container-maker-development-service")
+CONTAINER_MAKER_PORT: int = int(os.getenv("CONTAINER_MAKER_PORT", "50052"))
 
 CONTAINER_MAKER_SERVER_KEY_FILE: str = "./cert/server.key"
 CONTAINER_MAKER_SERVER_CERT_FILE: str = "./cert/server.crt"
@@ -18,9 +18,128 @@ CONTAINER_MAKER_CLIENT_CERT_ENV_VAR: str = "CONTAINER_MAKER_CLIENT_CRT"
 CONTAINER_MAKER_CLIENT_KEY_ENV_VAR: str = "CONTAINER_MAKER_CLIENT_KEY"
 CONTAINER_MAKER_CA_ENV_VAR: str = "CONTAINER_MAKER_CA_CRT"
 
+# Container Maker RPC deadlines (seconds)
+CONTAINER_MAKER_CREATE_CONTAINER_TIMEOUT: float = float(os.getenv("CONTAINER_MAKER_CREATE_CONTAINER_TIMEOUT", "120"))
+CONTAINER_MAKER_GET_CONTAINER_TIMEOUT: float = float(os.getenv("CONTAINER_MAKER_GET_CONTAINER_TIMEOUT", "10"))
+CONTAINER_MAKER_LIST_CONTAINER_TIMEOUT: float = float(os.getenv("CONTAINER_MAKER_LIST_CONTAINER_TIMEOUT", "10"))
+CONTAINER_MAKER_DELETE_CONTAINER_TIMEOUT: float = float(os.getenv("CONTAINER_MAKER_DELETE_CONTAINER_TIMEOUT", "60"))
+
+# Container Maker channel
+CONTAINER_MAKER_RETRY_MAX_ATTEMPTS: int = int(os.getenv("CONTAINER_MAKER_RETRY_MAX_ATTEMPTS", "3"))  # getContainer and listContainer only
+CONTAINER_MAKER_KEEPALIVE_TIME_MS: int = int(os.getenv("CONTAINER_MAKER_KEEPALIVE_TIME_MS", "30000"))
+CONTAINER_MAKER_KEEPALIVE_TIMEOUT_MS: int = int(os.getenv("CONTAINER_MAKER_KEEPALIVE_TIMEOUT_MS", "10000"))
+CONTAINER_MAKER_COMPRESSION: str = os.getenv("CONTAINER_MAKER_COMPRESSION", "none")  # gzip, deflate or none. Container messages are small, compressing them costs more than it saves
+
+# Container Maker circuit breaker
+CONTAINER_MAKER_BREAKER_WINDOW: float = float(os.getenv("CONTAINER_MAKER_BREAKER_WINDOW", "30"))  # seconds of call outcomes considered
+CONTAINER_MAKER_BREAKER_MIN_CALLS: int = int(os.getenv("CONTAINER_MAKER_BREAKER_MIN_CALLS", "10"))  # calls in the window before it can open
+CONTAINER_MAKER_BREAKER_ERROR_RATE: float = float(os.getenv("CONTAINER_MAKER_BREAKER_ERROR_RATE", "0.5"))
+CONTAINER_MAKER_BREAKER_OPEN_DURATION: float = float(os.getenv("CONTAINER_MAKER_BREAKER_OPEN_DURATION", "15"))  # seconds before probing again
+
+# Container Maker adaptive concurrency limit (AIMD)
+CONTAINER_MAKER_LIMIT_INITIAL: int = int(os.getenv("CONTAINER_MAKER_LIMIT_INITIAL", "20"))
+CONTAINER_MAKER_LIMIT_MIN: int = int(os.getenv("CONTAINER_MAKER_LIMIT_MIN", "2"))
+CONTAINER_MAKER_LIMIT_MAX: int = int(os.getenv("CONTAINER_MAKER_LIMIT_MAX", "200"))
+CONTAINER_MAKER_LIMIT_BACKOFF_RATIO: float = float(os.getenv("CONTAINER_MAKER_LIMIT_BACKOFF_RATIO", "0.9"))
+CONTAINER_MAKER_LIMIT_LATENCY_TOLERANCE: float = float(os.getenv("CONTAINER_MAKER_LIMIT_LATENCY_TOLERANCE", "2.0"))  # slow: latency above tolerance x average
+CONTAINER_MAKER_LIMIT_QUEUE_TIMEOUT: float = float(os.getenv("CONTAINER_MAKER_LIMIT_QUEUE_TIMEOUT", "2"))  # seconds to wait for a slot
+
+# Terminal Config
+TERMINAL_NETWORK_NAME: str = os.getenv("TERMINAL_NETWORK_NAME", "browseterm-new")
+SSH_IMAGE_NAME: str = os.getenv("SSH_IMAGE_NAME", "zim95/ssh_ubuntu:latest")
+SSH_USERNAME: str = os.getenv("SSH_USERNAME", "browseterm")
+SSH_PUBLISH_PORT: int = 2222
+SSH_TARGET_PORT: int = 22
+SOCKET_SSH_IMAGE_NAME: str = os.getenv("SOCKET_SSH_IMAGE_NAME", "zim95/socket-ssh:latest")
+SOCKET_SSH_PORT: int = 8000
+
+# Creation Job Config
+CREATION_JOB_PREFIX: str = "creation_job:"
+CREATION_JOB_TTL: int = int(os.getenv("CREATION_JOB_TTL", "3600"))  # seconds a finished job can still be read
+CREATION_JOB_READY_TIMEOUT: float = float(os.getenv("CREATION_JOB_READY_TIMEOUT", "60"))
+CREATION_JOB_HEARTBEAT_INTERVAL: float = float(os.getenv("CREATION_JOB_HEARTBEAT_INTERVAL", "15"))
+
+# Admission Config: container creations are queued by subscription tier once in-flight capacity is reached.
+# Tier maps are <subscription type>:<value> lists, types that are not listed use the default.
+ADMISSION_MAX_IN_FLIGHT: int = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "10"))  # creations running at once, per server
+ADMISSION_MAX_QUEUE: int = int(os.getenv("ADMISSION_MAX_QUEUE", "100"))  # creations waiting, beyond that they are rejected
+ADMISSION_TIER_PRIORITIES: dict[str, int] = {
+    tier: int(value) for tier, value in (item.split(":") for item in os.getenv("ADMISSION_TIER_PRIORITIES", "free:1").split(",") if item)
+}  # lower is admitted first
+ADMISSION_DEFAULT_PRIORITY: int = int(os.getenv("ADMISSION_DEFAULT_PRIORITY", "0"))
+ADMISSION_USER_LIMITS: dict[str, int] = {
+    tier: int(value) for tier, value in (item.split(":") for item in os.getenv("ADMISSION_USER_LIMITS", "free:1").split(",") if item)
+}  # creations a user can have running or waiting
+ADMISSION_DEFAULT_USER_LIMIT: int = int(os.getenv("ADMISSION_DEFAULT_USER_LIMIT", "3"))
+ADMISSION_QUEUE_TIMEOUTS: dict[str, float] = {
+    tier: float(value) for tier, value in (item.split(":") for item in os.getenv("ADMISSION_QUEUE_TIMEOUTS", "free:15").split(",") if item)
+}  # seconds a creation can wait before it fails
+ADMISSION_DEFAULT_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_DEFAULT_QUEUE_TIMEOUT", "60"))
+
+# Warm Pool Config
+WARM_POOL_ENABLED: bool = os.getenv("WARM_POOL_ENABLED", "false").lower() == "true"  # provisions WARM_POOL_MIN_SIZE terminals per image on start
+WARM_POOL_IMAGES: list[str] = [image for image in os.getenv("WARM_POOL_IMAGES", SSH_IMAGE_NAME).split(",") if image]
+WARM_POOL_MIN_SIZE: int = int(os.getenv("WARM_POOL_MIN_SIZE", "1"))
+WARM_POOL_MAX_SIZE: int = int(os.getenv("WARM_POOL_MAX_SIZE", "10"))
+WARM_POOL_DEMAND_WINDOW: int = int(os.getenv("WARM_POOL_DEMAND_WINDOW", "600"))  # seconds of demand history
+WARM_POOL_DEMAND_FACTOR: float = float(os.getenv("WARM_POOL_DEMAND_FACTOR", "0.5"))  # pool size per request in the window
+WARM_POOL_REFILL_INTERVAL: int = int(os.getenv("WARM_POOL_REFILL_INTERVAL", "5"))
+WARM_POOL_REFILL_CONCURRENCY: int = int(os.getenv("WARM_POOL_REFILL_CONCURRENCY", "2"))
+WARM_POOL_MAX_AGE: int = int(os.getenv("WARM_POOL_MAX_AGE", "3600"))  # warm terminals older than this are discarded
+WARM_POOL_PREFIX: str = "warm_pool:"
+
+# Kubernetes API Config
+KUBERNETES_API_HOST: str = os.getenv("KUBERNETES_API_HOST", "")  # empty: use the in-cluster service account
+KUBERNETES_API_VERIFY_SSL: bool = os.getenv("KUBERNETES_API_VERIFY_SSL", "true").lower() == "true"
+KUBERNETES_API_POOL_MAXSIZE: int = int(os.getenv("KUBERNETES_API_POOL_MAXSIZE", "32"))  # concurrent connections to the API server
+
+# Idle Terminal Reaper Config: terminals without activity for their tier's idle timeout are deleted.
+TERMINAL_REAPER_ENABLED: bool = os.getenv("TERMINAL_REAPER_ENABLED", "true").lower() == "true"
+TERMINAL_REAPER_IDLE_TIMEOUTS: dict[str, int] = {
+    tier: int(value) for tier, value in (item.split(":") for item in os.getenv("TERMINAL_REAPER_IDLE_TIMEOUTS", "free:900").split(",") if item)
+}  # seconds without activity, by subscription type
+TERMINAL_REAPER_DEFAULT_IDLE_TIMEOUT: int = int(os.getenv("TERMINAL_REAPER_DEFAULT_IDLE_TIMEOUT", "3600"))
+TERMINAL_REAPER_INTERVAL: int = int(os.getenv("TERMINAL_REAPER_INTERVAL", "30"))
+TERMINAL_REAPER_BATCH_SIZE: int = int(os.getenv("TERMINAL_REAPER_BATCH_SIZE", "50"))  # idle terminals reaped per run
+TERMINAL_REAPER_CONCURRENCY: int = int(os.getenv("TERMINAL_REAPER_CONCURRENCY", "5"))  # terminals deleted at once
+TERMINAL_REAPER_ACTIVITY_INTERVAL: int = int(os.getenv("TERMINAL_REAPER_ACTIVITY_INTERVAL", "10"))  # seconds between recorded activity of a terminal
+TERMINAL_REAPER_PREFIX: str = "terminal_reaper:"
+
+# Terminal Relay Config: browser websockets relayed to the socket-ssh container of their terminal.
+TERMINAL_RELAY_QUEUE_SIZE: int = int(os.getenv("TERMINAL_RELAY_QUEUE_SIZE", "64"))  # frames buffered per direction and connection
+TERMINAL_RELAY_MAX_FRAME_SIZE: int = int(os.getenv("TERMINAL_RELAY_MAX_FRAME_SIZE", "65536"))  # bytes
+TERMINAL_RELAY_CONNECT_TIMEOUT: int = int(os.getenv("TERMINAL_RELAY_CONNECT_TIMEOUT", "10"))  # seconds to open the socket-ssh connection
+TERMINAL_RELAY_FLUSH_INTERVAL: float = float(os.getenv("TERMINAL_RELAY_FLUSH_INTERVAL", "0.008"))  # seconds output is coalesced before a frame is sent
+TERMINAL_RELAY_FLUSH_SIZE: int = int(os.getenv("TERMINAL_RELAY_FLUSH_SIZE", "16384"))  # bytes of coalesced output that are sent right away
+TERMINAL_RELAY_ECHO_WINDOW: float = float(os.getenv("TERMINAL_RELAY_ECHO_WINDOW", "0.05"))  # seconds after input in which small output is echo
+TERMINAL_RELAY_ECHO_SIZE: int = int(os.getenv("TERMINAL_RELAY_ECHO_SIZE", "256"))  # bytes of output at most to count as echo
+TERMINAL_RELAY_SCROLLBACK_SIZE: int = int(os.getenv("TERMINAL_RELAY_SCROLLBACK_SIZE", "262144"))  # bytes of output kept per terminal for reconnects
+TERMINAL_RELAY_RESUME_TIMEOUT: int = int(os.getenv("TERMINAL_RELAY_RESUME_TIMEOUT", "60"))  # seconds a detached terminal session waits for a reconnect
+TERMINAL_RELAY_WINDOW: int = int(os.getenv("TERMINAL_RELAY_WINDOW", "65536"))  # bytes of data a channel may send before the peer grants more
+TERMINAL_RELAY_MAX_CHANNELS: int = int(os.getenv("TERMINAL_RELAY_MAX_CHANNELS", "32"))  # terminals multiplexed over one browser websocket
+TERMINAL_RELAY_SSL_CACHE_SIZE: int = int(os.getenv("TERMINAL_RELAY_SSL_CACHE_SIZE", "256"))  # socket-ssh ssl contexts kept, least recently used dropped
+TERMINAL_RELAY_POOL_SIZE: int = int(os.getenv("TERMINAL_RELAY_POOL_SIZE", "64"))  # warm socket-ssh connections kept per pod
+TERMINAL_RELAY_POOL_IDLE_TIMEOUT: int = int(os.getenv("TERMINAL_RELAY_POOL_IDLE_TIMEOUT", "60"))  # seconds a warm connection waits for a relay
+TERMINAL_RELAY_GATEWAY_ENABLED: bool = os.getenv("TERMINAL_RELAY_GATEWAY_ENABLED", "false").lower() == "true"  # relay SSH straight to the SSH container, no socket-ssh
+TERMINAL_RELAY_GATEWAY_IDLE_TIMEOUT: int = int(os.getenv("TERMINAL_RELAY_GATEWAY_IDLE_TIMEOUT", "60"))  # seconds an SSH connection without shells stays open
+
 # Cert Manager Config
 CERT_MANAGER_CRON_JOB_NAME: str = os.getenv("CERT_MANAGER_CRON_JOB_NAME")
 CERT_MANAGER_CRON_JOB_NAMESPACE: str = os.getenv("CERT_MANAGER_CRON_JOB_NAMESPACE")
+CERT_MANAGER_JOB_TIMEOUT: int = int(os.getenv("CERT_MANAGER_JOB_TIMEOUT", "120"))  # seconds to wait for a certificate job
+
+# Certificate Pool Config
+CERT_POOL_ENABLED: bool = os.getenv("CERT_POOL_ENABLED", "false").lower() == "true"  # pre-issues certificates with CronJob batches, only needed without the in-process CA
+CERT_POOL_SIZE: int = int(os.getenv("CERT_POOL_SIZE", "10"))  # pre-issued certificates to keep
+CERT_POOL_BATCH_SIZE: int = int(os.getenv("CERT_POOL_BATCH_SIZE", "10"))  # services per certificate job
+CERT_POOL_REFILL_INTERVAL: int = int(os.getenv("CERT_POOL_REFILL_INTERVAL", "10"))
+CERT_POOL_MAX_AGE: int = int(os.getenv("CERT_POOL_MAX_AGE", "604800"))  # pooled certificates older than this are deleted
+CERT_POOL_PREFIX: str = "certificate_pool:"
+
+# In-process Certificate Authority Config
+CERT_AUTHORITY_ENABLED: bool = os.getenv("CERT_AUTHORITY_ENABLED", "true").lower() == "true"
+CERT_AUTHORITY_SECRET_NAME: str = os.getenv("CERT_AUTHORITY_SECRET_NAME", "cert-manager-ca")  # secret holding ca.crt and ca.key
+CERT_AUTHORITY_VALIDITY_DAYS: int = int(os.getenv("CERT_AUTHORITY_VALIDITY_DAYS", "365"))
 
 
 # Auth common config
@@ -59,6 +178,22 @@ REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
 REDIS_SESSION_EXPIRY: int = 86400
 REDIS_SESSION_PREFIX: str = "session:"
 
+# Container metadata cache
+CONTAINER_CACHE_PREFIX: str = "container_cache:"
+CONTAINER_CACHE_TTL: int = int(os.getenv("CONTAINER_CACHE_TTL", "5"))
+
+# Container ownership: the containers of each user, only owners can get, list and delete them
+CONTAINER_OWNER_PREFIX: str = "container_owner:"
+
+# Terminal ownership: the user of each terminal, only owners can open it
+TERMINAL_OWNER_PREFIX: str = "terminal_owner:"
+
+# Container informer: in-memory index of terminal pods and services, fed by a Kubernetes watch
+CONTAINER_INFORMER_ENABLED: bool = os.getenv("CONTAINER_INFORMER_ENABLED", "true").lower() == "true"
+CONTAINER_INFORMER_LABEL_SELECTOR: str = os.getenv("CONTAINER_INFORMER_LABEL_SELECTOR", "")  # empty: every pod and service in the namespace
+CONTAINER_INFORMER_WATCH_TIMEOUT: int = int(os.getenv("CONTAINER_INFORMER_WATCH_TIMEOUT", "300"))  # seconds before a watch is renewed
+CONTAINER_INFORMER_RETRY_INTERVAL: float = float(os.getenv("CONTAINER_INFORMER_RETRY_INTERVAL", "5"))
+
 
 # Postgres Configuration
 POSTGRES_HOST: str = os.getenv("POSTGRES_HOST", "localhost")
@@ -1,11 +1,22 @@
+# builtins
+import asyncio
+import json
+from typing import Awaitable, Callable
+
 # third party
 import grpc
 
+# resilience
+from src.common.resilience import ResilienceGuard
+
 
 class GRPCUtils:
     '''
     A utility class for GRPC connections.
     Creates a secure or insecure channel to a GRPC server.
+    Both blocking (grpc) and asyncio (grpc.aio) channels and stubs are available.
+    The asyncio ones should be used from the FastAPI handlers, so that RPCs do not tie up worker threads.
+    Channels can carry a service config (per-method deadlines and retry policies), keepalive pings and compression.
 
     TODO: Add connection pooling.
     '''
@@ -17,7 +28,11 @@ class GRPCUtils:
         secure: bool = True,
         client_key: bytes | None = None,
         client_cert: bytes | None = None,
-        ca_cert: bytes | None = None
+        ca_cert: bytes | None = None,
+        service_config: dict | None = None,
+        keepalive_time_ms: int | None = None,
+        keepalive_timeout_ms: int | None = None,
+        compression: grpc.Compression | None = None
     ) -> None:
         '''
         Initialize the GRPCUtils object.
@@ -36,6 +51,14 @@ class GRPCUtils:
                 The GRPC server's certificate.
             ca_cert: str
                 The GRPC server's CA certificate.
+            service_config: dict
+                The GRPC service config: per-method timeouts and retry policies. See method_config.
+            keepalive_time_ms: int
+                Interval of keepalive pings, so that dead peers are detected.
+            keepalive_timeout_ms: int
+                Time to wait for a keepalive ping to be acknowledged before closing the connection.
+            compression: grpc.Compression
+                The default compression of the channel.
         '''
         self.host: str = host
         self.port: int = port
@@ -47,27 +70,110 @@ class GRPCUtils:
         self.client_cert: bytes = client_cert
         self.ca_cert: bytes = ca_cert
 
+        # channel behaviour
+        self.service_config: dict | None = service_config
+        self.keepalive_time_ms: int | None = keepalive_time_ms
+        self.keepalive_timeout_ms: int | None = keepalive_timeout_ms
+        self.compression: grpc.Compression | None = compression
+
         self._channel: grpc.Channel | None = None
         self._stub: any | None = None
 
+        self._async_channel: grpc.aio.Channel | None = None
+        self._async_stub: any | None = None
+
     @property
-    def channel(self) -> grpc.Channel:
+    def target(self) -> str:
         '''
-        Get the GRPC channel.
+        Get the GRPC target address.
+        '''
+        return f"{self.host}:{self.port}"
+
+    @staticmethod
+    def method_config(
+        service: str,
+        methods: list[str],
+        timeout: float | None = None,
+        retry_policy: dict | None = None
+    ) -> dict:
+        '''
+        Build a methodConfig entry of a GRPC service config.
+        :params:
+            service: The full service name, e.g. package.Service.
+            methods: The methods the entry applies to.
+            timeout: The deadline of each call, in seconds. It covers every retry attempt.
+            retry_policy: The retryPolicy of the methods. Only set it for idempotent methods.
+        :returns: The methodConfig entry.
+        '''
+        method_config: dict = {'name': [{'service': service, 'method': method} for method in methods]}
+        if timeout is not None:
+            method_config['timeout'] = f"{timeout}s"
+        if retry_policy is not None:
+            method_config['retryPolicy'] = retry_policy
+        return method_config
+
+    @staticmethod
+    def retry_policy(
+        max_attempts: int,
+        initial_backoff: float = 0.1,
+        max_backoff: float = 1.0,
+        backoff_multiplier: float = 2.0,
+        retryable_status_codes: list[str] | None = None
+    ) -> dict:
+        '''
+        Build a retryPolicy of a GRPC service config.
+        By default only UNAVAILABLE is retried: the call never reached the server.
+        '''
+        return {
+            'maxAttempts': max_attempts,
+            'initialBackoff': f"{initial_backoff}s",
+            'maxBackoff': f"{max_backoff}s",
+            'backoffMultiplier': backoff_multiplier,
+            'retryableStatusCodes': retryable_status_codes or ['UNAVAILABLE'],
+        }
+
+    @property
+    def options(self) -> list[tuple[str, str | int]]:
+        '''
+        Get the GRPC channel options.
+        '''
+        options: list[tuple[str, str | int]] = []
+        if self.service_config is not None:
+            options.append(('grpc.service_config', json.dumps(self.service_config)))
+            options.append(('grpc.enable_retries', 1))
+        if self.keepalive_time_ms is not None:
+            options.append(('grpc.keepalive_time_ms', self.keepalive_time_ms))
+            # ping idle connections too, so that the first call after a quiet period does not hang on a dead peer.
+            options.append(('grpc.keepalive_permit_without_calls', 1))
+            options.append(('grpc.http2.max_pings_without_data', 0))
+        if self.keepalive_timeout_ms is not None:
+            options.append(('grpc.keepalive_timeout_ms', self.keepalive_timeout_ms))
+        return options
+
+    @property
+    def credentials(self) -> grpc.ChannelCredentials:
+        '''
+        Get the GRPC channel credentials for a secure channel.
         '''
-        if self._channel is not None:
-            return self._channel
-        if not self.secure:
-            self._channel = grpc.insecure_channel(f"{self.host}:{self.port}")
-            return self._channel
         if not any([self.client_key, self.client_cert, self.ca_cert]):
             raise ValueError("Client key, client cert, and CA cert must be provided if secure is True")
-        credentials: grpc.ServerCredentials = grpc.ssl_channel_credentials(
+        return grpc.ssl_channel_credentials(
             root_certificates=self.ca_cert,
             private_key=self.client_key,
             certificate_chain=self.client_cert
         )
-        self._channel = grpc.secure_channel(f"{self.host}:{self.port}", credentials)
+
+    @property
+    def channel(self) -> grpc.Channel:
+        '''
+        Get the GRPC channel.
+        '''
+        if self._channel is not None:
+            return self._channel
+        if not self.secure:
+            self._channel = grpc.insecure_channel(self.target, options=self.options, compression=self.compression)
+            return self._channel
+        self._channel = grpc.secure_channel(self.target, self.credentials, options=self.options, compression=self.compression)
         return self._channel
 
     @property
@@ -79,3 +185,80 @@ class GRPCUtils:
             return self._stub
         self._stub = self.stub_class(channel=self.channel)
         return self._stub
+
+    @property
+    def async_channel(self) -> grpc.aio.Channel:
+        '''
+        Get the asyncio GRPC channel.
+        NOTE: The channel is bound to the event loop it is first used on.
+        '''
+        if self._async_channel is not None:
+            return self._async_channel
+        if not self.secure:
+            self._async_channel = grpc.aio.insecure_channel(self.target, options=self.options, compression=self.compression)
+            return self._async_channel
+        self._async_channel = grpc.aio.secure_channel(
+            self.target, self.credentials, options=self.options, compression=self.compression
+        )
+        return self._async_channel
+
+    @property
+    def async_stub(self) -> any:
+        '''
+        Get the asyncio GRPC stub.
+        RPCs on this stub return awaitables instead of blocking.
+        '''
+        if self._async_stub is not None:
+            return self._async_stub
+        self._async_stub = self.stub_class(channel=self.async_channel)
+        return self._async_stub
+
+    async def close(self) -> None:
+        '''
+        Close the open channels.
+        '''
+        if self._async_channel is not None:
+            await self._async_channel.close()
+            self._async_channel = None
+            self._async_stub = None
+        if self._channel is not None:
+            self._channel.close()
+            self._channel = None
+            self._stub = None
+
+
+# status codes that say the server is unhealthy or overloaded, not that the request was wrong.
+BACKEND_FAILURE_STATUS_CODES: set[grpc.StatusCode] = {
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.INTERNAL,
+    grpc.StatusCode.UNKNOWN,
+}
+
+
+def is_backend_failure(error: BaseException) -> bool:
+    '''
+    Check if an RPC error signals an unhealthy or overloaded server.
+    '''
+    if isinstance(error, grpc.RpcError) and hasattr(error, 'code'):
+        return error.code() in BACKEND_FAILURE_STATUS_CODES
+    return isinstance(error, asyncio.TimeoutError)
+
+
+class GuardedStub:
+    '''
+    Wraps an asyncio GRPC stub, so that every RPC goes through a ResilienceGuard.
+    Calls look the same as on the wrapped stub: await stub.method(request, **kwargs).
+    '''
+    def __init__(self, stub: any, guard: ResilienceGuard) -> None:
+        self.stub: any = stub
+        self.guard: ResilienceGuard = guard
+
+    def __getattr__(self, method: str) -> Callable[..., Awaitable[any]]:
+        rpc: Callable = getattr(self.stub, method)
+
+        async def call(request: any, **kwargs: dict) -> any:
+            return await self.guard.call(method, lambda: rpc(request, **kwargs))
+
+        return call
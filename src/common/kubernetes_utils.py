@@ -0,0 +1,61 @@
+# third party
+from kubernetes_asyncio import client, config
+from kubernetes_asyncio.client.api_client import ApiClient
+
+# config
+from src.common.config import KUBERNETES_API_HOST
+from src.common.config import KUBERNETES_API_VERIFY_SSL
+from src.common.config import KUBERNETES_API_POOL_MAXSIZE
+
+
+class KubernetesUtils:
+    '''
+    A utility class for Kubernetes API connections.
+    Holds one process-wide asyncio API client, so that every caller shares the same connection pool.
+    Nothing talks to the cluster until the client is first used.
+    '''
+    _api_client: ApiClient | None = None
+
+    @staticmethod
+    def configuration() -> client.Configuration:
+        '''
+        Build the client configuration.
+        Uses the pod service account, unless KUBERNETES_API_HOST points at another API server (e.g. a local stub).
+        '''
+        configuration: client.Configuration = client.Configuration()
+        if KUBERNETES_API_HOST:
+            configuration.host = KUBERNETES_API_HOST
+            configuration.verify_ssl = KUBERNETES_API_VERIFY_SSL
+        else:
+            config.load_incluster_config(client_configuration=configuration)
+        configuration.connection_pool_maxsize = KUBERNETES_API_POOL_MAXSIZE
+        return configuration
+
+    @classmethod
+    def api_client(cls) -> ApiClient:
+        '''
+        Get the shared asyncio API client.
+        The client is created on first use.
+        '''
+        if cls._api_client is not None:
+            return cls._api_client
+        cls._api_client = ApiClient(configuration=cls.configuration())
+        return cls._api_client
+
+    @classmethod
+    def batch_v1(cls) -> client.BatchV1Api:
+        return client.BatchV1Api(cls.api_client())
+
+    @classmethod
+    def core_v1(cls) -> client.CoreV1Api:
+        return client.CoreV1Api(cls.api_client())
+
+    @classmethod
+    async def close(cls) -> None:
+        '''
+        Close the shared asyncio API client.
+        '''
+        if cls._api_client is None:
+            return
+        await cls._api_client.close()
+        cls._api_client = None
@@ -0,0 +1,89 @@
+'''
+Prometheus metrics of the server, exposed on /metrics.
+All metrics are defined here, so that their names and labels are kept in one place.
+'''
+
+# third party
+from prometheus_client import Counter, Gauge, Histogram
+
+
+# Circuit breakers
+CIRCUIT_BREAKER_STATE: Gauge = Gauge(
+    'circuit_breaker_state', 'Circuit breaker state: 0 closed, 1 half open, 2 open.', ['backend']
+)
+CIRCUIT_BREAKER_REJECTIONS: Counter = Counter(
+    'circuit_breaker_rejections', 'Calls failed fast by an open circuit breaker.', ['backend']
+)
+
+# Adaptive concurrency limits
+CONCURRENCY_LIMIT: Gauge = Gauge(
+    'concurrency_limit', 'Current adaptive concurrency limit.', ['backend']
+)
+CONCURRENCY_IN_FLIGHT: Gauge = Gauge(
+    'concurrency_in_flight', 'Calls currently in flight.', ['backend']
+)
+CONCURRENCY_LIMIT_REJECTIONS: Counter = Counter(
+    'concurrency_limit_rejections', 'Calls rejected because no slot freed up in time.', ['backend']
+)
+
+# Backend calls
+BACKEND_CALL_LATENCY: Histogram = Histogram(
+    'backend_call_latency_seconds', 'Latency of backend calls.', ['backend', 'method', 'outcome'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+
+# Admission of container creations
+ADMISSION_IN_FLIGHT: Gauge = Gauge(
+    'admission_in_flight', 'Container creations admitted and running.'
+)
+ADMISSION_QUEUE_LENGTH: Gauge = Gauge(
+    'admission_queue_length', 'Container creations waiting for admission.'
+)
+ADMISSION_REJECTIONS: Counter = Counter(
+    'admission_rejections', 'Container creations rejected by admission.', ['tier', 'reason']
+)
+ADMISSION_QUEUE_TIME: Histogram = Histogram(
+    'admission_queue_time_seconds', 'Time container creations waited for admission.', ['tier'],
+    buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+# Idle terminal reaper
+TERMINALS_REAPED: Counter = Counter(
+    'terminals_reaped', 'Idle terminals deleted by the reaper.', ['outcome']
+)
+TERMINALS_TRACKED: Gauge = Gauge(
+    'terminals_tracked', 'Terminals tracked for idleness.'
+)
+
+# Terminal relay
+TERMINAL_RELAY_CONNECTIONS: Gauge = Gauge(
+    'terminal_relay_connections', 'Browser websockets relayed to socket-ssh.'
+)
+TERMINAL_RELAY_CHANNELS: Gauge = Gauge(
+    'terminal_relay_channels', 'Terminals attached to browser websockets, one per channel.'
+)
+TERMINAL_RELAY_BYTES: Counter = Counter(
+    'terminal_relay_bytes', 'Bytes relayed between browsers and socket-ssh.', ['direction']
+)
+TERMINAL_RELAY_FRAMES: Counter = Counter(
+    'terminal_relay_frames', 'Frames relayed between browsers and socket-ssh, rate() gives frames per second.', ['direction']
+)
+TERMINAL_RELAY_FRAME_SIZE: Histogram = Histogram(
+    'terminal_relay_frame_size_bytes', 'Bytes per relayed frame.', ['direction'],
+    buckets=(16, 64, 256, 1024, 4096, 16384, 65536)
+)
+TERMINAL_RELAY_SESSIONS: Gauge = Gauge(
+    'terminal_relay_sessions', 'Terminal sessions open to socket-ssh, attached or waiting for a reconnect.'
+)
+TERMINAL_RELAY_RESUMES: Counter = Counter(
+    'terminal_relay_resumes', 'Reconnects resuming a terminal session, truncated if output was lost.', ['outcome']
+)
+TERMINAL_RELAY_POOL_REQUESTS: Counter = Counter(
+    'terminal_relay_pool_requests', 'socket-ssh connections taken by relays, hit if a warm one was ready.', ['outcome']
+)
+TERMINAL_RELAY_TLS_HANDSHAKES: Counter = Counter(
+    'terminal_relay_tls_handshakes', 'TLS handshakes with socket-ssh, resumed or full.', ['outcome']
+)
+TERMINAL_RELAY_GATEWAY_CONNECTIONS: Gauge = Gauge(
+    'terminal_relay_gateway_connections', 'SSH connections of the SSH gateway to SSH containers.'
+)
@@ -0,0 +1,64 @@
+# third party
+import redis.asyncio as aioredis
+
+# config
+from src.common.config import REDIS_HOST
+from src.common.config import REDIS_PORT
+from src.common.config import REDIS_USERNAME
+from src.common.config import REDIS_PASSWORD
+from src.common.config import REDIS_DB
+
+
+class RedisUtils:
+    '''
+    A utility class for Redis connections.
+    Holds one process-wide asyncio Redis client, so that every caller shares the same connection pool.
+    '''
+    _async_client: aioredis.Redis | None = None
+
+    @classmethod
+    def async_client(cls) -> aioredis.Redis:
+        '''
+        Get the shared asyncio Redis client.
+        The client is created on first use.
+        '''
+        if cls._async_client is not None:
+            return cls._async_client
+        cls._async_client = aioredis.Redis(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            username=REDIS_USERNAME,
+            password=REDIS_PASSWORD,
+            db=REDIS_DB,
+            decode_responses=True
+        )
+        return cls._async_client
+
+    @staticmethod
+    async def hold_lock(redis_client: aioredis.Redis, key: str, owner: str, ttl: int) -> bool:
+        '''
+        Take or renew a lock. Used to elect the one pod running a background loop.
+        The lock expires if its owner stops renewing it.
+        :params:
+            redis_client: The asyncio Redis client.
+            key: The lock key.
+            owner: Id of the caller, e.g. a per-process uuid.
+            ttl: Lock expiry in seconds.
+        :returns: True if the caller holds the lock.
+        '''
+        if await redis_client.set(key, owner, nx=True, ex=ttl):
+            return True
+        if await redis_client.get(key) == owner:
+            await redis_client.expire(key, ttl)
+            return True
+        return False
+
+    @classmethod
+    async def close(cls) -> None:
+        '''
+        Close the shared asyncio Redis client.
+        '''
+        if cls._async_client is None:
+            return
+        await cls._async_client.aclose()
+        cls._async_client = None
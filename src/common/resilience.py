@@ -0,0 +1,287 @@
+'''
+Client-side protection of a struggling backend.
+
+CircuitBreaker fails calls fast while the recent error rate is high:
+    closed -> open: at least min_calls in the window and an error rate of at least error_rate.
+    open -> half open: after open_duration seconds. One probe call is let through at a time.
+    half open -> closed if the probe succeeds, -> open again if it fails.
+
+AIMDLimit caps the calls in flight:
+    additive increase: every successful call grows the limit by 1 / limit, so by about one per limit calls.
+    multiplicative decrease: a slow or overloaded call shrinks the limit by backoff_ratio.
+    A call is slow when its latency exceeds latency_tolerance times the average latency of its method,
+    so fast and slow methods can share one limit.
+    Callers wait up to queue_timeout seconds for a slot, then they are rejected.
+
+ResilienceGuard combines both around a backend. Every state change is published as a Prometheus metric.
+'''
+
+# builtins
+import asyncio
+import time
+from collections import deque
+from enum import Enum
+from typing import Awaitable, Callable, TypeVar
+
+# metrics
+from src.common.metrics import CIRCUIT_BREAKER_STATE
+from src.common.metrics import CIRCUIT_BREAKER_REJECTIONS
+from src.common.metrics import CONCURRENCY_LIMIT
+from src.common.metrics import CONCURRENCY_IN_FLIGHT
+from src.common.metrics import CONCURRENCY_LIMIT_REJECTIONS
+from src.common.metrics import BACKEND_CALL_LATENCY
+
+
+T = TypeVar('T')
+
+
+class BackendUnavailableError(Exception):
+    '''
+    Raised instead of calling a backend that is protected right now.
+    :params:
+        retry_after: Seconds after which calling again makes sense.
+    '''
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after: float = retry_after
+
+
+class CircuitOpenError(BackendUnavailableError):
+    '''
+    Raised when the circuit breaker is open.
+    '''
+    pass
+
+
+class ConcurrencyLimitError(BackendUnavailableError):
+    '''
+    Raised when no concurrency slot freed up in time.
+    '''
+    pass
+
+
+class CircuitState(int, Enum):
+    CLOSED: int = 0  # calls go through
+    HALF_OPEN: int = 1  # one probe call at a time goes through
+    OPEN: int = 2  # calls fail fast
+
+
+class CircuitBreaker:
+    '''
+    Error rate based circuit breaker over a sliding time window.
+    '''
+    def __init__(self, name: str, window: float, min_calls: int, error_rate: float, open_duration: float) -> None:
+        '''
+        Initialize the CircuitBreaker.
+        :params:
+            name: The backend name, used as metric label.
+            window: Seconds of call outcomes considered.
+            min_calls: Calls needed in the window before the breaker can open.
+            error_rate: Error rate (0 to 1) that opens the breaker.
+            open_duration: Seconds the breaker stays open before probing.
+        '''
+        self.name: str = name
+        self.window: float = window
+        self.min_calls: int = min_calls
+        self.error_rate: float = error_rate
+        self.open_duration: float = open_duration
+        self.outcomes: deque[tuple[float, bool]] = deque()  # (time, failed)
+        self.state: CircuitState = CircuitState.CLOSED
+        self.opened_at: float = 0.0
+        self.probing: bool = False
+        CIRCUIT_BREAKER_STATE.labels(backend=name).set(self.state.value)
+
+    def set_state(self, state: CircuitState) -> None:
+        self.state = state
+        CIRCUIT_BREAKER_STATE.labels(backend=self.name).set(state.value)
+
+    @property
+    def retry_after(self) -> float:
+        return max(self.opened_at + self.open_duration - time.monotonic(), 1.0)
+
+    def check(self) -> None:
+        '''
+        Check that a call may go through, without taking the probe.
+        :raises: CircuitOpenError if calls fail fast right now.
+        '''
+        if self.state == CircuitState.OPEN and time.monotonic() >= self.opened_at + self.open_duration:
+            self.set_state(CircuitState.HALF_OPEN)
+        if self.state == CircuitState.OPEN or (self.state == CircuitState.HALF_OPEN and self.probing):
+            CIRCUIT_BREAKER_REJECTIONS.labels(backend=self.name).inc()
+            raise CircuitOpenError(f"{self.name} is unavailable, circuit breaker is open", self.retry_after)
+
+    def before_call(self) -> None:
+        '''
+        Let a call through or fail it fast. In half open state, the call becomes the probe.
+        :raises: CircuitOpenError if the call must fail fast.
+        '''
+        self.check()
+        if self.state == CircuitState.HALF_OPEN:
+            self.probing = True
+
+    def record(self, failed: bool) -> None:
+        '''
+        Record the outcome of a call that went through.
+        '''
+        now: float = time.monotonic()
+        if self.state == CircuitState.HALF_OPEN:
+            self.probing = False
+            if failed:
+                self.open(now)
+            else:
+                self.outcomes.clear()
+                self.set_state(CircuitState.CLOSED)
+            return
+        self.outcomes.append((now, failed))
+        while self.outcomes and self.outcomes[0][0] < now - self.window:
+            self.outcomes.popleft()
+        failures: int = sum(1 for _, call_failed in self.outcomes if call_failed)
+        if self.state == CircuitState.CLOSED and len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.error_rate:
+            self.open(now)
+
+    def open(self, now: float) -> None:
+        self.opened_at = now
+        self.outcomes.clear()
+        self.set_state(CircuitState.OPEN)
+
+
+class AIMDLimit:
+    '''
+    Adaptive concurrency limit: additive increase, multiplicative decrease.
+    '''
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        backoff_ratio: float,
+        latency_tolerance: float,
+        queue_timeout: float
+    ) -> None:
+        '''
+        Initialize the AIMDLimit.
+        :params:
+            name: The backend name, used as metric label.
+            initial_limit, min_limit, max_limit: Bounds of the concurrency limit.
+            backoff_ratio: Factor applied to the limit on a slow or overloaded call.
+            latency_tolerance: A call is slow if its latency exceeds this times the average of its method.
+            queue_timeout: Seconds a caller waits for a slot before it is rejected.
+        '''
+        self.name: str = name
+        self.limit: float = float(initial_limit)
+        self.min_limit: int = min_limit
+        self.max_limit: int = max_limit
+        self.backoff_ratio: float = backoff_ratio
+        self.latency_tolerance: float = latency_tolerance
+        self.queue_timeout: float = queue_timeout
+        self.in_flight: int = 0
+        self.average_latency: dict[str, float] = {}  # exponential moving average by method
+        self.slot_freed: asyncio.Event = asyncio.Event()
+        CONCURRENCY_LIMIT.labels(backend=name).set(self.limit)
+        CONCURRENCY_IN_FLIGHT.labels(backend=name).set(0)
+
+    async def acquire(self) -> None:
+        '''
+        Take a slot, waiting up to queue_timeout seconds for one.
+        :raises: ConcurrencyLimitError if no slot freed up in time.
+        '''
+        deadline: float = time.monotonic() + self.queue_timeout
+        while self.in_flight >= int(self.limit):
+            remaining: float = deadline - time.monotonic()
+            if remaining <= 0:
+                CONCURRENCY_LIMIT_REJECTIONS.labels(backend=self.name).inc()
+                raise ConcurrencyLimitError(f"{self.name} is at its concurrency limit of {int(self.limit)}", 1.0)
+            try:
+                await asyncio.wait_for(self.slot_freed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+        self.in_flight += 1
+        CONCURRENCY_IN_FLIGHT.labels(backend=self.name).set(self.in_flight)
+
+    def release(self, method: str, latency: float, overloaded: bool) -> None:
+        '''
+        Give a slot back and adapt the limit to the call.
+        :params:
+            method: The called method, latencies are compared per method.
+            latency: The call latency in seconds.
+            overloaded: Whether the call failed in a way that signals an overloaded backend.
+        '''
+        average: float | None = self.average_latency.get(method)
+        slow: bool = average is not None and latency > self.latency_tolerance * average
+        if overloaded or slow:
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        if not overloaded:
+            self.average_latency[method] = latency if average is None else 0.9 * average + 0.1 * latency
+        CONCURRENCY_LIMIT.labels(backend=self.name).set(self.limit)
+        self.free()
+
+    def free(self) -> None:
+        '''
+        Give a slot back without adapting the limit, e.g. for a cancelled call.
+        '''
+        self.in_flight -= 1
+        CONCURRENCY_IN_FLIGHT.labels(backend=self.name).set(self.in_flight)
+        # wake up the waiters, they check the limit again.
+        self.slot_freed.set()
+        self.slot_freed = asyncio.Event()
+
+
+class ResilienceGuard:
+    '''
+    Runs backend calls through a circuit breaker and an adaptive concurrency limit.
+    '''
+    def __init__(self, breaker: CircuitBreaker, limit: AIMDLimit, is_failure: Callable[[BaseException], bool]) -> None:
+        '''
+        Initialize the ResilienceGuard.
+        :params:
+            breaker: The circuit breaker.
+            limit: The concurrency limit.
+            is_failure: Tells errors that signal an unhealthy backend from errors of the request itself (e.g. not found).
+        '''
+        self.breaker: CircuitBreaker = breaker
+        self.limit: AIMDLimit = limit
+        self.is_failure: Callable[[BaseException], bool] = is_failure
+
+    async def call(self, method: str, call: Callable[[], Awaitable[T]]) -> T:
+        '''
+        Make a backend call.
+        :params:
+            method: The method name, for latency tracking and metrics.
+            call: Starts the call.
+        :raises: BackendUnavailableError if the call was not made.
+        '''
+        self.breaker.before_call()
+        probe: bool = self.breaker.state == CircuitState.HALF_OPEN
+        try:
+            await self.limit.acquire()
+        except BaseException:
+            # no slot or cancelled while waiting for one: the probe was never sent, let the next caller probe.
+            if probe:
+                self.breaker.probing = False
+            raise
+        started: float = time.monotonic()
+        try:
+            result: T = await call()
+        except asyncio.CancelledError:
+            # the outcome is unknown: free the slot and the probe, record nothing.
+            self.limit.free()
+            self.breaker.probing = False
+            raise
+        except Exception as e:
+            self.record(method, time.monotonic() - started, failed=self.is_failure(e))
+            raise
+        self.record(method, time.monotonic() - started, failed=False)
+        return result
+
+    def record(self, method: str, latency: float, failed: bool) -> None:
+        '''
+        Record the outcome of a finished call.
+        '''
+        self.limit.release(method, latency, overloaded=failed)
+        self.breaker.record(failed)
+        BACKEND_CALL_LATENCY.labels(
+            backend=self.breaker.name, method=method, outcome='failure' if failed else 'success'
+        ).observe(latency)
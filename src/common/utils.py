@@ -27,3 +27,18 @@ def read_certs(env_var_key: str, path: str) -> str:
         return cert
     except FileNotFoundError as fnfe:
         raise FileNotFoundError(fnfe)
+
+
+def read_cert_from_env_var(env_var_key: str) -> bytes:
+    """
+    Read a certificate from the environment.
+    :params:
+        env_var_key: str
+            The environment variable key to read the certificate from.
+    :return:
+        The certificate as bytes.
+    """
+    cert: str | None = os.environ.get(env_var_key)
+    if cert is None:
+        raise ValueError(f"Environment variable {env_var_key} is not set")
+    return cert.encode('utf-8')
@@ -0,0 +1,193 @@
+'''
+Admission control of container creations.
+
+Creating containers is expensive, so only ADMISSION_MAX_IN_FLIGHT creations run at once.
+The others wait in a queue ordered by subscription tier, then by arrival:
+a burst of free-tier creations does not delay paid ones.
+
+A creation is reserved when it is requested, and rejected right away (429 with a Retry-After) if:
+    - the queue is full.
+    - the user already has as many creations running or waiting as their tier allows.
+A reserved creation waits for admission inside its creation job, while the job is QUEUED.
+If it is not admitted within the queue timeout of its tier, the job fails.
+'''
+
+# builtins
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+# config
+from src.common.config import ADMISSION_MAX_IN_FLIGHT
+from src.common.config import ADMISSION_MAX_QUEUE
+from src.common.config import ADMISSION_TIER_PRIORITIES
+from src.common.config import ADMISSION_DEFAULT_PRIORITY
+from src.common.config import ADMISSION_USER_LIMITS
+from src.common.config import ADMISSION_DEFAULT_USER_LIMIT
+from src.common.config import ADMISSION_QUEUE_TIMEOUTS
+from src.common.config import ADMISSION_DEFAULT_QUEUE_TIMEOUT
+
+# metrics
+from src.common.metrics import ADMISSION_IN_FLIGHT
+from src.common.metrics import ADMISSION_QUEUE_LENGTH
+from src.common.metrics import ADMISSION_REJECTIONS
+from src.common.metrics import ADMISSION_QUEUE_TIME
+
+
+class AdmissionRejectedError(Exception):
+    '''
+    Raised when a creation is not admitted.
+    :params:
+        retry_after: Seconds after which requesting again makes sense.
+    '''
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after: float = retry_after
+
+
+class AdmissionTicket:
+    '''
+    A reserved creation of a user.
+    '''
+    def __init__(self, user_id: str, tier: str) -> None:
+        self.user_id: str = user_id
+        self.tier: str = tier
+        self.priority: int = ADMISSION_TIER_PRIORITIES.get(tier, ADMISSION_DEFAULT_PRIORITY)
+        self.queue_timeout: float = ADMISSION_QUEUE_TIMEOUTS.get(tier, ADMISSION_DEFAULT_QUEUE_TIMEOUT)
+        self.admitted: bool = False
+        self.released: bool = False
+
+
+class AdmissionController:
+    '''
+    In-process admission queue of container creations.
+    '''
+    def __init__(self, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT, max_queue: int = ADMISSION_MAX_QUEUE) -> None:
+        '''
+        Initialize the AdmissionController.
+        :params:
+            max_in_flight: Creations running at once.
+            max_queue: Creations waiting at once.
+        '''
+        self.max_in_flight: int = max_in_flight
+        self.max_queue: int = max_queue
+        self.in_flight: int = 0
+        self.user_load: dict[str, int] = {}  # creations running or waiting, by user
+        self.queue: list[tuple[int, int, asyncio.Future]] = []  # (priority, arrival, future), a heap
+        self.arrivals: itertools.count = itertools.count()
+        self.average_duration: float = 10.0  # seconds, moving average of admitted creations
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self.queue if not future.done())
+
+    def retry_after(self) -> int:
+        '''
+        Estimate when a slot frees up: the waiting creations, spread over the running ones.
+        '''
+        return max(math.ceil(self.average_duration * (self.waiting + 1) / self.max_in_flight), 1)
+
+    def reject(self, ticket: AdmissionTicket, reason: str, message: str) -> AdmissionRejectedError:
+        ADMISSION_REJECTIONS.labels(tier=ticket.tier, reason=reason).inc()
+        return AdmissionRejectedError(message, self.retry_after())
+
+    def reserve(self, user_id: str, tier: str) -> AdmissionTicket:
+        '''
+        Reserve a creation for a user. Does not wait.
+        :params:
+            user_id: The user id.
+            tier: The subscription type of the user, e.g. free.
+        :returns: The ticket to pass to admitted.
+        :raises: AdmissionRejectedError if the queue is full or the user is at their limit.
+        '''
+        ticket: AdmissionTicket = AdmissionTicket(user_id, tier)
+        if self.in_flight >= self.max_in_flight and self.waiting >= self.max_queue:
+            raise self.reject(ticket, 'queue_full', "Too many containers are being created, try again later")
+        if self.user_load.get(user_id, 0) >= ADMISSION_USER_LIMITS.get(tier, ADMISSION_DEFAULT_USER_LIMIT):
+            raise self.reject(ticket, 'user_limit', "You are already creating as many containers as your plan allows")
+        self.user_load[user_id] = self.user_load.get(user_id, 0) + 1
+        return ticket
+
+    async def admit(self, ticket: AdmissionTicket) -> None:
+        '''
+        Wait until the creation may run.
+        :raises: AdmissionRejectedError if it is not admitted within the queue timeout of its tier.
+        '''
+        queued_at: float = time.monotonic()
+        if self.in_flight < self.max_in_flight and self.waiting == 0:
+            self.in_flight += 1
+        else:
+            future: asyncio.Future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self.queue, (ticket.priority, next(self.arrivals), future))
+            ADMISSION_QUEUE_LENGTH.set(self.waiting)
+            try:
+                # asyncio.wait does not cancel the future, a slot handed over at the deadline is not lost.
+                await asyncio.wait({future}, timeout=ticket.queue_timeout)
+            finally:
+                if not future.done():
+                    future.cancel()
+                elif not future.cancelled():
+                    # the slot is ours, even if we were cancelled meanwhile: release gives it back.
+                    ticket.admitted = True
+                ADMISSION_QUEUE_LENGTH.set(self.waiting)
+            if future.cancelled():
+                raise self.reject(ticket, 'queue_timeout', f"Not admitted within {ticket.queue_timeout} seconds")
+        ticket.admitted = True
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        ADMISSION_QUEUE_TIME.labels(tier=ticket.tier).observe(time.monotonic() - queued_at)
+
+    def release(self, ticket: AdmissionTicket, duration: float | None = None) -> None:
+        '''
+        Release a ticket, admitted or not, and hand its slot to the next waiting creation.
+        '''
+        if ticket.released:
+            return
+        ticket.released = True
+        self.user_load[ticket.user_id] -= 1
+        if self.user_load[ticket.user_id] <= 0:
+            del self.user_load[ticket.user_id]
+        if not ticket.admitted:
+            return
+        if duration is not None:
+            self.average_duration = 0.9 * self.average_duration + 0.1 * duration
+        self.in_flight -= 1
+        while self.queue and self.in_flight < self.max_in_flight:
+            _, _, future = heapq.heappop(self.queue)
+            if future.done():
+                # timed out while waiting.
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        ADMISSION_QUEUE_LENGTH.set(self.waiting)
+
+    @asynccontextmanager
+    async def admitted(self, ticket: AdmissionTicket) -> AsyncIterator[None]:
+        '''
+        Run a creation once it is admitted, then release its ticket.
+        '''
+        started: float | None = None
+        try:
+            await self.admit(ticket)
+            started = time.monotonic()
+            yield
+        finally:
+            self.release(ticket, None if started is None else time.monotonic() - started)
+
+
+# Shared admission controller, created on first use.
+_admission_controller: AdmissionController | None = None
+
+
+def get_admission_controller() -> AdmissionController:
+    '''
+    Get the shared AdmissionController.
+    '''
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController()
+    return _admission_controller
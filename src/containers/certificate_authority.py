@@ -0,0 +1,201 @@
+'''
+In-process certificate authority for socket-ssh services.
+
+The cert-manager CronJob path schedules a pod per certificate request, which takes seconds.
+This module signs the same certificates with the same CA, in process, in milliseconds:
+    - The CA certificate and key are read once from CERT_AUTHORITY_SECRET_NAME and cached in memory.
+    - Keys are EC P-256, which are generated much faster than RSA keys.
+    - The result is written to the <service_name>-certs secret, with the same keys the CronJob writes:
+      server.key, server.crt, client.key, client.crt and ca.crt.
+
+If the CA secret is missing, invalid or disabled, callers fall back to the CronJob path (CertificateUtils).
+'''
+
+# builtins
+import base64
+import datetime
+
+# third party
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.types import CertificateIssuerPrivateKeyTypes
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+
+# kubernetes
+from kubernetes_asyncio import client
+from kubernetes_asyncio.client.rest import ApiException
+
+# config
+from src.common.config import CERT_AUTHORITY_SECRET_NAME
+from src.common.config import CERT_AUTHORITY_VALIDITY_DAYS
+from src.common.config import CERT_MANAGER_CRON_JOB_NAMESPACE
+
+# utils
+from src.common.kubernetes_utils import KubernetesUtils
+
+# helpers
+from src.containers.containers_helpers import CertificateUtils
+
+
+class CertificateAuthorityError(Exception):
+    '''
+    Raised when certificates cannot be issued in process.
+    '''
+    pass
+
+
+class CertificateAuthority:
+    '''
+    Signs server and client certificates for socket-ssh services with the cluster CA.
+    '''
+    def __init__(self, ca_secret_name: str = CERT_AUTHORITY_SECRET_NAME, validity_days: int = CERT_AUTHORITY_VALIDITY_DAYS) -> None:
+        '''
+        Initialize the CertificateAuthority. The CA is loaded on first use.
+        :params:
+            ca_secret_name: The secret holding ca.crt and ca.key.
+            validity_days: Validity of issued certificates in days.
+        '''
+        self.ca_secret_name: str = ca_secret_name
+        self.validity_days: int = validity_days
+        self.ca_cert: x509.Certificate | None = None
+        self.ca_key: CertificateIssuerPrivateKeyTypes | None = None
+        self.ca_cert_pem: bytes | None = None
+
+    async def load_ca(self) -> None:
+        '''
+        Load the CA certificate and key from their secret, once.
+        :raises: CertificateAuthorityError if the secret is missing, incomplete or does not hold a valid CA.
+        '''
+        if self.ca_cert is not None:
+            return
+        try:
+            data: dict = await CertificateUtils.read_certificate_from_secret(self.ca_secret_name)
+        except ApiException as e:
+            raise CertificateAuthorityError(f"CA secret {self.ca_secret_name} could not be read: {e.reason}")
+        if 'ca.crt' not in data or 'ca.key' not in data:
+            raise CertificateAuthorityError(f"CA secret {self.ca_secret_name} must contain ca.crt and ca.key")
+        try:
+            ca_cert_pem: bytes = base64.b64decode(data['ca.crt'])
+            ca_cert: x509.Certificate = x509.load_pem_x509_certificate(ca_cert_pem)
+            ca_key: CertificateIssuerPrivateKeyTypes = serialization.load_pem_private_key(
+                base64.b64decode(data['ca.key']), password=None
+            )
+        except (ValueError, TypeError) as e:
+            raise CertificateAuthorityError(f"CA secret {self.ca_secret_name} does not hold a valid CA: {e}")
+        # only cache a CA that loaded completely.
+        self.ca_cert_pem, self.ca_cert, self.ca_key = ca_cert_pem, ca_cert, ca_key
+
+    def sign(
+        self,
+        common_name: str,
+        extended_key_usage: x509.ObjectIdentifier,
+        dns_names: list[str] | None = None
+    ) -> tuple[bytes, bytes]:
+        '''
+        Generate a key and sign a certificate for it.
+        :returns: (key pem, certificate pem)
+        '''
+        key: ec.EllipticCurvePrivateKey = ec.generate_private_key(ec.SECP256R1())
+        now: datetime.datetime = datetime.datetime.now(datetime.timezone.utc)
+        builder: x509.CertificateBuilder = (
+            x509.CertificateBuilder()
+            .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)]))
+            .issuer_name(self.ca_cert.subject)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(minutes=5))
+            .not_valid_after(now + datetime.timedelta(days=self.validity_days))
+            .add_extension(x509.BasicConstraints(ca=False, path_length=None), critical=True)
+            .add_extension(x509.ExtendedKeyUsage([extended_key_usage]), critical=False)
+        )
+        if dns_names:
+            builder = builder.add_extension(
+                x509.SubjectAlternativeName([x509.DNSName(name) for name in dns_names]), critical=False
+            )
+        cert: x509.Certificate = builder.sign(private_key=self.ca_key, algorithm=hashes.SHA256())
+        key_pem: bytes = key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        return key_pem, cert.public_bytes(serialization.Encoding.PEM)
+
+    def issue(self, service_name: str) -> dict:
+        '''
+        Issue the server and client certificates of a service.
+        The CA must be loaded first (load_ca).
+        :returns: The secret data: base64 encoded PEMs keyed like the CronJob secrets.
+        '''
+        if self.ca_cert is None:
+            raise CertificateAuthorityError("CA is not loaded")
+        server_key, server_cert = self.sign(
+            common_name=service_name,
+            extended_key_usage=ExtendedKeyUsageOID.SERVER_AUTH,
+            dns_names=[
+                service_name,
+                f"{service_name}.{CERT_MANAGER_CRON_JOB_NAMESPACE}",
+                f"{service_name}.{CERT_MANAGER_CRON_JOB_NAMESPACE}.svc",
+                f"{service_name}.{CERT_MANAGER_CRON_JOB_NAMESPACE}.svc.cluster.local",
+            ]
+        )
+        client_key, client_cert = self.sign(
+            common_name=f"{service_name}-client",
+            extended_key_usage=ExtendedKeyUsageOID.CLIENT_AUTH
+        )
+        pems: dict[str, bytes] = {
+            'server.key': server_key,
+            'server.crt': server_cert,
+            'client.key': client_key,
+            'client.crt': client_cert,
+            'ca.crt': self.ca_cert_pem,
+        }
+        return {name: base64.b64encode(pem).decode('utf-8') for name, pem in pems.items()}
+
+    async def write_secret(self, secret_name: str, data: dict) -> None:
+        '''
+        Write the certificates to their secret, replacing an existing one.
+        '''
+        secret: client.V1Secret = client.V1Secret(
+            metadata=client.V1ObjectMeta(name=secret_name, namespace=CERT_MANAGER_CRON_JOB_NAMESPACE),
+            type="Opaque",
+            data=data
+        )
+        core_v1: client.CoreV1Api = KubernetesUtils.core_v1()
+        try:
+            await core_v1.create_namespaced_secret(namespace=CERT_MANAGER_CRON_JOB_NAMESPACE, body=secret)
+        except ApiException as e:
+            if e.status != 409:
+                raise
+            await core_v1.replace_namespaced_secret(
+                name=secret_name, namespace=CERT_MANAGER_CRON_JOB_NAMESPACE, body=secret
+            )
+
+    async def issue_certificates(self, service_name: str) -> dict:
+        '''
+        Issue the certificates of a service and write them to <service_name>-certs.
+        Signing happens in process, only the CA read (once) and the secret write go to the API server.
+        :returns: The secret data, as CertificateUtils.read_certificate_from_secret would return it.
+        :raises: CertificateAuthorityError if the CA is not available, or the certificates cannot be signed or written.
+        '''
+        await self.load_ca()
+        try:
+            data: dict = self.issue(service_name)
+            await self.write_secret(f"{service_name}-certs", data)
+        except (ApiException, ValueError, TypeError) as e:
+            raise CertificateAuthorityError(f"Certificates of {service_name} could not be issued: {e}")
+        return data
+
+
+# Shared certificate authority, the CA is cached on it.
+_certificate_authority: CertificateAuthority | None = None
+
+
+def get_certificate_authority() -> CertificateAuthority:
+    '''
+    Get the shared CertificateAuthority.
+    '''
+    global _certificate_authority
+    if _certificate_authority is None:
+        _certificate_authority = CertificateAuthority()
+    return _certificate_authority
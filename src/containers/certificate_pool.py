@@ -0,0 +1,175 @@
+'''
+Pool of pre-issued socket-ssh certificates.
+
+Certificates are issued for a service name, which is derived from the terminal id
+(see TerminalService). The pool picks terminal ids ahead of time and issues their certificates
+in batched jobs: one cert-manager job receives many services through its SERVICES variable.
+A terminal created with a pooled id finds its certificate secret already in place.
+
+State lives in Redis so that every pod hands out from the same pool:
+    certificate_pool:ready -> list of pooled terminal ids with their issue time (json), oldest first.
+    certificate_pool:leader -> id of the pod that refills the pool.
+
+Pooled certificates older than CERT_POOL_MAX_AGE are deleted in batches instead of handed out.
+'''
+
+# builtins
+import asyncio
+import json
+import time
+import uuid
+from typing import Optional
+
+# third party
+import redis
+import redis.asyncio as aioredis
+
+# config
+from src.common.config import CERT_POOL_SIZE
+from src.common.config import CERT_POOL_BATCH_SIZE
+from src.common.config import CERT_POOL_REFILL_INTERVAL
+from src.common.config import CERT_POOL_MAX_AGE
+from src.common.config import CERT_POOL_PREFIX
+
+# utils
+from src.common.redis_utils import RedisUtils
+
+# helpers
+from src.containers.containers_helpers import CertificateUtils
+from src.containers.terminal_service import TerminalService
+
+
+class CertificatePoolManager:
+    '''
+    Keeps a stock of pre-issued certificate secrets for future socket-ssh services.
+    Only the leader pod refills, every pod can hand out.
+    '''
+    def __init__(self, redis_client: aioredis.Redis | None = None, size: int = CERT_POOL_SIZE, batch_size: int = CERT_POOL_BATCH_SIZE) -> None:
+        '''
+        Initialize the CertificatePoolManager.
+        :params:
+            redis_client: The asyncio Redis client. Defaults to the shared client.
+            size: The number of pre-issued certificates to keep.
+            batch_size: The number of services per certificate job.
+        '''
+        self.redis_client: aioredis.Redis = redis_client or RedisUtils.async_client()
+        self.size: int = size
+        self.batch_size: int = batch_size
+        self.pod_id: str = str(uuid.uuid4())
+        self.issuing: int = 0
+        self.tasks: set[asyncio.Task] = set()
+
+    @property
+    def ready_key(self) -> str:
+        return f"{CERT_POOL_PREFIX}ready"
+
+    @property
+    def leader_key(self) -> str:
+        return f"{CERT_POOL_PREFIX}leader"
+
+    async def acquire(self) -> Optional[str]:
+        '''
+        Hand out a terminal id whose certificates are already issued.
+        Expired entries are deleted in one batch.
+        :returns: The terminal id or None if the pool is empty.
+        '''
+        expired: list[str] = []
+        try:
+            while True:
+                encoded: str | None = await self.redis_client.lpop(self.ready_key)
+                if encoded is None:
+                    return None
+                entry: dict = json.loads(encoded)
+                if time.time() - entry['issued_at'] <= CERT_POOL_MAX_AGE:
+                    return entry['terminal_id']
+                expired.append(entry['terminal_id'])
+        except redis.RedisError as e:
+            print(f"Error acquiring pooled certificate: {e}")
+            return None
+        finally:
+            if expired:
+                self.spawn(self.delete(expired))
+
+    async def issue_batch(self, terminal_ids: list[str]) -> None:
+        '''
+        Issue the certificates of many terminals in a single job and add them to the pool.
+        '''
+        try:
+            services: str = ','.join(TerminalService.socket_ssh_service_name(terminal_id) for terminal_id in terminal_ids)
+            await CertificateUtils.create_certificate_job(services)
+            issued_at: float = time.time()
+            await self.redis_client.rpush(
+                self.ready_key,
+                *[json.dumps({'terminal_id': terminal_id, 'issued_at': issued_at}) for terminal_id in terminal_ids]
+            )
+        except Exception as e:
+            print(f"Error issuing pooled certificates: {e}")
+            # the job may have written some secrets before failing.
+            await self.delete(terminal_ids)
+        finally:
+            self.issuing -= len(terminal_ids)
+
+    async def delete(self, terminal_ids: list[str]) -> None:
+        '''
+        Delete the certificate secrets of terminals in one batch.
+        '''
+        try:
+            await CertificateUtils.delete_secrets(
+                [TerminalService.certificate_secret_name(terminal_id) for terminal_id in terminal_ids]
+            )
+        except Exception as e:
+            print(f"Error deleting pooled certificates: {e}")
+
+    def spawn(self, coroutine: any) -> None:
+        '''
+        Run a coroutine in the background and keep a reference to it until it is done.
+        '''
+        task: asyncio.Task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def refill(self) -> None:
+        '''
+        Issue as many certificates as the pool is short of, in jobs of batch_size services.
+        '''
+        ready: int = await self.redis_client.llen(self.ready_key)
+        deficit: int = self.size - ready - self.issuing
+        while deficit > 0:
+            batch: list[str] = [TerminalService.generate_terminal_id() for _ in range(min(deficit, self.batch_size))]
+            self.issuing += len(batch)
+            deficit -= len(batch)
+            self.spawn(self.issue_batch(batch))
+
+    async def run(self) -> None:
+        '''
+        Refill loop. Runs until cancelled.
+        '''
+        while True:
+            try:
+                if await RedisUtils.hold_lock(self.redis_client, self.leader_key, self.pod_id, CERT_POOL_REFILL_INTERVAL * 3):
+                    await self.refill()
+            except redis.RedisError as e:
+                print(f"Error refilling certificate pool: {e}")
+            await asyncio.sleep(CERT_POOL_REFILL_INTERVAL)
+
+    async def stop(self) -> None:
+        '''
+        Cancel background issuance.
+        '''
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+# Shared certificate pool manager, created on first use.
+_certificate_pool_manager: CertificatePoolManager | None = None
+
+
+def get_certificate_pool_manager() -> CertificatePoolManager:
+    '''
+    Get the shared CertificatePoolManager.
+    '''
+    global _certificate_pool_manager
+    if _certificate_pool_manager is None:
+        _certificate_pool_manager = CertificatePoolManager()
+    return _certificate_pool_manager
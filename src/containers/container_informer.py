@@ -0,0 +1,264 @@
+'''
+Informer-style, in-memory index of the pods and services container-maker created for terminals.
+
+Each resource kind is listed once, then watched from the resource version of the list.
+Every watch event updates the index, so readiness and existence are known without asking
+container-maker or the API server. When a watch expires it is resumed from the last resource version,
+when the resource version is too old (410) the kind is listed again.
+
+Indexes:
+    pods, services -> by container name: container-maker names resources <container_name>-<suffix>.
+    containers -> ContainerResponseModel by container id, as container-maker reported it.
+    owners -> container ids by user id.
+
+container-maker does not label resources with our user or container ids,
+so the id and owner indexes are filled by ContainerMakerClient when a container is created for a user
+or handed out to them from the warm pool. List and get results never add owners.
+Lookups answer None whenever the index cannot be trusted, callers then fall back to container-maker.
+'''
+
+# builtins
+import asyncio
+from typing import Callable, Optional
+
+# kubernetes
+from kubernetes_asyncio import client, watch
+from kubernetes_asyncio.client.rest import ApiException
+
+# config
+from src.common.config import TERMINAL_NETWORK_NAME
+from src.common.config import CONTAINER_INFORMER_LABEL_SELECTOR
+from src.common.config import CONTAINER_INFORMER_WATCH_TIMEOUT
+from src.common.config import CONTAINER_INFORMER_RETRY_INTERVAL
+
+# utils
+from src.common.kubernetes_utils import KubernetesUtils
+
+# enums
+from src.containers.enum.container_status_enum import ContainerStatus
+
+# dtos
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.list_container_response_dto import ListContainerResponseModel
+
+
+class ContainerInformer:
+    '''
+    Watch-driven index of terminal pods and services in one namespace.
+    '''
+    def __init__(self, namespace: str = TERMINAL_NETWORK_NAME, label_selector: str = CONTAINER_INFORMER_LABEL_SELECTOR) -> None:
+        '''
+        Initialize the ContainerInformer.
+        :params:
+            namespace: The namespace (container-maker network) to watch.
+            label_selector: Only index pods and services matching this selector.
+        '''
+        self.namespace: str = namespace
+        self.label_selector: str = label_selector
+        self.pods: dict[str, client.V1Pod] = {}
+        self.services: dict[str, client.V1Service] = {}
+        self.containers: dict[str, ContainerResponseModel] = {}
+        self.owners: dict[str, set[str]] = {}
+        self.synced_kinds: set[str] = set()
+        # replaced on every change, so that waiters wake up on the next one.
+        self.changed: asyncio.Event = asyncio.Event()
+
+    @staticmethod
+    def container_name(resource_name: str) -> str:
+        '''
+        Remove the suffix like: service, ingress or pod from the resource name.
+        '''
+        return '-'.join(resource_name.split('-')[:-1])
+
+    @property
+    def synced(self) -> bool:
+        return {'pod', 'service'} <= self.synced_kinds
+
+    def index(self, kind: str) -> dict:
+        return self.pods if kind == 'pod' else self.services
+
+    def notify(self) -> None:
+        '''
+        Wake up everyone waiting for a change.
+        '''
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def replace(self, kind: str, items: list) -> None:
+        '''
+        Replace the index of a kind with the result of a list call.
+        '''
+        index: dict = self.index(kind)
+        index.clear()
+        for item in items:
+            index[self.container_name(item.metadata.name)] = item
+        self.synced_kinds.add(kind)
+        self.notify()
+
+    def apply(self, kind: str, event_type: str, item: client.V1Pod | client.V1Service) -> None:
+        '''
+        Apply a watch event to the index of a kind.
+        '''
+        index: dict = self.index(kind)
+        name: str = self.container_name(item.metadata.name)
+        if event_type == 'DELETED':
+            index.pop(name, None)
+        else:
+            index[name] = item
+        self.notify()
+
+    async def list_then_watch(self, kind: str, list_function: Callable) -> None:
+        '''
+        List a kind, then watch it from the list's resource version until the resource version expires.
+        '''
+        resource_list: client.V1PodList | client.V1ServiceList = await list_function(
+            namespace=self.namespace, label_selector=self.label_selector
+        )
+        self.replace(kind, resource_list.items)
+        resource_version: str = resource_list.metadata.resource_version
+        while True:
+            async with watch.Watch() as resource_watch:
+                async for event in resource_watch.stream(
+                    list_function,
+                    namespace=self.namespace,
+                    label_selector=self.label_selector,
+                    resource_version=resource_version,
+                    timeout_seconds=CONTAINER_INFORMER_WATCH_TIMEOUT
+                ):
+                    if event['type'] == 'BOOKMARK':
+                        continue
+                    self.apply(kind, event['type'], event['object'])
+                    resource_version = event['object'].metadata.resource_version
+
+    async def run_kind(self, kind: str, list_function: Callable) -> None:
+        '''
+        Keep a kind in sync. Runs until cancelled.
+        '''
+        while True:
+            try:
+                await self.list_then_watch(kind, list_function)
+            except ApiException as e:
+                if e.status != 410:
+                    print(f"Error watching {kind}s: {e}")
+                    await asyncio.sleep(CONTAINER_INFORMER_RETRY_INTERVAL)
+                # resource version too old: list again.
+            except Exception as e:
+                print(f"Error watching {kind}s: {e}")
+                await asyncio.sleep(CONTAINER_INFORMER_RETRY_INTERVAL)
+            self.synced_kinds.discard(kind)
+
+    async def run(self) -> None:
+        '''
+        Keep pods and services in sync. Runs until cancelled.
+        '''
+        core_v1: client.CoreV1Api = KubernetesUtils.core_v1()
+        await asyncio.gather(
+            self.run_kind('pod', core_v1.list_namespaced_pod),
+            self.run_kind('service', core_v1.list_namespaced_service)
+        )
+
+    def register(self, user_id: str, container: ContainerResponseModel) -> None:
+        '''
+        Record a container of a user: created for them, or handed out to them from the warm pool.
+        '''
+        if container.container_network != self.namespace:
+            return
+        self.containers[container.container_id] = container
+        self.owners.setdefault(user_id, set()).add(container.container_id)
+
+    def update(self, container: ContainerResponseModel) -> None:
+        '''
+        Refresh a registered container with what container-maker reports now, e.g. its ip once it is ready.
+        Containers that were never registered are ignored, this records no owner.
+        '''
+        if container.container_id in self.containers:
+            self.containers[container.container_id] = container
+
+    def forget(self, container_id: str) -> None:
+        '''
+        Drop a deleted container from the id and owner indexes.
+        '''
+        self.containers.pop(container_id, None)
+        for container_ids in self.owners.values():
+            container_ids.discard(container_id)
+
+    def status(self, container_name: str) -> ContainerStatus:
+        '''
+        Get the status of a container from its pod.
+        '''
+        pod: client.V1Pod | None = self.pods.get(container_name)
+        if pod is None or pod.metadata.deletion_timestamp is not None:
+            return ContainerStatus.GONE
+        if pod.status is None or pod.status.phase != 'Running':
+            return ContainerStatus.PENDING
+        conditions: list[client.V1PodCondition] = pod.status.conditions or []
+        if any(condition.type == 'Ready' and condition.status == 'True' for condition in conditions):
+            return ContainerStatus.READY
+        return ContainerStatus.RUNNING
+
+    def exists(self, container: ContainerResponseModel) -> bool:
+        return self.status(container.container_name) != ContainerStatus.GONE
+
+    def get(self, user_id: str, container_id: str) -> Optional[ContainerResponseModel]:
+        '''
+        Get a container of a user.
+        :returns: The container or None if the index cannot answer.
+        '''
+        if not self.synced or container_id not in self.owners.get(user_id, set()):
+            return None
+        container: ContainerResponseModel | None = self.containers.get(container_id)
+        if container is None or not container.container_ip or not self.exists(container):
+            return None
+        return container
+
+    def list(self, user_id: str, network_name: str, container_ids: set[str] | None = None) -> Optional[ListContainerResponseModel]:
+        '''
+        List the containers of a user that still exist.
+        :params:
+            user_id: The user.
+            network_name: The network.
+            container_ids: Every container the user owns, see ContainerOwners. Containers created through
+                another pod are not indexed here, so the index only answers if it has all of them.
+        :returns: The containers or None if the index cannot answer.
+        '''
+        if not self.synced or network_name != self.namespace or user_id not in self.owners:
+            return None
+        if container_ids is None:
+            container_ids = self.owners[user_id]
+        elif not container_ids <= self.owners[user_id]:
+            return None
+        containers: list[ContainerResponseModel] = [
+            self.containers[container_id] for container_id in container_ids if container_id in self.containers
+        ]
+        if any(not container.container_ip for container in containers):
+            return None
+        return ListContainerResponseModel(containers=[container for container in containers if self.exists(container)])
+
+    async def wait_until_ready(self, container_name: str, timeout: float) -> bool:
+        '''
+        Wait until the pod of a container is ready.
+        :returns: True if it is ready, False if it is not ready after timeout seconds.
+        '''
+        async def wait() -> None:
+            while self.status(container_name) != ContainerStatus.READY:
+                await self.changed.wait()
+
+        try:
+            await asyncio.wait_for(wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+# Shared container informer, created on first use.
+_container_informer: ContainerInformer | None = None
+
+
+def get_container_informer() -> ContainerInformer:
+    '''
+    Get the shared ContainerInformer.
+    '''
+    global _container_informer
+    if _container_informer is None:
+        _container_informer = ContainerInformer()
+    return _container_informer
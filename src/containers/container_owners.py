@@ -0,0 +1,48 @@
+'''
+Container ownership.
+container-maker does not know our users, so the owner of every container is recorded here when it is created
+for a user, or handed out to them from the warm pool. Only owners can get, list and delete a container.
+
+Keys:
+    container_owner:<user_id> -> set of container ids
+
+Unlike the metadata cache, Redis errors are raised: ownership is never assumed.
+'''
+
+# third party
+import redis.asyncio as aioredis
+
+# config
+from src.common.config import CONTAINER_OWNER_PREFIX
+
+# utils
+from src.common.redis_utils import RedisUtils
+
+
+class ContainerOwners:
+    '''
+    The container ids of each user, backed by Redis.
+    '''
+    def __init__(self, redis_client: aioredis.Redis | None = None) -> None:
+        '''
+        Initialize the ContainerOwners.
+        :params:
+            redis_client: The asyncio Redis client. Defaults to the shared client.
+        '''
+        self.redis_client: aioredis.Redis = redis_client or RedisUtils.async_client()
+        self.prefix: str = CONTAINER_OWNER_PREFIX
+
+    def key(self, user_id: str) -> str:
+        return f"{self.prefix}{user_id}"
+
+    async def add(self, user_id: str, container_id: str) -> None:
+        await self.redis_client.sadd(self.key(user_id), container_id)
+
+    async def remove(self, user_id: str, container_id: str) -> None:
+        await self.redis_client.srem(self.key(user_id), container_id)
+
+    async def owns(self, user_id: str, container_id: str) -> bool:
+        return bool(await self.redis_client.sismember(self.key(user_id), container_id))
+
+    async def container_ids(self, user_id: str) -> set[str]:
+        return set(await self.redis_client.smembers(self.key(user_id)))
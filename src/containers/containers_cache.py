@@ -0,0 +1,148 @@
+'''
+Per-user container metadata cache.
+Stored in Redis so that every pod serves the same view.
+
+The terminals page polls container state. Without this cache, every poll would go to container-maker
+and from there to the Kubernetes API server.
+
+Keys:
+    container_cache:<user_id>:container:<container_id> -> ContainerResponseModel (json)
+    container_cache:<user_id>:list:<network_name> -> ListContainerResponseModel (json)
+
+Entries expire after CONTAINER_CACHE_TTL seconds.
+They are populated on create, get and list, and invalidated on delete.
+'''
+
+# builtins
+from typing import Optional
+
+# third party
+import redis
+import redis.asyncio as aioredis
+
+# config
+from src.common.config import CONTAINER_CACHE_PREFIX
+from src.common.config import CONTAINER_CACHE_TTL
+
+# utils
+from src.common.redis_utils import RedisUtils
+
+# dtos
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.list_container_response_dto import ListContainerResponseModel
+
+
+class ContainerMetadataCache:
+    '''
+    Per-user container metadata cache backed by Redis.
+    Redis errors are treated as cache misses, the cache must never fail a request.
+    '''
+    def __init__(self, redis_client: aioredis.Redis | None = None, ttl: int = CONTAINER_CACHE_TTL) -> None:
+        '''
+        Initialize the cache.
+        :params:
+            redis_client: The asyncio Redis client. Defaults to the shared client.
+            ttl: Time to live of every entry in seconds.
+        '''
+        self.redis_client: aioredis.Redis = redis_client or RedisUtils.async_client()
+        self.prefix: str = CONTAINER_CACHE_PREFIX
+        self.ttl: int = ttl
+
+    def container_key(self, user_id: str, container_id: str) -> str:
+        '''
+        Get the key for a single container.
+        '''
+        return f"{self.prefix}{user_id}:container:{container_id}"
+
+    def list_key(self, user_id: str, network_name: str) -> str:
+        '''
+        Get the key for a container list.
+        '''
+        return f"{self.prefix}{user_id}:list:{network_name}"
+
+    async def get_container(self, user_id: str, container_id: str) -> Optional[ContainerResponseModel]:
+        '''
+        Get a cached container.
+        :returns: ContainerResponseModel or None on a miss.
+        '''
+        try:
+            encoded: str | None = await self.redis_client.get(self.container_key(user_id, container_id))
+            if encoded:
+                return ContainerResponseModel.model_validate_json(encoded)
+            return None
+        except (ValueError, redis.RedisError) as e:
+            print(f"Error reading container {container_id} from cache: {e}")
+            return None
+
+    async def set_container(self, user_id: str, container: ContainerResponseModel) -> None:
+        '''
+        Cache a container.
+        '''
+        try:
+            await self.redis_client.setex(
+                name=self.container_key(user_id, container.container_id),
+                time=self.ttl,
+                value=container.model_dump_json()
+            )
+        except redis.RedisError as e:
+            print(f"Error writing container {container.container_id} to cache: {e}")
+
+    async def get_container_list(self, user_id: str, network_name: str) -> Optional[ListContainerResponseModel]:
+        '''
+        Get a cached container list.
+        :returns: ListContainerResponseModel or None on a miss.
+        '''
+        try:
+            encoded: str | None = await self.redis_client.get(self.list_key(user_id, network_name))
+            if encoded:
+                return ListContainerResponseModel.model_validate_json(encoded)
+            return None
+        except (ValueError, redis.RedisError) as e:
+            print(f"Error reading container list {network_name} from cache: {e}")
+            return None
+
+    async def set_container_list(self, user_id: str, network_name: str, container_list: ListContainerResponseModel) -> None:
+        '''
+        Cache a container list. Every container in the list is cached individually as well.
+        '''
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.setex(name=self.list_key(user_id, network_name), time=self.ttl, value=container_list.model_dump_json())
+                for container in container_list.containers:
+                    pipe.setex(
+                        name=self.container_key(user_id, container.container_id),
+                        time=self.ttl,
+                        value=container.model_dump_json()
+                    )
+                await pipe.execute()
+        except redis.RedisError as e:
+            print(f"Error writing container list {network_name} to cache: {e}")
+
+    async def add_container(self, user_id: str, network_name: str, container: ContainerResponseModel) -> None:
+        '''
+        Cache a newly created container.
+        The cached list of its network no longer matches, so it is dropped.
+        '''
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.setex(
+                    name=self.container_key(user_id, container.container_id),
+                    time=self.ttl,
+                    value=container.model_dump_json()
+                )
+                pipe.delete(self.list_key(user_id, network_name))
+                await pipe.execute()
+        except redis.RedisError as e:
+            print(f"Error writing container {container.container_id} to cache: {e}")
+
+    async def invalidate_container(self, user_id: str, network_name: str, container_id: str) -> None:
+        '''
+        Invalidate a container and the list of its network.
+        '''
+        try:
+            await self.redis_client.delete(
+                self.container_key(user_id, container_id),
+                self.list_key(user_id, network_name)
+            )
+        except redis.RedisError as e:
+            print(f"Error invalidating container {container_id} in cache: {e}")
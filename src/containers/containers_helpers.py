@@ -1,36 +1,82 @@
+# builtins
+import asyncio
 import time
 
 # kubernetes
-from kubernetes import client, config
-from kubernetes.client.rest import ApiException
+from kubernetes_asyncio import client, watch
+from kubernetes_asyncio.client.rest import ApiException
 
 # common
 from src.common.config import CERT_MANAGER_CRON_JOB_NAME
 from src.common.config import CERT_MANAGER_CRON_JOB_NAMESPACE
+from src.common.config import CERT_MANAGER_JOB_TIMEOUT
+from src.common.kubernetes_utils import KubernetesUtils
+
+
+class CertificateJobError(Exception):
+    '''
+    Raised when a certificate job fails or does not complete in time.
+    '''
+    pass
 
 
 class CertificateUtils:
     '''
     A utility class for create, read and delete certificates using secrets and jobs.
+    Uses the shared asyncio Kubernetes client, so nothing blocks the event loop or a worker thread.
     '''
-    config.load_incluster_config()
-    batch_v1: client.BatchV1Api = client.BatchV1Api()
-    core_v1: client.CoreV1Api = client.CoreV1Api()  # Add CoreV1Api for secrets
 
-    @classmethod
-    def poll_until_completeion(cls, created_job: client.V1Job) -> None:
+    @staticmethod
+    def job_failed(job: client.V1Job) -> bool:
         '''
-        Poll until the job is complete.
+        Check if a job has failed: it has a Failed condition.
         '''
-        while True:
-            job: client.V1Job = cls.batch_v1.read_namespaced_job(name=created_job.metadata.name, namespace=CERT_MANAGER_CRON_JOB_NAMESPACE)
-            if job.status.succeeded:
-                break
-            time.sleep(4)
+        conditions: list[client.V1JobCondition] = (job.status.conditions if job.status else None) or []
+        return any(condition.type == "Failed" and condition.status == "True" for condition in conditions)
 
+    @classmethod
+    async def wait_for_job_completion(cls, created_job: client.V1Job, timeout: int = CERT_MANAGER_JOB_TIMEOUT) -> None:
+        '''
+        Wait until the job is complete.
+        Watches the job from the resource version it was created with, so the job is reported the moment it succeeds,
+        instead of polling it.
+        :raises:
+            CertificateJobError: If the job fails or does not succeed within timeout seconds.
+        '''
+        batch_v1: client.BatchV1Api = KubernetesUtils.batch_v1()
+        job_name: str = created_job.metadata.name
+        resource_version: str = created_job.metadata.resource_version
+        deadline: float = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                async with watch.Watch() as job_watch:
+                    async for event in job_watch.stream(
+                        batch_v1.list_namespaced_job,
+                        namespace=CERT_MANAGER_CRON_JOB_NAMESPACE,
+                        field_selector=f"metadata.name={job_name}",
+                        resource_version=resource_version,
+                        timeout_seconds=max(int(remaining), 1)
+                    ):
+                        job: client.V1Job = event['object']
+                        resource_version = job.metadata.resource_version
+                        if event['type'] == 'DELETED':
+                            raise CertificateJobError(f"Job {job_name} was deleted before completing")
+                        if job.status and job.status.succeeded:
+                            return
+                        if cls.job_failed(job):
+                            raise CertificateJobError(f"Job {job_name} failed")
+            except ApiException as e:
+                if e.status != 410:
+                    raise
+                # resource version too old: continue watching from the current state of the job.
+                job: client.V1Job = await batch_v1.read_namespaced_job(name=job_name, namespace=CERT_MANAGER_CRON_JOB_NAMESPACE)
+                if job.status and job.status.succeeded:
+                    return
+                resource_version = job.metadata.resource_version
+        raise CertificateJobError(f"Job {job_name} did not complete within {timeout} seconds")
 
     @classmethod
-    def create_certificate_job(cls, services: str) -> client.V1Job:
+    async def create_certificate_job(cls, services: str) -> client.V1Job:
         """
         Create self signed certificates for services.
         We already have a cronjob that creates the certificates.
@@ -39,9 +85,10 @@ class CertificateUtils:
             services: Comma separated string containing service names. Eg: socket-ssh-service,some-other-service
         :returns: The created V1Job object.
         """
+        batch_v1: client.BatchV1Api = KubernetesUtils.batch_v1()
         try:
             # Get the cronjob
-            cronjob: client.V1CronJob = cls.batch_v1.read_namespaced_cron_job(
+            cronjob: client.V1CronJob = await batch_v1.read_namespaced_cron_job(
                 name=CERT_MANAGER_CRON_JOB_NAME,
                 namespace=CERT_MANAGER_CRON_JOB_NAMESPACE
             )
@@ -79,20 +126,21 @@ class CertificateUtils:
             )
 
             # Create the job
-            created_job: client.V1Job = cls.batch_v1.create_namespaced_job(
+            created_job: client.V1Job = await batch_v1.create_namespaced_job(
                 namespace=CERT_MANAGER_CRON_JOB_NAMESPACE,
                 body=job
             )
 
             print(f"Created job {created_job.metadata.name} from cronjob {CERT_MANAGER_CRON_JOB_NAME}")
-            cls.poll_until_completeion(created_job)
+            await cls.wait_for_job_completion(created_job)
             print(f"Job {created_job.metadata.name} completed.")
+            return created_job
         except ApiException as e:
             print(f"Error creating job from cronjob: {e}")
             raise
 
     @classmethod
-    def read_certificate_from_secret(cls, secret_name: str) -> dict:
+    async def read_certificate_from_secret(cls, secret_name: str) -> dict:
         '''
         Read the certificate from the secret.
         If secret.data is empty, return an empty dict.
@@ -103,7 +151,7 @@ class CertificateUtils:
             A dictionary containing the secret data.
         '''
         try:
-            secret: client.V1Secret = cls.core_v1.read_namespaced_secret(
+            secret: client.V1Secret = await KubernetesUtils.core_v1().read_namespaced_secret(
                 name=secret_name, namespace=CERT_MANAGER_CRON_JOB_NAMESPACE
             )
             if secret.data:
@@ -114,7 +162,7 @@ class CertificateUtils:
             raise
 
     @classmethod
-    def delete_secret(cls, secret_name: str) -> None:
+    async def delete_secret(cls, secret_name: str) -> None:
         '''
         Read secret, if it exists, delete the secret.
         :params:
@@ -122,12 +170,50 @@ class CertificateUtils:
         :returns:
             None
         '''
+        core_v1: client.CoreV1Api = KubernetesUtils.core_v1()
         try:
-            secret: client.V1Secret = cls.core_v1.read_namespaced_secret(
+            secret: client.V1Secret = await core_v1.read_namespaced_secret(
                 name=secret_name, namespace=CERT_MANAGER_CRON_JOB_NAMESPACE
             )
             if secret:
-                cls.core_v1.delete_namespaced_secret(name=secret_name, namespace=CERT_MANAGER_CRON_JOB_NAMESPACE)
+                await core_v1.delete_namespaced_secret(name=secret_name, namespace=CERT_MANAGER_CRON_JOB_NAMESPACE)
         except ApiException as e:
             print(f"Error deleting secret: {e}")
             raise
+
+    @classmethod
+    async def delete_secret_if_exists(cls, secret_name: str) -> bool:
+        '''
+        Delete a secret without reading it first.
+        :params:
+            secret_name: The name of the secret to delete.
+        :returns:
+            True if the secret was deleted, False if it did not exist.
+        '''
+        try:
+            await KubernetesUtils.core_v1().delete_namespaced_secret(
+                name=secret_name, namespace=CERT_MANAGER_CRON_JOB_NAMESPACE
+            )
+            return True
+        except ApiException as e:
+            if e.status == 404:
+                return False
+            raise
+
+    @classmethod
+    async def delete_secrets(cls, secret_names: list[str]) -> None:
+        '''
+        Delete secrets in one batch. Deletes are sent concurrently over the shared connection pool
+        and missing secrets are ignored.
+        :params:
+            secret_names: The names of the secrets to delete.
+        :returns:
+            None
+        '''
+        results: list = await asyncio.gather(
+            *[cls.delete_secret_if_exists(secret_name) for secret_name in secret_names], return_exceptions=True
+        )
+        errors: list[BaseException] = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            print(f"Error deleting {len(errors)} of {len(secret_names)} secrets: {errors[0]}")
+            raise errors[0]
@@ -1,11 +1,14 @@
 # modules
+from container_maker_spec import service_pb2
 from container_maker_spec.service_pb2_grpc import ContainerMakerAPIStub
 
 # GRPC Types
 from container_maker_spec.types_pb2 import CreateContainerRequest
 from container_maker_spec.types_pb2 import GetContainerRequest
 from container_maker_spec.types_pb2 import ListContainerRequest
+from container_maker_spec.types_pb2 import ListContainerResponse
 from container_maker_spec.types_pb2 import DeleteContainerRequest
+from container_maker_spec.types_pb2 import DeleteContainerResponse
 from container_maker_spec.types_pb2 import ContainerResponse
 
 # utils
@@ -17,16 +20,56 @@ from src.common.config import CONTAINER_MAKER_CLIENT_KEY_ENV_VAR
 from src.common.config import CONTAINER_MAKER_CA_ENV_VAR
 from src.common.config import CONTAINER_MAKER_HOST
 from src.common.config import CONTAINER_MAKER_PORT
+from src.common.config import CONTAINER_MAKER_CREATE_CONTAINER_TIMEOUT
+from src.common.config import CONTAINER_MAKER_GET_CONTAINER_TIMEOUT
+from src.common.config import CONTAINER_MAKER_LIST_CONTAINER_TIMEOUT
+from src.common.config import CONTAINER_MAKER_DELETE_CONTAINER_TIMEOUT
+from src.common.config import CONTAINER_MAKER_RETRY_MAX_ATTEMPTS
+from src.common.config import CONTAINER_MAKER_KEEPALIVE_TIME_MS
+from src.common.config import CONTAINER_MAKER_KEEPALIVE_TIMEOUT_MS
+from src.common.config import CONTAINER_MAKER_COMPRESSION
+from src.common.config import CONTAINER_MAKER_BREAKER_WINDOW
+from src.common.config import CONTAINER_MAKER_BREAKER_MIN_CALLS
+from src.common.config import CONTAINER_MAKER_BREAKER_ERROR_RATE
+from src.common.config import CONTAINER_MAKER_BREAKER_OPEN_DURATION
+from src.common.config import CONTAINER_MAKER_LIMIT_INITIAL
+from src.common.config import CONTAINER_MAKER_LIMIT_MIN
+from src.common.config import CONTAINER_MAKER_LIMIT_MAX
+from src.common.config import CONTAINER_MAKER_LIMIT_BACKOFF_RATIO
+from src.common.config import CONTAINER_MAKER_LIMIT_LATENCY_TOLERANCE
+from src.common.config import CONTAINER_MAKER_LIMIT_QUEUE_TIMEOUT
+from src.common.config import CREATION_JOB_READY_TIMEOUT
+from src.common.config import CONTAINER_INFORMER_ENABLED
 
 # grpc utils
-from src.common.grpc_utils import GRPCUtils
+from src.common.grpc_utils import GRPCUtils, GuardedStub, is_backend_failure
+from src.common.resilience import AIMDLimit, CircuitBreaker, ResilienceGuard
 
 # third party
 import grpc
 
+# builtins
+import asyncio
+import time
+
+# cache
+from src.containers.containers_cache import ContainerMetadataCache
+from src.containers.container_owners import ContainerOwners
+from src.containers.container_informer import ContainerInformer, get_container_informer
+
+# creation jobs
+from src.containers.creation_jobs import ProgressCallback
+from src.containers.enum.creation_job_status_enum import CreationJobStatus
+
 # data transformers
 from src.containers.data_transformers.create_container_transformer import CreateContainerInputDataTransformer
 from src.containers.data_transformers.create_container_transformer import CreateContainerOutputDataTransformer
+from src.containers.data_transformers.get_container_transformer import GetContainerInputDataTransformer
+from src.containers.data_transformers.get_container_transformer import GetContainerOutputDataTransformer
+from src.containers.data_transformers.list_container_transformer import ListContainerInputDataTransformer
+from src.containers.data_transformers.list_container_transformer import ListContainerOutputDataTransformer
+from src.containers.data_transformers.delete_container_transformer import DeleteContainerInputDataTransformer
+from src.containers.data_transformers.delete_container_transformer import DeleteContainerOutputDataTransformer
 
 # dtos
 from src.containers.dto.create_container_dto import CreateContainerModel
@@ -38,17 +81,87 @@ from src.containers.dto.delete_container_dto import DeleteContainerDataModel
 from src.containers.dto.delete_container_response_dto import DeleteContainerResponseModel
 
 
-# builtins
-import asyncio
+def container_maker_service_config() -> dict:
+    '''
+    Build the GRPC service config of the ContainerMaker API.
+    Every method gets its deadline. getContainer and listContainer are idempotent, so they are retried as well.
+    '''
+    service: str = service_pb2.DESCRIPTOR.services_by_name['ContainerMakerAPI'].full_name
+    retry_policy: dict = GRPCUtils.retry_policy(max_attempts=CONTAINER_MAKER_RETRY_MAX_ATTEMPTS)
+    return {
+        'methodConfig': [
+            GRPCUtils.method_config(service, ['createContainer'], timeout=CONTAINER_MAKER_CREATE_CONTAINER_TIMEOUT),
+            GRPCUtils.method_config(
+                service, ['getContainer'], timeout=CONTAINER_MAKER_GET_CONTAINER_TIMEOUT, retry_policy=retry_policy
+            ),
+            GRPCUtils.method_config(
+                service, ['listContainer'], timeout=CONTAINER_MAKER_LIST_CONTAINER_TIMEOUT, retry_policy=retry_policy
+            ),
+            GRPCUtils.method_config(service, ['deleteContainer'], timeout=CONTAINER_MAKER_DELETE_CONTAINER_TIMEOUT),
+        ]
+    }
+
+
+def container_maker_guard() -> ResilienceGuard:
+    '''
+    Build the circuit breaker and adaptive concurrency limit around the ContainerMaker API.
+    '''
+    return ResilienceGuard(
+        breaker=CircuitBreaker(
+            name='container-maker',
+            window=CONTAINER_MAKER_BREAKER_WINDOW,
+            min_calls=CONTAINER_MAKER_BREAKER_MIN_CALLS,
+            error_rate=CONTAINER_MAKER_BREAKER_ERROR_RATE,
+            open_duration=CONTAINER_MAKER_BREAKER_OPEN_DURATION
+        ),
+        limit=AIMDLimit(
+            name='container-maker',
+            initial_limit=CONTAINER_MAKER_LIMIT_INITIAL,
+            min_limit=CONTAINER_MAKER_LIMIT_MIN,
+            max_limit=CONTAINER_MAKER_LIMIT_MAX,
+            backoff_ratio=CONTAINER_MAKER_LIMIT_BACKOFF_RATIO,
+            latency_tolerance=CONTAINER_MAKER_LIMIT_LATENCY_TOLERANCE,
+            queue_timeout=CONTAINER_MAKER_LIMIT_QUEUE_TIMEOUT
+        ),
+        is_failure=is_backend_failure
+    )
+
+
+# CONTAINER_MAKER_COMPRESSION -> grpc compression
+COMPRESSION_MAP: dict[str, grpc.Compression] = {
+    'gzip': grpc.Compression.Gzip,
+    'deflate': grpc.Compression.Deflate,
+    'none': grpc.Compression.NoCompression,
+}
+
+
+class ContainerNotFoundError(Exception):
+    '''
+    Raised when a user asks for a container they do not own. Missing containers and containers of other users
+    are reported alike.
+    '''
+    pass
 
 
 class ContainerMakerClient:
     '''
     A client for the ContainerMaker API.
+    When a user id is passed, only containers the user owns are served, see ContainerOwners.
+    Their metadata is served from the container informer, then from the per-user cache.
+    Deadlines and retries of the RPCs come from the channel service config, see container_maker_service_config.
     '''
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        cache: ContainerMetadataCache | None = None,
+        informer: ContainerInformer | None = None,
+        owners: ContainerOwners | None = None
+    ) -> None:
         '''
         Initialize the ContainerMakerClient.
+        :params:
+            cache: The container metadata cache. Defaults to the Redis backed cache.
+            informer: The container informer. Defaults to the shared informer, if enabled.
+            owners: The container owners. Defaults to the Redis backed owners.
         '''
         # read certificates
         self.client_key: bytes = read_cert_from_env_var(CONTAINER_MAKER_CLIENT_KEY_ENV_VAR)
@@ -63,43 +176,243 @@ class ContainerMakerClient:
             secure=True,
             client_key=self.client_key,
             client_cert=self.client_cert,
-            ca_cert=self.ca_cert
+            ca_cert=self.ca_cert,
+            service_config=container_maker_service_config(),
+            keepalive_time_ms=CONTAINER_MAKER_KEEPALIVE_TIME_MS,
+            keepalive_timeout_ms=CONTAINER_MAKER_KEEPALIVE_TIMEOUT_MS,
+            compression=COMPRESSION_MAP.get(CONTAINER_MAKER_COMPRESSION.lower(), grpc.Compression.NoCompression)
         )
-        self.channel: grpc.Channel = self.grpc_utils.channel
-        self.stub: ContainerMakerAPIStub = self.grpc_utils.stub
+        # asyncio channel and stub: RPCs are awaited natively instead of running in a worker thread.
+        # every RPC goes through the circuit breaker and the concurrency limit, cache hits do not.
+        self.channel: grpc.aio.Channel = self.grpc_utils.async_channel
+        self.guard: ResilienceGuard = container_maker_guard()
+        self.stub: GuardedStub = GuardedStub(self.grpc_utils.async_stub, self.guard)
+
+        # metadata cache
+        self.cache: ContainerMetadataCache = cache or ContainerMetadataCache()
+        # owners of the containers
+        self.owners: ContainerOwners = owners or ContainerOwners()
+        # watch-driven index of pods and services
+        self.informer: ContainerInformer | None = informer
+        if self.informer is None and CONTAINER_INFORMER_ENABLED:
+            self.informer = get_container_informer()
+
+    @staticmethod
+    def strip_resource_suffix(container_response: ContainerResponse) -> ContainerResponse:
+        '''
+        Remove the suffix like: service, ingress or pod from the container name.
+        '''
+        container_response.container_name = '-'.join(container_response.container_name.split('-')[:-1])
+        return container_response
+
+    async def adopt(self, user_id: str, network_name: str, container: ContainerResponseModel) -> None:
+        '''
+        Record a user as the owner of a container: when it is created for them, or handed out from the warm pool.
+        These are the only places owners are recorded, list and get results never are.
+        '''
+        await self.owners.add(user_id, container.container_id)
+        if self.informer is not None:
+            self.informer.register(user_id, container)
+        await self.cache.add_container(user_id, network_name, container)
 
-    async def create_container(self, create_container_data: CreateContainerModel) -> ContainerResponseModel:
+    async def create_container(self, create_container_data: CreateContainerModel, user_id: str | None = None) -> ContainerResponseModel:
         '''
         Create an SSH container and a Socket-SSH container.
         '''
         try:
             # transform data
             create_container_request: CreateContainerRequest = CreateContainerInputDataTransformer.transform(create_container_data)
-            # call the stub: Turn it into an async thread.
-            container_response: ContainerResponse = await asyncio.to_thread(self.stub.createContainer, create_container_request)
-            container_response.container_name = '-'.join(container_response.container_name.split('-')[:-1])  # remove the suffix like: service, ingress or pod
+            # call the stub
+            container_response: ContainerResponse = await self.stub.createContainer(create_container_request)
+            container_response = self.strip_resource_suffix(container_response)
             # transform data
             container_response_model: ContainerResponseModel = CreateContainerOutputDataTransformer.transform(container_response)
+            # record the owner and populate the cache
+            if user_id is not None:
+                try:
+                    await self.adopt(user_id, create_container_data.network_name, container_response_model)
+                except Exception as e:
+                    # nobody could get or delete a container without an owner.
+                    print(f"Error recording the owner of container {container_response_model.container_id}: {e}")
+                    await self.discard(container_response_model.container_id, create_container_data.network_name, user_id)
+                    raise e
             # return the response
             return container_response_model
         except Exception as e:
             raise e
 
+    async def discard(self, container_id: str, network_name: str, user_id: str) -> None:
+        '''
+        Delete a container that cannot be handed to its user, with whatever adopt recorded of it before failing,
+        so that list and get do not return it. Errors are logged, the caller reports its own.
+        '''
+        try:
+            await self.delete_container(DeleteContainerDataModel(container_id=container_id, network_name=network_name))
+        except Exception as e:
+            print(f"Error deleting container {container_id}: {e}")
+        if self.informer is not None:
+            self.informer.forget(container_id)
+        try:
+            await self.owners.remove(user_id, container_id)
+        except Exception as e:
+            print(f"Error removing the owner of container {container_id}: {e}")
+        await self.cache.invalidate_container(user_id, network_name, container_id)
+
+    async def wait_until_ready(
+        self,
+        container: ContainerResponseModel,
+        network_name: str,
+        user_id: str | None = None,
+        timeout: float = CREATION_JOB_READY_TIMEOUT,
+        interval: float = 1.0
+    ) -> ContainerResponseModel:
+        '''
+        Wait until container-maker reports an ip for the container.
+        :raises: TimeoutError if the container has no ip after timeout seconds.
+        '''
+        deadline: float = time.monotonic() + timeout
+        if not container.container_ip and self.informer is not None and self.informer.synced and network_name == self.informer.namespace:
+            # wait for the pod to become ready instead of polling container-maker.
+            await self.informer.wait_until_ready(container.container_name, deadline - time.monotonic())
+        while not container.container_ip:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Container {container.container_name} is not ready after {timeout} seconds")
+            await asyncio.sleep(interval)
+            # bypass the cache, it holds the container as it was created.
+            container = await self.get_container(
+                GetContainerDataModel(container_id=container.container_id, network_name=network_name)
+            )
+            if self.informer is not None:
+                self.informer.update(container)
+            if user_id is not None:
+                await self.cache.set_container(user_id, container)
+        return container
+
+    async def create_container_until_ready(
+        self,
+        create_container_data: CreateContainerModel,
+        user_id: str | None = None,
+        progress: ProgressCallback | None = None
+    ) -> ContainerResponseModel:
+        '''
+        Create a container and wait until it is ready. Used by creation jobs.
+        '''
+        container_response_model: ContainerResponseModel = await self.create_container(create_container_data, user_id=user_id)
+        if progress is not None:
+            await progress(CreationJobStatus.POD_SCHEDULED)
+        return await self.wait_until_ready(container_response_model, create_container_data.network_name, user_id=user_id)
 
-    async def list_container(self, list_container_data: ListContainerDataModel) -> ListContainerResponseModel:
+    async def list_container(self, list_container_data: ListContainerDataModel, user_id: str | None = None) -> ListContainerResponseModel:
         '''
-        List a container.
+        List containers in a network. With a user id, only the containers the user owns.
         '''
-        pass
+        try:
+            owned: set[str] = set()
+            # serve from the informer, then from the cache
+            if user_id is not None:
+                owned = await self.owners.container_ids(user_id)
+                if not owned:
+                    return ListContainerResponseModel(containers=[])
+                if self.informer is not None:
+                    indexed: ListContainerResponseModel | None = self.informer.list(
+                        user_id, list_container_data.network_name, container_ids=owned
+                    )
+                    if indexed is not None:
+                        return indexed
+                cached: ListContainerResponseModel | None = await self.cache.get_container_list(user_id, list_container_data.network_name)
+                if cached is not None:
+                    return cached
+            # transform data
+            list_container_request: ListContainerRequest = ListContainerInputDataTransformer.transform(list_container_data)
+            # call the stub
+            list_container_response: ListContainerResponse = await self.stub.listContainer(list_container_request)
+            for container_response in list_container_response.containers:
+                self.strip_resource_suffix(container_response)
+            # transform data
+            list_container_response_model: ListContainerResponseModel = ListContainerOutputDataTransformer.transform(list_container_response)
+            # keep the user's containers and populate the cache
+            if user_id is not None:
+                list_container_response_model = ListContainerResponseModel(containers=[
+                    container for container in list_container_response_model.containers if container.container_id in owned
+                ])
+                await self.cache.set_container_list(user_id, list_container_data.network_name, list_container_response_model)
+            return list_container_response_model
+        except Exception as e:
+            raise e
 
-    async def get_container(self, get_container_data: GetContainerDataModel) -> ContainerResponseModel:
+    async def get_container(self, get_container_data: GetContainerDataModel, user_id: str | None = None) -> ContainerResponseModel:
         '''
         Get a container.
+        :raises: ContainerNotFoundError if a user id is passed and the user does not own the container.
         '''
-        pass
-    
-    async def delete_container(self, delete_container_data: DeleteContainerDataModel) -> DeleteContainerResponseModel:
+        try:
+            # serve from the informer, then from the cache
+            if user_id is not None:
+                if not await self.owners.owns(user_id, get_container_data.container_id):
+                    raise ContainerNotFoundError(get_container_data.container_id)
+                if self.informer is not None:
+                    indexed: ContainerResponseModel | None = self.informer.get(user_id, get_container_data.container_id)
+                    if indexed is not None:
+                        return indexed
+                cached: ContainerResponseModel | None = await self.cache.get_container(user_id, get_container_data.container_id)
+                if cached is not None:
+                    return cached
+            # transform data
+            get_container_request: GetContainerRequest = GetContainerInputDataTransformer.transform(get_container_data)
+            # call the stub
+            container_response: ContainerResponse = await self.stub.getContainer(get_container_request)
+            container_response = self.strip_resource_suffix(container_response)
+            # transform data
+            container_response_model: ContainerResponseModel = GetContainerOutputDataTransformer.transform(container_response)
+            # populate the cache
+            if user_id is not None:
+                await self.cache.set_container(user_id, container_response_model)
+            return container_response_model
+        except Exception as e:
+            raise e
+
+    async def delete_container(self, delete_container_data: DeleteContainerDataModel, user_id: str | None = None) -> DeleteContainerResponseModel:
         '''
         Delete a container.
+        :raises: ContainerNotFoundError if a user id is passed and the user does not own the container.
+        '''
+        try:
+            if user_id is not None and not await self.owners.owns(user_id, delete_container_data.container_id):
+                raise ContainerNotFoundError(delete_container_data.container_id)
+            # transform data
+            delete_container_request: DeleteContainerRequest = DeleteContainerInputDataTransformer.transform(delete_container_data)
+            # call the stub
+            delete_container_response: DeleteContainerResponse = await self.stub.deleteContainer(delete_container_request)
+            # invalidate the cache
+            if self.informer is not None:
+                self.informer.forget(delete_container_data.container_id)
+            if user_id is not None:
+                await self.owners.remove(user_id, delete_container_data.container_id)
+                await self.cache.invalidate_container(
+                    user_id, delete_container_data.network_name, delete_container_data.container_id
+                )
+            # transform data
+            return DeleteContainerOutputDataTransformer.transform(delete_container_response)
+        except Exception as e:
+            raise e
+
+    async def close(self) -> None:
+        '''
+        Close the GRPC channel.
         '''
-        pass
+        await self.grpc_utils.close()
+
+
+# Shared client instance, created on first use.
+_container_maker_client: ContainerMakerClient | None = None
+
+
+def get_container_maker_client() -> ContainerMakerClient:
+    '''
+    Get the shared ContainerMakerClient.
+    One client means one GRPC channel per process, instead of one per request.
+    '''
+    global _container_maker_client
+    if _container_maker_client is None:
+        _container_maker_client = ContainerMakerClient()
+    return _container_maker_client
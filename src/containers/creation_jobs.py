@@ -0,0 +1,266 @@
+'''
+Asynchronous creation jobs.
+
+Creating containers takes seconds to tens of seconds. Instead of holding the HTTP connection open,
+creation handlers submit a job and return 202 with its id. The job runs in the background and
+reports its progress:
+    queued -> cert_issued (terminals only) -> pod_scheduled -> ready | failed
+
+Job state lives in Redis, so that any pod can report it:
+    creation_job:<job_id> -> CreationJobModel (json), expires CREATION_JOB_TTL seconds after the last update.
+    creation_job:<job_id>:events -> pub/sub channel, every update is published on it.
+    creation_job:idempotency:<user_id>:<kind>:<key> -> job id, expires CREATION_JOB_TTL seconds after submission.
+
+A job submitted with an idempotency key is submitted once: retries with the same key get the running
+or finished job, with its result, instead of creating again. Only a failed job can be retried with its key.
+'''
+
+# builtins
+import asyncio
+import time
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+# third party
+import redis.asyncio as aioredis
+from pydantic import BaseModel
+
+# config
+from src.common.config import CREATION_JOB_PREFIX
+from src.common.config import CREATION_JOB_TTL
+from src.common.config import CREATION_JOB_HEARTBEAT_INTERVAL
+
+# utils
+from src.common.redis_utils import RedisUtils
+
+# dtos
+from src.containers.dto.creation_job_dto import CreationJobModel
+from src.containers.enum.creation_job_kind_enum import CreationJobKind
+from src.containers.enum.creation_job_status_enum import CreationJobStatus
+
+
+# Reports an intermediate status of a running job.
+ProgressCallback = Callable[[CreationJobStatus], Awaitable[None]]
+
+
+class CreationJobManager:
+    '''
+    Submits, runs and reports creation jobs.
+    '''
+    def __init__(self, redis_client: aioredis.Redis | None = None) -> None:
+        '''
+        Initialize the CreationJobManager.
+        :params:
+            redis_client: The asyncio Redis client. Defaults to the shared client.
+        '''
+        self.redis_client: aioredis.Redis = redis_client or RedisUtils.async_client()
+        self.tasks: set[asyncio.Task] = set()
+
+    def job_key(self, job_id: str) -> str:
+        return f"{CREATION_JOB_PREFIX}{job_id}"
+
+    def events_channel(self, job_id: str) -> str:
+        return f"{CREATION_JOB_PREFIX}{job_id}:events"
+
+    async def save(self, job: CreationJobModel) -> None:
+        '''
+        Store a job and publish it to its subscribers.
+        '''
+        encoded: str = job.model_dump_json()
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.setex(name=self.job_key(job.job_id), time=CREATION_JOB_TTL, value=encoded)
+            pipe.publish(self.events_channel(job.job_id), encoded)
+            await pipe.execute()
+
+    async def get(self, job_id: str) -> Optional[CreationJobModel]:
+        '''
+        Get a job.
+        :returns: CreationJobModel or None if it does not exist or has expired.
+        '''
+        encoded: str | None = await self.redis_client.get(self.job_key(job_id))
+        if encoded is None:
+            return None
+        return CreationJobModel.model_validate_json(encoded)
+
+    async def update(
+        self,
+        job: CreationJobModel,
+        status: CreationJobStatus,
+        result: BaseModel | None = None,
+        error: str | None = None
+    ) -> CreationJobModel:
+        '''
+        Move a job to a new status.
+        '''
+        job.status = status
+        job.updated_at = time.time()
+        if result is not None:
+            job.result = result.model_dump()
+        if error is not None:
+            job.error = error
+        await self.save(job)
+        return job
+
+    async def submit(
+        self,
+        user_id: str,
+        kind: CreationJobKind,
+        run: Callable[[ProgressCallback], Awaitable[BaseModel]]
+    ) -> CreationJobModel:
+        '''
+        Submit a job and start running it in the background.
+        :params:
+            user_id: The user submitting the job.
+            kind: What is being created.
+            run: Creates the container or terminal. Receives a callback to report intermediate progress.
+        :returns: The queued job.
+        '''
+        job: CreationJobModel = self.new_job(user_id, kind)
+        await self.save(job)
+        self.start(job, run)
+        return job
+
+    async def submit_once(
+        self,
+        user_id: str,
+        kind: CreationJobKind,
+        run: Callable[[ProgressCallback], Awaitable[BaseModel]],
+        idempotency_key: str
+    ) -> tuple[CreationJobModel, bool]:
+        '''
+        Submit a job unless one was already submitted with the same idempotency key.
+        :params:
+            user_id: The user submitting the job.
+            kind: What is being created.
+            run: Creates the container or terminal. Receives a callback to report intermediate progress.
+            idempotency_key: Key chosen by the client, the same for all retries of a request.
+        :returns: The job and whether it was submitted now. An existing job is returned as is, run is not called.
+        '''
+        existing: CreationJobModel | None = await self.find(user_id, kind, idempotency_key)
+        if existing is not None:
+            return existing, False
+        job: CreationJobModel = self.new_job(user_id, kind)
+        # save the job before publishing its id, so that whoever reads the key finds the job.
+        await self.save(job)
+        key: str = self.idempotency_key(user_id, kind, idempotency_key)
+        if not await self.redis_client.set(key, job.job_id, nx=True, ex=CREATION_JOB_TTL):
+            # a concurrent retry won.
+            existing = await self.find(user_id, kind, idempotency_key)
+            if existing is not None:
+                await self.redis_client.delete(self.job_key(job.job_id))
+                return existing, False
+            # the job under the key failed or expired: take the key over.
+            await self.redis_client.set(key, job.job_id, ex=CREATION_JOB_TTL)
+        self.start(job, run)
+        return job, True
+
+    async def find(self, user_id: str, kind: CreationJobKind, idempotency_key: str) -> Optional[CreationJobModel]:
+        '''
+        Get the job submitted with an idempotency key.
+        :returns: The job, or None if there is none or it failed.
+        '''
+        job_id: str | None = await self.redis_client.get(self.idempotency_key(user_id, kind, idempotency_key))
+        if job_id is None:
+            return None
+        job: CreationJobModel | None = await self.get(job_id)
+        if job is None or job.status == CreationJobStatus.FAILED:
+            return None
+        return job
+
+    def idempotency_key(self, user_id: str, kind: CreationJobKind, idempotency_key: str) -> str:
+        return f"{CREATION_JOB_PREFIX}idempotency:{user_id}:{kind.value}:{idempotency_key}"
+
+    def new_job(self, user_id: str, kind: CreationJobKind) -> CreationJobModel:
+        now: float = time.time()
+        return CreationJobModel(
+            job_id=str(uuid.uuid4()),
+            user_id=user_id,
+            kind=kind,
+            status=CreationJobStatus.QUEUED,
+            created_at=now,
+            updated_at=now
+        )
+
+    def start(self, job: CreationJobModel, run: Callable[[ProgressCallback], Awaitable[BaseModel]]) -> None:
+        '''
+        Run a saved job in the background.
+        '''
+        task: asyncio.Task = asyncio.create_task(self.execute(job, run))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def execute(self, job: CreationJobModel, run: Callable[[ProgressCallback], Awaitable[BaseModel]]) -> None:
+        '''
+        Run a job and record its outcome. A cancelled job is marked failed before the cancellation is raised.
+        '''
+        async def progress(status: CreationJobStatus) -> None:
+            await self.update(job, status)
+
+        try:
+            result: BaseModel = await run(progress)
+            await self.update(job, CreationJobStatus.READY, result=result)
+        except asyncio.CancelledError:
+            # shutting down: finish the job, so that its stream ends instead of waiting for it to expire.
+            print(f"Creation job {job.job_id} cancelled")
+            await self.update(job, CreationJobStatus.FAILED, error="Cancelled")
+            raise
+        except Exception as e:
+            print(f"Error running creation job {job.job_id}: {e}")
+            await self.update(job, CreationJobStatus.FAILED, error=str(e) or e.__class__.__name__)
+
+    async def stream(self, job_id: str) -> AsyncIterator[Optional[CreationJobModel]]:
+        '''
+        Stream the updates of a job until it is finished.
+        Yields None every CREATION_JOB_HEARTBEAT_INTERVAL seconds without an update, so the caller can keep the connection alive.
+        Stops when the job expires.
+        '''
+        pubsub: aioredis.client.PubSub = self.redis_client.pubsub()
+        try:
+            # subscribe before reading the current state, so that no update is missed in between.
+            await pubsub.subscribe(self.events_channel(job_id))
+            job: CreationJobModel | None = await self.get(job_id)
+            if job is None:
+                return
+            yield job
+            while not job.is_finished:
+                message: dict | None = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=CREATION_JOB_HEARTBEAT_INTERVAL
+                )
+                if message is None:
+                    # no update: re-read the job, it may have expired or the update may have been missed.
+                    refreshed: CreationJobModel | None = await self.get(job_id)
+                    if refreshed is None:
+                        return
+                    if refreshed.updated_at == job.updated_at:
+                        yield None
+                        continue
+                    job = refreshed
+                    yield job
+                    continue
+                job = CreationJobModel.model_validate_json(message['data'])
+                yield job
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+
+    async def stop(self) -> None:
+        '''
+        Cancel running jobs.
+        '''
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+# Shared creation job manager, created on first use.
+_creation_job_manager: CreationJobManager | None = None
+
+
+def get_creation_job_manager() -> CreationJobManager:
+    '''
+    Get the shared CreationJobManager.
+    '''
+    global _creation_job_manager
+    if _creation_job_manager is None:
+        _creation_job_manager = CreationJobManager()
+    return _creation_job_manager
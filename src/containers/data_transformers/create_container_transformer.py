@@ -1,6 +1,7 @@
 # modules
 from src.containers.data_transformers import InputDataTransformer
 from src.containers.data_transformers import OutputDataTransformer
+from src.containers.data_transformers.registry import CONTAINER_RESPONSE
 
 # grpc
 from container_maker_spec.types_pb2 import CreateContainerRequest
@@ -11,7 +12,15 @@ from container_maker_spec.types_pb2 import ExposureLevel as GRPCExposureLevel
 # pydantic BaseModel(s)
 from src.containers.dto.create_container_dto import CreateContainerModel
 from src.containers.dto.container_response_dto import ContainerResponseModel
-from src.containers.dto.port_information_dto import PortInformationModel
+
+
+# ExposureLevel value -> GRPC ExposureLevel
+EXPOSURE_LEVEL_MAP: dict[int, GRPCExposureLevel] = {
+    1: GRPCExposureLevel.EXPOSURE_LEVEL_INTERNAL,
+    2: GRPCExposureLevel.EXPOSURE_LEVEL_CLUSTER_LOCAL,
+    3: GRPCExposureLevel.EXPOSURE_LEVEL_CLUSTER_EXTERNAL,
+    4: GRPCExposureLevel.EXPOSURE_LEVEL_EXPOSED
+}
 
 
 class CreateContainerInputDataTransformer(InputDataTransformer):
@@ -19,15 +28,17 @@ class CreateContainerInputDataTransformer(InputDataTransformer):
     Transform the input data for the CreateContainer RPC.
     BaseModel -> GRPC
     '''
+    @staticmethod
+    def supports_secret_mounts() -> bool:
+        '''
+        Check if the generated container-maker-spec has CreateContainerRequest.secret_mounts.
+        Older specs only carry environment variables, secrets then have to be inlined.
+        '''
+        return 'secret_mounts' in CreateContainerRequest.DESCRIPTOR.fields_by_name
+
     @classmethod
     def transform(cls, input_data: CreateContainerModel) -> CreateContainerRequest:
-        exposure_level_map: dict = {
-            1: GRPCExposureLevel.EXPOSURE_LEVEL_INTERNAL,
-            2: GRPCExposureLevel.EXPOSURE_LEVEL_CLUSTER_LOCAL,
-            3: GRPCExposureLevel.EXPOSURE_LEVEL_CLUSTER_EXTERNAL,
-            4: GRPCExposureLevel.EXPOSURE_LEVEL_EXPOSED
-        }
-        exposure_level: GRPCExposureLevel = exposure_level_map.get(input_data.exposure_level.value, GRPCExposureLevel.EXPOSURE_LEVEL_CLUSTER_LOCAL)
+        exposure_level: GRPCExposureLevel = EXPOSURE_LEVEL_MAP.get(input_data.exposure_level.value, GRPCExposureLevel.EXPOSURE_LEVEL_CLUSTER_LOCAL)
         publish_information: list[GRPCPublishInformation] = [
             GRPCPublishInformation(
                 publish_port=publish_info.publish_port,
@@ -37,14 +48,27 @@ class CreateContainerInputDataTransformer(InputDataTransformer):
             )
             for publish_info in input_data.publish_information
         ]
-        return CreateContainerRequest(
-            image_name=input_data.image_name,
-            container_name=input_data.container_name,
-            network_name=input_data.network_name,
-            exposure_level=exposure_level,
-            publish_information=publish_information,
-            environment_variables=input_data.environment_variables
-        )
+        create_container_request: dict = {
+            'image_name': input_data.image_name,
+            'container_name': input_data.container_name,
+            'network_name': input_data.network_name,
+            'exposure_level': exposure_level,
+            'publish_information': publish_information,
+            'environment_variables': input_data.environment_variables,
+        }
+        if input_data.secret_mounts:
+            if not cls.supports_secret_mounts():
+                raise ValueError("container-maker-spec does not support secret_mounts, update the spec")
+            # only the secret name and key mapping go over the wire, never the secret data.
+            create_container_request['secret_mounts'] = [
+                {
+                    'secret_name': secret_mount.secret_name,
+                    'mount_path': secret_mount.mount_path or '',
+                    'environment_variables': secret_mount.environment_variables,
+                }
+                for secret_mount in input_data.secret_mounts
+            ]
+        return CreateContainerRequest(**create_container_request)
 
 
 class CreateContainerOutputDataTransformer(OutputDataTransformer):
@@ -53,16 +77,4 @@ class CreateContainerOutputDataTransformer(OutputDataTransformer):
     '''
     @classmethod
     def transform(cls, output_data: ContainerResponse) -> ContainerResponseModel:
-        return ContainerResponseModel(
-            container_id=output_data.container_id,
-            container_name=output_data.container_name,
-            container_ip=output_data.container_ip,
-            container_network=output_data.container_network,
-            container_ports=[
-                PortInformationModel(
-                    name=port.name,
-                    container_port=port.container_port,
-                    protocol=port.protocol,
-                ) for port in output_data.ports
-            ],
-        )
+        return CONTAINER_RESPONSE.to_model(output_data)
@@ -5,6 +5,7 @@ from container_maker_spec.types_pb2 import DeleteContainerResponse
 # data transformers
 from src.containers.data_transformers import InputDataTransformer
 from src.containers.data_transformers import OutputDataTransformer
+from src.containers.data_transformers.registry import DELETE_CONTAINER_RESPONSE
 
 # dto
 from src.containers.dto.delete_container_dto import DeleteContainerDataModel
@@ -26,4 +27,4 @@ class DeleteContainerOutputDataTransformer(OutputDataTransformer):
     '''
     @classmethod
     def transform(cls, output_data: DeleteContainerResponse) -> DeleteContainerResponseModel:
-        return DeleteContainerResponseModel(container_id=output_data.container_id, status=output_data.status)
+        return DELETE_CONTAINER_RESPONSE.to_model(output_data)
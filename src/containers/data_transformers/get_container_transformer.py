@@ -6,10 +6,10 @@ from container_maker_spec.types_pb2 import ContainerResponse
 # dto
 from src.containers.dto.get_container_dto import GetContainerDataModel
 from src.containers.dto.container_response_dto import ContainerResponseModel
-from src.containers.dto.port_information_dto import PortInformationModel
 # data transformers
 from src.containers.data_transformers import InputDataTransformer
 from src.containers.data_transformers import OutputDataTransformer
+from src.containers.data_transformers.registry import CONTAINER_RESPONSE
 
 
 class GetContainerInputDataTransformer(InputDataTransformer):
@@ -27,15 +27,4 @@ class GetContainerOutputDataTransformer(OutputDataTransformer):
     '''
     @classmethod
     def transform(cls, output_data: ContainerResponse) -> ContainerResponseModel:
-        return ContainerResponseModel(
-            container_id=output_data.container_id,
-            container_name=output_data.container_name,
-            container_ip=output_data.container_ip,
-            container_network=output_data.container_network,
-            container_ports=[
-                PortInformationModel(
-                    name=port.name,
-                    container_port=port.container_port,
-                    protocol=port.protocol) for port in output_data.ports
-            ]
-        )
+        return CONTAINER_RESPONSE.to_model(output_data)
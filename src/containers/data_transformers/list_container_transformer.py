@@ -4,14 +4,13 @@ from container_maker_spec.types_pb2 import ListContainerRequest
 from container_maker_spec.types_pb2 import ListContainerResponse
 
 # dtos
-from src.containers.dto.container_response_dto import ContainerResponseModel
 from src.containers.dto.list_container_dto import ListContainerDataModel
 from src.containers.dto.list_container_response_dto import ListContainerResponseModel
 
 # data transformers
 from src.containers.data_transformers import InputDataTransformer
 from src.containers.data_transformers import OutputDataTransformer
-from src.containers.dto.port_information_dto import PortInformationModel
+from src.containers.data_transformers.registry import LIST_CONTAINER_RESPONSE
 
 
 class ListContainerInputDataTransformer(InputDataTransformer):
@@ -29,21 +28,4 @@ class ListContainerOutputDataTransformer(OutputDataTransformer):
     '''
     @classmethod
     def transform(cls, output_data: ListContainerResponse) -> ListContainerResponseModel:
-        containers: list[ContainerResponseModel] = []
-        for container in output_data.containers:
-            containers.append(
-                ContainerResponseModel(
-                    container_id=container.container_id,
-                    container_name=container.container_name,
-                    container_ip=container.container_ip,
-                    container_network=container.container_network,
-                    container_ports=[
-                        PortInformationModel(
-                            name=port.name,
-                            container_port=port.container_port,
-                            protocol=port.protocol,
-                        ) for port in container.ports
-                    ],
-                )
-            )
-        return ListContainerResponseModel(containers=containers)
+        return LIST_CONTAINER_RESPONSE.to_model(output_data)
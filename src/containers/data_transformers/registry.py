@@ -0,0 +1,172 @@
+'''
+Field mappings between protobuf messages and pydantic models, derived once at import time.
+
+A MessageMapping pairs a message type with a model. Model fields map to the message field of the same name,
+unless renamed. Nested message fields use the mapping registered for their message type,
+so nested messages must be registered first. A model field without a message field fails at import, not per call.
+
+Output transformers turn container-maker responses into models through the mappings:
+    to_dict(message): reads the message into plain python values, all fields of a message in one attrgetter call.
+    to_model(message): validates the plain values into the model and its nested models in one pydantic-core call.
+        This is cheaper than model_construct, which is pure python, and than constructing every nested model.
+    to_json(message): encodes the message straight to the JSON of the model, without building the model.
+'''
+
+# builtins
+import operator
+from typing import Any, Callable, Generic, Type, TypeVar
+
+# third party
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+from google.protobuf.message import Message
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+# grpc types
+from container_maker_spec.types_pb2 import PortInformation
+from container_maker_spec.types_pb2 import ContainerResponse
+from container_maker_spec.types_pb2 import ListContainerResponse
+from container_maker_spec.types_pb2 import DeleteContainerResponse
+
+# dtos
+from src.containers.dto.port_information_dto import PortInformationModel
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.list_container_response_dto import ListContainerResponseModel
+from src.containers.dto.delete_container_response_dto import DeleteContainerResponseModel
+
+
+T = TypeVar('T', bound=BaseModel)
+
+
+def is_repeated(field: FieldDescriptor) -> bool:
+    # FieldDescriptor.label is deprecated in newer protobuf releases.
+    if hasattr(field, 'is_repeated'):
+        return field.is_repeated
+    return field.label == FieldDescriptor.LABEL_REPEATED
+
+
+def is_map(field: FieldDescriptor) -> bool:
+    return field.message_type is not None and field.message_type.GetOptions().map_entry
+
+
+class MessageMapping(Generic[T]):
+    '''
+    Mapping of one protobuf message type to one pydantic model.
+    '''
+    def __init__(
+        self,
+        descriptor: Descriptor,
+        model: Type[T],
+        fields: dict[str, str],
+        converters: dict[str, Callable[[Any], Any]]
+    ) -> None:
+        '''
+        Initialize the MessageMapping. Use TransformerRegistry.register.
+        :params:
+            descriptor: The message descriptor.
+            model: The model.
+            fields: Message field names by model field name.
+            converters: Converters of the model fields whose message values are not plain python values.
+        '''
+        self.descriptor: Descriptor = descriptor
+        self.model: Type[T] = model
+        self.model_fields: tuple[str, ...] = tuple(fields)
+        self.converters: list[tuple[str, Callable[[Any], Any]]] = list(converters.items())
+        # reads all message fields in one call, attrgetter of a single field returns the value itself.
+        getter: operator.attrgetter = operator.attrgetter(*fields.values())
+        self.getter: Callable[[Message], tuple] = getter if len(fields) > 1 else lambda message: (getter(message),)
+
+    def to_dict(self, message: Message) -> dict[str, Any]:
+        '''
+        Get the model fields of a message as plain python values.
+        '''
+        values: dict[str, Any] = dict(zip(self.model_fields, self.getter(message)))
+        for model_field, convert in self.converters:
+            values[model_field] = convert(values[model_field])
+        return values
+
+    def to_model(self, message: Message) -> T:
+        '''
+        Build the model of a message, nested models included, in a single validation call.
+        '''
+        return self.model.model_validate(self.to_dict(message))
+
+    def to_json(self, message: Message) -> bytes:
+        '''
+        Encode a message as the JSON of its model, without building the model.
+        '''
+        return to_json(self.to_dict(message))
+
+
+class TransformerRegistry:
+    '''
+    Registry of message mappings by message type.
+    '''
+    mappings: dict[str, MessageMapping] = {}
+
+    @classmethod
+    def register(cls, message_type: Type[Message], model: Type[T], renames: dict[str, str] | None = None) -> MessageMapping[T]:
+        '''
+        Derive and register the mapping of a message type to a model.
+        :params:
+            message_type: The protobuf message class.
+            model: The pydantic model.
+            renames: Message field names by model field name, for fields named differently.
+        :raises: ValueError if a model field has no message field, or a nested message type is not registered.
+        '''
+        descriptor: Descriptor = message_type.DESCRIPTOR
+        renames = renames or {}
+        fields: dict[str, str] = {}
+        converters: dict[str, Callable[[Any], Any]] = {}
+        for model_field in model.model_fields:
+            message_field: str = renames.get(model_field, model_field)
+            field: FieldDescriptor | None = descriptor.fields_by_name.get(message_field)
+            if field is None:
+                raise ValueError(f"{descriptor.full_name} has no field {message_field} for {model.__name__}.{model_field}")
+            fields[model_field] = message_field
+            convert: Callable[[Any], Any] | None = cls.field_converter(field)
+            if convert is not None:
+                converters[model_field] = convert
+        mapping: MessageMapping[T] = MessageMapping(descriptor, model, fields, converters)
+        cls.mappings[descriptor.full_name] = mapping
+        return mapping
+
+    @classmethod
+    def field_converter(cls, field: FieldDescriptor) -> Callable[[Any], Any] | None:
+        '''
+        Get the converter of a message field value to a plain python value.
+        :returns: The converter or None if the value already is one.
+        '''
+        if is_map(field):
+            if field.message_type.fields_by_name['value'].message_type is not None:
+                raise ValueError(f"{field.full_name}: maps of messages are not supported")
+            return dict
+        if field.message_type is None:
+            return list if is_repeated(field) else None
+        nested: MessageMapping | None = cls.mappings.get(field.message_type.full_name)
+        if nested is None:
+            raise ValueError(f"{field.full_name}: register {field.message_type.full_name} first")
+        if is_repeated(field):
+            return lambda values: [nested.to_dict(value) for value in values]
+        return nested.to_dict
+
+    @classmethod
+    def mapping(cls, message_type: Type[Message]) -> MessageMapping:
+        '''
+        Get the mapping of a message type.
+        :raises: KeyError if it is not registered.
+        '''
+        return cls.mappings[message_type.DESCRIPTOR.full_name]
+
+
+# container-maker responses, nested messages first.
+PORT_INFORMATION: MessageMapping[PortInformationModel] = TransformerRegistry.register(PortInformation, PortInformationModel)
+CONTAINER_RESPONSE: MessageMapping[ContainerResponseModel] = TransformerRegistry.register(
+    ContainerResponse, ContainerResponseModel, renames={'container_ports': 'ports'}
+)
+LIST_CONTAINER_RESPONSE: MessageMapping[ListContainerResponseModel] = TransformerRegistry.register(
+    ListContainerResponse, ListContainerResponseModel
+)
+DELETE_CONTAINER_RESPONSE: MessageMapping[DeleteContainerResponseModel] = TransformerRegistry.register(
+    DeleteContainerResponse, DeleteContainerResponseModel
+)
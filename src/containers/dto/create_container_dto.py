@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from typing import List, Dict, Optional
 from src.containers.enum.exposure_level_enum import ExposureLevel
 from src.containers.dto.publish_information_dto import PublishInformationModel
+from src.containers.dto.secret_mount_dto import SecretMountModel
 
 
 class CreateContainerModel(BaseModel):
@@ -12,3 +13,5 @@ class CreateContainerModel(BaseModel):
     exposure_level: ExposureLevel  # exposure level of the container
     publish_information: List[PublishInformationModel]  # list of publish information
     environment_variables: Optional[Dict[str, str]] = {} # environment variables
+    secret_mounts: Optional[List[SecretMountModel]] = []  # secrets referenced by name, container-maker mounts them
+    idempotency_key: Optional[str] = None  # retries with the same key get the same creation job
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+from src.common.config import SSH_IMAGE_NAME, TERMINAL_NETWORK_NAME
+
+
+class CreateTerminalModel(BaseModel):
+    image_name: str = SSH_IMAGE_NAME  # name of the ssh image to use
+    network_name: str = TERMINAL_NETWORK_NAME  # name of the network
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from src.containers.enum.creation_job_kind_enum import CreationJobKind
+from src.containers.enum.creation_job_status_enum import CreationJobStatus
+
+
+class CreationJobModel(BaseModel):
+    job_id: str  # id of the job
+    user_id: str  # id of the user that submitted the job
+    kind: CreationJobKind  # what is being created
+    status: CreationJobStatus  # current status of the job
+    result: Optional[Dict[str, Any]] = None  # the created container or terminal, once ready
+    error: Optional[str] = None  # error message, once failed
+    created_at: float  # unix timestamp of submission
+    updated_at: float  # unix timestamp of the last status change
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (CreationJobStatus.READY, CreationJobStatus.FAILED)
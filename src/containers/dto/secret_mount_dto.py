@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+
+class SecretMountModel(BaseModel):
+    secret_name: str  # name of the secret, in the network (namespace) of the container
+    mount_path: Optional[str] = None  # directory the secret keys are mounted to as files
+    environment_variables: Optional[Dict[str, str]] = {}  # environment variable name -> secret key
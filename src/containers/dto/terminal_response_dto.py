@@ -0,0 +1,16 @@
+from typing import Optional
+from pydantic import BaseModel
+from src.containers.dto.container_response_dto import ContainerResponseModel
+
+
+class TerminalResponseModel(BaseModel):
+    terminal_id: str  # id of the terminal
+    image_name: str  # name of the ssh image
+    network_name: str  # name of the network
+    ssh_container: ContainerResponseModel  # the ssh container
+    # the socket-ssh container relaying to the ssh container, None when the relay speaks SSH itself (gateway mode)
+    socket_ssh_container: Optional[ContainerResponseModel] = None
+    ssh_username: str  # username of the ssh container
+    ssh_password: str  # password of the ssh container
+    certificate_secret_name: Optional[str] = None  # name of the secret holding the socket-ssh certificates, None in gateway mode
+    created_at: float  # unix timestamp of creation
@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class ContainerStatus(str, Enum):
+    PENDING: str = 'pending'  # the pod exists but is not running yet
+    RUNNING: str = 'running'  # the pod is running but not ready
+    READY: str = 'ready'  # the pod passes its readiness checks
+    GONE: str = 'gone'  # there is no pod for the container
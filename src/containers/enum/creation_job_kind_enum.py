@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class CreationJobKind(str, Enum):
+    CONTAINER: str = 'container'  # a single container
+    TERMINAL: str = 'terminal'  # an SSH + Socket-SSH container pair
@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class CreationJobStatus(str, Enum):
+    QUEUED: str = 'queued'  # accepted, not started yet
+    CERT_ISSUED: str = 'cert_issued'  # socket-ssh certificates exist
+    POD_SCHEDULED: str = 'pod_scheduled'  # container-maker created the pods and services
+    READY: str = 'ready'  # the containers have an ip and can be used
+    FAILED: str = 'failed'  # creation failed, see error
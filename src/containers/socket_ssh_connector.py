@@ -0,0 +1,265 @@
+'''
+Mutual TLS websocket connections from the relay to socket-ssh containers.
+
+SSL contexts are built in memory from the certificate secret of a socket-ssh service: the CA is loaded from memory,
+the client certificate and key from an anonymous memory file (memfd), since load_cert_chain only takes paths.
+Nothing is written to disk. Contexts are cached by secret name, the least recently used beyond
+TERMINAL_RELAY_SSL_CACHE_SIZE are dropped.
+
+Every context keeps the TLS session of its last connection and offers it on the next handshake,
+so reconnects and further connections to the same service resume the session instead of a full handshake.
+
+Connections can be warmed ahead of use: once a terminal is created, its socket-ssh connection is opened
+(TLS and websocket handshakes) and kept idle, up to TERMINAL_RELAY_POOL_SIZE connections for at most
+TERMINAL_RELAY_POOL_IDLE_TIMEOUT seconds. The relay takes it when the browser attaches, and only opens the SSH session.
+Warm connections live in the pod that warmed them, a browser routed to another pod connects cold.
+'''
+
+# builtins
+import asyncio
+import base64
+import json
+import os
+import ssl
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator
+
+# third party
+from websockets.asyncio.client import ClientConnection, connect
+from websockets.protocol import State
+
+# config
+from src.common.config import SSH_PUBLISH_PORT
+from src.common.config import SOCKET_SSH_PORT
+from src.common.config import TERMINAL_RELAY_QUEUE_SIZE
+from src.common.config import TERMINAL_RELAY_MAX_FRAME_SIZE
+from src.common.config import TERMINAL_RELAY_CONNECT_TIMEOUT
+from src.common.config import TERMINAL_RELAY_SSL_CACHE_SIZE
+from src.common.config import TERMINAL_RELAY_POOL_SIZE
+from src.common.config import TERMINAL_RELAY_POOL_IDLE_TIMEOUT
+
+# metrics
+from src.common.metrics import TERMINAL_RELAY_POOL_REQUESTS
+from src.common.metrics import TERMINAL_RELAY_TLS_HANDSHAKES
+
+# helpers
+from src.containers.containers_helpers import CertificateUtils
+from src.containers.terminal_protocol import OPCODE_CONNECT
+from src.containers.terminal_protocol import BINARY_SUBPROTOCOL
+from src.containers.terminal_protocol import Frame
+from src.containers.terminal_protocol import TerminalCodec
+from src.containers.terminal_protocol import socket_ssh_codec
+
+# services
+from src.containers.terminal_service import TerminalService
+
+# dtos
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+
+
+@contextmanager
+def memory_file(data: bytes) -> Iterator[str]:
+    '''
+    A path to data kept in memory: an anonymous memory file, readable through /proc/self/fd.
+    Platforms without memfd (not Linux) get a temporary file, deleted on exit.
+    '''
+    if not hasattr(os, 'memfd_create'):
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'data')
+            with open(path, 'wb') as file:
+                file.write(data)
+            yield path
+        return
+    fd: int = os.memfd_create('browseterm', os.MFD_CLOEXEC)
+    try:
+        with open(fd, 'wb', closefd=False) as file:
+            file.write(data)
+        yield f"/proc/self/fd/{fd}"
+    finally:
+        os.close(fd)
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    '''
+    Client SSL context offering the TLS session of its last connection on the next handshake.
+    asyncio has no way to pass a session to a connection, so it is passed where asyncio wraps the connection.
+    '''
+    session: ssl.SSLSession | None = None
+
+    def wrap_bio(
+        self,
+        incoming: ssl.MemoryBIO,
+        outgoing: ssl.MemoryBIO,
+        server_side: bool = False,
+        server_hostname: str | None = None,
+        session: ssl.SSLSession | None = None
+    ) -> ssl.SSLObject:
+        if session is None and not server_side:
+            session = self.session
+        return super().wrap_bio(incoming, outgoing, server_side, server_hostname, session)
+
+    def remember(self, ssl_object: ssl.SSLObject | None) -> None:
+        '''
+        Keep the session of a connection for the next handshake, and count the handshake.
+        '''
+        if ssl_object is None:
+            return
+        TERMINAL_RELAY_TLS_HANDSHAKES.labels(outcome='resumed' if ssl_object.session_reused else 'full').inc()
+        if ssl_object.session is not None:
+            self.session = ssl_object.session
+
+
+def build_ssl_context(certificates: dict) -> ResumingSSLContext:
+    '''
+    Build the client SSL context of a socket-ssh connection.
+    :params:
+        certificates: The certificate secret data, base64 encoded PEMs.
+    '''
+    ssl_context: ResumingSSLContext = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ssl_context.load_verify_locations(cadata=base64.b64decode(certificates['ca.crt']).decode('utf-8'))
+    chain: bytes = base64.b64decode(certificates['client.crt']) + b'\n' + base64.b64decode(certificates['client.key'])
+    with memory_file(chain) as path:
+        ssl_context.load_cert_chain(path)
+    return ssl_context
+
+
+class SocketSSHConnector:
+    '''
+    Opens mutual TLS websocket connections to socket-ssh containers, and keeps warm ones.
+    '''
+    def __init__(self) -> None:
+        # certificate secret name -> ssl context, least recently used first.
+        self.ssl_contexts: OrderedDict[str, ResumingSSLContext] = OrderedDict()
+        # terminal id -> idle connection, its codec and its expiry, oldest first.
+        self.idle: OrderedDict[str, tuple[ClientConnection, TerminalCodec, asyncio.TimerHandle]] = OrderedDict()
+        self.warming: dict[str, asyncio.Task] = {}  # terminal id -> task opening its warm connection
+        self.closing: set[asyncio.Task] = set()  # tasks closing discarded connections
+
+    async def ssl_context(self, terminal: TerminalResponseModel) -> ResumingSSLContext:
+        '''
+        Get the SSL context of a terminal, reading its certificates on first use.
+        '''
+        ssl_context: ResumingSSLContext | None = self.ssl_contexts.get(terminal.certificate_secret_name)
+        if ssl_context is not None:
+            self.ssl_contexts.move_to_end(terminal.certificate_secret_name)
+            return ssl_context
+        certificates: dict = await CertificateUtils.read_certificate_from_secret(terminal.certificate_secret_name)
+        ssl_context = build_ssl_context(certificates)
+        self.ssl_contexts[terminal.certificate_secret_name] = ssl_context
+        while len(self.ssl_contexts) > TERMINAL_RELAY_SSL_CACHE_SIZE:
+            self.ssl_contexts.popitem(last=False)
+        return ssl_context
+
+    def forget(self, terminal: TerminalResponseModel) -> None:
+        '''
+        Drop the SSL context and the warm connection of a terminal, e.g. after its certificates were reissued.
+        '''
+        self.ssl_contexts.pop(terminal.certificate_secret_name, None)
+        self.discard(terminal.terminal_id)
+
+    async def dial(self, terminal: TerminalResponseModel) -> tuple[ClientConnection, TerminalCodec]:
+        '''
+        Open a connection to the socket-ssh container of a terminal, without an SSH session.
+        :returns: The connection and the codec socket-ssh selected.
+        '''
+        ssl_context: ResumingSSLContext = await self.ssl_context(terminal)
+        upstream: ClientConnection = await connect(
+            f"wss://{TerminalService.socket_ssh_service_name(terminal.terminal_id)}:{SOCKET_SSH_PORT}",
+            ssl=ssl_context,
+            open_timeout=TERMINAL_RELAY_CONNECT_TIMEOUT,
+            max_size=TERMINAL_RELAY_MAX_FRAME_SIZE,
+            max_queue=TERMINAL_RELAY_QUEUE_SIZE,
+            compression=None,  # terminal frames are small, deflate costs more than it saves.
+            subprotocols=[BINARY_SUBPROTOCOL]
+        )
+        ssl_context.remember(upstream.transport.get_extra_info('ssl_object'))
+        return upstream, socket_ssh_codec(upstream.subprotocol, {0: terminal.terminal_id})
+
+    def warm(self, terminal: TerminalResponseModel) -> None:
+        '''
+        Open a connection to the socket-ssh container of a terminal in the background, for a relay to take.
+        '''
+        if terminal.terminal_id in self.idle or terminal.terminal_id in self.warming:
+            return
+        self.warming[terminal.terminal_id] = asyncio.create_task(self.keep_warm(terminal))
+
+    async def keep_warm(self, terminal: TerminalResponseModel) -> None:
+        try:
+            upstream, codec = await self.dial(terminal)
+        except Exception as e:
+            print(f"Error warming socket-ssh connection of terminal {terminal.terminal_id}: {e}")
+            return
+        finally:
+            self.warming.pop(terminal.terminal_id, None)
+        expiry: asyncio.TimerHandle = asyncio.get_running_loop().call_later(
+            TERMINAL_RELAY_POOL_IDLE_TIMEOUT, self.discard, terminal.terminal_id
+        )
+        self.idle[terminal.terminal_id] = (upstream, codec, expiry)
+        while len(self.idle) > TERMINAL_RELAY_POOL_SIZE:
+            self.discard(next(iter(self.idle)))
+
+    def discard(self, terminal_id: str) -> None:
+        idle: tuple[ClientConnection, TerminalCodec, asyncio.TimerHandle] | None = self.idle.pop(terminal_id, None)
+        if idle is None:
+            return
+        upstream, _, expiry = idle
+        expiry.cancel()
+        task: asyncio.Task = asyncio.create_task(upstream.close())
+        self.closing.add(task)
+        task.add_done_callback(self.closing.discard)
+
+    async def take(self, terminal: TerminalResponseModel) -> tuple[ClientConnection, TerminalCodec]:
+        '''
+        Take the warm connection of a terminal, waiting for it if it is being opened. Opens one if there is none.
+        '''
+        warming: asyncio.Task | None = self.warming.get(terminal.terminal_id)
+        if warming is not None:
+            await asyncio.shield(warming)
+        idle: tuple[ClientConnection, TerminalCodec, asyncio.TimerHandle] | None = self.idle.pop(terminal.terminal_id, None)
+        if idle is not None:
+            upstream, codec, expiry = idle
+            expiry.cancel()
+            if upstream.state is State.OPEN:
+                TERMINAL_RELAY_POOL_REQUESTS.labels(outcome='hit').inc()
+                return upstream, codec
+            await upstream.close()
+        TERMINAL_RELAY_POOL_REQUESTS.labels(outcome='miss').inc()
+        return await self.dial(terminal)
+
+    async def connect(self, terminal: TerminalResponseModel) -> tuple[ClientConnection, TerminalCodec]:
+        '''
+        Connect to the socket-ssh container of a terminal and open its SSH session on channel 0.
+        :returns: The connection and the codec socket-ssh selected.
+        '''
+        upstream, codec = await self.take(terminal)
+        await upstream.send(codec.encode(Frame(OPCODE_CONNECT, 0, json.dumps({
+            'ssh_host': terminal.ssh_container.container_ip,
+            'ssh_port': SSH_PUBLISH_PORT,
+            'ssh_username': terminal.ssh_username,
+            'ssh_password': terminal.ssh_password,
+        }).encode('utf-8'))))
+        return upstream, codec
+
+    async def close(self) -> None:
+        for task in self.warming.values():
+            task.cancel()
+        await asyncio.gather(*self.warming.values(), return_exceptions=True)
+        for terminal_id in list(self.idle):
+            self.discard(terminal_id)
+        await asyncio.gather(*self.closing, return_exceptions=True)
+
+
+# Shared socket-ssh connector, created on first use.
+_socket_ssh_connector: SocketSSHConnector | None = None
+
+
+def get_socket_ssh_connector() -> SocketSSHConnector:
+    '''
+    Get the shared SocketSSHConnector.
+    '''
+    global _socket_ssh_connector
+    if _socket_ssh_connector is None:
+        _socket_ssh_connector = SocketSSHConnector()
+    return _socket_ssh_connector
@@ -0,0 +1,221 @@
+'''
+SSH gateway: the relay speaks SSH to the SSH container of a terminal itself, without socket-ssh in between.
+
+Keystrokes go browser -> relay -> SSH container instead of browser -> relay -> socket-ssh -> SSH container,
+one network hop less. Terminals need no socket-ssh container nor its certificates, see TerminalService.
+
+One SSH connection is kept per SSH container and every session of the terminal opens a channel (a shell) on it.
+A connection without channels is closed after TERMINAL_RELAY_GATEWAY_IDLE_TIMEOUT seconds,
+so a reconnecting browser or a new shell does not pay the SSH handshake again.
+
+Enabled by TERMINAL_RELAY_GATEWAY_ENABLED, for every terminal created and relayed by the pod.
+Pods must agree on it: a terminal created without a socket-ssh container can only be relayed by the gateway.
+'''
+
+# builtins
+import asyncio
+from typing import Callable
+
+# third party
+import asyncssh
+
+# config
+from src.common.config import SSH_PUBLISH_PORT
+from src.common.config import TERMINAL_RELAY_MAX_FRAME_SIZE
+from src.common.config import TERMINAL_RELAY_CONNECT_TIMEOUT
+from src.common.config import TERMINAL_RELAY_GATEWAY_IDLE_TIMEOUT
+
+# metrics
+from src.common.metrics import TERMINAL_RELAY_GATEWAY_CONNECTIONS
+
+# helpers
+from src.containers.terminal_protocol import RawCodec
+from src.containers.terminal_protocol import TerminalCodec
+
+# dtos
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+
+
+TERM_TYPE: str = 'xterm-256color'  # what the browser runs, xterm.js
+
+ConnectionKey = tuple[str, int, str]  # host, port and username of an SSH connection
+
+
+class SSHChannel:
+    '''
+    A shell on an SSH connection of the gateway.
+    Sends and yields raw bytes, like a socket-ssh connection that selected RawCodec.
+    '''
+    def __init__(self, process: asyncssh.SSHClientProcess, on_close: Callable[[], None]) -> None:
+        '''
+        Initialize the SSHChannel.
+        :params:
+            process: The shell, with a pty.
+            on_close: Called once the channel is closed.
+        '''
+        self.process: asyncssh.SSHClientProcess = process
+        self.on_close: Callable[[], None] = on_close
+        self.closed: bool = False
+
+    async def send(self, message: bytes) -> None:
+        self.process.stdin.write(message)
+        # SSH flow control: waits while the container does not read.
+        await self.process.stdin.drain()
+
+    def __aiter__(self) -> 'SSHChannel':
+        return self
+
+    async def __anext__(self) -> bytes:
+        data: bytes = await self.process.stdout.read(TERMINAL_RELAY_MAX_FRAME_SIZE)
+        if not data:
+            raise StopAsyncIteration
+        return data
+
+    async def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.process.close()
+        try:
+            await self.process.wait_closed()
+        finally:
+            self.on_close()
+
+
+class SSHGateway:
+    '''
+    Opens shells on SSH containers, over one SSH connection per container.
+    Connects like SocketSSHConnector, so TerminalSessions can use either.
+    '''
+    def __init__(self) -> None:
+        self.connections: dict[ConnectionKey, asyncssh.SSHClientConnection] = {}
+        self.connecting: dict[ConnectionKey, asyncio.Task] = {}  # tasks opening connections
+        self.channels: dict[ConnectionKey, int] = {}  # open channels per connection
+        self.expiry: dict[ConnectionKey, asyncio.TimerHandle] = {}  # idle connections, closed when they fire
+        self.warming: set[asyncio.Task] = set()
+
+    @staticmethod
+    def key(terminal: TerminalResponseModel) -> ConnectionKey:
+        return terminal.ssh_container.container_ip, SSH_PUBLISH_PORT, terminal.ssh_username
+
+    async def dial(self, terminal: TerminalResponseModel) -> asyncssh.SSHClientConnection:
+        key: ConnectionKey = self.key(terminal)
+        try:
+            connection: asyncssh.SSHClientConnection = await asyncio.wait_for(
+                asyncssh.connect(
+                    key[0],
+                    port=key[1],
+                    username=terminal.ssh_username,
+                    password=terminal.ssh_password,
+                    # SSH containers generate their host key on start, there is nothing to pin.
+                    known_hosts=None,
+                ),
+                TERMINAL_RELAY_CONNECT_TIMEOUT
+            )
+        finally:
+            self.connecting.pop(key, None)
+        self.connections[key] = connection
+        TERMINAL_RELAY_GATEWAY_CONNECTIONS.set(len(self.connections))
+        if not self.channels.get(key):
+            self.idle(key)
+        return connection
+
+    async def connection(self, terminal: TerminalResponseModel) -> asyncssh.SSHClientConnection:
+        '''
+        Get the SSH connection to the SSH container of a terminal, opening it if there is none.
+        '''
+        key: ConnectionKey = self.key(terminal)
+        connection: asyncssh.SSHClientConnection | None = self.connections.get(key)
+        if connection is not None and not connection.is_closed():
+            return connection
+        task: asyncio.Task | None = self.connecting.get(key)
+        if task is None:
+            task = self.connecting[key] = asyncio.create_task(self.dial(terminal))
+        return await asyncio.shield(task)
+
+    def warm(self, terminal: TerminalResponseModel) -> None:
+        '''
+        Open the SSH connection of a terminal in the background, for its first session.
+        '''
+        async def warm() -> None:
+            try:
+                await self.connection(terminal)
+            except Exception as e:
+                print(f"Error warming SSH connection of terminal {terminal.terminal_id}: {e}")
+
+        task: asyncio.Task = asyncio.create_task(warm())
+        self.warming.add(task)
+        task.add_done_callback(self.warming.discard)
+
+    async def connect(self, terminal: TerminalResponseModel) -> tuple[SSHChannel, TerminalCodec]:
+        '''
+        Open a shell on the SSH container of a terminal.
+        :returns: The channel and its codec.
+        '''
+        key: ConnectionKey = self.key(terminal)
+        connection: asyncssh.SSHClientConnection = await self.connection(terminal)
+        # claim the connection before opening the shell, so that the idle expiry cannot close it meanwhile.
+        self.channels[key] = self.channels.get(key, 0) + 1
+        expiry: asyncio.TimerHandle | None = self.expiry.pop(key, None)
+        if expiry is not None:
+            expiry.cancel()
+        try:
+            process: asyncssh.SSHClientProcess = await connection.create_process(
+                term_type=TERM_TYPE, encoding=None, stderr=asyncssh.STDOUT
+            )
+        except BaseException:
+            self.release(key)
+            raise
+        return SSHChannel(process, lambda: self.release(key)), RawCodec()
+
+    def release(self, key: ConnectionKey) -> None:
+        self.channels[key] = max(0, self.channels.get(key, 0) - 1)
+        if self.channels[key] == 0:
+            self.idle(key)
+
+    def idle(self, key: ConnectionKey) -> None:
+        '''
+        Close a connection without channels once it stayed idle for TERMINAL_RELAY_GATEWAY_IDLE_TIMEOUT.
+        '''
+        if key not in self.expiry:
+            self.expiry[key] = asyncio.get_running_loop().call_later(
+                TERMINAL_RELAY_GATEWAY_IDLE_TIMEOUT, self.discard, key
+            )
+
+    def discard(self, key: ConnectionKey) -> None:
+        expiry: asyncio.TimerHandle | None = self.expiry.pop(key, None)
+        if expiry is not None:
+            expiry.cancel()
+        self.channels.pop(key, None)
+        connection: asyncssh.SSHClientConnection | None = self.connections.pop(key, None)
+        if connection is not None:
+            connection.close()
+        TERMINAL_RELAY_GATEWAY_CONNECTIONS.set(len(self.connections))
+
+    def forget(self, terminal: TerminalResponseModel) -> None:
+        '''
+        Close the SSH connection of a terminal, e.g. after connecting failed.
+        '''
+        self.discard(self.key(terminal))
+
+    async def close(self) -> None:
+        for task in [*self.warming, *self.connecting.values()]:
+            task.cancel()
+        connections: list[asyncssh.SSHClientConnection] = list(self.connections.values())
+        for key in list(self.connections):
+            self.discard(key)
+        await asyncio.gather(*[connection.wait_closed() for connection in connections], return_exceptions=True)
+
+
+# Shared SSH gateway, created on first use.
+_ssh_gateway: SSHGateway | None = None
+
+
+def get_ssh_gateway() -> SSHGateway:
+    '''
+    Get the shared SSHGateway.
+    '''
+    global _ssh_gateway
+    if _ssh_gateway is None:
+        _ssh_gateway = SSHGateway()
+    return _ssh_gateway
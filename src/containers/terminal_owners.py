@@ -0,0 +1,109 @@
+'''
+Terminal ownership.
+The owner of every terminal is recorded here when it is handed out to a user, whether or not the reaper tracks it.
+Only owners can open a terminal.
+
+Keys:
+    terminal_owner:<terminal_id> -> {user_id, terminal} (json)
+    terminal_owner:container:<container_id> -> terminal id, so that deleting a container of a terminal drops its record.
+
+The record is deleted with the terminal: when it is reaped, or when one of its containers is deleted.
+Like container ownership, Redis errors are raised.
+'''
+
+# builtins
+import json
+from typing import Optional
+
+# third party
+import redis.asyncio as aioredis
+
+# config
+from src.common.config import TERMINAL_OWNER_PREFIX
+
+# utils
+from src.common.redis_utils import RedisUtils
+
+# dtos
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+
+
+class TerminalOwners:
+    '''
+    The user and the details of each terminal, backed by Redis.
+    '''
+    def __init__(self, redis_client: aioredis.Redis | None = None) -> None:
+        '''
+        Initialize the TerminalOwners.
+        :params:
+            redis_client: The asyncio Redis client. Defaults to the shared client.
+        '''
+        self.redis_client: aioredis.Redis = redis_client or RedisUtils.async_client()
+        self.prefix: str = TERMINAL_OWNER_PREFIX
+
+    def key(self, terminal_id: str) -> str:
+        return f"{self.prefix}{terminal_id}"
+
+    def container_key(self, container_id: str) -> str:
+        return f"{self.prefix}container:{container_id}"
+
+    @staticmethod
+    def container_ids(terminal: TerminalResponseModel) -> list[str]:
+        return [
+            container.container_id
+            for container in (terminal.ssh_container, terminal.socket_ssh_container)
+            if container is not None
+        ]
+
+    async def add(self, user_id: str, terminal: TerminalResponseModel) -> None:
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.set(self.key(terminal.terminal_id), json.dumps({'user_id': user_id, 'terminal': terminal.model_dump()}))
+            for container_id in self.container_ids(terminal):
+                pipe.set(self.container_key(container_id), terminal.terminal_id)
+            await pipe.execute()
+
+    async def remove(self, *terminal_ids: str) -> None:
+        '''
+        Delete the records of terminals, and their container index.
+        '''
+        keys: list[str] = [self.key(terminal_id) for terminal_id in terminal_ids]
+        for encoded in await self.redis_client.mget(keys):
+            if encoded is not None:
+                terminal: TerminalResponseModel = TerminalResponseModel.model_validate(json.loads(encoded)['terminal'])
+                keys.extend(self.container_key(container_id) for container_id in self.container_ids(terminal))
+        await self.redis_client.delete(*keys)
+
+    async def remove_container(self, container_id: str) -> None:
+        '''
+        Delete the record of the terminal a deleted container belonged to, if it belonged to one.
+        '''
+        terminal_id: str | None = await self.redis_client.get(self.container_key(container_id))
+        if terminal_id is not None:
+            await self.remove(terminal_id)
+
+    async def terminal(self, terminal_id: str, user_id: str) -> Optional[TerminalResponseModel]:
+        '''
+        Get a terminal of a user.
+        :returns: The terminal, or None if it does not exist or belongs to someone else.
+        '''
+        encoded: str | None = await self.redis_client.get(self.key(terminal_id))
+        if encoded is None:
+            return None
+        entry: dict = json.loads(encoded)
+        if entry['user_id'] != user_id:
+            return None
+        return TerminalResponseModel.model_validate(entry['terminal'])
+
+
+# Shared terminal owners, created on first use.
+_terminal_owners: TerminalOwners | None = None
+
+
+def get_terminal_owners() -> TerminalOwners:
+    '''
+    Get the shared TerminalOwners.
+    '''
+    global _terminal_owners
+    if _terminal_owners is None:
+        _terminal_owners = TerminalOwners()
+    return _terminal_owners
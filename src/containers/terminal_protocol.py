@@ -0,0 +1,216 @@
+'''
+Wire protocol of terminal traffic, between the browser, the relay and socket-ssh.
+
+A frame is an opcode, a channel id and a raw payload. Encodings are negotiated as websocket subprotocols:
+    browseterm.binary.v1 -> binary frames: 1 byte opcode, 2 bytes channel id (big endian), payload.
+        3 bytes of overhead per frame, no parsing: keystrokes and output pass through as they are.
+    browseterm.json.v1 -> text frames: {"op": "data", "channel": 0, "data": "<text>"}.
+        Fallback for browsers, payloads must be utf-8.
+socket-ssh is offered browseterm.binary.v1 too. socket-ssh versions that do not select it get its JSON envelopes:
+    {"type": "sshConnect", "data": {...}} and {"type": "sshSendData", "data": {"ssh_hash": ..., "ssh_command": ...}},
+with output as plain messages. The SSH gateway has no socket-ssh, its SSH channels carry raw payloads (RawCodec).
+
+Channels multiplex terminals over one browser websocket (see terminal_relay). Each channel has a window of
+TERMINAL_RELAY_WINDOW bytes of data per direction: a side sends at most that much before the peer grants more
+with credit frames, so a terminal that is not read stalls its own channel, not the websocket.
+
+Codecs are stateful (text payloads may end in the middle of a character), so every connection gets its own.
+'''
+
+# builtins
+import codecs
+import json
+import struct
+from typing import NamedTuple, Optional
+
+
+# opcodes
+OPCODE_DATA: int = 0x01  # keystrokes to socket-ssh, output to the browser
+OPCODE_CONNECT: int = 0x02  # relay to socket-ssh: open the SSH session of a channel, payload is its parameters as JSON
+OPCODE_SYNC: int = 0x03  # relay to browser: sequence number of the next output byte, in ascii digits
+OPCODE_OPEN: int = 0x04  # browser to relay: attach a terminal to a channel, payload is {"terminal_id": ..., "resume": ...} as JSON
+OPCODE_CLOSE: int = 0x05  # close a channel, payload is the close code in ascii digits
+OPCODE_CREDIT: int = 0x06  # grant the peer more bytes of data on a channel, in ascii digits
+
+OPCODE_NAMES: dict[int, str] = {
+    OPCODE_DATA: 'data',
+    OPCODE_CONNECT: 'connect',
+    OPCODE_SYNC: 'sync',
+    OPCODE_OPEN: 'open',
+    OPCODE_CLOSE: 'close',
+    OPCODE_CREDIT: 'credit',
+}
+OPCODES: dict[str, int] = {name: opcode for opcode, name in OPCODE_NAMES.items()}
+
+BINARY_SUBPROTOCOL: str = 'browseterm.binary.v1'
+JSON_SUBPROTOCOL: str = 'browseterm.json.v1'
+
+HEADER: struct.Struct = struct.Struct('!BH')
+
+
+class ProtocolError(ValueError):
+    '''
+    A frame that does not follow the negotiated protocol.
+    '''
+
+
+class Frame(NamedTuple):
+    opcode: int
+    channel: int
+    payload: bytes
+
+
+class TerminalCodec:
+    '''
+    Encodes frames to websocket messages and decodes websocket messages to frames.
+    '''
+    subprotocol: Optional[str] = None
+
+    def encode(self, frame: Frame) -> bytes | str | None:
+        '''
+        Encode a frame.
+        :returns: The message, or None if there is nothing to send yet (the payload ends in the middle of a character).
+        '''
+        raise NotImplementedError
+
+    def decode(self, message: bytes | str) -> Frame:
+        '''
+        Decode a message.
+        :raises: ProtocolError if the message is not a frame of this protocol.
+        '''
+        raise NotImplementedError
+
+
+class TextPayloads:
+    '''
+    Decodes byte payloads to text per channel, keeping characters split across payloads whole.
+    '''
+    def __init__(self) -> None:
+        self.decoders: dict[int, codecs.IncrementalDecoder] = {}
+
+    def decode(self, channel: int, payload: bytes) -> str:
+        decoder: codecs.IncrementalDecoder | None = self.decoders.get(channel)
+        if decoder is None:
+            decoder = self.decoders[channel] = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        return decoder.decode(payload)
+
+
+class BinaryCodec(TerminalCodec):
+    '''
+    browseterm.binary.v1
+    '''
+    subprotocol: Optional[str] = BINARY_SUBPROTOCOL
+
+    def encode(self, frame: Frame) -> bytes:
+        return HEADER.pack(frame.opcode, frame.channel) + frame.payload
+
+    def decode(self, message: bytes | str) -> Frame:
+        if not isinstance(message, bytes) or len(message) < HEADER.size:
+            raise ProtocolError("Expected a binary frame")
+        opcode, channel = HEADER.unpack_from(message)
+        return Frame(opcode, channel, message[HEADER.size:])
+
+
+class JsonCodec(TerminalCodec):
+    '''
+    browseterm.json.v1
+    '''
+    subprotocol: Optional[str] = JSON_SUBPROTOCOL
+
+    def __init__(self) -> None:
+        self.text: TextPayloads = TextPayloads()
+
+    def encode(self, frame: Frame) -> str | None:
+        if frame.opcode != OPCODE_DATA:
+            data: str = frame.payload.decode('utf-8')
+        else:
+            data = self.text.decode(frame.channel, frame.payload)
+        if not data:
+            return None
+        return json.dumps({'op': OPCODE_NAMES[frame.opcode], 'channel': frame.channel, 'data': data})
+
+    def decode(self, message: bytes | str) -> Frame:
+        try:
+            decoded: dict = json.loads(message)
+            return Frame(OPCODES[decoded['op']], int(decoded.get('channel', 0)), decoded['data'].encode('utf-8'))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise ProtocolError(f"Invalid frame: {e}")
+
+
+class SocketSSHJsonCodec(TerminalCodec):
+    '''
+    The JSON envelopes of socket-ssh, for versions that do not speak browseterm.binary.v1.
+    SSH sessions are identified by their ssh hash, one per channel.
+    '''
+    subprotocol: Optional[str] = None
+
+    def __init__(self, ssh_hashes: dict[int, str]) -> None:
+        '''
+        Initialize the SocketSSHJsonCodec.
+        :params:
+            ssh_hashes: The ssh hash of every channel.
+        '''
+        self.ssh_hashes: dict[int, str] = ssh_hashes
+        self.text: TextPayloads = TextPayloads()
+
+    def encode(self, frame: Frame) -> str | None:
+        if frame.opcode == OPCODE_CONNECT:
+            return json.dumps({
+                'type': 'sshConnect',
+                'data': {'ssh_hash': self.ssh_hashes[frame.channel], **json.loads(frame.payload)}
+            })
+        command: str = self.text.decode(frame.channel, frame.payload)
+        if not command:
+            return None
+        return json.dumps({
+            'type': 'sshSendData',
+            'data': {'ssh_hash': self.ssh_hashes[frame.channel], 'ssh_command': command}
+        })
+
+    def decode(self, message: bytes | str) -> Frame:
+        # output is not enveloped, and carries no channel: socket-ssh relays a single session per connection.
+        return Frame(OPCODE_DATA, 0, message.encode('utf-8') if isinstance(message, str) else message)
+
+
+class RawCodec(TerminalCodec):
+    '''
+    Data payloads as they are, for upstreams carrying a single SSH session (channels of the SSH gateway).
+    '''
+    subprotocol: Optional[str] = None
+
+    def encode(self, frame: Frame) -> bytes | None:
+        if frame.opcode != OPCODE_DATA:
+            return None
+        return frame.payload
+
+    def decode(self, message: bytes | str) -> Frame:
+        return Frame(OPCODE_DATA, 0, message.encode('utf-8') if isinstance(message, str) else message)
+
+
+# browser codecs, in order of preference.
+BROWSER_CODECS: dict[str, type[TerminalCodec]] = {
+    BINARY_SUBPROTOCOL: BinaryCodec,
+    JSON_SUBPROTOCOL: JsonCodec,
+}
+
+
+def negotiate_browser_codec(offered: list[str]) -> TerminalCodec:
+    '''
+    Negotiate the codec of a browser websocket.
+    :params:
+        offered: The subprotocols offered by the browser.
+    :returns: The preferred codec offered, JSON if the browser offered none.
+    '''
+    for subprotocol, codec in BROWSER_CODECS.items():
+        if subprotocol in offered:
+            return codec()
+    return JsonCodec()
+
+
+def socket_ssh_codec(subprotocol: Optional[str], ssh_hashes: dict[int, str]) -> TerminalCodec:
+    '''
+    Get the codec of a socket-ssh connection, from the subprotocol socket-ssh selected.
+    '''
+    if subprotocol == BINARY_SUBPROTOCOL:
+        return BinaryCodec()
+    return SocketSSHJsonCodec(ssh_hashes)
@@ -0,0 +1,255 @@
+'''
+Reaper of idle terminals.
+
+Terminals handed out to users are tracked until they are idle for longer than the idle timeout
+of the user's subscription type, then their containers and certificate secret are deleted.
+container-maker cannot scale a container to zero, so idle terminals are deleted rather than hibernated.
+
+Activity (heartbeats from the terminal page, relay traffic) pushes the terminal's deadline back.
+Every pod throttles the activity it records to once per TERMINAL_REAPER_ACTIVITY_INTERVAL per terminal.
+
+State lives in Redis so that every pod records activity and one pod reaps:
+    terminal_reaper:deadlines -> sorted set of terminal ids, scored by last activity + idle timeout.
+        Idle terminals are the ones scored before now, a single range query.
+    terminal_reaper:terminals -> hash of terminal id -> {user_id, terminal} (json).
+    terminal_reaper:leader -> id of the pod that reaps.
+The owner record of a reaped terminal (see terminal_owners) is deleted with its tracking state.
+
+The leader reaps up to TERMINAL_REAPER_BATCH_SIZE terminals per run, TERMINAL_REAPER_CONCURRENCY at once.
+A terminal that fails to delete is retried on a later run.
+'''
+
+# builtins
+import asyncio
+import json
+import time
+import uuid
+from typing import Optional
+
+# third party
+import grpc
+import redis
+import redis.asyncio as aioredis
+
+# config
+from src.common.config import TERMINAL_REAPER_IDLE_TIMEOUTS
+from src.common.config import TERMINAL_REAPER_DEFAULT_IDLE_TIMEOUT
+from src.common.config import TERMINAL_REAPER_INTERVAL
+from src.common.config import TERMINAL_REAPER_BATCH_SIZE
+from src.common.config import TERMINAL_REAPER_CONCURRENCY
+from src.common.config import TERMINAL_REAPER_ACTIVITY_INTERVAL
+from src.common.config import TERMINAL_REAPER_PREFIX
+
+# metrics
+from src.common.metrics import TERMINALS_REAPED
+from src.common.metrics import TERMINALS_TRACKED
+
+# utils
+from src.common.redis_utils import RedisUtils
+
+# helpers
+from src.containers.containers_helpers import CertificateUtils
+
+# services
+from src.containers.terminal_service import TerminalService
+from src.containers.terminal_owners import TerminalOwners
+
+# dtos
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+
+
+class TerminalReaper:
+    '''
+    Tracks the activity of terminals and deletes the idle ones.
+    Only the leader pod reaps, every pod records activity.
+    '''
+    def __init__(self, terminal_service: TerminalService | None = None, redis_client: aioredis.Redis | None = None) -> None:
+        '''
+        Initialize the TerminalReaper.
+        :params:
+            terminal_service: The service used to delete terminals.
+            redis_client: The asyncio Redis client. Defaults to the shared client.
+        '''
+        self.terminal_service: TerminalService = terminal_service or TerminalService()
+        self.redis_client: aioredis.Redis = redis_client or RedisUtils.async_client()
+        self.owners: TerminalOwners = TerminalOwners(redis_client=self.redis_client)
+        self.pod_id: str = str(uuid.uuid4())
+        self.recorded_at: dict[str, float] = {}  # terminal id -> when this pod last recorded its activity
+
+    @property
+    def deadlines_key(self) -> str:
+        return f"{TERMINAL_REAPER_PREFIX}deadlines"
+
+    @property
+    def terminals_key(self) -> str:
+        return f"{TERMINAL_REAPER_PREFIX}terminals"
+
+    @property
+    def leader_key(self) -> str:
+        return f"{TERMINAL_REAPER_PREFIX}leader"
+
+    @staticmethod
+    def idle_timeout(tier: str) -> int:
+        return TERMINAL_REAPER_IDLE_TIMEOUTS.get(tier, TERMINAL_REAPER_DEFAULT_IDLE_TIMEOUT)
+
+    async def track(self, terminal: TerminalResponseModel, user_id: str, tier: str) -> None:
+        '''
+        Start tracking a terminal handed out to a user.
+        :raises: redis.RedisError if the terminal could not be tracked. It would never be reaped, so callers delete it.
+        '''
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                self.terminals_key, terminal.terminal_id,
+                json.dumps({'user_id': user_id, 'terminal': terminal.model_dump()})
+            )
+            pipe.zadd(self.deadlines_key, {terminal.terminal_id: time.time() + self.idle_timeout(tier)})
+            await pipe.execute()
+        self.recorded_at[terminal.terminal_id] = time.monotonic()
+
+    async def owner(self, terminal_id: str) -> Optional[str]:
+        '''
+        Get the user a tracked terminal belongs to.
+        :returns: The user id or None if the terminal is not tracked.
+        '''
+        encoded: str | None = await self.redis_client.hget(self.terminals_key, terminal_id)
+        if encoded is None:
+            return None
+        return json.loads(encoded)['user_id']
+
+    async def record_activity(self, terminal_id: str, tier: str) -> None:
+        '''
+        Push the deadline of a tracked terminal back. Cheap to call on every message:
+        activity is written at most once per TERMINAL_REAPER_ACTIVITY_INTERVAL per terminal.
+        '''
+        now: float = time.monotonic()
+        if now - self.recorded_at.get(terminal_id, float('-inf')) < TERMINAL_REAPER_ACTIVITY_INTERVAL:
+            return
+        self.recorded_at[terminal_id] = now
+        try:
+            # xx: never starts tracking a terminal, e.g. one reaped meanwhile.
+            await self.redis_client.zadd(self.deadlines_key, {terminal_id: time.time() + self.idle_timeout(tier)}, xx=True)
+        except redis.RedisError as e:
+            print(f"Error recording activity of terminal {terminal_id}: {e}")
+
+    async def heartbeat(self, terminal_id: str, user_id: str, tier: str) -> bool:
+        '''
+        Record a heartbeat of a user for one of their terminals.
+        :returns: False if the terminal is not tracked or belongs to someone else.
+        '''
+        if await self.owner(terminal_id) != user_id:
+            return False
+        await self.record_activity(terminal_id, tier)
+        return True
+
+    async def forget(self, terminal_ids: list[str]) -> None:
+        '''
+        Stop tracking terminals, and forget their owners.
+        '''
+        await self.owners.remove(*terminal_ids)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.deadlines_key, *terminal_ids)
+            pipe.hdel(self.terminals_key, *terminal_ids)
+            await pipe.execute()
+        for terminal_id in terminal_ids:
+            self.recorded_at.pop(terminal_id, None)
+
+    async def idle_terminals(self) -> list[tuple[str, Optional[str]]]:
+        '''
+        Get up to TERMINAL_REAPER_BATCH_SIZE terminals past their deadline, with their tracked entries.
+        '''
+        terminal_ids: list[str] = await self.redis_client.zrangebyscore(
+            self.deadlines_key, '-inf', time.time(), start=0, num=TERMINAL_REAPER_BATCH_SIZE
+        )
+        if not terminal_ids:
+            return []
+        return list(zip(terminal_ids, await self.redis_client.hmget(self.terminals_key, terminal_ids)))
+
+    async def reap_terminal(self, semaphore: asyncio.Semaphore, terminal_id: str, encoded: Optional[str]) -> Optional[str]:
+        '''
+        Delete an idle terminal.
+        :returns: The terminal id if it no longer needs tracking, None to retry it on a later run.
+        '''
+        if encoded is None:
+            # its entry is gone, nothing left to delete.
+            return terminal_id
+        entry: dict = json.loads(encoded)
+        terminal: TerminalResponseModel = TerminalResponseModel.model_validate(entry['terminal'])
+        async with semaphore:
+            try:
+                await self.terminal_service.delete_terminal(terminal, user_id=entry['user_id'])
+            except grpc.RpcError as e:
+                if e.code() != grpc.StatusCode.NOT_FOUND:
+                    print(f"Error reaping terminal {terminal_id}: {e}")
+                    TERMINALS_REAPED.labels(outcome='failure').inc()
+                    return None
+                # deleted by someone else: only the secret may be left.
+                if terminal.certificate_secret_name is not None:
+                    await CertificateUtils.delete_secret_if_exists(terminal.certificate_secret_name)
+            except Exception as e:
+                print(f"Error reaping terminal {terminal_id}: {e}")
+                TERMINALS_REAPED.labels(outcome='failure').inc()
+                return None
+        TERMINALS_REAPED.labels(outcome='success').inc()
+        return terminal_id
+
+    async def reap(self) -> int:
+        '''
+        Delete a batch of idle terminals, a bounded number at once.
+        :returns: The number of terminals no longer tracked.
+        '''
+        idle: list[tuple[str, Optional[str]]] = await self.idle_terminals()
+        if not idle:
+            return 0
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(TERMINAL_REAPER_CONCURRENCY)
+        results: list[Optional[str]] = await asyncio.gather(
+            *[self.reap_terminal(semaphore, terminal_id, encoded) for terminal_id, encoded in idle]
+        )
+        reaped: list[str] = [terminal_id for terminal_id in results if terminal_id is not None]
+        if reaped:
+            await self.forget(reaped)
+        failed: list[str] = [terminal_id for (terminal_id, _), result in zip(idle, results) if result is None]
+        if failed:
+            # retry on a later run instead of at the head of every batch.
+            retry_at: float = time.time() + TERMINAL_REAPER_INTERVAL
+            await self.redis_client.zadd(self.deadlines_key, {terminal_id: retry_at for terminal_id in failed}, xx=True)
+        return len(reaped)
+
+    async def is_leader(self) -> bool:
+        '''
+        Take or renew reaping leadership.
+        '''
+        return await RedisUtils.hold_lock(self.redis_client, self.leader_key, self.pod_id, TERMINAL_REAPER_INTERVAL * 3)
+
+    async def run(self) -> None:
+        '''
+        Reaping loop. Runs until cancelled.
+        '''
+        while True:
+            # older records would not throttle the next activity anyway.
+            recorded_before: float = time.monotonic() - TERMINAL_REAPER_ACTIVITY_INTERVAL
+            self.recorded_at = {
+                terminal_id: recorded_at for terminal_id, recorded_at in self.recorded_at.items() if recorded_at > recorded_before
+            }
+            try:
+                if await self.is_leader():
+                    # a full batch means more idle terminals may be waiting.
+                    while await self.reap() >= TERMINAL_REAPER_BATCH_SIZE:
+                        pass
+                    TERMINALS_TRACKED.set(await self.redis_client.zcard(self.deadlines_key))
+            except redis.RedisError as e:
+                print(f"Error reaping idle terminals: {e}")
+            await asyncio.sleep(TERMINAL_REAPER_INTERVAL)
+
+
+# Shared terminal reaper, created on first use.
+_terminal_reaper: TerminalReaper | None = None
+
+
+def get_terminal_reaper() -> TerminalReaper:
+    '''
+    Get the shared TerminalReaper.
+    '''
+    global _terminal_reaper
+    if _terminal_reaper is None:
+        _terminal_reaper = TerminalReaper()
+    return _terminal_reaper
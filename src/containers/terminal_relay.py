@@ -0,0 +1,639 @@
+'''
+Relay of terminal traffic between the browser and the socket-ssh container of a terminal.
+
+Frames are encoded as negotiated on each side, see terminal_protocol: binary frames where both ends speak them,
+JSON as a fallback. Payloads are relayed as bytes, the relay only re-encodes the frame around them.
+The relay opens the SSH session itself (connect frame), so the SSH credentials never reach the browser.
+
+Connections to socket-ssh are mutual TLS, with the certificates issued for its service, see socket_ssh_connector.
+In gateway mode the relay speaks SSH to the SSH container itself instead, see ssh_gateway.
+
+A TerminalSession is the SSH session of a terminal: its socket-ssh connection and the scrollback of its output,
+a ring buffer of the last TERMINAL_RELAY_SCROLLBACK_SIZE bytes (see terminal_scrollback).
+A TerminalRelay attaches a browser websocket to sessions, each on a channel (TerminalChannel).
+When the websocket drops (network blip, deploy, laptop sleep), the session lives on for TERMINAL_RELAY_RESUME_TIMEOUT seconds and keeps recording output.
+A browser that reconnects with the sequence number of the output it saw is sent only what it missed,
+without a new SSH session. Every attach starts with a sync frame: the sequence number output resumes from.
+Sessions live in the pod that opened them, reconnects routed to another pod open a new SSH session.
+
+Multiplexing: /ws/terminals carries every terminal of a browser page over one websocket, one channel each.
+The browser opens and closes channels with open and close frames. A terminal is attached to one channel at a time,
+attaching it elsewhere closes the previous channel with CLOSE_REPLACED. /ws/terminal/{terminal_id} is the
+single terminal form: channel 0 only, no credits, and the websocket closes with its terminal.
+
+Output is coalesced: interactive shells write many tiny chunks, sending each as a frame wastes CPU and bandwidth.
+Output is sent once TERMINAL_RELAY_FLUSH_SIZE bytes are pending or after TERMINAL_RELAY_FLUSH_INTERVAL seconds,
+whichever comes first. Small output right after input is echo and is sent right away, so typing stays snappy.
+Under heavy output (cat of a large log) frames fill up to the flush size without waiting: fewer, larger frames.
+
+Flow control is per channel, so one busy or stalled terminal does not hold up the others of the websocket.
+Multiplexed channels use credits: each side sends at most TERMINAL_RELAY_WINDOW bytes of data
+before the other grants more (see terminal_protocol), so a browser that does not render a terminal's output
+stalls that channel only. Channels take turns sending output, one frame of up to TERMINAL_RELAY_FLUSH_SIZE each,
+so a terminal printing a large log does not starve a terminal being typed in.
+Single terminal relays have no credits: their input buffer stops reading the websocket once it holds a window,
+so TCP flow control pushes back on the browser, and their output is paced by the websocket.
+Output stops being read from socket-ssh while the attached channel has a full scrollback left to read,
+so the browser's pace pushes back on socket-ssh. Detached sessions keep reading and overwrite the oldest output.
+Memory per terminal stays bounded by the scrollback, plus a window of input.
+'''
+
+# builtins
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+# third party
+from fastapi import WebSocket
+from websockets.asyncio.client import ClientConnection
+
+# config
+from src.common.config import TERMINAL_RELAY_MAX_FRAME_SIZE
+from src.common.config import TERMINAL_RELAY_FLUSH_INTERVAL
+from src.common.config import TERMINAL_RELAY_FLUSH_SIZE
+from src.common.config import TERMINAL_RELAY_ECHO_WINDOW
+from src.common.config import TERMINAL_RELAY_ECHO_SIZE
+from src.common.config import TERMINAL_RELAY_SCROLLBACK_SIZE
+from src.common.config import TERMINAL_RELAY_RESUME_TIMEOUT
+from src.common.config import TERMINAL_RELAY_WINDOW
+from src.common.config import TERMINAL_RELAY_MAX_CHANNELS
+from src.common.config import TERMINAL_RELAY_GATEWAY_ENABLED
+
+# metrics
+from src.common.metrics import TERMINAL_RELAY_CONNECTIONS
+from src.common.metrics import TERMINAL_RELAY_CHANNELS
+from src.common.metrics import TERMINAL_RELAY_BYTES
+from src.common.metrics import TERMINAL_RELAY_FRAMES
+from src.common.metrics import TERMINAL_RELAY_FRAME_SIZE
+from src.common.metrics import TERMINAL_RELAY_SESSIONS
+from src.common.metrics import TERMINAL_RELAY_RESUMES
+
+# helpers
+from src.containers.terminal_protocol import OPCODE_DATA
+from src.containers.terminal_protocol import OPCODE_SYNC
+from src.containers.terminal_protocol import OPCODE_OPEN
+from src.containers.terminal_protocol import OPCODE_CLOSE
+from src.containers.terminal_protocol import OPCODE_CREDIT
+from src.containers.terminal_protocol import BinaryCodec
+from src.containers.terminal_protocol import Frame
+from src.containers.terminal_protocol import ProtocolError
+from src.containers.terminal_protocol import SocketSSHJsonCodec
+from src.containers.terminal_protocol import TerminalCodec
+from src.containers.terminal_scrollback import Scrollback
+
+# services
+from src.containers.socket_ssh_connector import SocketSSHConnector
+from src.containers.socket_ssh_connector import get_socket_ssh_connector
+from src.containers.ssh_gateway import SSHChannel
+from src.containers.ssh_gateway import SSHGateway
+from src.containers.ssh_gateway import get_ssh_gateway
+
+# dtos
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+
+
+# websocket close codes
+CLOSE_NORMAL: int = 1000
+CLOSE_POLICY_VIOLATION: int = 1008
+CLOSE_MESSAGE_TOO_BIG: int = 1009
+CLOSE_INTERNAL_ERROR: int = 1011
+CLOSE_REPLACED: int = 4000  # the terminal was attached from another websocket
+
+
+class TerminalSession:
+    '''
+    The SSH session of a terminal: its socket-ssh connection (or gateway channel) and the scrollback of its output.
+    Outlives the browser websockets attached to it, until it is idle for TERMINAL_RELAY_RESUME_TIMEOUT.
+    '''
+    def __init__(
+        self,
+        terminal_id: str,
+        upstream: ClientConnection | SSHChannel,
+        upstream_codec: TerminalCodec | None = None,
+        on_close: Callable[['TerminalSession'], None] | None = None
+    ) -> None:
+        '''
+        Initialize the TerminalSession and start reading its output.
+        :params:
+            terminal_id: The terminal, identifies the SSH session in socket-ssh.
+            upstream: The socket-ssh connection with its SSH session open, or the shell of the SSH gateway.
+            upstream_codec: The codec selected by socket-ssh. Defaults to its JSON envelopes.
+            on_close: Called once the session is closed.
+        '''
+        self.terminal_id: str = terminal_id
+        self.upstream: ClientConnection | SSHChannel = upstream
+        self.upstream_codec: TerminalCodec = upstream_codec or SocketSSHJsonCodec({0: terminal_id})
+        self.on_close: Callable[['TerminalSession'], None] | None = on_close
+        self.scrollback: Scrollback = Scrollback(TERMINAL_RELAY_SCROLLBACK_SIZE)
+        self.attached: 'TerminalChannel | None' = None
+        self.drained: asyncio.Event = asyncio.Event()  # set when the attached browser read output
+        self.closed: bool = False
+        self.expiry: asyncio.TimerHandle | None = None
+        self.reader: asyncio.Task = asyncio.create_task(self.read_upstream())
+        TERMINAL_RELAY_SESSIONS.inc()
+
+    def attach(self, channel: 'TerminalChannel') -> 'TerminalChannel | None':
+        '''
+        Attach a browser websocket channel.
+        :returns: The channel it replaces, if the terminal was attached elsewhere.
+        '''
+        if self.expiry is not None:
+            self.expiry.cancel()
+            self.expiry = None
+        replaced: TerminalChannel | None = self.attached
+        self.attached = channel
+        self.drained.set()
+        return replaced
+
+    def detach(self, channel: 'TerminalChannel') -> None:
+        '''
+        Detach a browser websocket channel, the session is closed if no browser resumes it in time.
+        '''
+        if self.attached is not channel:
+            return
+        self.attached = None
+        self.drained.set()
+        if not self.closed:
+            self.expiry = asyncio.get_running_loop().call_later(TERMINAL_RELAY_RESUME_TIMEOUT, self.reader.cancel)
+
+    async def send(self, payload: bytes) -> None:
+        message: bytes | str | None = self.upstream_codec.encode(Frame(OPCODE_DATA, 0, payload))
+        if message is not None:
+            await self.upstream.send(message)
+
+    async def write(self, payload: bytes) -> None:
+        '''
+        Write output to the scrollback. Waits while the attached browser has not read a full scrollback yet.
+        '''
+        while self.attached is not None and (
+            self.scrollback.end + min(len(payload), self.scrollback.capacity) - self.attached.cursor > self.scrollback.capacity
+        ):
+            self.drained.clear()
+            await self.drained.wait()
+        self.scrollback.write(payload)
+        if self.attached is not None:
+            self.attached.wake()
+
+    async def read_upstream(self) -> None:
+        try:
+            async for message in self.upstream:
+                frame: Frame = self.upstream_codec.decode(message)
+                if frame.opcode == OPCODE_DATA and frame.payload:
+                    await self.write(frame.payload)
+        except Exception as e:
+            print(f"Error reading socket-ssh output of terminal {self.terminal_id}: {e}")
+        finally:
+            self.closed = True
+            if self.attached is not None:
+                self.attached.wake()
+            TERMINAL_RELAY_SESSIONS.dec()
+            if self.expiry is not None:
+                self.expiry.cancel()
+            if self.on_close is not None:
+                self.on_close(self)
+            try:
+                await self.upstream.close()
+            except Exception as e:
+                print(f"Error closing socket-ssh connection of terminal {self.terminal_id}: {e}")
+
+    async def close(self) -> None:
+        self.reader.cancel()
+        await asyncio.gather(self.reader, return_exceptions=True)
+
+
+class TerminalSessions:
+    '''
+    The terminal sessions of this pod, by terminal id.
+    Sessions connect through socket-ssh, or straight to the SSH container in gateway mode.
+    '''
+    def __init__(self, connector: SocketSSHConnector | SSHGateway | None = None) -> None:
+        if connector is None:
+            connector = get_ssh_gateway() if TERMINAL_RELAY_GATEWAY_ENABLED else get_socket_ssh_connector()
+        self.connector: SocketSSHConnector | SSHGateway = connector
+        self.sessions: dict[str, TerminalSession] = {}
+
+    def get(self, terminal_id: str) -> TerminalSession | None:
+        session: TerminalSession | None = self.sessions.get(terminal_id)
+        if session is None or session.closed:
+            return None
+        return session
+
+    async def open(self, terminal: TerminalResponseModel) -> TerminalSession:
+        '''
+        Get the session of a terminal, connecting to its socket-ssh container if it has none.
+        '''
+        session: TerminalSession | None = self.get(terminal.terminal_id)
+        if session is not None:
+            return session
+        upstream, upstream_codec = await self.connector.connect(terminal)
+        session = self.get(terminal.terminal_id)
+        if session is not None:
+            # opened concurrently by another websocket.
+            await upstream.close()
+            return session
+        session = TerminalSession(terminal.terminal_id, upstream, upstream_codec, on_close=self.remove)
+        self.sessions[terminal.terminal_id] = session
+        return session
+
+    def remove(self, session: TerminalSession) -> None:
+        if self.sessions.get(session.terminal_id) is session:
+            del self.sessions[session.terminal_id]
+
+    async def close(self) -> None:
+        await asyncio.gather(*[session.close() for session in list(self.sessions.values())])
+        await self.connector.close()
+
+
+class TerminalChannel:
+    '''
+    A terminal session attached to a channel of a browser websocket.
+    Input is buffered until sent to socket-ssh, output is read from the scrollback of the session.
+    '''
+    def __init__(self, relay: 'TerminalRelay', channel_id: int, session: TerminalSession, resume: int | None = None) -> None:
+        '''
+        Initialize the TerminalChannel.
+        :params:
+            relay: The relay of the browser websocket.
+            channel_id: The channel, chosen by the browser.
+            session: The session of the terminal.
+            resume: Sequence number of the output the browser saw, None for a new terminal view.
+                A new view is sent the whole scrollback.
+        '''
+        self.relay: TerminalRelay = relay
+        self.channel_id: int = channel_id
+        self.session: TerminalSession = session
+        self.terminal_id: str = session.terminal_id
+        self.resume: int | None = resume
+        self.cursor: int = session.scrollback.start if resume is None else resume  # next output byte to send
+        self.synced: bool = False  # whether the sync frame was sent
+        self.closed: bool = False
+        # output bytes the browser accepts before it grants more, unbounded without credits.
+        self.credit: float = TERMINAL_RELAY_WINDOW if relay.multiplexed else float('inf')
+        self.input: bytearray = bytearray()  # input not sent to socket-ssh yet
+        self.input_ready: asyncio.Event = asyncio.Event()  # set while there is input to send
+        self.input_drained: asyncio.Event = asyncio.Event()  # set when input was sent
+        self.input_credit: int = TERMINAL_RELAY_WINDOW  # input bytes the browser may send before it is granted more
+        self.returned: int = 0  # input bytes sent to socket-ssh, not granted back to the browser yet
+        self.input_at: float = float('-inf')  # monotonic time of the last input not echoed yet
+        self.writer: asyncio.Task | None = None
+        TERMINAL_RELAY_CHANNELS.inc()
+
+    @property
+    def pending(self) -> int:
+        return self.session.scrollback.end - self.cursor
+
+    def wake(self) -> None:
+        self.relay.wakeup.set()
+
+    async def receive(self, payload: bytes) -> None:
+        '''
+        Buffer input from the browser.
+        :raises: ProtocolError if a multiplexing browser sends more than it was granted.
+        '''
+        if self.relay.multiplexed:
+            if len(payload) > self.input_credit:
+                raise ProtocolError(f"Channel {self.channel_id} sent more data than it was granted")
+            self.input_credit -= len(payload)
+        else:
+            # without credits, stop reading the browser until socket-ssh caught up.
+            while len(self.input) >= TERMINAL_RELAY_WINDOW:
+                self.input_drained.clear()
+                await self.input_drained.wait()
+        self.input += payload
+        self.input_ready.set()
+        self.input_at = time.monotonic()
+
+    async def write_upstream(self) -> None:
+        try:
+            while True:
+                await self.input_ready.wait()
+                # everything buffered goes as one frame: a paste is not sent keystroke by keystroke.
+                data: bytes = bytes(self.input[:TERMINAL_RELAY_MAX_FRAME_SIZE])
+                del self.input[:len(data)]
+                if not self.input:
+                    self.input_ready.clear()
+                self.input_drained.set()
+                await self.session.send(data)
+                TerminalRelay.record_frame('input', len(data))
+                if self.relay.multiplexed:
+                    self.returned += len(data)
+                    if self.returned >= TERMINAL_RELAY_WINDOW // 4:
+                        self.wake()
+        except Exception as e:
+            print(f"Error relaying input of terminal {self.terminal_id}: {e}")
+            self.close(CLOSE_INTERNAL_ERROR)
+
+    def is_echo(self) -> bool:
+        '''
+        Whether pending output answers recent input, e.g. the echo of a keystroke.
+        Only the first output after input counts, so a command's output is coalesced from then on.
+        '''
+        if self.pending > TERMINAL_RELAY_ECHO_SIZE or time.monotonic() - self.input_at > TERMINAL_RELAY_ECHO_WINDOW:
+            return False
+        self.input_at = float('-inf')
+        return True
+
+    def ready(self) -> bool:
+        '''
+        Whether the channel has a frame to send.
+        '''
+        return (
+            not self.synced
+            or self.returned >= TERMINAL_RELAY_WINDOW // 4
+            or (self.pending > 0 and self.credit > 0)
+            or (self.session.closed and self.pending <= 0)
+        )
+
+    def urgent(self) -> bool:
+        '''
+        Whether the channel's frames should be sent without coalescing more output first.
+        '''
+        return (
+            not self.synced
+            or self.returned >= TERMINAL_RELAY_WINDOW // 4
+            or self.session.closed
+            or self.pending >= TERMINAL_RELAY_FLUSH_SIZE
+            or self.is_echo()
+        )
+
+    async def sync(self) -> None:
+        scrollback: Scrollback = self.session.scrollback
+        self.cursor = min(max(self.cursor, scrollback.start), scrollback.end)
+        if self.resume is not None:
+            TERMINAL_RELAY_RESUMES.labels(outcome='resumed' if self.cursor == self.resume else 'truncated').inc()
+        self.synced = True
+        await self.relay.send_frame(Frame(OPCODE_SYNC, self.channel_id, str(self.cursor).encode('ascii')))
+
+    async def flush(self) -> None:
+        '''
+        Send the frames the channel has ready, at most one frame of output.
+        '''
+        if not self.synced:
+            await self.sync()
+        if self.returned >= TERMINAL_RELAY_WINDOW // 4:
+            returned: int = self.returned
+            self.returned = 0
+            self.input_credit += returned
+            await self.relay.send_frame(Frame(OPCODE_CREDIT, self.channel_id, str(returned).encode('ascii')))
+        if self.pending > 0 and self.credit > 0:
+            cursor, data = self.session.scrollback.read(self.cursor, min(TERMINAL_RELAY_FLUSH_SIZE, self.credit))
+            await self.relay.send_frame(Frame(OPCODE_DATA, self.channel_id, data))
+            self.cursor = cursor + len(data)
+            self.credit -= len(data)
+            self.session.drained.set()
+            TerminalRelay.record_frame('output', len(data))
+        elif self.session.closed and self.pending <= 0:
+            self.close(CLOSE_NORMAL)
+
+    def close(self, code: int, announce: bool = True) -> None:
+        '''
+        Close the channel and detach its session.
+        :params:
+            code: The close code, sent to the browser.
+            announce: Whether to tell the browser, not needed when it closed the channel.
+        '''
+        if self.closed:
+            return
+        self.closed = True
+        TERMINAL_RELAY_CHANNELS.dec()
+        self.relay.remove(self, code if announce else None)
+        if self.writer is not None:
+            self.writer.cancel()
+        self.session.detach(self)
+
+
+class TerminalRelay:
+    '''
+    Relays one browser websocket to terminal sessions, one per channel, until either side closes the websocket.
+
+    A relay for a single terminal attaches its session to channel 0 and ends with it.
+    A multiplexed relay (no session given) attaches the terminals the browser opens, see OPCODE_OPEN,
+    and flow controls every channel with credits.
+    '''
+    def __init__(
+        self,
+        websocket: WebSocket,
+        session: TerminalSession | None = None,
+        browser_codec: TerminalCodec | None = None,
+        on_input: Callable[[str], Awaitable[None]] | None = None,
+        resume: int | None = None,
+        open_session: Callable[[str], Awaitable[TerminalSession | None]] | None = None
+    ) -> None:
+        '''
+        Initialize the TerminalRelay.
+        :params:
+            websocket: The accepted browser websocket.
+            session: The session of the terminal, None to multiplex the terminals the browser opens.
+            browser_codec: The codec negotiated with the browser. Defaults to binary frames.
+            on_input: Called with the terminal id on every browser frame, e.g. to record activity. Must be cheap.
+            resume: Sequence number of the output the browser saw of session, None for a new terminal view.
+            open_session: Multiplexing only: gets the session of a terminal id the browser opens,
+                None if the browser may not open it.
+        '''
+        self.websocket: WebSocket = websocket
+        self.session: TerminalSession | None = session
+        self.multiplexed: bool = session is None
+        self.browser_codec: TerminalCodec = browser_codec or BinaryCodec()
+        self.on_input: Callable[[str], Awaitable[None]] | None = on_input
+        self.resume: int | None = resume
+        self.open_session: Callable[[str], Awaitable[TerminalSession | None]] | None = open_session
+        self.channels: dict[int, TerminalChannel] = {}
+        self.opening: dict[int, asyncio.Task] = {}  # channel id -> task opening its session
+        self.closing: deque[tuple[int, int]] = deque()  # channel id and close code of closes to send
+        self.wakeup: asyncio.Event = asyncio.Event()  # set when a channel may be ready
+        self.close_code: int = CLOSE_NORMAL
+        self.tasks: list[asyncio.Task] = []
+
+    def attach(self, channel_id: int, session: TerminalSession, resume: int | None = None) -> None:
+        '''
+        Attach a session to a channel, replacing wherever it was attached before.
+        '''
+        channel: TerminalChannel = TerminalChannel(self, channel_id, session, resume)
+        replaced: TerminalChannel | None = session.attach(channel)
+        if replaced is not None:
+            replaced.close(CLOSE_REPLACED)
+        self.channels[channel_id] = channel
+        channel.writer = asyncio.create_task(channel.write_upstream())
+        self.wakeup.set()
+
+    def remove(self, channel: TerminalChannel, code: int | None) -> None:
+        '''
+        Remove a closed channel.
+        :params:
+            code: The close code to send to the browser, None to send none.
+        '''
+        if self.channels.get(channel.channel_id) is channel:
+            del self.channels[channel.channel_id]
+        if code is not None:
+            self.announce_close(channel.channel_id, code)
+
+    def announce_close(self, channel_id: int, code: int) -> None:
+        self.closing.append((channel_id, code))
+        self.wakeup.set()
+
+    async def open_channel(self, channel_id: int, terminal_id: str, resume: int | None) -> None:
+        try:
+            session: TerminalSession | None = await self.open_session(terminal_id)
+        except Exception as e:
+            print(f"Error opening terminal {terminal_id}: {e}")
+            self.announce_close(channel_id, CLOSE_INTERNAL_ERROR)
+            return
+        finally:
+            self.opening.pop(channel_id, None)
+        if session is None:
+            # terminals of other users are refused like missing ones.
+            self.announce_close(channel_id, CLOSE_POLICY_VIOLATION)
+            return
+        self.attach(channel_id, session, resume)
+
+    async def handle_frame(self, frame: Frame) -> bool:
+        '''
+        Handle a browser frame.
+        :returns: Whether the frame is valid, the websocket is closed otherwise.
+        '''
+        if not self.multiplexed and (frame.opcode != OPCODE_DATA or frame.channel != 0):
+            return False
+        if frame.opcode == OPCODE_DATA:
+            channel: TerminalChannel | None = self.channels.get(frame.channel)
+            if channel is None:
+                # input that crossed the close of its channel.
+                return True
+            if self.on_input is not None:
+                await self.on_input(channel.terminal_id)
+            await channel.receive(frame.payload)
+            return True
+        if frame.opcode == OPCODE_OPEN:
+            if frame.channel in self.channels or frame.channel in self.opening:
+                return False
+            opened: dict = json.loads(frame.payload)
+            terminal_id: str = str(opened['terminal_id'])
+            resume: int | None = None if opened.get('resume') is None else int(opened['resume'])
+            if len(self.channels) + len(self.opening) >= TERMINAL_RELAY_MAX_CHANNELS:
+                self.announce_close(frame.channel, CLOSE_POLICY_VIOLATION)
+                return True
+            self.opening[frame.channel] = asyncio.create_task(self.open_channel(frame.channel, terminal_id, resume))
+            return True
+        if frame.opcode == OPCODE_CLOSE:
+            if frame.channel in self.opening:
+                self.opening.pop(frame.channel).cancel()
+            elif frame.channel in self.channels:
+                self.channels[frame.channel].close(CLOSE_NORMAL, announce=False)
+            return True
+        if frame.opcode == OPCODE_CREDIT:
+            channel = self.channels.get(frame.channel)
+            if channel is not None:
+                channel.credit += int(frame.payload)
+                self.wakeup.set()
+            return True
+        return False
+
+    async def read_browser(self) -> None:
+        while True:
+            message: dict = await self.websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                return
+            data: bytes | str | None = message.get('bytes')
+            if data is None:
+                data = message.get('text') or ''
+            if len(data) > TERMINAL_RELAY_MAX_FRAME_SIZE:
+                self.close_code = CLOSE_MESSAGE_TOO_BIG
+                return
+            try:
+                valid: bool = await self.handle_frame(self.browser_codec.decode(data))
+            except (ProtocolError, ValueError, KeyError, TypeError) as e:
+                print(f"Error relaying terminal frame: {e}")
+                valid = False
+            if not valid:
+                self.close_code = CLOSE_POLICY_VIOLATION
+                return
+
+    async def send_frame(self, frame: Frame) -> None:
+        message: bytes | str | None = self.browser_codec.encode(frame)
+        if isinstance(message, bytes):
+            await self.websocket.send_bytes(message)
+        elif message is not None:
+            await self.websocket.send_text(message)
+
+    async def write_browser(self) -> None:
+        '''
+        Send the frames of all channels, the only task sending to the browser.
+        Channels take turns, one frame each per round: a terminal printing a large log can not starve the others.
+        '''
+        while True:
+            if self.closing:
+                channel_id, code = self.closing.popleft()
+                if not self.multiplexed:
+                    # a single terminal relay ends with its terminal.
+                    self.close_code = code
+                    return
+                await self.send_frame(Frame(OPCODE_CLOSE, channel_id, str(code).encode('ascii')))
+                continue
+            channels: list[TerminalChannel] = [channel for channel in self.channels.values() if channel.ready()]
+            if not channels:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            if not any([channel.urgent() for channel in channels]):
+                # give the shells a moment to write the rest.
+                await asyncio.sleep(TERMINAL_RELAY_FLUSH_INTERVAL)
+            for channel in channels:
+                if not channel.closed:
+                    await channel.flush()
+
+    @staticmethod
+    def record_frame(direction: str, size: int) -> None:
+        TERMINAL_RELAY_FRAMES.labels(direction=direction).inc()
+        TERMINAL_RELAY_FRAME_SIZE.labels(direction=direction).observe(size)
+        TERMINAL_RELAY_BYTES.labels(direction=direction).inc(size)
+
+    async def run(self) -> None:
+        '''
+        Relay both directions. Whichever side stops first ends the relay.
+        Sessions outlive the relay, unless it is the session that stopped.
+        '''
+        if self.session is not None:
+            self.attach(0, self.session, self.resume)
+        TERMINAL_RELAY_CONNECTIONS.inc()
+        self.tasks = [
+            asyncio.create_task(self.read_browser()),
+            asyncio.create_task(self.write_browser()),
+        ]
+        try:
+            done, _ = await asyncio.wait(self.tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    print(f"Error relaying terminal websocket: {task.exception()}")
+                    self.close_code = CLOSE_INTERNAL_ERROR
+        finally:
+            await self.stop()
+            TERMINAL_RELAY_CONNECTIONS.dec()
+            try:
+                await self.websocket.close(code=self.close_code)
+            except RuntimeError:
+                # the browser is already gone.
+                pass
+
+    async def stop(self) -> None:
+        tasks: list[asyncio.Task] = [*self.tasks, *self.opening.values()]
+        writers: list[asyncio.Task] = [channel.writer for channel in self.channels.values() if channel.writer is not None]
+        for channel in list(self.channels.values()):
+            channel.close(CLOSE_NORMAL, announce=False)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, *writers, return_exceptions=True)
+
+
+# Terminal sessions of this pod, created on first use.
+_terminal_sessions: TerminalSessions | None = None
+
+
+def get_terminal_sessions() -> TerminalSessions:
+    '''
+    Get the shared TerminalSessions.
+    '''
+    global _terminal_sessions
+    if _terminal_sessions is None:
+        _terminal_sessions = TerminalSessions()
+    return _terminal_sessions
@@ -0,0 +1,61 @@
+'''
+Scrollback of terminal output: a ring buffer of the most recent output bytes of a terminal.
+
+The buffer is one bytearray preallocated at its capacity, so a terminal costs the same memory however much it writes,
+and output is copied into place instead of being kept as one object per chunk.
+
+Output bytes are numbered by their offset in the terminal's output stream, their sequence number.
+A client that saw output up to a sequence number can be sent exactly what followed,
+as long as it is still within the last capacity bytes.
+'''
+
+
+class Scrollback:
+    '''
+    Ring buffer of the last capacity bytes of an output stream.
+    '''
+    def __init__(self, capacity: int) -> None:
+        '''
+        Initialize the Scrollback.
+        :params:
+            capacity: Bytes kept.
+        '''
+        self.capacity: int = capacity
+        self.buffer: bytearray = bytearray(capacity)
+        self.view: memoryview = memoryview(self.buffer)
+        self.end: int = 0  # sequence number of the next byte written
+
+    @property
+    def start(self) -> int:
+        '''
+        Sequence number of the oldest byte kept.
+        '''
+        return max(0, self.end - self.capacity)
+
+    def write(self, data: bytes) -> None:
+        '''
+        Append output, overwriting the oldest bytes once full.
+        '''
+        length: int = len(data)
+        # only the last capacity bytes of a larger write are kept.
+        skipped: int = max(0, length - self.capacity)
+        data = memoryview(data)[skipped:]
+        position: int = (self.end + skipped) % self.capacity
+        first: int = min(len(data), self.capacity - position)
+        self.view[position:position + first] = data[:first]
+        self.view[:len(data) - first] = data[first:]
+        self.end += length
+
+    def read(self, sequence: int, limit: int) -> tuple[int, bytes]:
+        '''
+        Read output from a sequence number.
+        :params:
+            sequence: The sequence number to read from. Output older than start is gone, reading starts at start then.
+            limit: Bytes to read at most.
+        :returns: The sequence number of the first byte read, and the bytes.
+        '''
+        sequence = min(max(sequence, self.start), self.end)
+        length: int = min(self.end - sequence, limit)
+        position: int = sequence % self.capacity
+        first: int = min(length, self.capacity - position)
+        return sequence, b''.join((self.view[position:position + first], self.view[:length - first]))
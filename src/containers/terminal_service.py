@@ -0,0 +1,336 @@
+'''
+Terminal orchestration.
+A terminal is a pair of containers:
+    1. An SSH container, the actual shell.
+    2. A Socket-SSH container, relaying websocket traffic to the SSH container over mTLS.
+       It needs its own certificates, issued for its service name.
+With TERMINAL_RELAY_GATEWAY_ENABLED the relay speaks SSH to the SSH container itself (see ssh_gateway),
+so a terminal is only its SSH container: no Socket-SSH container, no certificates.
+'''
+
+# builtins
+import asyncio
+import base64
+import secrets
+import time
+
+# config
+from src.common.config import SSH_USERNAME
+from src.common.config import SSH_PUBLISH_PORT
+from src.common.config import SSH_TARGET_PORT
+from src.common.config import SOCKET_SSH_IMAGE_NAME
+from src.common.config import SOCKET_SSH_PORT
+from src.common.config import CERT_AUTHORITY_ENABLED
+from src.common.config import CERT_POOL_ENABLED
+from src.common.config import TERMINAL_RELAY_GATEWAY_ENABLED
+
+# helpers
+from src.containers.containers_helpers import CertificateUtils
+from src.containers.data_transformers.create_container_transformer import CreateContainerInputDataTransformer
+from src.containers.certificate_authority import CertificateAuthorityError, get_certificate_authority
+from src.containers.containers_service import ContainerMakerClient, get_container_maker_client
+from src.containers.creation_jobs import ProgressCallback
+from src.containers.enum.creation_job_status_enum import CreationJobStatus
+
+# dtos
+from src.containers.dto.create_container_dto import CreateContainerModel
+from src.containers.dto.create_terminal_dto import CreateTerminalModel
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.delete_container_dto import DeleteContainerDataModel
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+from src.containers.dto.secret_mount_dto import SecretMountModel
+from src.containers.enum.exposure_level_enum import ExposureLevel
+
+
+# Socket-SSH environment variable -> key in the certificate secret
+SOCKET_SSH_CERTIFICATE_ENVIRONMENT_VARIABLES: dict[str, str] = {
+    'SERVER_KEY': 'server.key',
+    'SERVER_CRT': 'server.crt',
+    'CLIENT_KEY': 'client.key',
+    'CLIENT_CRT': 'client.crt',
+    'CA_CRT': 'ca.crt',
+}
+
+
+class TerminalService:
+    '''
+    Creates and deletes terminals (SSH + Socket-SSH container pairs, only SSH containers in gateway mode).
+    '''
+    def __init__(self, container_maker_client: ContainerMakerClient | None = None) -> None:
+        '''
+        Initialize the TerminalService.
+        :params:
+            container_maker_client: The container maker client. Defaults to the shared client.
+        '''
+        self.container_maker_client: ContainerMakerClient = container_maker_client or get_container_maker_client()
+        self.certificate_pool_manager = None
+        if CERT_POOL_ENABLED and not TERMINAL_RELAY_GATEWAY_ENABLED:
+            # imported here because the certificate pool derives its names from TerminalService.
+            from src.containers.certificate_pool import get_certificate_pool_manager
+            self.certificate_pool_manager = get_certificate_pool_manager()
+
+    @staticmethod
+    def generate_terminal_id() -> str:
+        '''
+        Generate a terminal id. Container and service names are derived from it, so it must be DNS safe.
+        '''
+        return secrets.token_hex(6)
+
+    @staticmethod
+    def ssh_container_name(terminal_id: str) -> str:
+        return f"ssh-{terminal_id}"
+
+    @staticmethod
+    def socket_ssh_container_name(terminal_id: str) -> str:
+        return f"socket-ssh-{terminal_id}"
+
+    @staticmethod
+    def socket_ssh_service_name(terminal_id: str) -> str:
+        '''
+        container-maker names the service <container_name>-service. The certificates are issued for it.
+        '''
+        return f"{TerminalService.socket_ssh_container_name(terminal_id)}-service"
+
+    @staticmethod
+    def certificate_secret_name(terminal_id: str) -> str:
+        return f"{TerminalService.socket_ssh_service_name(terminal_id)}-certs"
+
+    def ssh_container_data(
+        self, terminal_id: str, create_terminal_data: CreateTerminalModel, ssh_password: str
+    ) -> CreateContainerModel:
+        '''
+        Build the create container data for the SSH container.
+        '''
+        return CreateContainerModel(
+            image_name=create_terminal_data.image_name,
+            container_name=self.ssh_container_name(terminal_id),
+            network_name=create_terminal_data.network_name,
+            exposure_level=ExposureLevel.CLUSTER_LOCAL,
+            publish_information=[
+                {'publish_port': SSH_PUBLISH_PORT, 'target_port': SSH_TARGET_PORT, 'protocol': 'TCP'},
+            ],
+            environment_variables={
+                'SSH_USERNAME': SSH_USERNAME,
+                'SSH_PASSWORD': ssh_password,
+            }
+        )
+
+    def socket_ssh_container_data(
+        self, terminal_id: str, create_terminal_data: CreateTerminalModel, certificates: dict | None = None
+    ) -> CreateContainerModel:
+        '''
+        Build the create container data for the Socket-SSH container.
+        Without certificates, the certificate secret is referenced by name and container-maker mounts it
+        as environment variables.
+        With certificates (specs without secret mounts), they are passed as environment variables.
+        '''
+        create_container_data: CreateContainerModel = CreateContainerModel(
+            image_name=SOCKET_SSH_IMAGE_NAME,
+            container_name=self.socket_ssh_container_name(terminal_id),
+            network_name=create_terminal_data.network_name,
+            exposure_level=ExposureLevel.CLUSTER_LOCAL,
+            publish_information=[
+                {'publish_port': SOCKET_SSH_PORT, 'target_port': SOCKET_SSH_PORT, 'protocol': 'TCP'},
+            ]
+        )
+        if certificates is None:
+            create_container_data.secret_mounts = [
+                SecretMountModel(
+                    secret_name=self.certificate_secret_name(terminal_id),
+                    environment_variables=SOCKET_SSH_CERTIFICATE_ENVIRONMENT_VARIABLES
+                )
+            ]
+        else:
+            create_container_data.environment_variables = {
+                environment_variable: base64.b64decode(certificates[key]).decode('utf-8')
+                for environment_variable, key in SOCKET_SSH_CERTIFICATE_ENVIRONMENT_VARIABLES.items()
+            }
+        return create_container_data
+
+    async def acquire_terminal_id(self) -> tuple[str, bool]:
+        '''
+        Take a terminal id from the certificate pool, so that its certificates are already issued.
+        :returns: The terminal id and whether it came from the pool.
+        '''
+        if self.certificate_pool_manager is not None:
+            terminal_id: str | None = await self.certificate_pool_manager.acquire()
+            if terminal_id is not None:
+                return terminal_id, True
+        return self.generate_terminal_id(), False
+
+    async def read_pooled_certificates(self, terminal_id: str) -> dict:
+        '''
+        Read the certificates of a terminal id taken from the certificate pool.
+        Their secret may have been deleted or expired since it was pooled.
+        :returns: The certificates, or an empty dict if they are unavailable.
+        '''
+        try:
+            return await CertificateUtils.read_certificate_from_secret(self.certificate_secret_name(terminal_id))
+        except Exception as e:
+            print(f"Pooled certificate unavailable, issuing a new one: {e}")
+            return {}
+
+    async def issue_certificate_secret(self, terminal_id: str, pooled: bool = False) -> dict | None:
+        '''
+        Make sure the Socket-SSH certificate secret exists.
+        Pooled terminal ids already have their secret, unless it was deleted since.
+        Otherwise the certificates are signed in process when the CA is available.
+        Otherwise a certificate job is created from the cert-manager CronJob.
+        :returns: The certificates if they were signed in process, None if they are only in the secret.
+        '''
+        if pooled and await self.read_pooled_certificates(terminal_id):
+            return None
+        if CERT_AUTHORITY_ENABLED:
+            try:
+                return await get_certificate_authority().issue_certificates(self.socket_ssh_service_name(terminal_id))
+            except CertificateAuthorityError as e:
+                print(f"In-process certificate authority unavailable, falling back to the certificate job: {e}")
+        await CertificateUtils.create_certificate_job(self.socket_ssh_service_name(terminal_id))
+        return None
+
+    async def issue_certificates(self, terminal_id: str, pooled: bool = False) -> dict:
+        '''
+        Issue the Socket-SSH certificates and return them, reading them back from their secret if needed.
+        '''
+        if pooled:
+            certificates: dict = await self.read_pooled_certificates(terminal_id)
+            if certificates:
+                return certificates
+        certificates: dict | None = await self.issue_certificate_secret(terminal_id)
+        if certificates:
+            return certificates
+        return await CertificateUtils.read_certificate_from_secret(self.certificate_secret_name(terminal_id))
+
+    async def create_socket_ssh_container(
+        self,
+        terminal_id: str,
+        create_terminal_data: CreateTerminalModel,
+        user_id: str | None = None,
+        progress: ProgressCallback | None = None,
+        pooled: bool = False
+    ) -> ContainerResponseModel:
+        '''
+        Issue the Socket-SSH certificates, then create the Socket-SSH container right away.
+        When container-maker supports secret mounts, the certificates are not read back nor sent over GRPC.
+        '''
+        certificates: dict | None = None
+        if CreateContainerInputDataTransformer.supports_secret_mounts():
+            await self.issue_certificate_secret(terminal_id, pooled=pooled)
+        else:
+            certificates = await self.issue_certificates(terminal_id, pooled=pooled)
+        if progress is not None:
+            await progress(CreationJobStatus.CERT_ISSUED)
+        return await self.container_maker_client.create_container(
+            self.socket_ssh_container_data(terminal_id, create_terminal_data, certificates), user_id=user_id
+        )
+
+    async def create_terminal(
+        self,
+        create_terminal_data: CreateTerminalModel,
+        user_id: str | None = None,
+        progress: ProgressCallback | None = None
+    ) -> TerminalResponseModel:
+        '''
+        Create a terminal.
+        The SSH container does not depend on the certificates, so two chains run concurrently:
+            1. Create the SSH container.
+            2. Issue the Socket-SSH certificates, then create the Socket-SSH container.
+        In gateway mode only the first chain runs.
+        Once the containers exist, wait until they are ready.
+        If any step fails, whatever was created is rolled back and the error is raised.
+        '''
+        terminal_id, pooled = await self.acquire_terminal_id()
+        ssh_password: str = secrets.token_urlsafe(16)
+        network_name: str = create_terminal_data.network_name
+
+        chains: list = [
+            self.container_maker_client.create_container(
+                self.ssh_container_data(terminal_id, create_terminal_data, ssh_password), user_id=user_id
+            )
+        ]
+        if not TERMINAL_RELAY_GATEWAY_ENABLED:
+            chains.append(self.create_socket_ssh_container(
+                terminal_id, create_terminal_data, user_id=user_id, progress=progress, pooled=pooled
+            ))
+        # wait for both chains, even if one fails, so that everything created can be rolled back.
+        results: list = await asyncio.gather(*chains, return_exceptions=True)
+        created: list[ContainerResponseModel] = [
+            result for result in results if isinstance(result, ContainerResponseModel)
+        ]
+        errors: list[BaseException] = [
+            result for result in results if isinstance(result, BaseException)
+        ]
+        if errors:
+            await self.rollback(terminal_id, network_name, created, user_id=user_id)
+            raise errors[0]
+
+        if progress is not None:
+            await progress(CreationJobStatus.POD_SCHEDULED)
+        try:
+            ready: list[ContainerResponseModel] = await asyncio.gather(
+                *[
+                    self.container_maker_client.wait_until_ready(result, network_name, user_id=user_id)
+                    for result in results
+                ]
+            )
+        except Exception:
+            await self.rollback(terminal_id, network_name, created, user_id=user_id)
+            raise
+        ssh_container: ContainerResponseModel = ready[0]
+        socket_ssh_container: ContainerResponseModel | None = ready[1] if len(ready) > 1 else None
+        return TerminalResponseModel(
+            terminal_id=terminal_id,
+            image_name=create_terminal_data.image_name,
+            network_name=network_name,
+            ssh_container=ssh_container,
+            socket_ssh_container=socket_ssh_container,
+            ssh_username=SSH_USERNAME,
+            ssh_password=ssh_password,
+            certificate_secret_name=(
+                self.certificate_secret_name(terminal_id) if socket_ssh_container is not None else None
+            ),
+            created_at=time.time()
+        )
+
+    async def rollback(
+        self,
+        terminal_id: str,
+        network_name: str,
+        containers: list[ContainerResponseModel],
+        user_id: str | None = None
+    ) -> None:
+        '''
+        Delete the containers and the certificate secret of a partially created terminal.
+        Rollback errors are logged, the original error is what the caller reports.
+        '''
+        print(f"Rolling back terminal {terminal_id}")
+        deletions: list = [
+            self.container_maker_client.delete_container(
+                DeleteContainerDataModel(container_id=container.container_id, network_name=network_name),
+                user_id=user_id
+            )
+            for container in containers
+        ]
+        if not TERMINAL_RELAY_GATEWAY_ENABLED:
+            deletions.append(CertificateUtils.delete_secret(self.certificate_secret_name(terminal_id)))
+        results: list = await asyncio.gather(*deletions, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                print(f"Error rolling back terminal {terminal_id}: {result}")
+
+    async def delete_terminal(self, terminal: TerminalResponseModel, user_id: str | None = None) -> None:
+        '''
+        Delete the containers of a terminal and its certificate secret, if it has them.
+        '''
+        await asyncio.gather(
+            *[
+                self.container_maker_client.delete_container(
+                    DeleteContainerDataModel(container_id=container.container_id, network_name=terminal.network_name),
+                    user_id=user_id
+                )
+                for container in (terminal.socket_ssh_container, terminal.ssh_container)
+                if container is not None
+            ]
+        )
+        if terminal.certificate_secret_name is not None:
+            await CertificateUtils.delete_secret(terminal.certificate_secret_name)
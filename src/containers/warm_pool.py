@@ -0,0 +1,311 @@
+'''
+Warm pool of pre-provisioned terminals.
+
+Creating a terminal takes seconds to tens of seconds: the SSH pod and service, the certificate Job and
+the Socket-SSH pod and service. The warm pool keeps ready terminals per popular image, so that a user
+gets one immediately and the pool refills in the background.
+
+State lives in Redis so that every pod hands out from the same pool:
+    warm_pool:ready:<image> -> list of TerminalResponseModel (json), oldest first.
+    warm_pool:demand:<image> -> sorted set of terminal requests, scored by timestamp.
+    warm_pool:leader -> id of the pod that refills the pool.
+    warm_pool:wakeup -> list the leader blocks on between refills. Handing out a terminal on any pod pushes to it,
+        so the leader refills right away instead of after WARM_POOL_REFILL_INTERVAL.
+
+Pool size follows demand: WARM_POOL_DEMAND_FACTOR terminals per request seen in the last
+WARM_POOL_DEMAND_WINDOW seconds, clamped to [WARM_POOL_MIN_SIZE, WARM_POOL_MAX_SIZE].
+Terminals older than WARM_POOL_MAX_AGE are deleted, when handed out and on every refill.
+Terminals being provisioned are never cancelled half way, stopping waits for them: they would be created but never pooled.
+'''
+
+# builtins
+import asyncio
+import math
+import time
+import uuid
+from typing import Optional
+
+# third party
+import redis
+import redis.asyncio as aioredis
+
+# config
+from src.common.config import TERMINAL_NETWORK_NAME
+from src.common.config import WARM_POOL_IMAGES
+from src.common.config import WARM_POOL_MIN_SIZE
+from src.common.config import WARM_POOL_MAX_SIZE
+from src.common.config import WARM_POOL_DEMAND_WINDOW
+from src.common.config import WARM_POOL_DEMAND_FACTOR
+from src.common.config import WARM_POOL_REFILL_INTERVAL
+from src.common.config import WARM_POOL_REFILL_CONCURRENCY
+from src.common.config import WARM_POOL_MAX_AGE
+from src.common.config import WARM_POOL_PREFIX
+
+# utils
+from src.common.redis_utils import RedisUtils
+
+# services
+from src.containers.terminal_service import TerminalService
+from src.containers.creation_jobs import ProgressCallback
+
+# dtos
+from src.containers.dto.create_terminal_dto import CreateTerminalModel
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+
+
+class WarmPoolManager:
+    '''
+    Keeps a demand sized stock of ready terminals per image and hands them out on request.
+    Only the leader pod refills, every pod can hand out.
+    '''
+    def __init__(
+        self,
+        terminal_service: TerminalService | None = None,
+        redis_client: aioredis.Redis | None = None,
+        images: list[str] = WARM_POOL_IMAGES
+    ) -> None:
+        '''
+        Initialize the WarmPoolManager.
+        :params:
+            terminal_service: The service used to provision terminals.
+            redis_client: The asyncio Redis client. Defaults to the shared client.
+            images: The images to keep warm.
+        '''
+        self.terminal_service: TerminalService = terminal_service or TerminalService()
+        self.redis_client: aioredis.Redis = redis_client or RedisUtils.async_client()
+        self.images: list[str] = images
+        self.pod_id: str = str(uuid.uuid4())
+        self.provisioning: dict[str, int] = {image: 0 for image in images}
+        self.tasks: set[asyncio.Task] = set()
+        self.provisions: set[asyncio.Task] = set()  # terminals being created and pooled, never cancelled
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def ready_key(self, image: str) -> str:
+        return f"{WARM_POOL_PREFIX}ready:{image}"
+
+    def demand_key(self, image: str) -> str:
+        return f"{WARM_POOL_PREFIX}demand:{image}"
+
+    @property
+    def leader_key(self) -> str:
+        return f"{WARM_POOL_PREFIX}leader"
+
+    @property
+    def wakeup_key(self) -> str:
+        return f"{WARM_POOL_PREFIX}wakeup"
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        '''
+        Bounds the number of terminals provisioned at once. Created on the running event loop.
+        '''
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(WARM_POOL_REFILL_CONCURRENCY)
+        return self._semaphore
+
+    def is_pooled(self, create_terminal_data: CreateTerminalModel) -> bool:
+        '''
+        Warm terminals are only kept for the configured images in the default network.
+        '''
+        return create_terminal_data.image_name in self.images and create_terminal_data.network_name == TERMINAL_NETWORK_NAME
+
+    def spawn(self, coroutine: any) -> None:
+        '''
+        Run a coroutine in the background and keep a reference to it until it is done.
+        '''
+        task: asyncio.Task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def record_demand(self, image: str) -> None:
+        '''
+        Record a terminal request for an image and drop requests older than the demand window.
+        Wakes up the leader, wherever it runs, so that it refills the pool.
+        '''
+        now: float = time.time()
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.zadd(self.demand_key(image), {f"{now}:{uuid.uuid4().hex[:8]}": now})
+                pipe.zremrangebyscore(self.demand_key(image), '-inf', now - WARM_POOL_DEMAND_WINDOW)
+                pipe.expire(self.demand_key(image), WARM_POOL_DEMAND_WINDOW)
+                # one pending wakeup is enough, a refill covers every image.
+                pipe.rpush(self.wakeup_key, image)
+                pipe.ltrim(self.wakeup_key, -1, -1)
+                await pipe.execute()
+        except redis.RedisError as e:
+            print(f"Error recording warm pool demand for {image}: {e}")
+
+    async def target_size(self, image: str) -> int:
+        '''
+        Get the pool size for an image based on its recent demand.
+        '''
+        now: float = time.time()
+        demand: int = await self.redis_client.zcount(self.demand_key(image), now - WARM_POOL_DEMAND_WINDOW, '+inf')
+        return max(WARM_POOL_MIN_SIZE, min(WARM_POOL_MAX_SIZE, math.ceil(demand * WARM_POOL_DEMAND_FACTOR)))
+
+    @staticmethod
+    def is_fresh(terminal: TerminalResponseModel) -> bool:
+        return time.time() - terminal.created_at <= WARM_POOL_MAX_AGE
+
+    async def acquire(self, image: str) -> Optional[TerminalResponseModel]:
+        '''
+        Hand out a warm terminal for an image.
+        Terminals older than WARM_POOL_MAX_AGE are discarded.
+        :returns: TerminalResponseModel or None if the pool is empty.
+        '''
+        await self.record_demand(image)
+        try:
+            while True:
+                encoded: str | None = await self.redis_client.lpop(self.ready_key(image))
+                if encoded is None:
+                    return None
+                terminal: TerminalResponseModel = TerminalResponseModel.model_validate_json(encoded)
+                if self.is_fresh(terminal):
+                    return terminal
+                self.spawn(self.discard(terminal))
+        except redis.RedisError as e:
+            print(f"Error acquiring warm terminal for {image}: {e}")
+            return None
+
+    async def acquire_or_create(
+        self,
+        create_terminal_data: CreateTerminalModel,
+        user_id: str | None = None,
+        progress: ProgressCallback | None = None
+    ) -> TerminalResponseModel:
+        '''
+        Hand out a warm terminal if there is one, otherwise create a terminal on demand.
+        '''
+        if self.is_pooled(create_terminal_data):
+            terminal: TerminalResponseModel | None = await self.acquire(create_terminal_data.image_name)
+            if terminal is not None:
+                if user_id is not None:
+                    # warm terminals were created without an owner, the user owns them now.
+                    for container in (terminal.ssh_container, terminal.socket_ssh_container):
+                        if container is None:
+                            continue
+                        await self.terminal_service.container_maker_client.adopt(
+                            user_id, terminal.network_name, container
+                        )
+                return terminal
+        return await self.terminal_service.create_terminal(create_terminal_data, user_id=user_id, progress=progress)
+
+    async def provision(self, image: str) -> None:
+        '''
+        Provision one warm terminal and add it to the pool.
+        Creating and pooling the terminal is shielded: cancelled half way, it would be created but never pooled.
+        '''
+        try:
+            async with self.semaphore:
+                task: asyncio.Task = asyncio.create_task(self.create_pooled_terminal(image))
+                self.provisions.add(task)
+                task.add_done_callback(self.provisions.discard)
+                await asyncio.shield(task)
+        except Exception as e:
+            print(f"Error provisioning warm terminal for {image}: {e}")
+        finally:
+            self.provisioning[image] -= 1
+
+    async def create_pooled_terminal(self, image: str) -> None:
+        '''
+        Create a warm terminal and add it to the pool. A terminal that cannot be pooled is deleted.
+        '''
+        terminal: TerminalResponseModel = await self.terminal_service.create_terminal(
+            CreateTerminalModel(image_name=image, network_name=TERMINAL_NETWORK_NAME)
+        )
+        try:
+            await self.redis_client.rpush(self.ready_key(image), terminal.model_dump_json())
+        except Exception:
+            await self.discard(terminal)
+            raise
+
+    async def discard(self, terminal: TerminalResponseModel) -> None:
+        '''
+        Delete a stale warm terminal.
+        '''
+        try:
+            await self.terminal_service.delete_terminal(terminal)
+        except Exception as e:
+            print(f"Error discarding warm terminal {terminal.terminal_id}: {e}")
+
+    async def is_leader(self) -> bool:
+        '''
+        Take or renew refill leadership.
+        '''
+        return await RedisUtils.hold_lock(self.redis_client, self.leader_key, self.pod_id, WARM_POOL_REFILL_INTERVAL * 3)
+
+    async def sweep(self, image: str) -> int:
+        '''
+        Discard the warm terminals of an image older than WARM_POOL_MAX_AGE.
+        :returns: The number of fresh terminals in the pool.
+        '''
+        ready: int = 0
+        for encoded in await self.redis_client.lrange(self.ready_key(image), 0, -1):
+            terminal: TerminalResponseModel = TerminalResponseModel.model_validate_json(encoded)
+            if self.is_fresh(terminal):
+                ready += 1
+            # only discarded if still in the pool, not if it was handed out meanwhile.
+            elif await self.redis_client.lrem(self.ready_key(image), 1, encoded):
+                self.spawn(self.discard(terminal))
+        return ready
+
+    async def refill(self, image: str) -> None:
+        '''
+        Start provisioning as many terminals as the pool is short of.
+        Stale terminals are discarded first, terminals already being provisioned count towards the pool.
+        '''
+        ready: int = await self.sweep(image)
+        deficit: int = await self.target_size(image) - ready - self.provisioning[image]
+        for _ in range(max(deficit, 0)):
+            self.provisioning[image] += 1
+            self.spawn(self.provision(image))
+
+    async def run(self) -> None:
+        '''
+        Refill loop. Runs until cancelled.
+        '''
+        while True:
+            leader: bool = False
+            try:
+                leader = await self.is_leader()
+                if leader:
+                    for image in self.images:
+                        await self.refill(image)
+            except redis.RedisError as e:
+                print(f"Error refilling warm pool: {e}")
+            await self.wait_for_wakeup(leader)
+
+    async def wait_for_wakeup(self, leader: bool) -> None:
+        '''
+        Wait until the next refill: WARM_POOL_REFILL_INTERVAL, or less on the leader when a terminal is handed out.
+        '''
+        if leader:
+            try:
+                await self.redis_client.blpop([self.wakeup_key], timeout=WARM_POOL_REFILL_INTERVAL)
+                return
+            except redis.RedisError as e:
+                print(f"Error waiting for warm pool wakeup: {e}")
+        await asyncio.sleep(WARM_POOL_REFILL_INTERVAL)
+
+    async def stop(self) -> None:
+        '''
+        Cancel background tasks, and wait for the terminals being created to be pooled.
+        '''
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await asyncio.gather(*self.provisions, return_exceptions=True)
+
+
+# Shared warm pool manager, created on first use.
+_warm_pool_manager: WarmPoolManager | None = None
+
+
+def get_warm_pool_manager() -> WarmPoolManager:
+    '''
+    Get the shared WarmPoolManager.
+    '''
+    global _warm_pool_manager
+    if _warm_pool_manager is None:
+        _warm_pool_manager = WarmPoolManager()
+    return _warm_pool_manager
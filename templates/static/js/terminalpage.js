@@ -1,3 +1,24 @@
+// Terminal wire protocol: 1 byte opcode, 2 bytes channel id, payload
+const TERMINAL_BINARY_SUBPROTOCOL = 'browseterm.binary.v1';
+const TERMINAL_JSON_SUBPROTOCOL = 'browseterm.json.v1';
+const TERMINAL_FRAME_HEADER_SIZE = 3;
+const TERMINAL_OPCODE_DATA = 0x01;
+const TERMINAL_OPCODE_SYNC = 0x03;
+const TERMINAL_OPCODE_OPEN = 0x04;
+const TERMINAL_OPCODE_CLOSE = 0x05;
+const TERMINAL_OPCODE_CREDIT = 0x06;
+const TERMINAL_OPCODE_NAMES = {
+    data: TERMINAL_OPCODE_DATA,
+    sync: TERMINAL_OPCODE_SYNC,
+    open: TERMINAL_OPCODE_OPEN,
+    close: TERMINAL_OPCODE_CLOSE,
+    credit: TERMINAL_OPCODE_CREDIT
+};
+// Bytes of data a channel may send before the peer grants more (TERMINAL_RELAY_WINDOW on the server)
+const TERMINAL_WINDOW = 65536;
+// Close codes after which reconnecting is pointless
+const TERMINAL_FINAL_CLOSE_CODES = [1008, 1009, 4000];
+
 /**
  * TerminalPageUtilities
  * Utility methods for terminal page functionality
@@ -87,6 +108,257 @@ class TerminalPageUtilities {
     }
 }
 
+/**
+ * TerminalMux
+ * Carries the terminals of the page over one websocket, one channel each (see terminal_relay.py).
+ * Output is granted back to the server once the terminal rendered it, input waits for credit.
+ * Reconnects reopen every channel from the output it already showed.
+ */
+class TerminalMux {
+    /**
+     * Initialize the terminal multiplexer
+     */
+    constructor() {
+        this.websocket = null;
+        this.channels = new Map();
+        this.nextChannelId = 1;
+        this.reconnectAttempts = 0;
+        this.textEncoder = new TextEncoder();
+        this.textDecoder = new TextDecoder();
+    }
+
+    /**
+     * Open a terminal on a new channel
+     * @param {string} terminalId - Terminal ID
+     * @param {Object} handlers - onSync(seq, previousSeq), onData(payload, done) and onClose(code) callbacks
+     * @returns {number} Channel ID
+     */
+    open(terminalId, handlers) {
+        const channelId = this.nextChannelId++;
+        this.channels.set(channelId, {
+            terminalId: terminalId,
+            handlers: handlers,
+            outputSeq: null,
+            rendered: 0,
+            inputCredit: TERMINAL_WINDOW,
+            pendingInput: []
+        });
+        if (this.websocket === null) {
+            this.connect();
+        } else if (this.websocket.readyState === WebSocket.OPEN) {
+            this.sendOpen(channelId);
+        }
+        return channelId;
+    }
+
+    /**
+     * Close a channel
+     * @param {number} channelId - Channel ID
+     */
+    close(channelId) {
+        if (!this.channels.delete(channelId)) {
+            return;
+        }
+        if (this.websocket && this.websocket.readyState === WebSocket.OPEN) {
+            this.sendFrame(TERMINAL_OPCODE_CLOSE, channelId, new Uint8Array(0));
+        }
+    }
+
+    /**
+     * Send input on a channel, as soon as the server granted room for it
+     * @param {number} channelId - Channel ID
+     * @param {string} data - Input data from terminal
+     */
+    send(channelId, data) {
+        const channel = this.channels.get(channelId);
+        if (!channel) {
+            return;
+        }
+        channel.pendingInput.push(this.textEncoder.encode(data));
+        this.flushInput(channelId);
+    }
+
+    /**
+     * Send pending input of a channel, up to its credit
+     * @param {number} channelId - Channel ID
+     */
+    flushInput(channelId) {
+        const channel = this.channels.get(channelId);
+        if (!this.websocket || this.websocket.readyState !== WebSocket.OPEN) {
+            return;
+        }
+        while (channel.pendingInput.length > 0 && channel.inputCredit > 0) {
+            let payload = channel.pendingInput[0];
+            if (payload.length > channel.inputCredit) {
+                // Split at a character boundary, JSON frames can only carry whole characters
+                let end = channel.inputCredit;
+                while (end > 0 && (payload[end] & 0xc0) === 0x80) {
+                    end -= 1;
+                }
+                if (end === 0) {
+                    return;
+                }
+                channel.pendingInput[0] = payload.subarray(end);
+                payload = payload.subarray(0, end);
+            } else {
+                channel.pendingInput.shift();
+            }
+            channel.inputCredit -= payload.length;
+            this.sendFrame(TERMINAL_OPCODE_DATA, channelId, payload);
+        }
+    }
+
+    /**
+     * Record output of a channel as rendered, granting the server room for more
+     * @param {number} channelId - Channel ID
+     * @param {number} length - Bytes rendered
+     */
+    rendered(channelId, length) {
+        const channel = this.channels.get(channelId);
+        if (!channel) {
+            return;
+        }
+        channel.rendered += length;
+        if (channel.rendered >= TERMINAL_WINDOW / 4 && this.websocket && this.websocket.readyState === WebSocket.OPEN) {
+            this.sendFrame(TERMINAL_OPCODE_CREDIT, channelId, this.textEncoder.encode(String(channel.rendered)));
+            channel.rendered = 0;
+        }
+    }
+
+    /**
+     * Connect the websocket and open every channel on it
+     */
+    connect() {
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        this.websocket = new WebSocket(
+            `${protocol}//${window.location.host}/ws/terminals`,
+            [TERMINAL_BINARY_SUBPROTOCOL, TERMINAL_JSON_SUBPROTOCOL]
+        );
+        this.websocket.binaryType = 'arraybuffer';
+
+        this.websocket.onopen = () => {
+            console.log('WebSocket connected:', this.websocket.protocol);
+            this.reconnectAttempts = 0;
+            for (const channelId of this.channels.keys()) {
+                this.sendOpen(channelId);
+            }
+        };
+
+        this.websocket.onmessage = (event) => {
+            this.handleFrame(this.decodeFrame(event.data));
+        };
+
+        this.websocket.onerror = (error) => {
+            console.error('WebSocket error:', error);
+        };
+
+        this.websocket.onclose = (event) => {
+            console.log('WebSocket disconnected:', event.code);
+            this.websocket = null;
+            if (TERMINAL_FINAL_CLOSE_CODES.includes(event.code)) {
+                for (const [channelId, channel] of this.channels) {
+                    this.channels.delete(channelId);
+                    channel.handlers.onClose(event.code);
+                }
+                return;
+            }
+            if (this.channels.size === 0) {
+                return;
+            }
+            // Network blip, deploy or sleep: reconnect with backoff
+            const delay = Math.min(1000 * 2 ** this.reconnectAttempts, 30000);
+            this.reconnectAttempts += 1;
+            setTimeout(() => this.connect(), delay);
+        };
+    }
+
+    /**
+     * Open a channel on the connected websocket, resuming from the output it already showed
+     * @param {number} channelId - Channel ID
+     */
+    sendOpen(channelId) {
+        const channel = this.channels.get(channelId);
+        // Windows start over on every websocket
+        channel.rendered = 0;
+        channel.inputCredit = TERMINAL_WINDOW;
+        const open = { terminal_id: channel.terminalId, resume: channel.outputSeq };
+        this.sendFrame(TERMINAL_OPCODE_OPEN, channelId, this.textEncoder.encode(JSON.stringify(open)));
+        this.flushInput(channelId);
+    }
+
+    /**
+     * Handle a frame from the server
+     * @param {Object|null} frame - Decoded frame
+     */
+    handleFrame(frame) {
+        const channel = frame === null ? undefined : this.channels.get(frame.channel);
+        if (!channel) {
+            return;
+        }
+        if (frame.opcode === TERMINAL_OPCODE_SYNC) {
+            // Sequence number output continues from
+            const seq = Number(this.textDecoder.decode(frame.payload));
+            channel.handlers.onSync(seq, channel.outputSeq);
+            channel.outputSeq = seq;
+        } else if (frame.opcode === TERMINAL_OPCODE_DATA) {
+            channel.outputSeq += frame.payload.length;
+            channel.handlers.onData(frame.payload, () => this.rendered(frame.channel, frame.payload.length));
+        } else if (frame.opcode === TERMINAL_OPCODE_CREDIT) {
+            channel.inputCredit += Number(this.textDecoder.decode(frame.payload));
+            this.flushInput(frame.channel);
+        } else if (frame.opcode === TERMINAL_OPCODE_CLOSE) {
+            this.channels.delete(frame.channel);
+            channel.handlers.onClose(Number(this.textDecoder.decode(frame.payload)));
+        }
+    }
+
+    /**
+     * Send a frame
+     * @param {number} opcode - Opcode
+     * @param {number} channelId - Channel ID
+     * @param {Uint8Array} payload - Payload
+     */
+    sendFrame(opcode, channelId, payload) {
+        if (this.websocket.protocol !== TERMINAL_BINARY_SUBPROTOCOL) {
+            const op = Object.keys(TERMINAL_OPCODE_NAMES).find(name => TERMINAL_OPCODE_NAMES[name] === opcode);
+            this.websocket.send(JSON.stringify({ op: op, channel: channelId, data: this.textDecoder.decode(payload) }));
+            return;
+        }
+        const frame = new Uint8Array(TERMINAL_FRAME_HEADER_SIZE + payload.length);
+        const header = new DataView(frame.buffer);
+        header.setUint8(0, opcode);
+        header.setUint16(1, channelId);
+        frame.set(payload, TERMINAL_FRAME_HEADER_SIZE);
+        this.websocket.send(frame.buffer);
+    }
+
+    /**
+     * Decode a frame from the server
+     * @param {ArrayBuffer|string} message - Websocket message
+     * @returns {Object|null} Opcode, channel and payload bytes, null for malformed frames
+     */
+    decodeFrame(message) {
+        if (typeof message === 'string') {
+            const frame = JSON.parse(message);
+            // Sequence numbers and credits count bytes, so JSON payloads are counted as utf-8 too
+            return {
+                opcode: TERMINAL_OPCODE_NAMES[frame.op],
+                channel: frame.channel || 0,
+                payload: this.textEncoder.encode(frame.data)
+            };
+        }
+        if (message.byteLength < TERMINAL_FRAME_HEADER_SIZE) {
+            return null;
+        }
+        const header = new DataView(message);
+        return {
+            opcode: header.getUint8(0),
+            channel: header.getUint16(1),
+            payload: new Uint8Array(message, TERMINAL_FRAME_HEADER_SIZE)
+        };
+    }
+}
+
 /**
  * TerminalPageHandler
  * Handles terminal page functionality and xterm.js integration
@@ -102,7 +374,10 @@ class TerminalPageHandler {
         this.terminalInfo = null;
         this.term = null;
         this.fitAddon = null;
-        this.websocket = null;
+        this.mux = new TerminalMux();
+        this.channelId = null;
+        this.heartbeatTimer = null;
+        this.inputSinceHeartbeat = false;
     }
 
     /**
@@ -135,6 +410,40 @@ class TerminalPageHandler {
 
         // Handle window resize
         window.addEventListener('resize', () => this.handleResize());
+
+        // Keep the terminal from being deleted as idle while it is used
+        this.startHeartbeat();
+    }
+
+    /**
+     * Send a heartbeat every minute in which the terminal received input.
+     * The server deletes terminals without activity for longer than the idle timeout of the plan.
+     */
+    startHeartbeat() {
+        if (!this.terminalId) {
+            return;
+        }
+        this.heartbeatTimer = setInterval(async () => {
+            if (!this.inputSinceHeartbeat) {
+                return;
+            }
+            this.inputSinceHeartbeat = false;
+            try {
+                const response = await fetch(`/terminals/${encodeURIComponent(this.terminalId)}/heartbeat`, {
+                    method: 'POST',
+                    credentials: 'same-origin'
+                });
+                if (response.status === 404) {
+                    // the terminal is gone, no point in keeping it alive
+                    clearInterval(this.heartbeatTimer);
+                    this.mux.close(this.channelId);
+                    this.channelId = null;
+                    this.writeColoredText('This terminal was deleted after being idle.', 'yellow');
+                }
+            } catch (error) {
+                console.error('Error sending heartbeat:', error);
+            }
+        }, 60000);
     }
 
     /**
@@ -253,8 +562,7 @@ class TerminalPageHandler {
             this.elements.terminalPort.textContent = this.terminalInfo.port;
         }
 
-        // TODO: In production, establish WebSocket connection here
-        // this.connectToTerminal();
+        this.connectToTerminal();
     }
 
     /**
@@ -280,14 +588,11 @@ class TerminalPageHandler {
      * @param {string} data - Input data from terminal
      */
     handleTerminalInput(data) {
-        // For now, just log the data
-        // In production, this would send data to the backend via WebSocket
-        console.log('Terminal input:', data);
-
-        // TODO: Send data via WebSocket
-        // if (this.websocket && this.websocket.readyState === WebSocket.OPEN) {
-        //     this.websocket.send(data);
-        // }
+        this.inputSinceHeartbeat = true;
+
+        if (this.channelId !== null) {
+            this.mux.send(this.channelId, data);
+        }
     }
 
     /**
@@ -305,33 +610,31 @@ class TerminalPageHandler {
     }
 
     /**
-     * Connect to terminal via WebSocket (TODO)
+     * Connect to terminal via WebSocket
+     * The server relays frames to the terminal's socket-ssh container, on a channel of the page's websocket.
+     * Binary frames are preferred, JSON frames are the fallback (see terminal_protocol.py)
      */
     connectToTerminal() {
+        if (!this.terminalId) {
+            return;
+        }
         console.log('Connecting to terminal:', this.terminalInfo);
 
-        // TODO: Implement WebSocket connection
-        // This will establish WebSocket connection to the backend
-        // which will then connect to the SSH container
-
-        // Example structure:
-        // this.websocket = new WebSocket('wss://your-backend/terminal');
-        // 
-        // this.websocket.onopen = () => {
-        //     console.log('WebSocket connected');
-        // };
-        //
-        // this.websocket.onmessage = (event) => {
-        //     this.term.write(event.data);
-        // };
-        //
-        // this.websocket.onerror = (error) => {
-        //     console.error('WebSocket error:', error);
-        // };
-        //
-        // this.websocket.onclose = () => {
-        //     console.log('WebSocket disconnected');
-        // };
+        this.channelId = this.mux.open(this.terminalId, {
+            onSync: (seq, previousSeq) => {
+                if (previousSeq !== null && seq < previousSeq) {
+                    // A new session, its output starts over
+                    this.term.reset();
+                } else if (previousSeq !== null && seq > previousSeq) {
+                    this.writeColoredText('Some output was lost while disconnected.', 'yellow');
+                }
+            },
+            onData: (payload, done) => this.term.write(payload, done),
+            onClose: () => {
+                this.channelId = null;
+                this.writeColoredText('Disconnected from the terminal.', 'yellow');
+            }
+        });
     }
 
     /**
@@ -60,13 +60,33 @@ class TerminalsUtilities {
     };
 
     /**
-     * Simulate API call to fetch terminals
+     * Fetch terminals from the list_container API
      * @returns {Promise<Object>} Terminals data
      */
     static async fetchTerminals() {
         console.log('Fetching terminals...');
-        await new Promise(resolve => setTimeout(resolve, 1000));
-        return { terminals: TerminalsUtilities.DUMMY_TERMINALS };
+        const response = await fetch('/list_container', { credentials: 'same-origin' });
+        if (!response.ok) {
+            throw new Error(`Failed to fetch terminals: ${response.status}`);
+        }
+        const data = await response.json();
+        return { terminals: data.containers.map(TerminalsUtilities.toTerminal) };
+    }
+
+    /**
+     * Map a container response to the terminal shape used by the page
+     * @param {Object} container - ContainerResponseModel
+     * @returns {Object} Terminal data
+     */
+    static toTerminal(container) {
+        const port = container.container_ports.length > 0 ? container.container_ports[0].container_port : '';
+        return {
+            id: container.container_id,
+            name: container.container_name,
+            ipAddress: container.container_ip,
+            port: String(port),
+            status: container.container_ip ? 'running' : 'pending'
+        };
     }
 
     /**
@@ -453,29 +473,30 @@ class TerminalsHandler {
                 memory: parseInt(formData.get('memory'))
             };
 
-            // Get user data
-            const userData = await TerminalsUtilities.fetchUser();
+            console.log('Terminal Creation Data:', terminalData);
 
-            // Combine all data
-            const submissionData = {
-                terminal: terminalData,
-                user: userData.user,
-                timestamp: new Date().toISOString()
-            };
-
-            // Console log the data
-            console.log('Terminal Creation Data:', submissionData);
+            // Submit the creation job, the server answers with 202 and the job
+            const response = await fetch('/create_terminal', {
+                method: 'POST',
+                credentials: 'same-origin',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({})
+            });
+            if (response.status !== 202) {
+                throw new Error(`Failed to create terminal: ${response.status}`);
+            }
+            const job = await response.json();
 
-            // Show success notification
             TerminalsUtilities.showNotification(
-                'success',
-                'Terminal Created',
-                'Terminal creation data logged to console!',
-                4000
+                'info',
+                'Creating Terminal',
+                'Your terminal is being created...',
+                3000
             );
 
-            // Close modal
+            // Close modal and follow the job progress
             this.closeModal();
+            this.followCreationJob(job.job_id);
 
         } catch (error) {
             console.error('Error submitting form:', error);
@@ -488,6 +509,39 @@ class TerminalsHandler {
         }
     }
 
+    /**
+     * Follow the progress of a creation job over server-sent events
+     * @param {string} jobId - Creation job ID
+     */
+    followCreationJob(jobId) {
+        const events = new EventSource(`/creation_jobs/${jobId}/events`);
+        const statusMessages = {
+            queued: 'Waiting to start...',
+            cert_issued: 'Certificates issued...',
+            pod_scheduled: 'Containers scheduled...'
+        };
+
+        Object.keys(statusMessages).forEach(status => {
+            events.addEventListener(status, () => {
+                console.log(`Creation job ${jobId}: ${status}`);
+                TerminalsUtilities.showNotification('info', 'Creating Terminal', statusMessages[status], 2000);
+            });
+        });
+
+        events.addEventListener('ready', () => {
+            events.close();
+            TerminalsUtilities.showNotification('success', 'Terminal Created', 'Your terminal is ready!', 4000);
+            this.loadTerminals();
+        });
+
+        events.addEventListener('failed', (e) => {
+            events.close();
+            const job = JSON.parse(e.data);
+            console.error(`Creation job ${jobId} failed:`, job.error);
+            TerminalsUtilities.showNotification('error', 'Creation Failed', 'Terminal creation failed. Please try again.', 5000);
+        });
+    }
+
     /**
      * Show error message in UI
      * @param {string} message - Error message
@@ -0,0 +1,340 @@
+'''
+Fake ContainerMakerAPI server, for load testing the container path without a cluster.
+
+Implements createContainer, getContainer, listContainer and deleteContainer on in-memory state,
+with configurable latency and failures per method:
+    - latency: a distribution per method, see LatencyDistribution.parse.
+    - failures: a rate per method. Failed calls are aborted with failure_code (UNAVAILABLE by default)
+      after their latency, like a backend that gives up.
+    - readiness: containers report an ip only ready_delay seconds after their creation,
+      like pods that are still being scheduled.
+
+Behaves like container-maker where it matters to browseterm-server:
+    - container names carry a resource suffix (<container_name>-pod).
+    - creating a container whose name exists in the network returns the existing container.
+    - getting or deleting an unknown container fails with NOT_FOUND.
+
+Serves insecure or with mutual TLS, so GRPCUtils can connect in both modes.
+
+Standalone:
+    python -m tests.fakes.container_maker_server --port 50052 \
+        --latency createContainer=lognormal:0.8,0.5 --latency getContainer=uniform:0.005,0.02 \
+        --failure-rate createContainer=0.05 --ready-delay 2 --certs-dir ./fake-certs
+With --certs-dir, a CA, a server certificate for --host and a client certificate are generated into the directory.
+Point the app at the fake with CONTAINER_MAKER_HOST, CONTAINER_MAKER_PORT and the CONTAINER_MAKER_*_CRT/KEY
+variables set to the contents of ca.crt, client.crt and client.key.
+'''
+
+# builtins
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import time
+import uuid
+from typing import Any, Callable, Optional
+
+# third party
+import grpc
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+# grpc
+from container_maker_spec import service_pb2_grpc
+from container_maker_spec.types_pb2 import CreateContainerRequest
+from container_maker_spec.types_pb2 import GetContainerRequest
+from container_maker_spec.types_pb2 import ListContainerRequest
+from container_maker_spec.types_pb2 import ListContainerResponse
+from container_maker_spec.types_pb2 import DeleteContainerRequest
+from container_maker_spec.types_pb2 import DeleteContainerResponse
+from container_maker_spec.types_pb2 import ContainerResponse
+from container_maker_spec.types_pb2 import PortInformation
+
+# local
+from src.containers.certificate_authority import CertificateAuthority
+
+
+METHODS: tuple[str, ...] = ('createContainer', 'getContainer', 'listContainer', 'deleteContainer')
+
+
+class LatencyDistribution:
+    '''
+    Latency of a method, in seconds.
+    '''
+    def __init__(self, kind: str = 'fixed', params: tuple[float, ...] = (0.0,)) -> None:
+        self.kind: str = kind
+        self.params: tuple[float, ...] = params
+
+    @classmethod
+    def parse(cls, spec: str) -> 'LatencyDistribution':
+        '''
+        Parse a distribution:
+            fixed:<seconds>
+            uniform:<low>,<high>
+            normal:<mean>,<stddev>  (clamped at 0)
+            lognormal:<median>,<sigma>  (long tail, like real pod scheduling)
+            exponential:<mean>
+        '''
+        kind, _, params = spec.partition(':')
+        values: tuple[float, ...] = tuple(float(value) for value in params.split(',') if value)
+        expected: dict[str, int] = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2, 'exponential': 1}
+        if kind not in expected or len(values) != expected[kind]:
+            raise ValueError(f"Invalid latency distribution {spec}")
+        return cls(kind, values)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == 'fixed':
+            return self.params[0]
+        if self.kind == 'uniform':
+            return rng.uniform(*self.params)
+        if self.kind == 'normal':
+            return max(rng.gauss(*self.params), 0.0)
+        if self.kind == 'lognormal':
+            median, sigma = self.params
+            return rng.lognormvariate(0.0, sigma) * median
+        return rng.expovariate(1 / self.params[0])
+
+
+class FakeContainerMakerServicer(service_pb2_grpc.ContainerMakerAPIServicer):
+    '''
+    In-memory ContainerMakerAPI.
+    '''
+    def __init__(
+        self,
+        latency: dict[str, LatencyDistribution] | None = None,
+        failure_rate: dict[str, float] | None = None,
+        failure_code: grpc.StatusCode = grpc.StatusCode.UNAVAILABLE,
+        ready_delay: float = 0.0,
+        seed: int | None = None
+    ) -> None:
+        '''
+        Initialize the FakeContainerMakerServicer.
+        :params:
+            latency: Latency distribution by method name, methods not listed answer immediately.
+            failure_rate: Failure rate (0 to 1) by method name.
+            failure_code: Status code of injected failures.
+            ready_delay: Seconds after creation until a container reports its ip.
+            seed: Seed of latencies and failures, for reproducible runs.
+        '''
+        self.latency: dict[str, LatencyDistribution] = latency or {}
+        self.failure_rate: dict[str, float] = failure_rate or {}
+        self.failure_code: grpc.StatusCode = failure_code
+        self.ready_delay: float = ready_delay
+        self.rng: random.Random = random.Random(seed)
+        self.containers: dict[str, dict[str, ContainerResponse]] = {}  # network -> container id -> container
+        self.created_at: dict[str, float] = {}  # container id -> monotonic creation time
+        self.calls: dict[str, int] = {method: 0 for method in METHODS}
+
+    async def simulate(self, method: str, context: grpc.aio.ServicerContext) -> None:
+        '''
+        Wait for the latency of a call and fail it at the failure rate of its method.
+        '''
+        self.calls[method] += 1
+        distribution: LatencyDistribution | None = self.latency.get(method)
+        if distribution is not None:
+            await asyncio.sleep(distribution.sample(self.rng))
+        if self.rng.random() < self.failure_rate.get(method, 0.0):
+            await context.abort(self.failure_code, f"Injected {method} failure")
+
+    def view(self, container: ContainerResponse) -> ContainerResponse:
+        '''
+        The container as reported now: without ip until it is ready.
+        '''
+        reported: ContainerResponse = ContainerResponse()
+        reported.CopyFrom(container)
+        if time.monotonic() - self.created_at[container.container_id] < self.ready_delay:
+            reported.container_ip = ''
+        return reported
+
+    def find(self, network_name: str, container_id: str) -> Optional[ContainerResponse]:
+        return self.containers.get(network_name, {}).get(container_id)
+
+    async def createContainer(self, request: CreateContainerRequest, context: grpc.aio.ServicerContext) -> ContainerResponse:
+        await self.simulate('createContainer', context)
+        network: dict[str, ContainerResponse] = self.containers.setdefault(request.network_name, {})
+        resource_name: str = f"{request.container_name}-pod"
+        for container in network.values():
+            if container.container_name == resource_name:
+                return self.view(container)
+        container_id: str = str(uuid.uuid4())
+        count: int = sum(len(containers) for containers in self.containers.values())
+        container: ContainerResponse = ContainerResponse(
+            container_id=container_id,
+            container_name=resource_name,
+            container_ip=f"10.{(count >> 16) % 256}.{(count >> 8) % 256}.{count % 256}",
+            container_network=request.network_name,
+            ports=[
+                PortInformation(
+                    name=f"{request.container_name}-{publish_information.publish_port}",
+                    container_port=publish_information.publish_port,
+                    protocol=publish_information.protocol
+                )
+                for publish_information in request.publish_information
+            ]
+        )
+        network[container_id] = container
+        self.created_at[container_id] = time.monotonic()
+        return self.view(container)
+
+    async def getContainer(self, request: GetContainerRequest, context: grpc.aio.ServicerContext) -> ContainerResponse:
+        await self.simulate('getContainer', context)
+        container: ContainerResponse | None = self.find(request.network_name, request.container_id)
+        if container is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"Container {request.container_id} not found")
+        return self.view(container)
+
+    async def listContainer(self, request: ListContainerRequest, context: grpc.aio.ServicerContext) -> ListContainerResponse:
+        await self.simulate('listContainer', context)
+        return ListContainerResponse(
+            containers=[self.view(container) for container in self.containers.get(request.network_name, {}).values()]
+        )
+
+    async def deleteContainer(self, request: DeleteContainerRequest, context: grpc.aio.ServicerContext) -> DeleteContainerResponse:
+        await self.simulate('deleteContainer', context)
+        container: ContainerResponse | None = self.containers.get(request.network_name, {}).pop(request.container_id, None)
+        if container is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"Container {request.container_id} not found")
+        self.created_at.pop(request.container_id, None)
+        return DeleteContainerResponse(container_id=request.container_id, status='Deleted')
+
+
+class FakeContainerMakerServer:
+    '''
+    Runs a FakeContainerMakerServicer on a grpc.aio server.
+    '''
+    def __init__(
+        self,
+        servicer: FakeContainerMakerServicer | None = None,
+        host: str = 'localhost',
+        port: int = 0,
+        certificates: dict[str, bytes] | None = None
+    ) -> None:
+        '''
+        Initialize the FakeContainerMakerServer.
+        :params:
+            servicer: The servicer. Defaults to one without latency or failures.
+            host: The host to listen on.
+            port: The port to listen on, 0 picks a free one.
+            certificates: PEMs keyed ca.crt, server.crt and server.key for mutual TLS, insecure without.
+        '''
+        self.servicer: FakeContainerMakerServicer = servicer or FakeContainerMakerServicer()
+        self.host: str = host
+        self.port: int = port
+        self.certificates: dict[str, bytes] | None = certificates
+        self.server: grpc.aio.Server | None = None
+
+    async def start(self) -> int:
+        '''
+        Start serving.
+        :returns: The port the server listens on.
+        '''
+        self.server = grpc.aio.server()
+        service_pb2_grpc.add_ContainerMakerAPIServicer_to_server(self.servicer, self.server)
+        address: str = f"{self.host}:{self.port}"
+        if self.certificates is None:
+            self.port = self.server.add_insecure_port(address)
+        else:
+            credentials: grpc.ServerCredentials = grpc.ssl_server_credentials(
+                [(self.certificates['server.key'], self.certificates['server.crt'])],
+                root_certificates=self.certificates['ca.crt'],
+                require_client_auth=True
+            )
+            self.port = self.server.add_secure_port(address, credentials)
+        await self.server.start()
+        return self.port
+
+    async def stop(self, grace: float | None = None) -> None:
+        if self.server is not None:
+            await self.server.stop(grace)
+
+
+def generate_certificates(host: str = 'localhost') -> dict[str, bytes]:
+    '''
+    Generate a CA, a server certificate for host and a client certificate, for mutual TLS with the fake.
+    :returns: PEMs keyed ca.crt, server.crt, server.key, client.crt and client.key.
+    '''
+    ca_key: ec.EllipticCurvePrivateKey = ec.generate_private_key(ec.SECP256R1())
+    ca_name: x509.Name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'fake-container-maker-ca')])
+    now: datetime.datetime = datetime.datetime.now(datetime.timezone.utc)
+    ca_cert: x509.Certificate = (
+        x509.CertificateBuilder()
+        .subject_name(ca_name)
+        .issuer_name(ca_name)
+        .public_key(ca_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=30))
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(private_key=ca_key, algorithm=hashes.SHA256())
+    )
+    # sign with the same code that issues the socket-ssh certificates.
+    authority: CertificateAuthority = CertificateAuthority(validity_days=30)
+    authority.ca_cert, authority.ca_key = ca_cert, ca_key
+    authority.ca_cert_pem = ca_cert.public_bytes(serialization.Encoding.PEM)
+    server_key, server_cert = authority.sign(host, x509.oid.ExtendedKeyUsageOID.SERVER_AUTH, dns_names=[host])
+    client_key, client_cert = authority.sign(f"{host}-client", x509.oid.ExtendedKeyUsageOID.CLIENT_AUTH)
+    return {
+        'ca.crt': authority.ca_cert_pem,
+        'server.crt': server_cert,
+        'server.key': server_key,
+        'client.crt': client_cert,
+        'client.key': client_key,
+    }
+
+
+def parse_per_method(values: list[str], parse: Callable[[str], Any]) -> dict:
+    '''
+    Parse <method>=<value> arguments. A value without a method applies to every method.
+    '''
+    parsed: dict = {}
+    for value in values:
+        method, _, spec = value.rpartition('=')
+        for name in ([method] if method else METHODS):
+            if name not in METHODS:
+                raise ValueError(f"Unknown method {name}, expected one of {', '.join(METHODS)}")
+            parsed[name] = parse(spec)
+    return parsed
+
+
+async def serve(args: argparse.Namespace) -> None:
+    certificates: dict[str, bytes] | None = None
+    if args.certs_dir:
+        certificates = generate_certificates(args.host)
+        os.makedirs(args.certs_dir, exist_ok=True)
+        for name, pem in certificates.items():
+            with open(os.path.join(args.certs_dir, name), 'wb') as certificate_file:
+                certificate_file.write(pem)
+    servicer: FakeContainerMakerServicer = FakeContainerMakerServicer(
+        latency=parse_per_method(args.latency, LatencyDistribution.parse),
+        failure_rate=parse_per_method(args.failure_rate, float),
+        failure_code=grpc.StatusCode[args.failure_code],
+        ready_delay=args.ready_delay,
+        seed=args.seed
+    )
+    server: FakeContainerMakerServer = FakeContainerMakerServer(servicer, host=args.host, port=args.port, certificates=certificates)
+    port: int = await server.start()
+    print(f"Fake container-maker listening on {args.host}:{port} ({'mutual TLS' if certificates else 'insecure'})")
+    try:
+        await server.server.wait_for_termination()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=50052)
+    parser.add_argument('--latency', action='append', default=[], help='[<method>=]<distribution>, e.g. createContainer=lognormal:0.8,0.5')
+    parser.add_argument('--failure-rate', action='append', default=[], help='[<method>=]<rate>, e.g. createContainer=0.05')
+    parser.add_argument('--failure-code', default='UNAVAILABLE', choices=[code.name for code in grpc.StatusCode])
+    parser.add_argument('--ready-delay', type=float, default=0.0, help='seconds until created containers report an ip')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--certs-dir', default=None, help='generate certificates into this directory and serve with mutual TLS')
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
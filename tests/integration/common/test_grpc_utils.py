@@ -0,0 +1,155 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import patch
+import asyncio
+import json
+
+# third party
+import grpc
+
+# grpc
+from container_maker_spec import service_pb2_grpc
+from container_maker_spec.types_pb2 import CreateContainerRequest
+from container_maker_spec.types_pb2 import GetContainerRequest
+
+# utils
+from src.common.grpc_utils import GRPCUtils, GuardedStub
+from src.containers.containers_service import container_maker_guard, container_maker_service_config
+
+# fakes
+from tests.fakes.container_maker_server import FakeContainerMakerServer
+from tests.fakes.container_maker_server import FakeContainerMakerServicer
+from tests.fakes.container_maker_server import LatencyDistribution
+
+
+class TestGRPCUtilsOptions(TestCase):
+    '''
+    Test the channel options and service config passed to GRPC.
+    '''
+    def test_default_options_are_empty(self) -> None:
+        '''
+        Test that a channel without service config or keepalive gets no options.
+        '''
+        grpc_utils: GRPCUtils = GRPCUtils('localhost', 50052, service_pb2_grpc.ContainerMakerAPIStub, secure=False)
+
+        self.assertEqual(grpc_utils.options, [])
+
+    def test_options(self) -> None:
+        '''
+        Test that the service config is serialized with retries enabled, and that keepalive pings idle connections.
+        '''
+        service_config: dict = {'methodConfig': []}
+        grpc_utils: GRPCUtils = GRPCUtils(
+            'localhost', 50052, service_pb2_grpc.ContainerMakerAPIStub, secure=False,
+            service_config=service_config, keepalive_time_ms=30000, keepalive_timeout_ms=10000
+        )
+
+        options: dict = dict(grpc_utils.options)
+
+        self.assertEqual(json.loads(options['grpc.service_config']), service_config)
+        self.assertEqual(options['grpc.enable_retries'], 1)
+        self.assertEqual(options['grpc.keepalive_time_ms'], 30000)
+        self.assertEqual(options['grpc.keepalive_timeout_ms'], 10000)
+        self.assertEqual(options['grpc.keepalive_permit_without_calls'], 1)
+        self.assertEqual(options['grpc.http2.max_pings_without_data'], 0)
+
+    def test_container_maker_service_config(self) -> None:
+        '''
+        Test that every method has its deadline, and that only getContainer and listContainer are retried.
+        '''
+        with (
+            patch('src.containers.containers_service.CONTAINER_MAKER_CREATE_CONTAINER_TIMEOUT', 120.0),
+            patch('src.containers.containers_service.CONTAINER_MAKER_GET_CONTAINER_TIMEOUT', 10.0),
+            patch('src.containers.containers_service.CONTAINER_MAKER_RETRY_MAX_ATTEMPTS', 3),
+        ):
+            service_config: dict = json.loads(json.dumps(container_maker_service_config()))
+
+        method_configs: dict = {
+            method_config['name'][0]['method']: method_config for method_config in service_config['methodConfig']
+        }
+        self.assertEqual(set(method_configs), {'createContainer', 'getContainer', 'listContainer', 'deleteContainer'})
+        for method, method_config in method_configs.items():
+            self.assertEqual(method_config['name'], [{'service': 'container_maker_spec.ContainerMakerAPI', 'method': method}])
+        self.assertEqual(method_configs['createContainer']['timeout'], '120.0s')
+        self.assertEqual(method_configs['getContainer']['timeout'], '10.0s')
+        self.assertNotIn('retryPolicy', method_configs['createContainer'])
+        self.assertNotIn('retryPolicy', method_configs['deleteContainer'])
+        retry_policy: dict = {
+            'maxAttempts': 3,
+            'initialBackoff': '0.1s',
+            'maxBackoff': '1.0s',
+            'backoffMultiplier': 2.0,
+            'retryableStatusCodes': ['UNAVAILABLE'],
+        }
+        self.assertEqual(method_configs['getContainer']['retryPolicy'], retry_policy)
+        self.assertEqual(method_configs['listContainer']['retryPolicy'], retry_policy)
+
+
+class TestGRPCUtilsAsync(TestCase):
+    '''
+    Test the asyncio channel and stub of GRPCUtils against an in-process, insecure fake container-maker.
+    '''
+    def setUp(self) -> None:
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.servicer: FakeContainerMakerServicer = FakeContainerMakerServicer(
+            latency={'getContainer': LatencyDistribution.parse('fixed:0.05')}
+        )
+        self.server: FakeContainerMakerServer = FakeContainerMakerServer(self.servicer)
+        self.grpc_utils: GRPCUtils = GRPCUtils('localhost', 0, service_pb2_grpc.ContainerMakerAPIStub, secure=False)
+
+    def tearDown(self) -> None:
+        self.loop.run_until_complete(self.grpc_utils.close())
+        self.loop.run_until_complete(self.server.stop())
+        self.loop.close()
+
+    def test_async_stub_awaits_rpcs(self) -> None:
+        '''
+        Test that RPCs on the asyncio stub are awaited without blocking the event loop,
+        and that the channel and stub are created once.
+        '''
+        async def calls() -> int:
+            self.grpc_utils.port = await self.server.start()
+            self.assertIsInstance(self.grpc_utils.async_channel, grpc.aio.Channel)
+            self.assertIs(self.grpc_utils.async_channel, self.grpc_utils.async_channel)
+            self.assertIs(self.grpc_utils.async_stub, self.grpc_utils.async_stub)
+            stub: GuardedStub = GuardedStub(self.grpc_utils.async_stub, container_maker_guard())
+            created = await stub.createContainer(CreateContainerRequest(container_name='terminal', network_name='browseterm'))
+
+            ticks: int = 0
+
+            async def tick() -> None:
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.005)
+
+            ticker: asyncio.Task = asyncio.create_task(tick())
+            fetched = await stub.getContainer(GetContainerRequest(container_id=created.container_id, network_name='browseterm'))
+            ticker.cancel()
+            self.assertEqual(fetched.container_id, created.container_id)
+            return ticks
+
+        ticks: int = self.loop.run_until_complete(calls())
+
+        # the loop kept running while getContainer was in flight.
+        self.assertGreater(ticks, 1)
+        self.assertEqual(self.servicer.calls['getContainer'], 1)
+
+    def test_close_resets_the_async_channel(self) -> None:
+        '''
+        Test that closing drops the asyncio channel and stub, and that the next use opens a new channel.
+        '''
+        async def reopen() -> None:
+            self.grpc_utils.port = await self.server.start()
+            channel: grpc.aio.Channel = self.grpc_utils.async_channel
+            await self.grpc_utils.close()
+            self.assertIsNone(self.grpc_utils._async_channel)
+            self.assertIsNone(self.grpc_utils._async_stub)
+            self.assertIsNot(self.grpc_utils.async_channel, channel)
+            created = await self.grpc_utils.async_stub.createContainer(
+                CreateContainerRequest(container_name='terminal', network_name='browseterm')
+            )
+            self.assertEqual(created.container_name, 'terminal-pod')
+
+        self.loop.run_until_complete(reopen())
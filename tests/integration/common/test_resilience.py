@@ -0,0 +1,125 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import patch
+import asyncio
+
+# local
+from src.common.resilience import AIMDLimit, CircuitBreaker, CircuitOpenError, CircuitState
+from src.common.resilience import ConcurrencyLimitError, ResilienceGuard
+
+
+class BackendError(Exception):
+    pass
+
+
+class TestResilienceGuard(TestCase):
+    '''
+    Test the circuit breaker and the adaptive concurrency limit through a ResilienceGuard.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Setup a guard that opens after 2 failures out of 4 calls.
+        '''
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        self.breaker: CircuitBreaker = CircuitBreaker(
+            name='test-backend', window=60, min_calls=4, error_rate=0.5, open_duration=10
+        )
+        self.limit: AIMDLimit = AIMDLimit(
+            name='test-backend', initial_limit=2, min_limit=1, max_limit=10,
+            backoff_ratio=0.5, latency_tolerance=2.0, queue_timeout=0.01
+        )
+        self.guard: ResilienceGuard = ResilienceGuard(
+            self.breaker, self.limit, is_failure=lambda e: isinstance(e, BackendError)
+        )
+
+    def tearDown(self) -> None:
+        '''
+        Close event loop.
+        '''
+        self.loop.close()
+
+    def call(self, result: object = None, error: Exception | None = None) -> object:
+        async def backend() -> object:
+            if error is not None:
+                raise error
+            return result
+
+        return self.loop.run_until_complete(self.guard.call('method', backend))
+
+    def test_breaker_opens_and_recovers(self) -> None:
+        '''
+        Test that the breaker opens on a high error rate, fails fast, then closes after a successful probe.
+        '''
+        for _ in range(2):
+            self.call(result='ok')
+        for _ in range(2):
+            with self.assertRaises(BackendError):
+                self.call(error=BackendError())
+        self.assertEqual(self.breaker.state, CircuitState.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.call(result='ok')
+
+        with patch('src.common.resilience.time.monotonic', return_value=self.breaker.opened_at + 11):
+            self.assertEqual(self.call(result='ok'), 'ok')
+        self.assertEqual(self.breaker.state, CircuitState.CLOSED)
+
+    def test_request_errors_do_not_open_the_breaker(self) -> None:
+        '''
+        Test that errors of the request itself are not counted as backend failures.
+        '''
+        for _ in range(4):
+            with self.assertRaises(ValueError):
+                self.call(error=ValueError())
+        self.assertEqual(self.breaker.state, CircuitState.CLOSED)
+
+    def test_limit_decreases_on_failure_and_rejects_when_full(self) -> None:
+        '''
+        Test multiplicative decrease, additive increase and rejection at the limit.
+        '''
+        with self.assertRaises(BackendError):
+            self.call(error=BackendError())
+        self.assertEqual(self.limit.limit, 1)
+        self.call(result='ok')
+        self.assertEqual(self.limit.limit, 2)
+
+        async def hold_slots() -> None:
+            release: asyncio.Event = asyncio.Event()
+            holders: list[asyncio.Task] = [
+                asyncio.create_task(self.guard.call('method', release.wait)) for _ in range(2)
+            ]
+            await asyncio.sleep(0)
+            try:
+                with self.assertRaises(ConcurrencyLimitError):
+                    await self.guard.call('method', release.wait)
+            finally:
+                release.set()
+                await asyncio.gather(*holders)
+
+        self.loop.run_until_complete(hold_slots())
+        self.assertEqual(self.limit.in_flight, 0)
+
+    def test_cancelled_probe_frees_the_probe(self) -> None:
+        '''
+        Test that a half open probe cancelled while it waits for a slot lets the next caller probe.
+        '''
+        self.breaker.set_state(CircuitState.HALF_OPEN)
+        self.limit.in_flight = int(self.limit.limit)
+        self.limit.queue_timeout = 10
+
+        async def cancel_probe() -> None:
+            probe: asyncio.Task = asyncio.create_task(self.guard.call('method', asyncio.Event().wait))
+            await asyncio.sleep(0.01)
+            self.assertTrue(self.breaker.probing)
+            probe.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await probe
+
+        self.loop.run_until_complete(cancel_probe())
+        self.assertFalse(self.breaker.probing)
+
+        self.limit.in_flight = 0
+        self.assertEqual(self.call(result='ok'), 'ok')
+        self.assertEqual(self.breaker.state, CircuitState.CLOSED)
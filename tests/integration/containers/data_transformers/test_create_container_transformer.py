@@ -1,5 +1,6 @@
 # builtins
 from unittest import TestCase
+from unittest.mock import patch
 
 # grpc
 from container_maker_spec.types_pb2 import CreateContainerRequest
@@ -9,6 +10,7 @@ from container_maker_spec.types_pb2 import PortInformation as GRPCPortInformatio
 
 # pydantic BaseModel(s)
 from src.containers.dto.create_container_dto import CreateContainerModel
+from src.containers.dto.secret_mount_dto import SecretMountModel
 from src.containers.enum.exposure_level_enum import ExposureLevel as BaseModelExposureLevel
 from src.containers.dto.container_response_dto import ContainerResponseModel
 # data transformer
@@ -101,6 +103,29 @@ class TestCreateContainerTransformer(TestCase):
         output_data_empty_env: CreateContainerRequest = CreateContainerInputDataTransformer.transform(emtpy_env_input_data)
         self.assertEqual(output_data_empty_env.environment_variables, {})
 
+    def test_transform_secret_mounts(self) -> None:
+        input_data: CreateContainerModel = self.input_data.model_copy(update={
+            'secret_mounts': [SecretMountModel(secret_name='test-certs', environment_variables={'SERVER_KEY': 'server.key'})]
+        })
+        if not CreateContainerInputDataTransformer.supports_secret_mounts():
+            # the generated spec predates secret mounts: the request cannot be built.
+            with self.assertRaises(ValueError):
+                CreateContainerInputDataTransformer.transform(input_data)
+            return
+
+        output_data: CreateContainerRequest = CreateContainerInputDataTransformer.transform(input_data)
+
+        self.assertEqual(output_data.secret_mounts[0].secret_name, 'test-certs')
+        self.assertEqual(dict(output_data.secret_mounts[0].environment_variables), {'SERVER_KEY': 'server.key'})
+
+    @patch.object(CreateContainerInputDataTransformer, 'supports_secret_mounts', return_value=False)
+    def test_transform_secret_mounts_unsupported(self, _) -> None:
+        input_data: CreateContainerModel = self.input_data.model_copy(update={
+            'secret_mounts': [SecretMountModel(secret_name='test-certs')]
+        })
+        with self.assertRaises(ValueError):
+            CreateContainerInputDataTransformer.transform(input_data)
+
     def test_transform_container_response_to_container_response_model(self) -> None:
         # transform
         output_data: ContainerResponseModel = CreateContainerOutputDataTransformer.transform(self.output_data)
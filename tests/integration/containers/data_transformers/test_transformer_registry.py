@@ -0,0 +1,74 @@
+from unittest import TestCase
+import json
+
+# third party
+from pydantic import BaseModel, ValidationError
+
+# grpc types
+from container_maker_spec.types_pb2 import ContainerResponse
+from container_maker_spec.types_pb2 import ListContainerResponse
+from container_maker_spec.types_pb2 import PortInformation as GRPCPortInformation
+
+# dto
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.list_container_response_dto import ListContainerResponseModel
+from src.containers.dto.port_information_dto import PortInformationModel
+
+# registry
+from src.containers.data_transformers.registry import CONTAINER_RESPONSE, LIST_CONTAINER_RESPONSE, TransformerRegistry
+
+
+class TestTransformerRegistry(TestCase):
+    '''
+    Test the message mappings of the transformer registry.
+    '''
+    def setUp(self) -> None:
+        self.list_container_response: ListContainerResponse = ListContainerResponse(
+            containers=[
+                ContainerResponse(
+                    container_id=str(i),
+                    container_name=f'test-container-{i}',
+                    container_ip='127.0.0.1',
+                    container_network='test-network',
+                    ports=[GRPCPortInformation(name='test-port', container_port=8080, protocol='TCP')]
+                ) for i in range(3)
+            ]
+        )
+
+    def test_model_and_json_paths_agree(self) -> None:
+        '''
+        Test that the model path builds nested models and the JSON path encodes the same JSON.
+        '''
+        container_list: ListContainerResponseModel = LIST_CONTAINER_RESPONSE.to_model(self.list_container_response)
+
+        self.assertIsInstance(container_list.containers[0], ContainerResponseModel)
+        self.assertIsInstance(container_list.containers[0].container_ports[0], PortInformationModel)
+        self.assertEqual([container.container_id for container in container_list.containers], ['0', '1', '2'])
+        self.assertEqual(LIST_CONTAINER_RESPONSE.to_json(self.list_container_response), container_list.model_dump_json().encode())
+        self.assertEqual(
+            json.loads(CONTAINER_RESPONSE.to_json(self.list_container_response.containers[1]))['container_ports'],
+            [{'name': 'test-port', 'container_port': 8080, 'protocol': 'TCP'}]
+        )
+
+    def test_to_model_validates(self) -> None:
+        '''
+        Test that values not matching the model are rejected.
+        '''
+        class StrictPortModel(BaseModel):
+            name: str
+            container_port: str
+
+        mapping = TransformerRegistry.register(GRPCPortInformation, StrictPortModel)
+        try:
+            with self.assertRaises(ValidationError):
+                mapping.to_model(GRPCPortInformation(name='test-port', container_port=8080))
+        finally:
+            # restore the port mapping the container mappings were derived from.
+            TransformerRegistry.register(GRPCPortInformation, PortInformationModel)
+
+    def test_register_rejects_unknown_fields(self) -> None:
+        '''
+        Test that a model field without a message field fails when the mapping is derived.
+        '''
+        with self.assertRaises(ValueError):
+            TransformerRegistry.register(ContainerResponse, ContainerResponseModel)  # container_ports is named ports
@@ -0,0 +1,106 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import patch
+import asyncio
+
+# local
+from src.containers.admission import AdmissionController, AdmissionRejectedError, AdmissionTicket
+
+
+class TestAdmissionController(TestCase):
+    '''
+    Test the tiered admission of container creations.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Setup a controller running one creation at once, with free creations queued after paid ones.
+        '''
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        self.patches = [
+            patch('src.containers.admission.ADMISSION_TIER_PRIORITIES', {'free': 1, 'pro': 0}),
+            patch('src.containers.admission.ADMISSION_USER_LIMITS', {'free': 1}),
+            patch('src.containers.admission.ADMISSION_QUEUE_TIMEOUTS', {'free': 0.05}),
+        ]
+        for p in self.patches:
+            p.start()
+        self.controller: AdmissionController = AdmissionController(max_in_flight=1, max_queue=2)
+
+    def tearDown(self) -> None:
+        '''
+        Stop patches and close event loop.
+        '''
+        for p in self.patches:
+            p.stop()
+        self.loop.close()
+
+    def test_paid_creations_are_admitted_first(self) -> None:
+        '''
+        Test that a waiting pro creation is admitted before a free one that arrived earlier.
+        '''
+        admitted: list[str] = []
+
+        async def create(ticket: AdmissionTicket, name: str) -> None:
+            async with self.controller.admitted(ticket):
+                admitted.append(name)
+                await asyncio.sleep(0)
+
+        async def run() -> None:
+            running: AdmissionTicket = self.controller.reserve('user-1', 'pro')
+            await self.controller.admit(running)
+            free: asyncio.Task = asyncio.ensure_future(create(self.controller.reserve('user-2', 'free'), 'free'))
+            pro: asyncio.Task = asyncio.ensure_future(create(self.controller.reserve('user-3', 'pro'), 'pro'))
+            await asyncio.sleep(0)
+            self.assertEqual(self.controller.waiting, 2)
+            self.controller.release(running)
+            await asyncio.gather(free, pro)
+
+        self.loop.run_until_complete(run())
+
+        self.assertEqual(admitted, ['pro', 'free'])
+        self.assertEqual(self.controller.in_flight, 0)
+        self.assertEqual(self.controller.user_load, {})
+
+    def test_rejects_beyond_user_limit_and_queue(self) -> None:
+        '''
+        Test that reservations beyond the user limit or the queue length are rejected with a Retry-After.
+        '''
+        async def run() -> None:
+            running: AdmissionTicket = self.controller.reserve('user-1', 'pro')
+            await self.controller.admit(running)
+            self.controller.reserve('user-2', 'free')
+            with self.assertRaises(AdmissionRejectedError) as context:
+                self.controller.reserve('user-2', 'free')
+            self.assertGreaterEqual(context.exception.retry_after, 1)
+
+            waiters: list[asyncio.Task] = [
+                asyncio.ensure_future(self.controller.admit(self.controller.reserve(f'user-{i}', 'pro'))) for i in (3, 4)
+            ]
+            await asyncio.sleep(0)
+            with self.assertRaises(AdmissionRejectedError):
+                self.controller.reserve('user-5', 'pro')
+            for waiter in waiters:
+                waiter.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+
+        self.loop.run_until_complete(run())
+
+    def test_queue_timeout(self) -> None:
+        '''
+        Test that a creation not admitted within its tier's queue timeout fails and gives its reservation back.
+        '''
+        async def run() -> None:
+            running: AdmissionTicket = self.controller.reserve('user-1', 'pro')
+            await self.controller.admit(running)
+            with self.assertRaises(AdmissionRejectedError):
+                async with self.controller.admitted(self.controller.reserve('user-2', 'free')):
+                    self.fail("The creation must not run")
+            self.assertNotIn('user-2', self.controller.user_load)
+            self.assertEqual(self.controller.waiting, 0)
+            self.controller.release(running)
+
+        self.loop.run_until_complete(run())
+
+        self.assertEqual(self.controller.in_flight, 0)
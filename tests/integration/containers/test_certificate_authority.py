@@ -0,0 +1,122 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import patch, AsyncMock, MagicMock
+import asyncio
+import base64
+import datetime
+
+# third party
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+
+# local
+from src.containers.certificate_authority import CertificateAuthority, CertificateAuthorityError
+
+
+class TestCertificateAuthority(TestCase):
+    '''
+    Test in-process certificate issuance with a CA generated for the test.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Generate a self signed CA and the secret data holding it.
+        '''
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.ca_key: ec.EllipticCurvePrivateKey = ec.generate_private_key(ec.SECP256R1())
+        ca_name: x509.Name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'test-ca')])
+        now: datetime.datetime = datetime.datetime.now(datetime.timezone.utc)
+        self.ca_cert: x509.Certificate = (
+            x509.CertificateBuilder()
+            .subject_name(ca_name)
+            .issuer_name(ca_name)
+            .public_key(self.ca_key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now)
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(self.ca_key, hashes.SHA256())
+        )
+        self.ca_secret_data: dict = {
+            'ca.crt': base64.b64encode(self.ca_cert.public_bytes(serialization.Encoding.PEM)).decode('utf-8'),
+            'ca.key': base64.b64encode(self.ca_key.private_bytes(
+                serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+            )).decode('utf-8'),
+        }
+        self.service_name: str = 'socket-ssh-test-service'
+
+    def tearDown(self) -> None:
+        '''
+        Close event loop.
+        '''
+        self.loop.close()
+
+    @patch('src.containers.certificate_authority.CertificateUtils')
+    def test_issue(self, mock_certificate_utils: MagicMock) -> None:
+        '''
+        Test that the server and client certificates are signed by the CA.
+        '''
+        mock_certificate_utils.read_certificate_from_secret = AsyncMock(return_value=self.ca_secret_data)
+        certificate_authority: CertificateAuthority = CertificateAuthority(ca_secret_name='test-ca-secret')
+
+        self.loop.run_until_complete(certificate_authority.load_ca())
+        data: dict = certificate_authority.issue(self.service_name)
+
+        self.assertEqual(set(data.keys()), {'server.key', 'server.crt', 'client.key', 'client.crt', 'ca.crt'})
+        self.assertEqual(data['ca.crt'], self.ca_secret_data['ca.crt'])
+        server_cert: x509.Certificate = x509.load_pem_x509_certificate(base64.b64decode(data['server.crt']))
+        client_cert: x509.Certificate = x509.load_pem_x509_certificate(base64.b64decode(data['client.crt']))
+        for cert in (server_cert, client_cert):
+            cert.verify_directly_issued_by(self.ca_cert)
+        san: x509.SubjectAlternativeName = server_cert.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
+        self.assertIn(self.service_name, san.get_values_for_type(x509.DNSName))
+        eku: x509.ExtendedKeyUsage = client_cert.extensions.get_extension_for_class(x509.ExtendedKeyUsage).value
+        self.assertIn(ExtendedKeyUsageOID.CLIENT_AUTH, list(eku))
+        # the server key matches the server certificate
+        server_key = serialization.load_pem_private_key(base64.b64decode(data['server.key']), password=None)
+        self.assertEqual(server_key.public_key(), server_cert.public_key())
+
+    @patch('src.containers.certificate_authority.CertificateUtils')
+    def test_ca_is_loaded_once(self, mock_certificate_utils: MagicMock) -> None:
+        '''
+        Test that the CA secret is read only once.
+        '''
+        mock_certificate_utils.read_certificate_from_secret = AsyncMock(return_value=self.ca_secret_data)
+        certificate_authority: CertificateAuthority = CertificateAuthority(ca_secret_name='test-ca-secret')
+
+        for service_name in ('service-a', 'service-b'):
+            self.loop.run_until_complete(certificate_authority.load_ca())
+            certificate_authority.issue(service_name)
+
+        mock_certificate_utils.read_certificate_from_secret.assert_awaited_once_with('test-ca-secret')
+
+    @patch('src.containers.certificate_authority.CertificateUtils')
+    def test_incomplete_ca_secret(self, mock_certificate_utils: MagicMock) -> None:
+        '''
+        Test that a CA secret without a key raises CertificateAuthorityError.
+        '''
+        mock_certificate_utils.read_certificate_from_secret = AsyncMock(return_value={'ca.crt': self.ca_secret_data['ca.crt']})
+        certificate_authority: CertificateAuthority = CertificateAuthority(ca_secret_name='test-ca-secret')
+
+        with self.assertRaises(CertificateAuthorityError):
+            self.loop.run_until_complete(certificate_authority.load_ca())
+
+    @patch('src.containers.certificate_authority.CertificateUtils')
+    def test_invalid_ca_secret(self, mock_certificate_utils: MagicMock) -> None:
+        '''
+        Test that a CA secret that cannot be decoded raises CertificateAuthorityError and is not cached.
+        '''
+        mock_certificate_utils.read_certificate_from_secret = AsyncMock(return_value={
+            'ca.crt': self.ca_secret_data['ca.crt'], 'ca.key': base64.b64encode(b'not a key').decode('utf-8')
+        })
+        certificate_authority: CertificateAuthority = CertificateAuthority(ca_secret_name='test-ca-secret')
+
+        for _ in range(2):
+            with self.assertRaises(CertificateAuthorityError):
+                self.loop.run_until_complete(certificate_authority.load_ca())
+
+        self.assertIsNone(certificate_authority.ca_cert)
+        self.assertEqual(mock_certificate_utils.read_certificate_from_secret.await_count, 2)
@@ -0,0 +1,74 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+import json
+import time
+
+# local
+from src.containers.certificate_pool import CertificatePoolManager
+from src.common.config import CERT_POOL_MAX_AGE
+
+
+class TestCertificatePoolManager(TestCase):
+    '''
+    Test CertificatePoolManager with a mocked asyncio Redis client and certificate jobs.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Setup the manager with an empty pool.
+        '''
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        self.redis_client: MagicMock = MagicMock()
+        self.redis_client.llen = AsyncMock(return_value=0)
+        self.redis_client.rpush = AsyncMock()
+        self.manager: CertificatePoolManager = CertificatePoolManager(
+            redis_client=self.redis_client, size=5, batch_size=2
+        )
+
+    def tearDown(self) -> None:
+        '''
+        Close event loop.
+        '''
+        self.loop.close()
+
+    def test_refill_issues_in_batches(self) -> None:
+        '''
+        Test that the deficit is issued in jobs of batch_size services.
+        '''
+        async def refill_and_wait() -> None:
+            await self.manager.refill()
+            await asyncio.gather(*self.manager.tasks)
+
+        with patch('src.containers.certificate_pool.CertificateUtils.create_certificate_job', new=AsyncMock()) as create_job:
+            self.loop.run_until_complete(refill_and_wait())
+
+        batch_sizes: list[int] = [len(call.args[0].split(',')) for call in create_job.await_args_list]
+        self.assertEqual(sorted(batch_sizes), [1, 2, 2])
+        pushed: int = sum(len(call.args) - 1 for call in self.redis_client.rpush.await_args_list)
+        self.assertEqual(pushed, 5)
+        self.assertEqual(self.manager.issuing, 0)
+
+    def test_acquire_skips_expired(self) -> None:
+        '''
+        Test that expired certificates are deleted and the next fresh one is handed out.
+        '''
+        entries: list[str] = [
+            json.dumps({'terminal_id': 'old', 'issued_at': time.time() - CERT_POOL_MAX_AGE - 1}),
+            json.dumps({'terminal_id': 'fresh', 'issued_at': time.time()}),
+        ]
+        self.redis_client.lpop = AsyncMock(side_effect=entries)
+
+        async def acquire_and_wait() -> str | None:
+            terminal_id: str | None = await self.manager.acquire()
+            await asyncio.gather(*self.manager.tasks)
+            return terminal_id
+
+        with patch('src.containers.certificate_pool.CertificateUtils.delete_secrets', new=AsyncMock()) as delete_secrets:
+            terminal_id: str | None = self.loop.run_until_complete(acquire_and_wait())
+
+        self.assertEqual(terminal_id, 'fresh')
+        delete_secrets.assert_awaited_once_with(['socket-ssh-old-service-certs'])
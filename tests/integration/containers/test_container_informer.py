@@ -0,0 +1,118 @@
+# builtins
+from unittest import TestCase
+import asyncio
+
+# kubernetes
+from kubernetes_asyncio import client
+
+# local
+from src.containers.container_informer import ContainerInformer
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.enum.container_status_enum import ContainerStatus
+
+
+class TestContainerInformer(TestCase):
+    '''
+    Test the ContainerInformer index, fed with list results and watch events directly.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Setup a synced informer with one ready container registered for a user.
+        '''
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        self.informer: ContainerInformer = ContainerInformer(namespace='browseterm-test')
+        self.container: ContainerResponseModel = ContainerResponseModel(
+            container_id='1',
+            container_name='ssh-abc',
+            container_ip='10.0.0.1',
+            container_network='browseterm-test',
+            container_ports=[]
+        )
+        self.informer.replace('pod', [self.pod('ssh-abc-pod', ready=True)])
+        self.informer.replace('service', [client.V1Service(metadata=client.V1ObjectMeta(name='ssh-abc-service'))])
+        self.informer.register('user', self.container)
+
+    def tearDown(self) -> None:
+        '''
+        Close event loop.
+        '''
+        self.loop.close()
+
+    @staticmethod
+    def pod(name: str, ready: bool) -> client.V1Pod:
+        return client.V1Pod(
+            metadata=client.V1ObjectMeta(name=name),
+            status=client.V1PodStatus(
+                phase='Running',
+                conditions=[client.V1PodCondition(type='Ready', status='True' if ready else 'False')]
+            )
+        )
+
+    def test_get_and_list(self) -> None:
+        '''
+        Test that registered containers are served to their owner only.
+        '''
+        self.assertEqual(self.informer.get('user', '1'), self.container)
+        self.assertEqual(self.informer.list('user', 'browseterm-test').containers, [self.container])
+        self.assertIsNone(self.informer.get('other-user', '1'))
+        self.assertIsNone(self.informer.list('other-user', 'browseterm-test'))
+        self.assertIsNone(self.informer.list('user', 'other-network'))
+
+    def test_list_needs_every_owned_container(self) -> None:
+        '''
+        Test that the index does not answer for containers it never indexed, e.g. created through another pod.
+        '''
+        self.assertEqual(self.informer.list('user', 'browseterm-test', container_ids={'1'}).containers, [self.container])
+        self.assertIsNone(self.informer.list('user', 'browseterm-test', container_ids={'1', '2'}))
+
+    def test_update_records_no_owner(self) -> None:
+        '''
+        Test that updates refresh registered containers only.
+        '''
+        refreshed: ContainerResponseModel = self.container.model_copy(update={'container_ip': '10.0.0.2'})
+        self.informer.update(refreshed)
+        self.informer.update(self.container.model_copy(update={'container_id': '2'}))
+
+        self.assertEqual(self.informer.get('user', '1'), refreshed)
+        self.assertNotIn('2', self.informer.containers)
+        self.assertEqual(self.informer.owners, {'user': {'1'}})
+
+    def test_deleted_pod_is_gone(self) -> None:
+        '''
+        Test that a DELETED event removes the container from lookups.
+        '''
+        self.informer.apply('pod', 'DELETED', self.pod('ssh-abc-pod', ready=True))
+
+        self.assertEqual(self.informer.status('ssh-abc'), ContainerStatus.GONE)
+        self.assertIsNone(self.informer.get('user', '1'))
+        self.assertEqual(self.informer.list('user', 'browseterm-test').containers, [])
+
+    def test_not_synced(self) -> None:
+        '''
+        Test that an informer that has not listed both kinds does not answer.
+        '''
+        self.informer.synced_kinds.discard('service')
+
+        self.assertIsNone(self.informer.get('user', '1'))
+        self.assertIsNone(self.informer.list('user', 'browseterm-test'))
+
+    def test_wait_until_ready(self) -> None:
+        '''
+        Test that waiters wake up when a watch event marks the pod ready.
+        '''
+        self.informer.apply('pod', 'ADDED', self.pod('ssh-def-pod', ready=False))
+        self.assertEqual(self.informer.status('ssh-def'), ContainerStatus.RUNNING)
+
+        async def become_ready() -> None:
+            await asyncio.sleep(0)
+            self.informer.apply('pod', 'MODIFIED', self.pod('ssh-def-pod', ready=True))
+
+        async def wait() -> bool:
+            ready, _ = await asyncio.gather(self.informer.wait_until_ready('ssh-def', timeout=1), become_ready())
+            return ready
+
+        self.assertTrue(self.loop.run_until_complete(wait()))
+        self.assertFalse(self.loop.run_until_complete(self.informer.wait_until_ready('ssh-xyz', timeout=0.01)))
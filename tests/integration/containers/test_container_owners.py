@@ -0,0 +1,187 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+import os
+
+# local
+from src.common.config import CONTAINER_MAKER_CLIENT_CERT_ENV_VAR
+from src.common.config import CONTAINER_MAKER_CLIENT_KEY_ENV_VAR
+from src.common.config import CONTAINER_MAKER_CA_ENV_VAR
+from src.containers.container_informer import ContainerInformer
+from src.containers.container_owners import ContainerOwners
+from src.containers.containers_service import ContainerMakerClient, ContainerNotFoundError
+from src.containers.dto.create_container_dto import CreateContainerModel
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.delete_container_dto import DeleteContainerDataModel
+from src.containers.dto.get_container_dto import GetContainerDataModel
+from src.containers.dto.list_container_dto import ListContainerDataModel
+from src.containers.dto.list_container_response_dto import ListContainerResponseModel
+from src.containers.enum.exposure_level_enum import ExposureLevel
+from tests.fakes.container_maker_server import FakeContainerMakerServer, generate_certificates
+
+
+class FakeRedisSets:
+    '''
+    The Redis set commands ContainerOwners uses, in memory.
+    '''
+    def __init__(self) -> None:
+        self.sets: dict[str, set[str]] = {}
+
+    async def sadd(self, key: str, member: str) -> None:
+        self.sets.setdefault(key, set()).add(member)
+
+    async def srem(self, key: str, member: str) -> None:
+        self.sets.get(key, set()).discard(member)
+
+    async def sismember(self, key: str, member: str) -> bool:
+        return member in self.sets.get(key, set())
+
+    async def smembers(self, key: str) -> set[str]:
+        return set(self.sets.get(key, set()))
+
+
+class TestContainerOwnership(TestCase):
+    '''
+    Test that ContainerMakerClient only serves users their own containers, against the fake container-maker.
+    '''
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.certificates: dict[str, bytes] = generate_certificates('localhost')
+
+    def setUp(self) -> None:
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.server: FakeContainerMakerServer = FakeContainerMakerServer(certificates=self.certificates)
+        port: int = self.loop.run_until_complete(self.server.start())
+        self.patches: list = [
+            patch.dict(os.environ, {
+                CONTAINER_MAKER_CLIENT_KEY_ENV_VAR: self.certificates['client.key'].decode('utf-8'),
+                CONTAINER_MAKER_CLIENT_CERT_ENV_VAR: self.certificates['client.crt'].decode('utf-8'),
+                CONTAINER_MAKER_CA_ENV_VAR: self.certificates['ca.crt'].decode('utf-8'),
+            }),
+            patch('src.containers.containers_service.CONTAINER_MAKER_HOST', 'localhost'),
+            patch('src.containers.containers_service.CONTAINER_MAKER_PORT', port),
+            patch('src.containers.containers_service.CONTAINER_INFORMER_ENABLED', False),
+        ]
+        for started in self.patches:
+            started.start()
+        # every cache lookup misses.
+        self.cache: MagicMock = MagicMock()
+        self.cache.get_container = AsyncMock(return_value=None)
+        self.cache.get_container_list = AsyncMock(return_value=None)
+        self.cache.set_container = AsyncMock()
+        self.cache.set_container_list = AsyncMock()
+        self.cache.add_container = AsyncMock()
+        self.cache.invalidate_container = AsyncMock()
+        self.redis_client: FakeRedisSets = FakeRedisSets()
+        self.client: ContainerMakerClient = ContainerMakerClient(
+            cache=self.cache, owners=ContainerOwners(redis_client=self.redis_client)
+        )
+
+    def tearDown(self) -> None:
+        for started in self.patches:
+            started.stop()
+        self.loop.run_until_complete(self.client.close())
+        self.loop.run_until_complete(self.server.stop())
+        self.loop.close()
+
+    def create(self, container_name: str, user_id: str) -> ContainerResponseModel:
+        return self.loop.run_until_complete(self.client.create_container(
+            CreateContainerModel(
+                image_name='image', container_name=container_name, network_name='browseterm',
+                exposure_level=ExposureLevel.CLUSTER_LOCAL, publish_information=[]
+            ),
+            user_id=user_id
+        ))
+
+    def test_list_returns_only_owned_containers(self) -> None:
+        '''
+        Test that a user lists their own containers, not every container of the network.
+        '''
+        mine: ContainerResponseModel = self.create('mine', '1')
+        self.create('theirs', '2')
+
+        listed: ListContainerResponseModel = self.loop.run_until_complete(
+            self.client.list_container(ListContainerDataModel(network_name='browseterm'), user_id='1')
+        )
+        nobody: ListContainerResponseModel = self.loop.run_until_complete(
+            self.client.list_container(ListContainerDataModel(network_name='browseterm'), user_id='3')
+        )
+
+        self.assertEqual([container.container_id for container in listed.containers], [mine.container_id])
+        self.assertEqual(nobody.containers, [])
+        # the list cached for the user is the filtered one.
+        cached: ListContainerResponseModel = self.cache.set_container_list.await_args.args[2]
+        self.assertEqual([container.container_id for container in cached.containers], [mine.container_id])
+
+    def test_containers_of_other_users_are_not_found(self) -> None:
+        '''
+        Test that getting or deleting another user's container fails, and leaves the container alone.
+        '''
+        theirs: ContainerResponseModel = self.create('theirs', '2')
+
+        with self.assertRaises(ContainerNotFoundError):
+            self.loop.run_until_complete(self.client.get_container(
+                GetContainerDataModel(container_id=theirs.container_id, network_name='browseterm'), user_id='1'
+            ))
+        with self.assertRaises(ContainerNotFoundError):
+            self.loop.run_until_complete(self.client.delete_container(
+                DeleteContainerDataModel(container_id=theirs.container_id, network_name='browseterm'), user_id='1'
+            ))
+
+        self.assertEqual(self.server.servicer.calls['getContainer'], 0)
+        self.assertEqual(self.server.servicer.calls['deleteContainer'], 0)
+        self.loop.run_until_complete(self.client.delete_container(
+            DeleteContainerDataModel(container_id=theirs.container_id, network_name='browseterm'), user_id='2'
+        ))
+        self.assertEqual(self.redis_client.sets['container_owner:2'], set())
+
+    def test_container_without_owner_is_deleted(self) -> None:
+        '''
+        Test that a container whose owner cannot be recorded is deleted, and the error raised.
+        '''
+        self.redis_client.sadd = AsyncMock(side_effect=ConnectionError('Redis is down'))
+
+        with self.assertRaises(ConnectionError):
+            self.create('orphan', '1')
+
+        self.assertEqual(self.server.servicer.calls['deleteContainer'], 1)
+        self.assertEqual(self.server.servicer.containers.get('browseterm', {}), {})
+
+    def test_partly_adopted_container_is_forgotten(self) -> None:
+        '''
+        Test that when adopting a new container fails half way, what was recorded of it is removed with it.
+        '''
+        self.client.informer = ContainerInformer(namespace='browseterm')
+        self.cache.add_container = AsyncMock(side_effect=RuntimeError('cache is down'))
+
+        with self.assertRaises(RuntimeError):
+            self.create('orphan', '1')
+
+        self.assertEqual(self.server.servicer.calls['deleteContainer'], 1)
+        self.assertEqual(self.redis_client.sets['container_owner:1'], set())
+        self.assertEqual(self.client.informer.containers, {})
+        self.assertEqual(self.client.informer.owners, {'1': set()})
+        self.cache.invalidate_container.assert_awaited_once()
+        listed: ListContainerResponseModel = self.loop.run_until_complete(
+            self.client.list_container(ListContainerDataModel(network_name='browseterm'), user_id='1')
+        )
+        self.assertEqual(listed.containers, [])
+
+    def test_informer_owners_come_from_creation_only(self) -> None:
+        '''
+        Test that list and get results do not make the caller an owner in the informer.
+        '''
+        self.client.informer = ContainerInformer(namespace='browseterm')
+        mine: ContainerResponseModel = self.create('mine', '1')
+        theirs: ContainerResponseModel = self.create('theirs', '2')
+
+        self.loop.run_until_complete(
+            self.client.list_container(ListContainerDataModel(network_name='browseterm'), user_id='1')
+        )
+        self.loop.run_until_complete(self.client.get_container(
+            GetContainerDataModel(container_id=theirs.container_id, network_name='browseterm')
+        ))
+
+        self.assertEqual(self.client.informer.owners, {'1': {mine.container_id}, '2': {theirs.container_id}})
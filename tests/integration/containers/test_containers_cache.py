@@ -0,0 +1,109 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import AsyncMock, MagicMock
+import asyncio
+
+# third party
+import redis
+
+# local
+from src.containers.containers_cache import ContainerMetadataCache
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.list_container_response_dto import ListContainerResponseModel
+
+
+class TestContainerMetadataCache(TestCase):
+    '''
+    Test ContainerMetadataCache with a mocked asyncio Redis client.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Setup test data.
+        '''
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        self.mock_redis: MagicMock = MagicMock()
+        self.cache: ContainerMetadataCache = ContainerMetadataCache(redis_client=self.mock_redis, ttl=5)
+        self.user_id: str = '1'
+        self.network_name: str = 'test-network'
+        self.container: ContainerResponseModel = ContainerResponseModel(
+            container_id='container-1',
+            container_name='test-container',
+            container_ip='127.0.0.1',
+            container_network=self.network_name,
+            container_ports=[{'name': 'ssh', 'container_port': 2222, 'protocol': 'TCP'}]
+        )
+
+    def tearDown(self) -> None:
+        '''
+        Close event loop.
+        '''
+        self.loop.close()
+
+    def test_get_container_hit(self) -> None:
+        '''
+        Test a cache hit returns the stored container.
+        '''
+        self.mock_redis.get = AsyncMock(return_value=self.container.model_dump_json())
+
+        cached: ContainerResponseModel | None = self.loop.run_until_complete(
+            self.cache.get_container(self.user_id, 'container-1')
+        )
+
+        self.assertEqual(cached, self.container)
+        self.mock_redis.get.assert_awaited_once_with('container_cache:1:container:container-1')
+
+    def test_get_container_miss(self) -> None:
+        '''
+        Test a cache miss returns None.
+        '''
+        self.mock_redis.get = AsyncMock(return_value=None)
+
+        cached: ContainerResponseModel | None = self.loop.run_until_complete(
+            self.cache.get_container(self.user_id, 'container-1')
+        )
+
+        self.assertIsNone(cached)
+
+    def test_get_container_list_redis_error_is_a_miss(self) -> None:
+        '''
+        Test that a Redis error is treated as a cache miss.
+        '''
+        self.mock_redis.get = AsyncMock(side_effect=redis.RedisError('Redis connection failed'))
+
+        cached: ListContainerResponseModel | None = self.loop.run_until_complete(
+            self.cache.get_container_list(self.user_id, self.network_name)
+        )
+
+        self.assertIsNone(cached)
+
+    def test_set_container(self) -> None:
+        '''
+        Test that a container is stored with the configured TTL.
+        '''
+        self.mock_redis.setex = AsyncMock(return_value=True)
+
+        self.loop.run_until_complete(self.cache.set_container(self.user_id, self.container))
+
+        self.mock_redis.setex.assert_awaited_once_with(
+            name='container_cache:1:container:container-1',
+            time=5,
+            value=self.container.model_dump_json()
+        )
+
+    def test_invalidate_container(self) -> None:
+        '''
+        Test that delete drops the container and the list of its network.
+        '''
+        self.mock_redis.delete = AsyncMock(return_value=2)
+
+        self.loop.run_until_complete(
+            self.cache.invalidate_container(self.user_id, self.network_name, 'container-1')
+        )
+
+        self.mock_redis.delete.assert_awaited_once_with(
+            'container_cache:1:container:container-1',
+            'container_cache:1:list:test-network'
+        )
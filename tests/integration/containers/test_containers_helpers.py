@@ -0,0 +1,161 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+
+# kubernetes
+from kubernetes_asyncio import client
+from kubernetes_asyncio.client.rest import ApiException
+
+# local
+from src.containers.containers_helpers import CertificateJobError, CertificateUtils
+
+
+class FakeWatch:
+    '''
+    A job watch replaying one scripted stream per call: a list of events, or an exception raised by the stream.
+    Streams that run out of events wait a moment, like a watch ending at its timeout.
+    '''
+    def __init__(self, streams: list) -> None:
+        self.streams: list = streams
+        self.resource_versions: list[str] = []
+
+    def __call__(self) -> 'FakeWatch':
+        return self
+
+    async def __aenter__(self) -> 'FakeWatch':
+        return self
+
+    async def __aexit__(self, *args: any) -> None:
+        pass
+
+    async def stream(self, list_function: any, **kwargs: any) -> any:
+        self.resource_versions.append(kwargs['resource_version'])
+        stream: list | Exception = self.streams.pop(0) if self.streams else []
+        if isinstance(stream, Exception):
+            raise stream
+        for event in stream:
+            yield event
+        await asyncio.sleep(0.01)
+
+
+class TestCertificateUtils(TestCase):
+    '''
+    Test waiting for certificate jobs and deleting certificate secrets, with a mocked Kubernetes API.
+    '''
+    def setUp(self) -> None:
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.batch_v1: MagicMock = MagicMock()
+        self.core_v1: MagicMock = MagicMock()
+        self.patches: list = [
+            patch('src.containers.containers_helpers.KubernetesUtils.batch_v1', return_value=self.batch_v1),
+            patch('src.containers.containers_helpers.KubernetesUtils.core_v1', return_value=self.core_v1),
+        ]
+        for started in self.patches:
+            started.start()
+
+    def tearDown(self) -> None:
+        for started in self.patches:
+            started.stop()
+        self.loop.close()
+
+    @staticmethod
+    def job(resource_version: str, succeeded: int | None = None, failed: bool = False) -> client.V1Job:
+        conditions: list[client.V1JobCondition] = [client.V1JobCondition(type='Failed', status='True')] if failed else None
+        return client.V1Job(
+            metadata=client.V1ObjectMeta(name='certificate-job', resource_version=resource_version),
+            status=client.V1JobStatus(succeeded=succeeded, conditions=conditions)
+        )
+
+    def wait(self, streams: list, timeout: float = 5) -> FakeWatch:
+        fake_watch: FakeWatch = FakeWatch(streams)
+        with patch('src.containers.containers_helpers.watch.Watch', fake_watch):
+            self.loop.run_until_complete(CertificateUtils.wait_for_job_completion(self.job('1'), timeout=timeout))
+        return fake_watch
+
+    def test_wait_returns_when_the_job_completes(self) -> None:
+        '''
+        Test that the wait ends on the first event reporting the job succeeded.
+        '''
+        fake_watch: FakeWatch = self.wait([[
+            {'type': 'MODIFIED', 'object': self.job('2')},
+            {'type': 'MODIFIED', 'object': self.job('3', succeeded=1)},
+        ]])
+
+        self.assertEqual(fake_watch.resource_versions, ['1'])
+
+    def test_wait_raises_when_the_job_fails(self) -> None:
+        '''
+        Test that a Failed condition ends the wait with an error.
+        '''
+        with self.assertRaisesRegex(CertificateJobError, 'failed'):
+            self.wait([[{'type': 'MODIFIED', 'object': self.job('2', failed=True)}]])
+
+    def test_wait_raises_when_the_job_is_deleted(self) -> None:
+        '''
+        Test that a deleted job ends the wait with an error.
+        '''
+        with self.assertRaisesRegex(CertificateJobError, 'deleted'):
+            self.wait([[{'type': 'DELETED', 'object': self.job('2')}]])
+
+    def test_wait_rereads_the_job_when_the_watch_expires(self) -> None:
+        '''
+        Test that after a 410 the job is read again, and watched from its current resource version.
+        '''
+        self.batch_v1.read_namespaced_job = AsyncMock(return_value=self.job('5'))
+
+        fake_watch: FakeWatch = self.wait([
+            [{'type': 'MODIFIED', 'object': self.job('2')}],
+            ApiException(status=410),
+            [{'type': 'MODIFIED', 'object': self.job('6', succeeded=1)}],
+        ])
+
+        self.batch_v1.read_namespaced_job.assert_awaited_once()
+        self.assertEqual(fake_watch.resource_versions, ['1', '2', '5'])
+
+    def test_wait_returns_when_the_reread_job_completed(self) -> None:
+        '''
+        Test that a job completing while the watch was expired is not waited for again.
+        '''
+        self.batch_v1.read_namespaced_job = AsyncMock(return_value=self.job('5', succeeded=1))
+
+        fake_watch: FakeWatch = self.wait([ApiException(status=410)])
+
+        self.assertEqual(fake_watch.resource_versions, ['1'])
+
+    def test_wait_raises_other_api_errors(self) -> None:
+        '''
+        Test that API errors other than 410 are raised.
+        '''
+        with self.assertRaises(ApiException):
+            self.wait([ApiException(status=403)])
+
+    def test_wait_times_out(self) -> None:
+        '''
+        Test that a job that never completes ends the wait with an error once the timeout is reached.
+        '''
+        with self.assertRaisesRegex(CertificateJobError, 'did not complete'):
+            self.wait([[{'type': 'MODIFIED', 'object': self.job('2')}]], timeout=0.05)
+
+    def test_delete_secrets_ignores_missing_secrets(self) -> None:
+        '''
+        Test that every secret is deleted, and that secrets that do not exist are not an error.
+        '''
+        self.core_v1.delete_namespaced_secret = AsyncMock(side_effect=[None, ApiException(status=404), None])
+
+        self.loop.run_until_complete(CertificateUtils.delete_secrets(['first', 'missing', 'third']))
+
+        deleted: list[str] = [call.kwargs['name'] for call in self.core_v1.delete_namespaced_secret.await_args_list]
+        self.assertEqual(deleted, ['first', 'missing', 'third'])
+
+    def test_delete_secrets_raises_after_deleting_the_rest(self) -> None:
+        '''
+        Test that a failed delete is raised once the other secrets have been deleted.
+        '''
+        self.core_v1.delete_namespaced_secret = AsyncMock(side_effect=[ApiException(status=500), None])
+
+        with self.assertRaises(ApiException):
+            self.loop.run_until_complete(CertificateUtils.delete_secrets(['failing', 'second']))
+
+        self.assertEqual(self.core_v1.delete_namespaced_secret.await_count, 2)
@@ -0,0 +1,153 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import AsyncMock, MagicMock
+import asyncio
+
+# local
+from src.containers.creation_jobs import CreationJobManager, ProgressCallback
+from src.containers.dto.creation_job_dto import CreationJobModel
+from src.containers.dto.delete_container_response_dto import DeleteContainerResponseModel
+from src.containers.enum.creation_job_kind_enum import CreationJobKind
+from src.containers.enum.creation_job_status_enum import CreationJobStatus
+
+
+class TestCreationJobManager(TestCase):
+    '''
+    Test CreationJobManager with a mocked asyncio Redis client.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Setup the manager and record every saved status.
+        '''
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        self.manager: CreationJobManager = CreationJobManager(redis_client=MagicMock())
+        self.saved_statuses: list[CreationJobStatus] = []
+
+        async def save(job: CreationJobModel) -> None:
+            self.saved_statuses.append(job.status)
+
+        self.manager.save = AsyncMock(side_effect=save)
+
+    def tearDown(self) -> None:
+        '''
+        Close event loop.
+        '''
+        self.loop.close()
+
+    def test_job_reports_progress_and_result(self) -> None:
+        '''
+        Test that a successful job goes through its progress statuses and stores the result.
+        '''
+        result: DeleteContainerResponseModel = DeleteContainerResponseModel(container_id='1', status='Deleted')
+
+        async def run(progress: ProgressCallback) -> DeleteContainerResponseModel:
+            await progress(CreationJobStatus.POD_SCHEDULED)
+            return result
+
+        async def submit_and_wait() -> CreationJobModel:
+            job: CreationJobModel = await self.manager.submit('1', CreationJobKind.CONTAINER, run)
+            await asyncio.gather(*self.manager.tasks)
+            return job
+
+        job: CreationJobModel = self.loop.run_until_complete(submit_and_wait())
+
+        self.assertEqual(
+            self.saved_statuses,
+            [CreationJobStatus.QUEUED, CreationJobStatus.POD_SCHEDULED, CreationJobStatus.READY]
+        )
+        self.assertEqual(job.status, CreationJobStatus.READY)
+        self.assertEqual(job.result, result.model_dump())
+        self.assertTrue(job.is_finished)
+
+    def test_job_failure(self) -> None:
+        '''
+        Test that a failing job is marked failed with the error message.
+        '''
+        async def run(progress: ProgressCallback) -> DeleteContainerResponseModel:
+            raise RuntimeError('container-maker unavailable')
+
+        async def submit_and_wait() -> CreationJobModel:
+            job: CreationJobModel = await self.manager.submit('1', CreationJobKind.TERMINAL, run)
+            await asyncio.gather(*self.manager.tasks)
+            return job
+
+        job: CreationJobModel = self.loop.run_until_complete(submit_and_wait())
+
+        self.assertEqual(self.saved_statuses, [CreationJobStatus.QUEUED, CreationJobStatus.FAILED])
+        self.assertEqual(job.error, 'container-maker unavailable')
+        self.assertIsNone(job.result)
+
+    def test_cancelled_job_is_marked_failed(self) -> None:
+        '''
+        Test that a job cancelled while running, e.g. on shutdown, is marked failed and stays cancelled.
+        '''
+        started: asyncio.Event = asyncio.Event()
+
+        async def run(progress: ProgressCallback) -> DeleteContainerResponseModel:
+            started.set()
+            await asyncio.Event().wait()
+
+        async def submit_and_stop() -> tuple[CreationJobModel, list]:
+            job: CreationJobModel = await self.manager.submit('1', CreationJobKind.TERMINAL, run)
+            tasks: list[asyncio.Task] = list(self.manager.tasks)
+            await started.wait()
+            await self.manager.stop()
+            return job, tasks
+
+        job, tasks = self.loop.run_until_complete(submit_and_stop())
+
+        self.assertEqual(self.saved_statuses, [CreationJobStatus.QUEUED, CreationJobStatus.FAILED])
+        self.assertEqual(job.error, 'Cancelled')
+        self.assertTrue(all(task.cancelled() for task in tasks))
+
+    def test_submit_once_per_idempotency_key(self) -> None:
+        '''
+        Test that retries with an idempotency key get the first job and do not run again,
+        and that a failed job can be retried with its key.
+        '''
+        jobs: dict[str, CreationJobModel] = {}
+        keys: dict[str, str] = {}
+
+        async def save(job: CreationJobModel) -> None:
+            jobs[job.job_id] = job.model_copy()
+
+        async def get(job_id: str) -> CreationJobModel | None:
+            return jobs.get(job_id)
+
+        async def set_key(key: str, value: str, nx: bool = False, ex: int | None = None) -> bool:
+            if nx and key in keys:
+                return False
+            keys[key] = value
+            return True
+
+        self.manager.save = AsyncMock(side_effect=save)
+        self.manager.get = AsyncMock(side_effect=get)
+        self.manager.redis_client.get = AsyncMock(side_effect=lambda key: keys.get(key))
+        self.manager.redis_client.set = AsyncMock(side_effect=set_key)
+        self.manager.redis_client.delete = AsyncMock()
+        run: AsyncMock = AsyncMock(return_value=DeleteContainerResponseModel(container_id='1', status='Deleted'))
+
+        async def submit_and_wait() -> tuple[CreationJobModel, bool]:
+            submitted: tuple[CreationJobModel, bool] = await self.manager.submit_once('1', CreationJobKind.CONTAINER, run, 'key-1')
+            await asyncio.gather(*self.manager.tasks)
+            return submitted
+
+        first, first_submitted = self.loop.run_until_complete(submit_and_wait())
+        retry, retry_submitted = self.loop.run_until_complete(submit_and_wait())
+
+        self.assertTrue(first_submitted)
+        self.assertFalse(retry_submitted)
+        self.assertEqual(retry.job_id, first.job_id)
+        self.assertEqual(retry.status, CreationJobStatus.READY)
+        self.assertEqual(retry.result, {'container_id': '1', 'status': 'Deleted'})
+        run.assert_awaited_once()
+
+        jobs[first.job_id].status = CreationJobStatus.FAILED
+        after_failure, submitted_after_failure = self.loop.run_until_complete(submit_and_wait())
+
+        self.assertTrue(submitted_after_failure)
+        self.assertNotEqual(after_failure.job_id, first.job_id)
+        self.assertEqual(run.await_count, 2)
@@ -0,0 +1,130 @@
+# builtins
+from unittest import TestCase
+import asyncio
+import random
+
+# third party
+import grpc
+
+# grpc
+from container_maker_spec import service_pb2_grpc
+from container_maker_spec.types_pb2 import CreateContainerRequest
+from container_maker_spec.types_pb2 import GetContainerRequest
+from container_maker_spec.types_pb2 import ListContainerRequest
+from container_maker_spec.types_pb2 import DeleteContainerRequest
+from container_maker_spec.types_pb2 import PublishInformation
+
+# utils
+from src.common.grpc_utils import GRPCUtils
+
+# fakes
+from tests.fakes.container_maker_server import FakeContainerMakerServer
+from tests.fakes.container_maker_server import FakeContainerMakerServicer
+from tests.fakes.container_maker_server import LatencyDistribution
+from tests.fakes.container_maker_server import generate_certificates
+
+
+class TestFakeContainerMaker(TestCase):
+    '''
+    Test the fake container-maker server through the asyncio stubs of GRPCUtils.
+    '''
+    def setUp(self) -> None:
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self) -> None:
+        self.loop.close()
+
+    async def lifecycle(self, server: FakeContainerMakerServer, grpc_utils: GRPCUtils) -> None:
+        await server.start()
+        grpc_utils.port = server.port
+        try:
+            stub: service_pb2_grpc.ContainerMakerAPIStub = grpc_utils.async_stub
+            request: CreateContainerRequest = CreateContainerRequest(
+                image_name='image', container_name='terminal', network_name='browseterm',
+                publish_information=[PublishInformation(publish_port=22, target_port=22, protocol='TCP')]
+            )
+            created = await stub.createContainer(request)
+            self.assertEqual(created.container_name, 'terminal-pod')
+            self.assertEqual([(port.container_port, port.protocol) for port in created.ports], [(22, 'TCP')])
+            # creating the same name returns the same container.
+            self.assertEqual((await stub.createContainer(request)).container_id, created.container_id)
+
+            fetched = await stub.getContainer(GetContainerRequest(container_id=created.container_id, network_name='browseterm'))
+            self.assertEqual(fetched.container_ip, created.container_ip)
+            listed = await stub.listContainer(ListContainerRequest(network_name='browseterm'))
+            self.assertEqual([container.container_id for container in listed.containers], [created.container_id])
+
+            deleted = await stub.deleteContainer(DeleteContainerRequest(container_id=created.container_id, network_name='browseterm'))
+            self.assertEqual(deleted.status, 'Deleted')
+            with self.assertRaises(grpc.RpcError) as error:
+                await stub.getContainer(GetContainerRequest(container_id=created.container_id, network_name='browseterm'))
+            self.assertEqual(error.exception.code(), grpc.StatusCode.NOT_FOUND)
+        finally:
+            await grpc_utils.close()
+            await server.stop()
+
+    def test_insecure_lifecycle(self) -> None:
+        '''
+        Test create, get, list and delete over an insecure channel.
+        '''
+        server: FakeContainerMakerServer = FakeContainerMakerServer()
+        grpc_utils: GRPCUtils = GRPCUtils('localhost', 0, service_pb2_grpc.ContainerMakerAPIStub, secure=False)
+        self.loop.run_until_complete(self.lifecycle(server, grpc_utils))
+
+    def test_secure_lifecycle(self) -> None:
+        '''
+        Test create, get, list and delete over mutual TLS, with the certificates of the fake.
+        '''
+        certificates: dict[str, bytes] = generate_certificates('localhost')
+        server: FakeContainerMakerServer = FakeContainerMakerServer(certificates=certificates)
+        grpc_utils: GRPCUtils = GRPCUtils(
+            'localhost', 0, service_pb2_grpc.ContainerMakerAPIStub, secure=True,
+            client_key=certificates['client.key'], client_cert=certificates['client.crt'], ca_cert=certificates['ca.crt']
+        )
+        self.loop.run_until_complete(self.lifecycle(server, grpc_utils))
+
+    def test_injected_failures_and_readiness(self) -> None:
+        '''
+        Test that failures are injected at the configured rate and that ips are reported once ready.
+        '''
+        servicer: FakeContainerMakerServicer = FakeContainerMakerServicer(
+            latency={'listContainer': LatencyDistribution.parse('uniform:0.001,0.002')},
+            failure_rate={'listContainer': 1.0},
+            ready_delay=60,
+            seed=1
+        )
+        server: FakeContainerMakerServer = FakeContainerMakerServer(servicer)
+        grpc_utils: GRPCUtils = GRPCUtils('localhost', 0, service_pb2_grpc.ContainerMakerAPIStub, secure=False)
+
+        async def calls() -> None:
+            await server.start()
+            grpc_utils.port = server.port
+            try:
+                stub: service_pb2_grpc.ContainerMakerAPIStub = grpc_utils.async_stub
+                created = await stub.createContainer(CreateContainerRequest(container_name='terminal', network_name='browseterm'))
+                self.assertEqual(created.container_ip, '')
+                with self.assertRaises(grpc.RpcError) as error:
+                    await stub.listContainer(ListContainerRequest(network_name='browseterm'))
+                self.assertEqual(error.exception.code(), grpc.StatusCode.UNAVAILABLE)
+                servicer.ready_delay = 0
+                fetched = await stub.getContainer(GetContainerRequest(container_id=created.container_id, network_name='browseterm'))
+                self.assertNotEqual(fetched.container_ip, '')
+            finally:
+                await grpc_utils.close()
+                await server.stop()
+
+        self.loop.run_until_complete(calls())
+        self.assertEqual(servicer.calls['listContainer'], 1)
+
+    def test_latency_distributions(self) -> None:
+        '''
+        Test parsing and sampling of latency distributions.
+        '''
+        rng: random.Random = random.Random(0)
+        self.assertEqual(LatencyDistribution.parse('fixed:0.5').sample(rng), 0.5)
+        self.assertTrue(0.1 <= LatencyDistribution.parse('uniform:0.1,0.2').sample(rng) <= 0.2)
+        self.assertGreaterEqual(LatencyDistribution.parse('normal:0,1').sample(rng), 0.0)
+        self.assertGreater(LatencyDistribution.parse('lognormal:0.8,0.5').sample(rng), 0.0)
+        with self.assertRaises(ValueError):
+            LatencyDistribution.parse('uniform:0.1')
@@ -14,11 +14,9 @@ So these tests are isolated from test_create_container.py
 '''
 
 from unittest import TestCase
-import ssl
+import asyncio
 import websocket
 import json
-import tempfile
-import os
 import base64
 
 # config
@@ -30,6 +28,7 @@ from src.common.config import CONTAINER_MAKER_CA_ENV_VAR
 
 # utils
 from src.common.grpc_utils import GRPCUtils
+from src.common.kubernetes_utils import KubernetesUtils
 from src.common.utils import read_cert_from_env_var
 
 # grpc
@@ -42,6 +41,7 @@ from container_maker_spec.types_pb2 import DeleteContainerResponse
 from container_maker_spec.types_pb2 import ExposureLevel as GRPCExposureLevel
 
 from src.containers.containers_helpers import CertificateUtils
+from src.containers.socket_ssh_connector import build_ssl_context
 
 
 # namespace name
@@ -114,10 +114,13 @@ class TestSocketCommunication(TestCase):
         print(f'Creating {self.web_socket_container_name} certificates...')
         service_name: str = f"{self.web_socket_container_name}-service"
         # for now, we only have one service in the list.
-        CertificateUtils.create_certificate_job(services=','.join([service_name]))
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self.loop.run_until_complete(CertificateUtils.create_certificate_job(services=','.join([service_name])))
         print(f'Done creating {self.web_socket_container_name} certificates...')
         self.cert_name: str = f"{service_name}-certs"
-        self.web_socket_certificates: dict = CertificateUtils.read_certificate_from_secret(self.cert_name)
+        self.web_socket_certificates: dict = self.loop.run_until_complete(
+            CertificateUtils.read_certificate_from_secret(self.cert_name)
+        )
         self.web_socket_image_name: str = 'zim95/socket-ssh:latest'
         self.web_socket_publish_information: list[dict] = [
             {'publish_port': 8000, 'target_port': 8000, 'protocol': 'TCP'},
@@ -158,44 +161,12 @@ class TestSocketCommunication(TestCase):
         # create the websocket container
         print('Creating Websocket Container...')
         websocket_container: ContainerResponse = self.stub.createContainer(self.web_socket_grpc_create_container_request)
-        '''
-        We need to write our certificates to a file temporarily.
-        This is because sslopt requires a file path.
-        Our secrets are basically bytes, so we need to write them to a file temporarily.
-        '''
-        # Initialize certificate paths
-        client_cert_path: str | None = None
-        client_key_path: str | None = None
-        ca_cert_path: str | None = None
-
         try:
-            print('Creating temporary files for certificates...')
-            # Create temporary files for certificates
-            with tempfile.NamedTemporaryFile(delete=False) as client_cert_filet, \
-                 tempfile.NamedTemporaryFile(delete=False) as client_key_filet, \
-                 tempfile.NamedTemporaryFile(delete=False) as ca_cert_filet:
-
-                # Write certificate data to temporary files
-                client_cert_filet.write(base64.b64decode(self.web_socket_certificates['client.crt']))
-                client_key_filet.write(base64.b64decode(self.web_socket_certificates['client.key']))
-                ca_cert_filet.write(base64.b64decode(self.web_socket_certificates['ca.crt']))
-
-                # Get the file paths
-                client_cert_path = client_cert_filet.name  # name gives us the path.
-                client_key_path = client_key_filet.name  # name gives us the path.
-                ca_cert_path = ca_cert_filet.name  # name gives us the path.
-
             print('Connecting to the websocket container...')
-            # connect to the websocket container
+            # the certificates are loaded from memory, the same way the relay connects.
             websocket_connection: websocket.WebSocketApp = websocket.create_connection(
                 f'wss://{self.web_socket_host}:{self.web_socket_port}',
-                sslopt={
-                    'certfile': client_cert_path,
-                    'keyfile': client_key_path,
-                    'ca_certs': ca_cert_path,
-                    'cert_reqs': ssl.CERT_REQUIRED,
-                    'ssl_version': ssl.PROTOCOL_TLS,
-                }
+                sslopt={'context': build_ssl_context(self.web_socket_certificates)}
             )
             print('Sending connect request to the websocket container...')
             websocket_connection.send(json.dumps(
@@ -232,14 +203,6 @@ class TestSocketCommunication(TestCase):
             print('Received shell command response from the websocket container:', shell_command_response)
             self.assertEqual(expected_response in shell_command_response, True)
         finally:
-            print('Cleaning up temporary files if they were created...')
-            # Clean up temporary files if they were created
-            if client_cert_path and os.path.exists(client_cert_path):
-                os.unlink(client_cert_path)
-            if client_key_path and os.path.exists(client_key_path):
-                os.unlink(client_key_path)
-            if ca_cert_path and os.path.exists(ca_cert_path):
-                os.unlink(ca_cert_path)
             # delete the containers.
             print('Deleting Containers...')
             delete_websocket_container_request: DeleteContainerRequest = DeleteContainerRequest(
@@ -255,4 +218,11 @@ class TestSocketCommunication(TestCase):
             self.assertEqual(delete_ssh_container_response.status, 'Deleted')
             # delete the secret
             print('Deleting secret...')
-            CertificateUtils.delete_secret(self.cert_name)
+            self.loop.run_until_complete(CertificateUtils.delete_secret(self.cert_name))
+
+    def tearDown(self) -> None:
+        '''
+        Close the shared Kubernetes client and the event loop.
+        '''
+        self.loop.run_until_complete(KubernetesUtils.close())
+        self.loop.close()
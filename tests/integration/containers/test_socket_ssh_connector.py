@@ -0,0 +1,156 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+import base64
+import os
+import ssl
+import tempfile
+
+# third party
+from websockets.asyncio.server import Server, ServerConnection, serve
+
+# local
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+from src.containers.socket_ssh_connector import SocketSSHConnector
+from src.containers.terminal_protocol import BINARY_SUBPROTOCOL, OPCODE_CONNECT, BinaryCodec
+from tests.fakes.container_maker_server import generate_certificates
+
+
+class FakeSocketSSH:
+    '''
+    socket-ssh side of the connector: a mutual TLS websocket server speaking binary frames, recording what it receives.
+    '''
+    def __init__(self, certificates: dict[str, bytes]) -> None:
+        self.ssl_context: ssl.SSLContext = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.ssl_context.load_verify_locations(cadata=certificates['ca.crt'].decode('utf-8'))
+        self.ssl_context.verify_mode = ssl.CERT_REQUIRED
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ('server.crt', 'server.key'):
+                with open(os.path.join(directory, name), 'wb') as file:
+                    file.write(certificates[name])
+            self.ssl_context.load_cert_chain(os.path.join(directory, 'server.crt'), os.path.join(directory, 'server.key'))
+        self.connections: int = 0
+        self.received: list[bytes] = []
+        self.server: Server | None = None
+
+    async def handle(self, connection: ServerConnection) -> None:
+        self.connections += 1
+        async for message in connection:
+            self.received.append(message)
+
+    async def start(self) -> int:
+        self.server = await serve(self.handle, 'localhost', 0, ssl=self.ssl_context, subprotocols=[BINARY_SUBPROTOCOL])
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class TestSocketSSHConnector(TestCase):
+    '''
+    Test SocketSSHConnector against a fake socket-ssh server.
+    '''
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.certificates: dict[str, bytes] = generate_certificates('localhost')
+
+    def setUp(self) -> None:
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.socket_ssh: FakeSocketSSH = FakeSocketSSH(self.certificates)
+        port: int = self.loop.run_until_complete(self.socket_ssh.start())
+        secret: dict[str, str] = {
+            name: base64.b64encode(self.certificates[name]).decode('utf-8') for name in ('ca.crt', 'client.crt', 'client.key')
+        }
+        self.read_secret: AsyncMock = AsyncMock(return_value=secret)
+        self.patches: list = [
+            patch('src.containers.socket_ssh_connector.SOCKET_SSH_PORT', port),
+            patch('src.containers.socket_ssh_connector.TerminalService.socket_ssh_service_name', return_value='localhost'),
+            patch('src.containers.socket_ssh_connector.CertificateUtils.read_certificate_from_secret', self.read_secret),
+            # certificates never touch the disk.
+            patch('src.containers.socket_ssh_connector.tempfile', MagicMock(side_effect=AssertionError)),
+        ]
+        for started in self.patches:
+            started.start()
+
+    def tearDown(self) -> None:
+        for started in self.patches:
+            started.stop()
+        self.loop.run_until_complete(self.socket_ssh.stop())
+        self.loop.close()
+
+    @staticmethod
+    def terminal(terminal_id: str) -> TerminalResponseModel:
+        container: ContainerResponseModel = ContainerResponseModel(
+            container_id=f'{terminal_id}-id', container_name=terminal_id, container_ip='127.0.0.1',
+            container_network='browseterm', container_ports=[]
+        )
+        return TerminalResponseModel(
+            terminal_id=terminal_id, image_name='image', network_name='browseterm',
+            ssh_container=container, socket_ssh_container=container, ssh_username='user', ssh_password='password',
+            certificate_secret_name=f'socket-ssh-{terminal_id}-service-certs', created_at=0.0
+        )
+
+    def test_tls_sessions_are_resumed(self) -> None:
+        '''
+        Test that the SSL context is read once per secret, and that later handshakes resume the TLS session.
+        '''
+        async def dial() -> list[bool]:
+            connector: SocketSSHConnector = SocketSSHConnector()
+            reused: list[bool] = []
+            for _ in range(3):
+                upstream, _ = await connector.dial(self.terminal('t1'))
+                reused.append(upstream.transport.get_extra_info('ssl_object').session_reused)
+                await upstream.close()
+            return reused
+
+        reused: list[bool] = self.loop.run_until_complete(dial())
+
+        self.assertEqual(reused, [False, True, True])
+        self.read_secret.assert_awaited_once()
+
+    def test_ssl_contexts_are_bounded(self) -> None:
+        '''
+        Test that the least recently used SSL context is dropped once the cache is full.
+        '''
+        async def contexts() -> list[str]:
+            connector: SocketSSHConnector = SocketSSHConnector()
+            for terminal_id in ('t1', 't2', 't1', 't3'):
+                await connector.ssl_context(self.terminal(terminal_id))
+            return list(connector.ssl_contexts)
+
+        with patch('src.containers.socket_ssh_connector.TERMINAL_RELAY_SSL_CACHE_SIZE', 2):
+            cached: list[str] = self.loop.run_until_complete(contexts())
+
+        self.assertEqual(cached, ['socket-ssh-t1-service-certs', 'socket-ssh-t3-service-certs'])
+
+    def test_warm_connections_are_taken(self) -> None:
+        '''
+        Test that a warm connection is taken by the next connect, which only opens the SSH session on it,
+        and that warm connections nobody takes are closed after the idle timeout.
+        '''
+        async def connect() -> tuple[int, int]:
+            connector: SocketSSHConnector = SocketSSHConnector()
+            connector.warm(self.terminal('t1'))
+            upstream, _ = await connector.connect(self.terminal('t1'))
+            while not self.socket_ssh.received:
+                await asyncio.sleep(0.005)
+            taken: int = self.socket_ssh.connections
+            await upstream.close()
+            connector.warm(self.terminal('t2'))
+            while not connector.idle:
+                await asyncio.sleep(0.005)
+            await asyncio.sleep(0.1)
+            expired: int = len(connector.idle)
+            await connector.close()
+            return taken, expired
+
+        with patch('src.containers.socket_ssh_connector.TERMINAL_RELAY_POOL_IDLE_TIMEOUT', 0.05):
+            taken, expired = self.loop.run_until_complete(connect())
+
+        self.assertEqual(taken, 1)
+        self.assertEqual(BinaryCodec().decode(self.socket_ssh.received[0]).opcode, OPCODE_CONNECT)
+        self.assertEqual(expired, 0)
@@ -0,0 +1,174 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import patch
+import asyncio
+
+# third party
+import asyncssh
+
+# local
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+from src.containers.ssh_gateway import SSHChannel, SSHGateway
+from src.containers.terminal_protocol import RawCodec
+
+
+class FakeSSHServer(asyncssh.SSHServer):
+    '''
+    SSH container side of the gateway: accepts one username and password.
+    '''
+    def begin_auth(self, username: str) -> bool:
+        return True
+
+    def password_auth_supported(self) -> bool:
+        return True
+
+    def validate_password(self, username: str, password: str) -> bool:
+        return (username, password) == ('user', 'password')
+
+
+class FakeSSHContainer:
+    '''
+    An SSH server whose shells echo their input, counting connections.
+    '''
+    def __init__(self) -> None:
+        self.connections: int = 0
+        self.terminal_types: list[str | None] = []
+        self.server: asyncssh.SSHAcceptor | None = None
+
+    def server_factory(self) -> FakeSSHServer:
+        self.connections += 1
+        return FakeSSHServer()
+
+    async def shell(self, process: asyncssh.SSHServerProcess) -> None:
+        self.terminal_types.append(process.get_terminal_type())
+        while data := await process.stdin.read(1024):
+            process.stdout.write(data)
+        process.exit(0)
+
+    async def start(self) -> int:
+        self.server = await asyncssh.listen(
+            'localhost', 0,
+            server_host_keys=[asyncssh.generate_private_key('ssh-ed25519')],
+            server_factory=self.server_factory,
+            process_factory=self.shell,
+            encoding=None,
+            line_editor=False
+        )
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class TestSSHGateway(TestCase):
+    '''
+    Test SSHGateway against a local SSH server.
+    '''
+    def setUp(self) -> None:
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.ssh_container: FakeSSHContainer = FakeSSHContainer()
+        port: int = self.loop.run_until_complete(self.ssh_container.start())
+        self.port_patch = patch('src.containers.ssh_gateway.SSH_PUBLISH_PORT', port)
+        self.port_patch.start()
+
+    def tearDown(self) -> None:
+        self.port_patch.stop()
+        self.loop.run_until_complete(self.ssh_container.stop())
+        self.loop.close()
+
+    @staticmethod
+    def terminal(terminal_id: str) -> TerminalResponseModel:
+        container: ContainerResponseModel = ContainerResponseModel(
+            container_id=f'{terminal_id}-id', container_name=terminal_id, container_ip='127.0.0.1',
+            container_network='browseterm', container_ports=[]
+        )
+        return TerminalResponseModel(
+            terminal_id=terminal_id, image_name='image', network_name='browseterm',
+            ssh_container=container, ssh_username='user', ssh_password='password', created_at=0.0
+        )
+
+    def test_shells_share_one_connection(self) -> None:
+        '''
+        Test that raw bytes round trip through a shell with a pty, and that two shells use one SSH connection.
+        '''
+        async def echo() -> tuple[bytes, bytes, int]:
+            gateway: SSHGateway = SSHGateway()
+            first, codec = await gateway.connect(self.terminal('t1'))
+            second, _ = await gateway.connect(self.terminal('t1'))
+            self.assertIsInstance(codec, RawCodec)
+            await first.send(b'ls\r')
+            await second.send(b'pwd\r')
+            echoed: tuple[bytes, bytes] = (await first.__anext__(), await second.__anext__())
+            channels: int = gateway.channels[gateway.key(self.terminal('t1'))]
+            await first.close()
+            await second.close()
+            await gateway.close()
+            return *echoed, channels
+
+        first, second, channels = self.loop.run_until_complete(echo())
+
+        self.assertEqual(first, b'ls\r')
+        self.assertEqual(second, b'pwd\r')
+        self.assertEqual(channels, 2)
+        self.assertEqual(self.ssh_container.connections, 1)
+        self.assertEqual(self.ssh_container.terminal_types, ['xterm-256color', 'xterm-256color'])
+
+    def test_idle_connections_are_closed(self) -> None:
+        '''
+        Test that a warm connection is reused by the next shell, and closed once it has no shells for the idle timeout.
+        '''
+        async def idle() -> tuple[int, bool]:
+            gateway: SSHGateway = SSHGateway()
+            gateway.warm(self.terminal('t1'))
+            while not gateway.connections:
+                await asyncio.sleep(0.005)
+            channel: SSHChannel = (await gateway.connect(self.terminal('t1')))[0]
+            await asyncio.sleep(0.1)
+            # a shell keeps its connection open.
+            kept: int = len(gateway.connections)
+            await channel.close()
+            await asyncio.sleep(0.1)
+            closed: bool = not gateway.connections
+            await gateway.close()
+            return kept, closed
+
+        with patch('src.containers.ssh_gateway.TERMINAL_RELAY_GATEWAY_IDLE_TIMEOUT', 0.05):
+            kept, closed = self.loop.run_until_complete(idle())
+
+        self.assertEqual(kept, 1)
+        self.assertTrue(closed)
+        self.assertEqual(self.ssh_container.connections, 1)
+
+    def test_idle_expiry_does_not_close_a_shell_being_opened(self) -> None:
+        '''
+        Test that a connection whose idle timeout runs out while a shell is being opened stays open for the shell.
+        '''
+        async def slow_shell() -> tuple[bytes, int]:
+            gateway: SSHGateway = SSHGateway()
+            gateway.warm(self.terminal('t1'))
+            while not gateway.connections:
+                await asyncio.sleep(0.005)
+            connection: asyncssh.SSHClientConnection = next(iter(gateway.connections.values()))
+            create_process = connection.create_process
+
+            async def slow_create_process(*args: any, **kwargs: any) -> asyncssh.SSHClientProcess:
+                await asyncio.sleep(0.1)
+                return await create_process(*args, **kwargs)
+
+            connection.create_process = slow_create_process
+            channel: SSHChannel = (await gateway.connect(self.terminal('t1')))[0]
+            await channel.send(b'ls\r')
+            echoed: bytes = await channel.__anext__()
+            kept: int = len(gateway.connections)
+            await channel.close()
+            await gateway.close()
+            return echoed, kept
+
+        with patch('src.containers.ssh_gateway.TERMINAL_RELAY_GATEWAY_IDLE_TIMEOUT', 0.05):
+            echoed, kept = self.loop.run_until_complete(slow_shell())
+
+        self.assertEqual(echoed, b'ls\r')
+        self.assertEqual(kept, 1)
@@ -0,0 +1,96 @@
+# builtins
+from unittest import TestCase
+import asyncio
+
+# local
+from src.containers.terminal_owners import TerminalOwners
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+from tests.integration.containers.test_warm_pool import FakePipeline
+
+
+class FakeRedisStrings:
+    '''
+    The Redis string commands TerminalOwners uses, in memory.
+    '''
+    def __init__(self) -> None:
+        self.strings: dict[str, str] = {}
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    async def set(self, key: str, value: str) -> None:
+        self.strings[key] = value
+
+    async def get(self, key: str) -> str | None:
+        return self.strings.get(key)
+
+    async def mget(self, keys: list[str]) -> list[str | None]:
+        return [self.strings.get(key) for key in keys]
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.strings.pop(key, None)
+
+
+class TestTerminalOwners(TestCase):
+    '''
+    Test that terminals are only handed to their owner.
+    '''
+    def setUp(self) -> None:
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.redis_client: FakeRedisStrings = FakeRedisStrings()
+        self.terminal_owners: TerminalOwners = TerminalOwners(redis_client=self.redis_client)
+
+    def tearDown(self) -> None:
+        self.loop.close()
+
+    @staticmethod
+    def terminal(terminal_id: str) -> TerminalResponseModel:
+        container: ContainerResponseModel = ContainerResponseModel(
+            container_id=f'{terminal_id}-id', container_name=terminal_id, container_ip='127.0.0.1',
+            container_network='browseterm', container_ports=[]
+        )
+        return TerminalResponseModel(
+            terminal_id=terminal_id, image_name='image', network_name='browseterm',
+            ssh_container=container, socket_ssh_container=container, ssh_username='user', ssh_password='password',
+            created_at=0.0
+        )
+
+    def test_only_the_owner_gets_the_terminal(self) -> None:
+        '''
+        Test that the owner gets their terminal, and that other users and unknown terminals get nothing.
+        '''
+        terminal: TerminalResponseModel = self.terminal('t1')
+        self.loop.run_until_complete(self.terminal_owners.add('user-1', terminal))
+
+        self.assertEqual(self.loop.run_until_complete(self.terminal_owners.terminal('t1', 'user-1')), terminal)
+        self.assertIsNone(self.loop.run_until_complete(self.terminal_owners.terminal('t1', 'user-2')))
+        self.assertIsNone(self.loop.run_until_complete(self.terminal_owners.terminal('t2', 'user-1')))
+
+    def test_removed_terminals_are_not_found(self) -> None:
+        '''
+        Test that a deleted terminal cannot be opened by its former owner.
+        '''
+        for terminal_id in ('t1', 't2'):
+            self.loop.run_until_complete(self.terminal_owners.add('user-1', self.terminal(terminal_id)))
+
+        self.loop.run_until_complete(self.terminal_owners.remove('t1', 't2'))
+
+        self.assertIsNone(self.loop.run_until_complete(self.terminal_owners.terminal('t1', 'user-1')))
+        self.assertIsNone(self.loop.run_until_complete(self.terminal_owners.terminal('t2', 'user-1')))
+        self.assertEqual(self.redis_client.strings, {})
+
+    def test_deleting_a_container_removes_its_terminal(self) -> None:
+        '''
+        Test that deleting a container of a terminal deletes the terminal's record, and that other containers do not.
+        '''
+        self.loop.run_until_complete(self.terminal_owners.add('user-1', self.terminal('t1')))
+
+        self.loop.run_until_complete(self.terminal_owners.remove_container('other-id'))
+        self.assertIsNotNone(self.loop.run_until_complete(self.terminal_owners.terminal('t1', 'user-1')))
+
+        self.loop.run_until_complete(self.terminal_owners.remove_container('t1-id'))
+        self.assertIsNone(self.loop.run_until_complete(self.terminal_owners.terminal('t1', 'user-1')))
+        self.assertEqual(self.redis_client.strings, {})
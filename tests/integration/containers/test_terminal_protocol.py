@@ -0,0 +1,80 @@
+# builtins
+from unittest import TestCase
+import json
+
+# local
+from src.containers.terminal_protocol import OPCODE_CONNECT
+from src.containers.terminal_protocol import OPCODE_DATA
+from src.containers.terminal_protocol import BINARY_SUBPROTOCOL
+from src.containers.terminal_protocol import JSON_SUBPROTOCOL
+from src.containers.terminal_protocol import BinaryCodec
+from src.containers.terminal_protocol import Frame
+from src.containers.terminal_protocol import JsonCodec
+from src.containers.terminal_protocol import ProtocolError
+from src.containers.terminal_protocol import RawCodec
+from src.containers.terminal_protocol import SocketSSHJsonCodec
+from src.containers.terminal_protocol import negotiate_browser_codec
+from src.containers.terminal_protocol import socket_ssh_codec
+
+
+class TestTerminalProtocol(TestCase):
+    '''
+    Test the terminal frame codecs and their negotiation.
+    '''
+    def test_binary_frames(self) -> None:
+        '''
+        Test that binary frames carry the payload as is behind a 3 byte header.
+        '''
+        codec: BinaryCodec = BinaryCodec()
+        encoded: bytes = codec.encode(Frame(OPCODE_DATA, 258, b'ls\n'))
+
+        self.assertEqual(encoded, b'\x01\x01\x02ls\n')
+        self.assertEqual(codec.decode(encoded), Frame(OPCODE_DATA, 258, b'ls\n'))
+        with self.assertRaises(ProtocolError):
+            codec.decode('ls\n')
+
+    def test_json_frames_keep_split_characters_whole(self) -> None:
+        '''
+        Test that JSON frames hold back a character split across payloads until it is complete.
+        '''
+        codec: JsonCodec = JsonCodec()
+        snowman: bytes = '☃'.encode('utf-8')
+
+        self.assertIsNone(codec.encode(Frame(OPCODE_DATA, 0, snowman[:2])))
+        self.assertEqual(json.loads(codec.encode(Frame(OPCODE_DATA, 0, snowman[2:]))), {'op': 'data', 'channel': 0, 'data': '☃'})
+        self.assertEqual(codec.decode('{"op": "data", "data": "ls"}'), Frame(OPCODE_DATA, 0, b'ls'))
+        with self.assertRaises(ProtocolError):
+            codec.decode('{"op": "resize"}')
+
+    def test_socket_ssh_envelopes(self) -> None:
+        '''
+        Test that socket-ssh versions without binary frames get their JSON envelopes.
+        '''
+        codec: SocketSSHJsonCodec = SocketSSHJsonCodec({0: 'terminal-1'})
+
+        connect: dict = json.loads(codec.encode(Frame(OPCODE_CONNECT, 0, b'{"ssh_port": 2222}')))
+        send: dict = json.loads(codec.encode(Frame(OPCODE_DATA, 0, b'pwd\n')))
+
+        self.assertEqual(connect, {'type': 'sshConnect', 'data': {'ssh_hash': 'terminal-1', 'ssh_port': 2222}})
+        self.assertEqual(send, {'type': 'sshSendData', 'data': {'ssh_hash': 'terminal-1', 'ssh_command': 'pwd\n'}})
+        self.assertEqual(codec.decode('/home/browseterm'), Frame(OPCODE_DATA, 0, b'/home/browseterm'))
+
+    def test_negotiation(self) -> None:
+        '''
+        Test that binary frames are preferred and JSON is the fallback.
+        '''
+        self.assertIsInstance(negotiate_browser_codec([JSON_SUBPROTOCOL, BINARY_SUBPROTOCOL]), BinaryCodec)
+        self.assertIsInstance(negotiate_browser_codec([JSON_SUBPROTOCOL]), JsonCodec)
+        self.assertIsInstance(negotiate_browser_codec([]), JsonCodec)
+        self.assertIsInstance(socket_ssh_codec(BINARY_SUBPROTOCOL, {0: 'terminal-1'}), BinaryCodec)
+        self.assertIsInstance(socket_ssh_codec(None, {0: 'terminal-1'}), SocketSSHJsonCodec)
+
+    def test_raw_frames(self) -> None:
+        '''
+        Test that gateway channels carry data payloads as they are, and nothing else.
+        '''
+        codec: RawCodec = RawCodec()
+
+        self.assertEqual(codec.encode(Frame(OPCODE_DATA, 0, b'ls\r')), b'ls\r')
+        self.assertIsNone(codec.encode(Frame(OPCODE_CONNECT, 0, b'{}')))
+        self.assertEqual(codec.decode(b'\x1b[0m'), Frame(OPCODE_DATA, 0, b'\x1b[0m'))
@@ -0,0 +1,91 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+import json
+
+# local
+from src.containers.terminal_reaper import TerminalReaper
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+
+
+class TestTerminalReaper(TestCase):
+    '''
+    Test TerminalReaper with a mocked asyncio Redis client and terminal service.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Setup the reaper with mocked Redis pipelines.
+        '''
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        self.pipeline: MagicMock = MagicMock()
+        self.pipeline.execute = AsyncMock()
+        self.redis_client: MagicMock = MagicMock()
+        self.redis_client.pipeline.return_value.__aenter__ = AsyncMock(return_value=self.pipeline)
+        self.redis_client.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+        self.redis_client.zadd = AsyncMock()
+        self.terminal_service: MagicMock = MagicMock()
+        self.terminal_service.delete_terminal = AsyncMock()
+        self.reaper: TerminalReaper = TerminalReaper(terminal_service=self.terminal_service, redis_client=self.redis_client)
+
+    def tearDown(self) -> None:
+        '''
+        Close event loop.
+        '''
+        self.loop.close()
+
+    def terminal_entry(self, terminal_id: str, user_id: str = 'user-1') -> str:
+        container: ContainerResponseModel = ContainerResponseModel(
+            container_id=f'{terminal_id}-id', container_name=terminal_id, container_ip='127.0.0.1',
+            container_network='browseterm', container_ports=[]
+        )
+        terminal: TerminalResponseModel = TerminalResponseModel(
+            terminal_id=terminal_id, image_name='image', network_name='browseterm',
+            ssh_container=container, socket_ssh_container=container, ssh_username='user', ssh_password='password',
+            certificate_secret_name=f'socket-ssh-{terminal_id}-service-certs', created_at=0.0
+        )
+        return json.dumps({'user_id': user_id, 'terminal': terminal.model_dump()})
+
+    def test_reap_deletes_idle_terminals_and_retries_failures(self) -> None:
+        '''
+        Test that idle terminals are deleted and forgotten, and that failed ones are pushed back for a retry.
+        '''
+        self.redis_client.zrangebyscore = AsyncMock(return_value=['t1', 't2', 't3'])
+        self.redis_client.hmget = AsyncMock(return_value=[self.terminal_entry('t1'), self.terminal_entry('t2'), None])
+        self.terminal_service.delete_terminal.side_effect = [None, RuntimeError('container-maker is down')]
+        self.reaper.owners.remove = AsyncMock()
+
+        reaped: int = self.loop.run_until_complete(self.reaper.reap())
+
+        self.assertEqual(reaped, 2)
+        self.assertEqual(self.terminal_service.delete_terminal.await_count, 2)
+        self.pipeline.zrem.assert_called_once_with(self.reaper.deadlines_key, 't1', 't3')
+        self.pipeline.hdel.assert_called_once_with(self.reaper.terminals_key, 't1', 't3')
+        self.reaper.owners.remove.assert_awaited_once_with('t1', 't3')
+        retried: dict = self.redis_client.zadd.await_args.args[1]
+        self.assertEqual(list(retried), ['t2'])
+
+    def test_activity_is_throttled_and_owned(self) -> None:
+        '''
+        Test that heartbeats of the owner push the deadline back at most once per interval,
+        and that heartbeats of other users are refused.
+        '''
+        self.redis_client.hget = AsyncMock(return_value=self.terminal_entry('t1'))
+
+        async def heartbeats() -> list[bool]:
+            return [
+                await self.reaper.heartbeat('t1', 'user-1', 'free'),
+                await self.reaper.heartbeat('t1', 'user-1', 'free'),
+                await self.reaper.heartbeat('t1', 'user-2', 'free'),
+            ]
+
+        with patch('src.containers.terminal_reaper.TERMINAL_REAPER_ACTIVITY_INTERVAL', 60):
+            results: list[bool] = self.loop.run_until_complete(heartbeats())
+
+        self.assertEqual(results, [True, True, False])
+        self.redis_client.zadd.assert_awaited_once()
+        self.assertTrue(self.redis_client.zadd.await_args.kwargs['xx'])
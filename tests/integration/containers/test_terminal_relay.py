@@ -0,0 +1,374 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import AsyncMock, patch
+import asyncio
+import json
+import time
+
+# local
+from src.containers.terminal_protocol import OPCODE_CLOSE, OPCODE_CREDIT, OPCODE_DATA, OPCODE_OPEN, OPCODE_SYNC, BinaryCodec, Frame
+from src.containers.terminal_relay import CLOSE_NORMAL, CLOSE_POLICY_VIOLATION, CLOSE_REPLACED, TerminalRelay, TerminalSession
+
+
+def data_frame(payload: bytes) -> bytes:
+    return BinaryCodec().encode(Frame(OPCODE_DATA, 0, payload))
+
+
+def sync_frame(sequence: int) -> bytes:
+    return BinaryCodec().encode(Frame(OPCODE_SYNC, 0, str(sequence).encode('ascii')))
+
+
+def frame(opcode: int, channel: int, payload: bytes) -> dict:
+    return {'type': 'websocket.receive', 'bytes': BinaryCodec().encode(Frame(opcode, channel, payload))}
+
+
+def open_frame(channel: int, terminal_id: str) -> dict:
+    return frame(OPCODE_OPEN, channel, json.dumps({'terminal_id': terminal_id}).encode('utf-8'))
+
+
+def received(browser: 'FakeBrowser', opcode: int) -> list[Frame]:
+    return [sent for sent in map(BinaryCodec().decode, browser.sent) if sent.opcode == opcode]
+
+
+def commands(upstream: 'FakeUpstream') -> str:
+    return ''.join(message['data']['ssh_command'] for message in upstream.received)
+
+
+class FakeBrowser:
+    '''
+    Browser side of the relay: frames to send are queued, sent frames are collected.
+    '''
+    def __init__(self) -> None:
+        self.incoming: asyncio.Queue[dict] = asyncio.Queue()
+        self.sent: list[bytes] = []
+        self.reading: asyncio.Event = asyncio.Event()  # cleared: the browser does not read
+        self.reading.set()
+        self.close = AsyncMock()
+
+    async def receive(self) -> dict:
+        return await self.incoming.get()
+
+    async def send_bytes(self, data: bytes) -> None:
+        await self.reading.wait()
+        self.sent.append(data)
+
+
+class FakeUpstream:
+    '''
+    socket-ssh side of the relay: yields the messages queued, or an endless stream of output.
+    '''
+    def __init__(self, endless: bool = False) -> None:
+        self.outgoing: asyncio.Queue[str | None] = asyncio.Queue()
+        self.endless: bool = endless
+        self.produced: int = 0
+        self.received: list[dict] = []
+        self.close = AsyncMock()
+
+    async def send(self, message: str) -> None:
+        self.received.append(json.loads(message))
+
+    def __aiter__(self) -> 'FakeUpstream':
+        return self
+
+    async def __anext__(self) -> str:
+        if self.endless:
+            await asyncio.sleep(0)
+            self.produced += 1
+            return 'x' * 1024
+        message: str | None = await self.outgoing.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+
+class TestTerminalRelay(TestCase):
+    '''
+    Test TerminalRelay and TerminalSession with fake browser and socket-ssh connections.
+    '''
+    def setUp(self) -> None:
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self) -> None:
+        self.loop.close()
+
+    async def wait_for(self, condition: callable) -> None:
+        while not condition():
+            await asyncio.sleep(0.005)
+
+    def test_relays_frames_both_ways(self) -> None:
+        '''
+        Test that browser bytes reach socket-ssh as commands, that output reaches the browser after a sync frame,
+        that a multibyte character split across frames arrives whole, and that the session outlives the browser.
+        '''
+        async def relay() -> tuple[FakeBrowser, FakeUpstream, AsyncMock, TerminalSession]:
+            browser: FakeBrowser = FakeBrowser()
+            upstream: FakeUpstream = FakeUpstream()
+            session: TerminalSession = TerminalSession('t1', upstream)
+            on_input: AsyncMock = AsyncMock()
+            task: asyncio.Task = asyncio.create_task(TerminalRelay(browser, session, on_input=on_input).run())
+            snowman: bytes = '☃'.encode('utf-8')
+            for data in (b'ls\n', snowman[:1], snowman[1:]):
+                await browser.incoming.put({'type': 'websocket.receive', 'bytes': data_frame(data)})
+            await upstream.outgoing.put('total 0\r\n')
+            await self.wait_for(lambda: commands(upstream) == 'ls\n☃' and len(browser.sent) == 2)
+            await browser.incoming.put({'type': 'websocket.disconnect'})
+            await task
+            return browser, upstream, on_input, session
+
+        browser, upstream, on_input, session = self.loop.run_until_complete(relay())
+
+        # input buffered while socket-ssh is busy is sent as one command.
+        self.assertEqual(commands(upstream), 'ls\n☃')
+        self.assertEqual({message['data']['ssh_hash'] for message in upstream.received}, {'t1'})
+        self.assertEqual(browser.sent, [sync_frame(0), data_frame(b'total 0\r\n')])
+        self.assertEqual(on_input.await_count, 3)
+        browser.close.assert_awaited_once_with(code=CLOSE_NORMAL)
+        # detached, waiting for a reconnect.
+        self.assertFalse(session.closed)
+        self.assertIsNotNone(session.expiry)
+        upstream.close.assert_not_awaited()
+        self.loop.run_until_complete(session.close())
+        upstream.close.assert_awaited_once()
+
+    def test_text_frames_are_refused(self) -> None:
+        '''
+        Test that a text frame from a browser that negotiated binary frames closes the relay with a policy violation.
+        '''
+        async def relay() -> FakeBrowser:
+            browser: FakeBrowser = FakeBrowser()
+            session: TerminalSession = TerminalSession('t1', FakeUpstream())
+            await browser.incoming.put({'type': 'websocket.receive', 'text': 'ls\n'})
+            await TerminalRelay(browser, session).run()
+            await session.close()
+            return browser
+
+        browser: FakeBrowser = self.loop.run_until_complete(relay())
+        browser.close.assert_awaited_once_with(code=CLOSE_POLICY_VIOLATION)
+
+    def test_slow_browser_stops_reading_upstream(self) -> None:
+        '''
+        Test that a browser that does not read stops the session from reading socket-ssh:
+        output buffered stays bounded by the scrollback.
+        '''
+        async def relay() -> FakeUpstream:
+            browser: FakeBrowser = FakeBrowser()
+            browser.reading.clear()
+            upstream: FakeUpstream = FakeUpstream(endless=True)
+            session: TerminalSession = TerminalSession('t1', upstream)
+            task: asyncio.Task = asyncio.create_task(TerminalRelay(browser, session).run())
+            await asyncio.sleep(0.2)
+            produced: int = upstream.produced
+            await browser.incoming.put({'type': 'websocket.disconnect'})
+            await task
+            await session.close()
+            return produced
+
+        with patch('src.containers.terminal_relay.TERMINAL_RELAY_SCROLLBACK_SIZE', 8192):
+            produced: int = self.loop.run_until_complete(relay())
+
+        # a full scrollback, plus the chunk waiting to be written.
+        self.assertLessEqual(produced, 8 + 1)
+
+    def test_output_is_coalesced_and_echo_is_not(self) -> None:
+        '''
+        Test that tiny output chunks are sent as one frame, and that the echo of input is sent right away.
+        '''
+        async def relay() -> list[bytes]:
+            browser: FakeBrowser = FakeBrowser()
+            upstream: FakeUpstream = FakeUpstream()
+            session: TerminalSession = TerminalSession('t1', upstream)
+            task: asyncio.Task = asyncio.create_task(TerminalRelay(browser, session).run())
+            await self.wait_for(lambda: browser.sent)
+            for chunk in ('a', 'b', 'c', 'd'):
+                await upstream.outgoing.put(chunk)
+            await self.wait_for(lambda: len(browser.sent) == 2)
+            # a keystroke, then its echo: sent without waiting for the flush interval.
+            await browser.incoming.put({'type': 'websocket.receive', 'bytes': data_frame(b'e')})
+            await self.wait_for(lambda: upstream.received)
+            await upstream.outgoing.put('e')
+            await self.wait_for(lambda: len(browser.sent) == 3)
+            await browser.incoming.put({'type': 'websocket.disconnect'})
+            await task
+            await session.close()
+            return browser.sent
+
+        with patch('src.containers.terminal_relay.TERMINAL_RELAY_FLUSH_INTERVAL', 0.05), \
+             patch('src.containers.terminal_relay.TERMINAL_RELAY_ECHO_WINDOW', 1):
+            started: float = time.monotonic()
+            sent: list[bytes] = self.loop.run_until_complete(relay())
+
+        self.assertEqual(sent, [sync_frame(0), data_frame(b'abcd'), data_frame(b'e')])
+        # one flush interval for the coalesced frame, none for the echo.
+        self.assertLess(time.monotonic() - started, 0.1)
+
+    def test_reconnect_resumes_from_sequence(self) -> None:
+        '''
+        Test that a reconnect is sent only the output it missed, and that the previous websocket is replaced.
+        '''
+        async def relay() -> tuple[FakeBrowser, FakeBrowser, FakeBrowser]:
+            upstream: FakeUpstream = FakeUpstream()
+            session: TerminalSession = TerminalSession('t1', upstream)
+            first: FakeBrowser = FakeBrowser()
+            first_task: asyncio.Task = asyncio.create_task(TerminalRelay(first, session).run())
+            await upstream.outgoing.put('hello')
+            await self.wait_for(lambda: len(first.sent) == 2)
+            await first.incoming.put({'type': 'websocket.disconnect'})
+            await first_task
+            # output while no browser is attached is kept.
+            await upstream.outgoing.put(' world')
+            await self.wait_for(lambda: session.scrollback.end == 11)
+
+            second: FakeBrowser = FakeBrowser()
+            second_task: asyncio.Task = asyncio.create_task(TerminalRelay(second, session, resume=5).run())
+            await self.wait_for(lambda: len(second.sent) == 2)
+            # attaching from another websocket replaces this one.
+            third: FakeBrowser = FakeBrowser()
+            third_task: asyncio.Task = asyncio.create_task(TerminalRelay(third, session, resume=11).run())
+            await second_task
+            await self.wait_for(lambda: third.sent)
+            await third.incoming.put({'type': 'websocket.disconnect'})
+            await third_task
+            await session.close()
+            return first, second, third
+
+        first, second, third = self.loop.run_until_complete(relay())
+
+        self.assertEqual(first.sent, [sync_frame(0), data_frame(b'hello')])
+        self.assertEqual(second.sent, [sync_frame(5), data_frame(b' world')])
+        second.close.assert_awaited_once_with(code=CLOSE_REPLACED)
+        self.assertEqual(third.sent, [sync_frame(11)])
+
+    def test_detached_session_expires(self) -> None:
+        '''
+        Test that a session nobody reconnects to is closed after the resume timeout.
+        '''
+        async def relay() -> tuple[TerminalSession, FakeUpstream]:
+            browser: FakeBrowser = FakeBrowser()
+            upstream: FakeUpstream = FakeUpstream()
+            session: TerminalSession = TerminalSession('t1', upstream)
+            await browser.incoming.put({'type': 'websocket.disconnect'})
+            await TerminalRelay(browser, session).run()
+            await self.wait_for(lambda: session.closed)
+            await asyncio.sleep(0)
+            return session, upstream
+
+        with patch('src.containers.terminal_relay.TERMINAL_RELAY_RESUME_TIMEOUT', 0.05):
+            session, upstream = self.loop.run_until_complete(relay())
+
+        self.assertTrue(session.closed)
+        upstream.close.assert_awaited_once()
+
+    def test_multiplexes_terminals(self) -> None:
+        '''
+        Test that terminals opened on channels of one websocket are relayed independently,
+        and that closing a channel detaches its terminal only.
+        '''
+        async def relay() -> tuple[FakeBrowser, dict[str, FakeUpstream], dict[str, TerminalSession]]:
+            upstreams: dict[str, FakeUpstream] = {'t1': FakeUpstream(), 't2': FakeUpstream()}
+            sessions: dict[str, TerminalSession] = {
+                terminal_id: TerminalSession(terminal_id, upstream) for terminal_id, upstream in upstreams.items()
+            }
+
+            async def open_session(terminal_id: str) -> TerminalSession | None:
+                return sessions.get(terminal_id)
+
+            browser: FakeBrowser = FakeBrowser()
+            task: asyncio.Task = asyncio.create_task(TerminalRelay(browser, open_session=open_session).run())
+            for message in (open_frame(1, 't1'), open_frame(2, 't2'), open_frame(3, 'other-users-terminal')):
+                await browser.incoming.put(message)
+            await self.wait_for(lambda: len(browser.sent) == 3)
+            await browser.incoming.put(frame(OPCODE_DATA, 1, b'ls\n'))
+            await browser.incoming.put(frame(OPCODE_DATA, 2, b'pwd\n'))
+            await upstreams['t1'].outgoing.put('one')
+            await upstreams['t2'].outgoing.put('two')
+            await self.wait_for(lambda: len(received(browser, OPCODE_DATA)) == 2 and all(
+                upstream.received for upstream in upstreams.values()
+            ))
+            await browser.incoming.put(frame(OPCODE_CLOSE, 1, b''))
+            await self.wait_for(lambda: sessions['t1'].attached is None)
+            await browser.incoming.put({'type': 'websocket.disconnect'})
+            await task
+            await asyncio.gather(*[session.close() for session in sessions.values()])
+            return browser, upstreams, sessions
+
+        browser, upstreams, sessions = self.loop.run_until_complete(relay())
+
+        self.assertEqual(received(browser, OPCODE_CLOSE), [Frame(OPCODE_CLOSE, 3, str(CLOSE_POLICY_VIOLATION).encode('ascii'))])
+        self.assertEqual(received(browser, OPCODE_SYNC), [Frame(OPCODE_SYNC, 1, b'0'), Frame(OPCODE_SYNC, 2, b'0')])
+        self.assertCountEqual(received(browser, OPCODE_DATA), [Frame(OPCODE_DATA, 1, b'one'), Frame(OPCODE_DATA, 2, b'two')])
+        self.assertEqual(commands(upstreams['t1']), 'ls\n')
+        self.assertEqual(commands(upstreams['t2']), 'pwd\n')
+        browser.close.assert_awaited_once_with(code=CLOSE_NORMAL)
+
+    def test_credits_stall_only_their_channel(self) -> None:
+        '''
+        Test that a channel sends no more output than it was granted, while the other channels keep going,
+        and that channels take turns sending output.
+        '''
+        async def relay() -> tuple[list[Frame], list[Frame], list[Frame]]:
+            sessions: dict[str, TerminalSession] = {
+                terminal_id: TerminalSession(terminal_id, FakeUpstream()) for terminal_id in ('t1', 't2')
+            }
+            for session in sessions.values():
+                await session.write(b'x' * 8192)
+
+            async def open_session(terminal_id: str) -> TerminalSession | None:
+                return sessions.get(terminal_id)
+
+            browser: FakeBrowser = FakeBrowser()
+            task: asyncio.Task = asyncio.create_task(TerminalRelay(browser, open_session=open_session).run())
+            await browser.incoming.put(open_frame(1, 't1'))
+            await browser.incoming.put(open_frame(2, 't2'))
+            await self.wait_for(lambda: len(received(browser, OPCODE_DATA)) == 8)
+            await asyncio.sleep(0.05)
+            stalled: list[Frame] = received(browser, OPCODE_DATA)
+            # channel 2 renders its output and grants it all, channel 1 grants nothing.
+            await browser.incoming.put(frame(OPCODE_CREDIT, 2, b'4096'))
+            await self.wait_for(lambda: len(received(browser, OPCODE_DATA)) == 12)
+            await asyncio.sleep(0.05)
+            granted: list[Frame] = received(browser, OPCODE_DATA)[8:]
+            await browser.incoming.put({'type': 'websocket.disconnect'})
+            await task
+            await asyncio.gather(*[session.close() for session in sessions.values()])
+            return stalled, granted
+
+        with patch('src.containers.terminal_relay.TERMINAL_RELAY_WINDOW', 4096), \
+             patch('src.containers.terminal_relay.TERMINAL_RELAY_FLUSH_SIZE', 1024):
+            stalled, granted = self.loop.run_until_complete(relay())
+
+        # a window each, sent in turns.
+        self.assertEqual([sent.channel for sent in stalled], [1, 2] * 4)
+        self.assertEqual({len(sent.payload) for sent in stalled}, {1024})
+        self.assertEqual([sent.channel for sent in granted], [2] * 4)
+
+    def test_input_beyond_credit_is_refused(self) -> None:
+        '''
+        Test that a browser sending more input than it was granted is closed with a policy violation.
+        '''
+        async def relay() -> tuple[FakeBrowser, FakeUpstream]:
+            upstream: FakeUpstream = FakeUpstream()
+            session: TerminalSession = TerminalSession('t1', upstream)
+
+            async def open_session(terminal_id: str) -> TerminalSession | None:
+                return session
+
+            browser: FakeBrowser = FakeBrowser()
+            task: asyncio.Task = asyncio.create_task(TerminalRelay(browser, open_session=open_session).run())
+            await browser.incoming.put(open_frame(1, 't1'))
+            await self.wait_for(lambda: session.attached is not None)
+            await browser.incoming.put(frame(OPCODE_DATA, 1, b'x' * 3072))
+            await self.wait_for(lambda: received(browser, OPCODE_CREDIT))
+            # 1024 bytes of the window left, plus the 3072 granted back.
+            await browser.incoming.put(frame(OPCODE_DATA, 1, b'y' * 4096))
+            await browser.incoming.put(frame(OPCODE_DATA, 1, b'z'))
+            await task
+            await session.close()
+            return browser, upstream
+
+        with patch('src.containers.terminal_relay.TERMINAL_RELAY_WINDOW', 4096):
+            browser, upstream = self.loop.run_until_complete(relay())
+
+        self.assertEqual(received(browser, OPCODE_CREDIT)[0], Frame(OPCODE_CREDIT, 1, b'3072'))
+        self.assertEqual(commands(upstream), 'x' * 3072 + 'y' * 4096)
+        browser.close.assert_awaited_once_with(code=CLOSE_POLICY_VIOLATION)
@@ -0,0 +1,37 @@
+# builtins
+from unittest import TestCase
+
+# local
+from src.containers.terminal_scrollback import Scrollback
+
+
+class TestScrollback(TestCase):
+    '''
+    Test the Scrollback ring buffer.
+    '''
+    def test_reads_from_sequence_across_the_wrap(self) -> None:
+        '''
+        Test that output written across the end of the buffer reads back in order.
+        '''
+        scrollback: Scrollback = Scrollback(8)
+        scrollback.write(b'abcdef')
+        scrollback.write(b'ghij')
+
+        self.assertEqual(scrollback.start, 2)
+        self.assertEqual(scrollback.end, 10)
+        self.assertEqual(scrollback.read(4, 100), (4, b'efghij'))
+        self.assertEqual(scrollback.read(4, 3), (4, b'efg'))
+        self.assertEqual(scrollback.read(10, 100), (10, b''))
+
+    def test_reads_older_than_start_begin_at_start(self) -> None:
+        '''
+        Test that output that was overwritten is skipped, and that a large write keeps only its tail.
+        '''
+        scrollback: Scrollback = Scrollback(4)
+        scrollback.write(b'ab')
+        scrollback.write(b'0123456789')
+
+        self.assertEqual(scrollback.end, 12)
+        self.assertEqual(scrollback.read(0, 100), (8, b'6789'))
+        # a sequence number from the future, such as one from another pod's session.
+        self.assertEqual(scrollback.read(50, 100), (12, b''))
@@ -0,0 +1,200 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+
+# kubernetes
+from kubernetes_asyncio.client.rest import ApiException
+
+# local
+from src.containers.certificate_authority import CertificateAuthority
+from src.containers.terminal_service import TerminalService
+from src.containers.dto.create_container_dto import CreateContainerModel
+from src.containers.dto.create_terminal_dto import CreateTerminalModel
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+
+
+class TestTerminalService(TestCase):
+    '''
+    Test TerminalService orchestration with a mocked container maker client.
+    Certificates are not issued, issue_certificates is mocked.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Setup a mocked container maker client that returns a container named after the request.
+        '''
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        async def create_container(create_container_data: CreateContainerModel, user_id: str | None = None) -> ContainerResponseModel:
+            return ContainerResponseModel(
+                container_id=f"{create_container_data.container_name}-id",
+                container_name=create_container_data.container_name,
+                container_ip='127.0.0.1',
+                container_network=create_container_data.network_name,
+                container_ports=[]
+            )
+
+        async def wait_until_ready(container: ContainerResponseModel, network_name: str, user_id: str | None = None) -> ContainerResponseModel:
+            return container
+
+        self.container_maker_client: MagicMock = MagicMock()
+        self.container_maker_client.create_container = AsyncMock(side_effect=create_container)
+        self.container_maker_client.wait_until_ready = AsyncMock(side_effect=wait_until_ready)
+        self.container_maker_client.delete_container = AsyncMock()
+        self.terminal_service: TerminalService = TerminalService(container_maker_client=self.container_maker_client)
+        # terminal ids are generated, not taken from the certificate pool.
+        self.terminal_service.certificate_pool_manager = None
+        # certificates are inlined unless a test enables secret mounts.
+        supports_secret_mounts = patch(
+            'src.containers.terminal_service.CreateContainerInputDataTransformer.supports_secret_mounts', return_value=False
+        )
+        self.supports_secret_mounts: MagicMock = supports_secret_mounts.start()
+        self.addCleanup(supports_secret_mounts.stop)
+        self.certificates: dict = {
+            'server.key': '', 'server.crt': '', 'client.key': '', 'client.crt': '', 'ca.crt': ''
+        }
+
+    def tearDown(self) -> None:
+        '''
+        Close event loop.
+        '''
+        self.loop.close()
+
+    def test_create_terminal(self) -> None:
+        '''
+        Test that both containers are created.
+        '''
+        self.terminal_service.issue_certificates = AsyncMock(return_value=self.certificates)
+
+        terminal: TerminalResponseModel = self.loop.run_until_complete(
+            self.terminal_service.create_terminal(CreateTerminalModel(), user_id='1')
+        )
+
+        self.assertEqual(terminal.ssh_container.container_name, f"ssh-{terminal.terminal_id}")
+        self.assertEqual(terminal.socket_ssh_container.container_name, f"socket-ssh-{terminal.terminal_id}")
+        self.assertEqual(terminal.certificate_secret_name, f"socket-ssh-{terminal.terminal_id}-service-certs")
+        self.assertEqual(self.container_maker_client.create_container.await_count, 2)
+        self.container_maker_client.delete_container.assert_not_awaited()
+
+    def test_create_terminal_with_secret_mount(self) -> None:
+        '''
+        Test that the certificate secret is referenced by name when container-maker supports secret mounts.
+        '''
+        self.supports_secret_mounts.return_value = True
+        self.terminal_service.issue_certificate_secret = AsyncMock(return_value=None)
+        self.terminal_service.issue_certificates = AsyncMock()
+
+        terminal: TerminalResponseModel = self.loop.run_until_complete(
+            self.terminal_service.create_terminal(CreateTerminalModel(), user_id='1')
+        )
+
+        self.terminal_service.issue_certificates.assert_not_awaited()
+        socket_ssh_data: CreateContainerModel = next(
+            call.args[0] for call in self.container_maker_client.create_container.await_args_list
+            if call.args[0].container_name.startswith('socket-ssh-')
+        )
+        self.assertEqual(socket_ssh_data.environment_variables, {})
+        self.assertEqual(socket_ssh_data.secret_mounts[0].secret_name, terminal.certificate_secret_name)
+        self.assertEqual(socket_ssh_data.secret_mounts[0].environment_variables['SERVER_KEY'], 'server.key')
+
+    def test_ssh_container_starts_before_certificates_are_issued(self) -> None:
+        '''
+        Test that the SSH container is created while certificates are still being issued.
+        '''
+        certificates_issued: asyncio.Event = asyncio.Event()
+
+        async def issue_certificates(terminal_id: str, pooled: bool = False) -> dict:
+            # only completes once the SSH container has been requested.
+            while self.container_maker_client.create_container.await_count == 0:
+                await asyncio.sleep(0)
+            certificates_issued.set()
+            return self.certificates
+
+        self.terminal_service.issue_certificates = AsyncMock(side_effect=issue_certificates)
+
+        self.loop.run_until_complete(self.terminal_service.create_terminal(CreateTerminalModel()))
+
+        self.assertTrue(certificates_issued.is_set())
+
+    @patch('src.containers.terminal_service.CertificateUtils')
+    @patch('src.containers.terminal_service.CERT_AUTHORITY_ENABLED', True)
+    def test_invalid_ca_falls_back_to_certificate_job(self, mock_certificate_utils: MagicMock) -> None:
+        '''
+        Test that a CA secret that cannot be decoded falls back to the certificate job.
+        '''
+        mock_certificate_utils.create_certificate_job = AsyncMock()
+        certificate_authority: CertificateAuthority = CertificateAuthority(ca_secret_name='test-ca-secret')
+
+        with (
+            patch('src.containers.certificate_authority.CertificateUtils.read_certificate_from_secret', new=AsyncMock(
+                return_value={'ca.crt': 'bm90IGEgY2VydGlmaWNhdGU=', 'ca.key': 'bm90IGEga2V5'}
+            )),
+            patch('src.containers.terminal_service.get_certificate_authority', return_value=certificate_authority),
+        ):
+            certificates: dict | None = self.loop.run_until_complete(self.terminal_service.issue_certificate_secret('1'))
+
+        self.assertIsNone(certificates)
+        mock_certificate_utils.create_certificate_job.assert_awaited_once_with(self.terminal_service.socket_ssh_service_name('1'))
+
+    @patch('src.containers.terminal_service.CertificateUtils')
+    @patch('src.containers.terminal_service.CERT_AUTHORITY_ENABLED', False)
+    def test_pooled_id_without_secret_issues_certificates(self, mock_certificate_utils: MagicMock) -> None:
+        '''
+        Test that a pooled terminal id whose secret is gone gets its certificates issued again, in secret mount mode.
+        '''
+        self.supports_secret_mounts.return_value = True
+        self.terminal_service.certificate_pool_manager = MagicMock()
+        self.terminal_service.certificate_pool_manager.acquire = AsyncMock(return_value='pooled')
+        mock_certificate_utils.read_certificate_from_secret = AsyncMock(side_effect=ApiException(status=404))
+        mock_certificate_utils.create_certificate_job = AsyncMock()
+
+        terminal: TerminalResponseModel = self.loop.run_until_complete(
+            self.terminal_service.create_terminal(CreateTerminalModel())
+        )
+
+        self.assertEqual(terminal.terminal_id, 'pooled')
+        mock_certificate_utils.read_certificate_from_secret.assert_awaited_once_with(terminal.certificate_secret_name)
+        mock_certificate_utils.create_certificate_job.assert_awaited_once_with(
+            self.terminal_service.socket_ssh_service_name('pooled')
+        )
+
+    @patch('src.containers.terminal_service.CertificateUtils')
+    def test_create_terminal_rolls_back_on_certificate_failure(self, mock_certificate_utils: MagicMock) -> None:
+        '''
+        Test that the SSH container and the secret are deleted when certificate issuance fails.
+        '''
+        mock_certificate_utils.delete_secret = AsyncMock()
+        self.terminal_service.issue_certificates = AsyncMock(side_effect=RuntimeError('job failed'))
+
+        with self.assertRaises(RuntimeError):
+            self.loop.run_until_complete(self.terminal_service.create_terminal(CreateTerminalModel()))
+
+        self.container_maker_client.delete_container.assert_awaited_once()
+        deleted_container_id: str = self.container_maker_client.delete_container.await_args.args[0].container_id
+        self.assertTrue(deleted_container_id.startswith('ssh-'))
+        mock_certificate_utils.delete_secret.assert_awaited_once()
+
+    @patch('src.containers.terminal_service.CertificateUtils')
+    @patch('src.containers.terminal_service.TERMINAL_RELAY_GATEWAY_ENABLED', True)
+    def test_create_and_delete_terminal_in_gateway_mode(self, mock_certificate_utils: MagicMock) -> None:
+        '''
+        Test that in gateway mode a terminal is only its SSH container, without certificates.
+        '''
+        mock_certificate_utils.delete_secret = AsyncMock()
+        self.terminal_service.issue_certificates = AsyncMock()
+
+        terminal: TerminalResponseModel = self.loop.run_until_complete(
+            self.terminal_service.create_terminal(CreateTerminalModel(), user_id='1')
+        )
+        self.loop.run_until_complete(self.terminal_service.delete_terminal(terminal, user_id='1'))
+
+        self.assertEqual(terminal.ssh_container.container_name, f"ssh-{terminal.terminal_id}")
+        self.assertIsNone(terminal.socket_ssh_container)
+        self.assertIsNone(terminal.certificate_secret_name)
+        self.terminal_service.issue_certificates.assert_not_awaited()
+        self.container_maker_client.create_container.assert_awaited_once()
+        self.container_maker_client.delete_container.assert_awaited_once()
+        mock_certificate_utils.delete_secret.assert_not_awaited()
@@ -0,0 +1,298 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+import time
+
+# third party
+import redis
+
+# local
+from src.common.config import WARM_POOL_MAX_AGE
+from src.containers.warm_pool import WarmPoolManager
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.create_terminal_dto import CreateTerminalModel
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+
+
+class FakePipeline:
+    '''
+    Queues commands and runs them on execute, like a non-transactional Redis pipeline.
+    '''
+    def __init__(self, redis_client: 'FakeRedis') -> None:
+        self.redis_client: FakeRedis = redis_client
+        self.commands: list = []
+
+    async def __aenter__(self) -> 'FakePipeline':
+        return self
+
+    async def __aexit__(self, *args: any) -> None:
+        pass
+
+    def __getattr__(self, command: str) -> any:
+        return lambda *args, **kwargs: self.commands.append((command, args, kwargs))
+
+    async def execute(self) -> list:
+        return [await getattr(self.redis_client, command)(*args, **kwargs) for command, args, kwargs in self.commands]
+
+
+class FakeRedis:
+    '''
+    The Redis commands WarmPoolManager uses, in memory.
+    '''
+    def __init__(self) -> None:
+        self.lists: dict[str, list[str]] = {}
+        self.sorted_sets: dict[str, dict[str, float]] = {}
+        self.strings: dict[str, str] = {}
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    async def rpush(self, key: str, *values: str) -> int:
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    async def lpop(self, key: str) -> str | None:
+        values: list[str] = self.lists.get(key, [])
+        return values.pop(0) if values else None
+
+    async def lrange(self, key: str, start: int, end: int) -> list[str]:
+        values: list[str] = self.lists.get(key, [])
+        return values[start:] if end == -1 else values[start:end + 1]
+
+    async def lrem(self, key: str, count: int, value: str) -> int:
+        values: list[str] = self.lists.get(key, [])
+        if value not in values:
+            return 0
+        values.remove(value)
+        return 1
+
+    async def llen(self, key: str) -> int:
+        return len(self.lists.get(key, []))
+
+    async def ltrim(self, key: str, start: int, end: int) -> None:
+        values: list[str] = self.lists.get(key, [])
+        self.lists[key] = values[start:] if end == -1 else values[start:end + 1]
+
+    async def blpop(self, keys: list[str], timeout: float) -> tuple[str, str] | None:
+        deadline: float = time.monotonic() + timeout
+        while True:
+            for key in keys:
+                if self.lists.get(key):
+                    return key, self.lists[key].pop(0)
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(0.001)
+
+    async def zadd(self, key: str, mapping: dict[str, float]) -> None:
+        self.sorted_sets.setdefault(key, {}).update(mapping)
+
+    async def zremrangebyscore(self, key: str, minimum: str, maximum: float) -> None:
+        members: dict[str, float] = self.sorted_sets.get(key, {})
+        for member in [member for member, score in members.items() if score <= maximum]:
+            del members[member]
+
+    async def zcount(self, key: str, minimum: float, maximum: str) -> int:
+        return sum(1 for score in self.sorted_sets.get(key, {}).values() if score >= minimum)
+
+    async def expire(self, key: str, ttl: int) -> None:
+        pass
+
+    async def set(self, key: str, value: str, nx: bool = False, ex: int | None = None) -> bool:
+        if nx and key in self.strings:
+            return False
+        self.strings[key] = value
+        return True
+
+    async def get(self, key: str) -> str | None:
+        return self.strings.get(key)
+
+
+class TestWarmPoolManager(TestCase):
+    '''
+    Test WarmPoolManager against an in-memory Redis, with a mocked terminal service.
+    '''
+    def setUp(self) -> None:
+        '''
+        Setup a manager keeping one image warm.
+        '''
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.redis_client: FakeRedis = FakeRedis()
+        self.terminal_service: MagicMock = MagicMock()
+        self.terminal_service.create_terminal = AsyncMock(side_effect=lambda *args, **kwargs: self.terminal('new'))
+        self.terminal_service.delete_terminal = AsyncMock()
+        self.terminal_service.container_maker_client.adopt = AsyncMock()
+        self.manager: WarmPoolManager = self.warm_pool_manager()
+
+    def tearDown(self) -> None:
+        '''
+        Close event loop.
+        '''
+        self.loop.run_until_complete(self.manager.stop())
+        self.loop.close()
+
+    def warm_pool_manager(self) -> WarmPoolManager:
+        return WarmPoolManager(terminal_service=self.terminal_service, redis_client=self.redis_client, images=['ssh'])
+
+    @staticmethod
+    def terminal(terminal_id: str, age: float = 0) -> TerminalResponseModel:
+        container: ContainerResponseModel = ContainerResponseModel(
+            container_id=f'ssh-{terminal_id}-id', container_name=f'ssh-{terminal_id}', container_ip='10.0.0.1',
+            container_network='browseterm', container_ports=[]
+        )
+        return TerminalResponseModel(
+            terminal_id=terminal_id, image_name='ssh', network_name='browseterm', ssh_container=container,
+            ssh_username='user', ssh_password='password', created_at=time.time() - age
+        )
+
+    def stock(self, *terminals: TerminalResponseModel) -> None:
+        self.redis_client.lists[self.manager.ready_key('ssh')] = [terminal.model_dump_json() for terminal in terminals]
+
+    def settle(self) -> None:
+        self.loop.run_until_complete(asyncio.gather(*self.manager.tasks))
+
+    def test_acquire_hands_out_the_first_fresh_terminal(self) -> None:
+        '''
+        Test that stale terminals are discarded on the way to a fresh one, and that demand is recorded.
+        '''
+        self.stock(self.terminal('stale', age=WARM_POOL_MAX_AGE + 1), self.terminal('fresh'))
+
+        terminal: TerminalResponseModel | None = self.loop.run_until_complete(self.manager.acquire('ssh'))
+        self.settle()
+
+        self.assertEqual(terminal.terminal_id, 'fresh')
+        self.assertEqual(self.terminal_service.delete_terminal.await_args.args[0].terminal_id, 'stale')
+        self.assertEqual(len(self.redis_client.sorted_sets[self.manager.demand_key('ssh')]), 1)
+        self.assertIsNone(self.loop.run_until_complete(self.manager.acquire('ssh')))
+
+    def test_handoff_makes_the_user_the_owner(self) -> None:
+        '''
+        Test that a warm terminal handed out to a user has its containers adopted by the user.
+        '''
+        self.stock(self.terminal('fresh'))
+
+        with patch('src.containers.warm_pool.TERMINAL_NETWORK_NAME', 'browseterm'):
+            terminal: TerminalResponseModel = self.loop.run_until_complete(self.manager.acquire_or_create(
+                CreateTerminalModel(image_name='ssh', network_name='browseterm'), user_id='1'
+            ))
+
+        self.terminal_service.container_maker_client.adopt.assert_awaited_once_with('1', 'browseterm', terminal.ssh_container)
+        self.terminal_service.create_terminal.assert_not_awaited()
+
+    def test_refill_sweeps_stale_terminals(self) -> None:
+        '''
+        Test that stale terminals are removed from the pool and do not count towards it.
+        '''
+        self.stock(self.terminal('stale', age=WARM_POOL_MAX_AGE + 1), self.terminal('fresh'))
+
+        with patch('src.containers.warm_pool.WARM_POOL_MIN_SIZE', 2):
+            self.loop.run_until_complete(self.manager.refill('ssh'))
+            self.settle()
+
+        ready: list[str] = [
+            TerminalResponseModel.model_validate_json(encoded).terminal_id
+            for encoded in self.redis_client.lists[self.manager.ready_key('ssh')]
+        ]
+        self.assertEqual(ready, ['fresh', 'new'])
+        self.assertEqual(self.terminal_service.delete_terminal.await_args.args[0].terminal_id, 'stale')
+
+    def test_refill_provisions_the_deficit(self) -> None:
+        '''
+        Test that the pool is filled up to its demand sized target, counting terminals being provisioned.
+        '''
+        self.stock(self.terminal('fresh'))
+        self.redis_client.sorted_sets[self.manager.demand_key('ssh')] = {f'request-{i}': time.time() for i in range(8)}
+        self.manager.provisioning['ssh'] = 1
+
+        with patch('src.containers.warm_pool.WARM_POOL_DEMAND_FACTOR', 0.5):
+            self.loop.run_until_complete(self.manager.refill('ssh'))
+            self.settle()
+
+        # 8 requests * 0.5 = 4 terminals: 1 ready, 1 being provisioned, 2 started.
+        self.assertEqual(self.terminal_service.create_terminal.await_count, 2)
+        self.assertEqual(len(self.redis_client.lists[self.manager.ready_key('ssh')]), 3)
+        self.assertEqual(self.manager.provisioning['ssh'], 1)
+
+    def test_only_the_leader_refills(self) -> None:
+        '''
+        Test that of two pods sharing the pool, only the one holding the lock refills.
+        '''
+        follower: WarmPoolManager = self.warm_pool_manager()
+        self.manager.refill = AsyncMock()
+        follower.refill = AsyncMock()
+
+        async def run_both() -> None:
+            leader_task: asyncio.Task = asyncio.create_task(self.manager.run())
+            await asyncio.sleep(0.01)
+            follower_task: asyncio.Task = asyncio.create_task(follower.run())
+            await asyncio.sleep(0.05)
+            for task in (leader_task, follower_task):
+                task.cancel()
+            await asyncio.gather(leader_task, follower_task, return_exceptions=True)
+
+        with patch('src.containers.warm_pool.WARM_POOL_REFILL_INTERVAL', 0.01):
+            self.loop.run_until_complete(run_both())
+
+        self.assertGreater(self.manager.refill.await_count, 1)
+        follower.refill.assert_not_awaited()
+        self.assertEqual(self.redis_client.strings[self.manager.leader_key], self.manager.pod_id)
+
+    def test_handout_on_a_follower_wakes_the_leader(self) -> None:
+        '''
+        Test that a terminal handed out on another pod makes the leader refill before the interval is over.
+        '''
+        follower: WarmPoolManager = self.warm_pool_manager()
+        self.manager.refill = AsyncMock()
+
+        async def hand_out_on_follower() -> None:
+            leader_task: asyncio.Task = asyncio.create_task(self.manager.run())
+            await asyncio.sleep(0.01)
+            self.assertEqual(self.manager.refill.await_count, 1)
+            await follower.acquire('ssh')
+            await asyncio.sleep(0.01)
+            leader_task.cancel()
+            await asyncio.gather(leader_task, return_exceptions=True)
+
+        with patch('src.containers.warm_pool.WARM_POOL_REFILL_INTERVAL', 10):
+            self.loop.run_until_complete(hand_out_on_follower())
+
+        self.assertEqual(self.manager.refill.await_count, 2)
+
+    def test_stop_waits_for_terminals_being_provisioned(self) -> None:
+        '''
+        Test that stopping does not cancel a terminal half way, and that the terminal is pooled.
+        '''
+        created: asyncio.Event = asyncio.Event()
+
+        async def create_terminal(*args: any, **kwargs: any) -> TerminalResponseModel:
+            await created.wait()
+            return self.terminal('new')
+
+        self.terminal_service.create_terminal = AsyncMock(side_effect=create_terminal)
+
+        async def stop_while_provisioning() -> None:
+            await self.manager.refill('ssh')
+            await asyncio.sleep(0.01)
+            stopping: asyncio.Task = asyncio.create_task(self.manager.stop())
+            await asyncio.sleep(0.01)
+            self.assertFalse(stopping.done())
+            created.set()
+            await stopping
+
+        self.loop.run_until_complete(stop_while_provisioning())
+
+        self.assertEqual(len(self.redis_client.lists[self.manager.ready_key('ssh')]), 1)
+        self.terminal_service.delete_terminal.assert_not_awaited()
+        self.assertEqual(self.manager.provisioning['ssh'], 0)
+
+    def test_terminal_that_cannot_be_pooled_is_deleted(self) -> None:
+        '''
+        Test that a provisioned terminal is deleted when it cannot be added to the pool.
+        '''
+        self.redis_client.rpush = AsyncMock(side_effect=redis.ConnectionError('Redis is down'))
+
+        self.loop.run_until_complete(self.manager.refill('ssh'))
+        self.settle()
+
+        self.assertEqual(self.terminal_service.delete_terminal.await_args.args[0].terminal_id, 'new')
@@ -0,0 +1,66 @@
+# builtins
+from unittest import TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+
+# third party
+import redis
+
+# local
+from src.api_handlers import hand_out_terminal
+from src.containers.terminal_owners import TerminalOwners
+from src.containers.terminal_reaper import TerminalReaper
+from src.containers.dto.container_response_dto import ContainerResponseModel
+from src.containers.dto.terminal_response_dto import TerminalResponseModel
+from tests.integration.containers.test_terminal_owners import FakeRedisStrings
+
+
+class TestHandOutTerminal(TestCase):
+    '''
+    Test that a new terminal is deleted when it cannot be handed out to its user.
+    '''
+    def setUp(self) -> None:
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        container: ContainerResponseModel = ContainerResponseModel(
+            container_id='ssh-t1-id', container_name='ssh-t1', container_ip='127.0.0.1',
+            container_network='browseterm', container_ports=[]
+        )
+        self.terminal: TerminalResponseModel = TerminalResponseModel(
+            terminal_id='t1', image_name='image', network_name='browseterm', ssh_container=container,
+            ssh_username='user', ssh_password='password', created_at=0.0
+        )
+        # the reaper's Redis pipeline fails.
+        pipeline: MagicMock = MagicMock()
+        pipeline.execute = AsyncMock(side_effect=redis.ConnectionError('Redis is down'))
+        reaper_redis_client: MagicMock = MagicMock()
+        reaper_redis_client.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipeline)
+        reaper_redis_client.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+        self.terminal_service: MagicMock = MagicMock()
+        self.terminal_service.delete_terminal = AsyncMock()
+        self.terminal_owners: TerminalOwners = TerminalOwners(redis_client=FakeRedisStrings())
+        self.patches: list = [
+            patch('src.api_handlers.TERMINAL_REAPER_ENABLED', True),
+            patch('src.api_handlers.get_terminal_reaper', return_value=TerminalReaper(
+                terminal_service=self.terminal_service, redis_client=reaper_redis_client
+            )),
+            patch('src.api_handlers.get_terminal_owners', return_value=self.terminal_owners),
+            patch('src.api_handlers.get_warm_pool_manager', return_value=MagicMock(terminal_service=self.terminal_service)),
+        ]
+        for started in self.patches:
+            started.start()
+
+    def tearDown(self) -> None:
+        for started in self.patches:
+            started.stop()
+        self.loop.close()
+
+    def test_untracked_terminal_is_deleted(self) -> None:
+        '''
+        Test that a terminal the reaper cannot track is deleted with its owner record, and the error raised.
+        '''
+        with self.assertRaises(redis.ConnectionError):
+            self.loop.run_until_complete(hand_out_terminal(self.terminal, 'user-1', 'free'))
+
+        self.terminal_service.delete_terminal.assert_awaited_once_with(self.terminal, user_id='user-1')
+        self.assertIsNone(self.loop.run_until_complete(self.terminal_owners.terminal('t1', 'user-1')))